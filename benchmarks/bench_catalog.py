@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark do catálogo indexado (DistributionCatalog)
+
+Gera um catálogo sintético (distribuições × variantes × arquiteturas × versões),
+mede montagem, gravação/carga do formato compacto, memória e consultas das
+cascatas de combobox, comparando com o dicionário aninhado original.
+
+Uso: python3 benchmarks/bench_catalog.py [--distros 10000] [--variants 3] [--archs 3] [--versions 5]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bootable_usb_creator_final import DistributionCatalog  # noqa: E402
+
+
+def build_nested(distros, variants, archs, versions):
+    """Monta o dicionário aninhado no formato do distributions.json"""
+    arch_names = ["amd64", "arm64", "i386", "armhf", "ppc64el", "s390x", "riscv64"][:archs]
+    data = {}
+    for d in range(distros):
+        version_names = [f"{d % 40}.{v}" for v in range(versions)]
+        data[f"Distro {d:05d}"] = {
+            "family": f"family{d % 50}",
+            "checksum_type": "sha256",
+            "variants": {
+                f"Variant{v}": {
+                    "architectures": {
+                        arch: {"versions": {version: {} for version in version_names}}
+                        for arch in arch_names
+                    }
+                }
+                for v in range(variants)
+            },
+        }
+    return data
+
+
+def measure(label, func):
+    """Mede o tempo (sem tracemalloc) e, numa segunda execução, a memória retida"""
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    del result
+
+    tracemalloc.start()
+    result = func()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<38} {elapsed * 1000:9.1f} ms   retido {current / 1024**2:7.1f} MB   pico {peak / 1024**2:7.1f} MB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--distros", type=int, default=10000)
+    parser.add_argument("--variants", type=int, default=3)
+    parser.add_argument("--archs", type=int, default=3)
+    parser.add_argument("--versions", type=int, default=5)
+    args = parser.parse_args()
+
+    total = args.distros * args.variants * args.archs * args.versions
+    print(f"📦 Catálogo sintético: {args.distros} × {args.variants} × {args.archs} × {args.versions} = {total} builds\n")
+
+    nested = measure("dicionário aninhado (montagem)", lambda: build_nested(
+        args.distros, args.variants, args.archs, args.versions))
+    catalog = measure("DistributionCatalog.from_distributions", lambda: DistributionCatalog.from_distributions(nested))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "distributions.json")
+        catalog_path = os.path.join(tmp, "catalog.bin")
+
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(nested, f)
+        catalog.save(catalog_path)
+
+        def load_json():
+            with open(json_path, encoding="utf-8") as f:
+                return json.load(f)
+
+        measure("json.load (distributions.json)", load_json)
+        loaded = measure("DistributionCatalog.load (compacto)", lambda: DistributionCatalog.load(catalog_path))
+
+        print(f"\n💾 JSON: {os.path.getsize(json_path) / 1024**2:.1f} MB   "
+              f"compacto: {os.path.getsize(catalog_path) / 1024**2:.1f} MB")
+
+    assert len(loaded) == len(catalog)
+
+    families = loaded.families()
+    lookups = 100000
+    start = time.perf_counter()
+    for i in range(lookups):
+        family = families[i % len(families)]
+        variant = loaded.variants(family)[0]
+        arch = loaded.architectures(family, variant)[0]
+        loaded.versions(family, variant, arch)
+    elapsed = time.perf_counter() - start
+    print(f"🔎 {lookups} cascatas família→variante→arquitetura→versões: "
+          f"{elapsed * 1000:.1f} ms ({elapsed / lookups * 1e6:.2f} µs cada)")
+
+
+if __name__ == "__main__":
+    main()
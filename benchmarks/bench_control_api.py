@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark da API de controle (JSON por linha num socket Unix)
+
+Sobe o servidor sobre um HeadlessUSBCreator e mede, numa única conexão:
+- pedidos em sequência (espera cada resposta antes do próximo) contra pedidos
+  encadeados (envia todos, depois lê as respostas), com "ping" e com um
+  "devices.list" que leva --detect-ms, como a varredura de dispositivos real;
+- a latência dos eventos: linhas de log registradas no núcleo até chegarem a
+  um cliente inscrito (publicação a cada CONTROL_EVENT_INTERVAL).
+
+Nada é gravado; o núcleo não acessa a rede nem os discos.
+
+Uso: python3 benchmarks/bench_control_api.py [--requests 200] [--detect-ms 20] [--log-lines 50]
+"""
+
+import argparse
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bootable_usb_creator_final import (  # noqa: E402
+    CONTROL_EVENT_INTERVAL, ControlAPIClient, HeadlessUSBCreator,
+)
+
+
+def sequential(client, method, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        client.call(method)
+    return time.perf_counter() - start
+
+
+def pipelined(client, method, count):
+    start = time.perf_counter()
+    ids = [client.send(method) for _ in range(count)]
+    for request_id in ids:
+        client.result(request_id)
+    return time.perf_counter() - start
+
+
+def event_latency(app, client, lines):
+    client.call("subscribe", topics=["log"])
+    latencies = []
+    for index in range(lines):
+        app.log(f"bench {index} {time.perf_counter()!r}")
+        while True:
+            message = client.events.popleft() if client.events else client.receive()
+            if message.get("event") == "log" and f"bench {index} " in message["message"]:
+                latencies.append(time.perf_counter() - float(message["message"].split()[-1]))
+                break
+        time.sleep(random.uniform(0, CONTROL_EVENT_INTERVAL))  # registros em fases diferentes da publicação
+    return sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--detect-ms", type=float, default=20)
+    parser.add_argument("--log-lines", type=int, default=50)
+    args = parser.parse_args()
+
+    app = HeadlessUSBCreator(assume_yes=True, stream=io.StringIO())
+
+    def detect():
+        time.sleep(args.detect_ms / 1000)
+        return [{"path": "/dev/sdz", "size": 16 * 1024**3}]
+
+    app.detect_usb_devices = detect
+    with tempfile.TemporaryDirectory() as tmp:
+        server = app.start_control_api(os.path.join(tmp, "control.sock"))
+        client = ControlAPIClient(server.socket_path)
+        print(f"🔌 {args.requests} pedido(s) por medida numa conexão, devices.list de {args.detect_ms:.0f} ms\n")
+
+        for method in ("ping", "devices.list"):
+            seq = sequential(client, method, args.requests)
+            pipe = pipelined(client, method, args.requests)
+            print(f"{method:<13} em sequência {seq * 1000:8.1f} ms   encadeado {pipe * 1000:8.1f} ms   "
+                  f"({seq / pipe:.1f}x)")
+
+        latencies = event_latency(app, client, args.log_lines)
+        print(f"\nEventos de log  p50 {statistics.median(latencies) * 1000:5.1f} ms   "
+              f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:5.1f} ms   "
+              f"máx {latencies[-1] * 1000:5.1f} ms   (publicação a cada {CONTROL_EVENT_INTERVAL * 1000:.0f} ms)")
+        client.close()
+        app.stop_control_api()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Benchmark do barramento de eventos (EventBus) durante uma gravação a toda velocidade
+
+Uma thread grava uma imagem sintética num arquivo temporário e publica o
+progresso a cada bloco (e uma linha de log a cada 1%). Compara o caminho antigo,
+em que a própria thread de gravação atualiza os widgets a cada bloco, com o
+barramento drenado a 20 Hz, que só aplica o último progresso de cada quadro.
+Mede a CPU gasta atualizando a interface, quantas atualizações chegaram aos
+widgets e a latência entre a publicação e a aplicação do evento.
+
+Com DISPLAY disponível usa widgets Tk reais; sem ele, widgets simulados.
+
+Uso: python3 benchmarks/bench_event_bus.py [--size-mb 512] [--chunk-kb 64]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bootable_usb_creator_final import UI_FRAME_INTERVAL_MS, EventBus  # noqa: E402
+
+
+class FakeWidgets:
+    """Stand-in dos widgets quando não há display"""
+
+    def __init__(self):
+        self.progress = 0.0
+        self.label = ""
+        self.lines = []
+
+    def set_progress(self, percent):
+        self.progress = percent
+        self.label = f"{percent:.1f}%"
+
+    def append_log(self, text):
+        self.lines.append(text)
+
+    def refresh(self):
+        pass
+
+
+class TkWidgets:
+    def __init__(self, root):
+        import tkinter as tk
+        from tkinter import ttk
+        self.tk = tk
+        self.root = root
+        self.progress_var = tk.DoubleVar()
+        ttk.Progressbar(root, variable=self.progress_var, maximum=100, length=400).pack()
+        self.progress_label = ttk.Label(root, text="0%")
+        self.progress_label.pack()
+        self.log_text = tk.Text(root, height=10)
+        self.log_text.pack()
+
+    def set_progress(self, percent):
+        self.progress_var.set(percent)
+        self.progress_label.config(text=f"{percent:.1f}%")
+
+    def append_log(self, text):
+        self.log_text.insert(self.tk.END, text + "\n")
+        self.log_text.see(self.tk.END)
+
+    def refresh(self):
+        self.root.update_idletasks()
+
+
+def write_image(path, size, chunk, on_progress, on_log):
+    block = os.urandom(chunk)
+    written = 0
+    last_log = -1
+    with open(path, "wb", buffering=0) as f:
+        while written < size:
+            written += f.write(block)
+            percent = written / size * 100
+            on_progress(percent)
+            if int(percent) != last_log:
+                last_log = int(percent)
+                on_log(f"📊 {percent:.1f}%")
+
+
+def run_direct(path, size, chunk, widgets):
+    """Caminho antigo: a thread de gravação mexe nos widgets a cada bloco"""
+    cpu = [0.0]
+    updates = [0]
+
+    def on_progress(percent):
+        start = time.thread_time()
+        widgets.set_progress(percent)
+        widgets.refresh()
+        cpu[0] += time.thread_time() - start
+        updates[0] += 1
+
+    def on_log(text):
+        start = time.thread_time()
+        widgets.append_log(text)
+        widgets.refresh()
+        cpu[0] += time.thread_time() - start
+        updates[0] += 1
+
+    start = time.perf_counter()
+    worker = threading.Thread(target=write_image, args=(path, size, chunk, on_progress, on_log))
+    worker.start()
+    pump_until(widgets, lambda: not worker.is_alive(), None)
+    return {"wall": time.perf_counter() - start, "cpu": cpu[0], "updates": updates[0], "latencies": []}
+
+
+def run_bus(path, size, chunk, widgets):
+    """Barramento: a gravação só publica; a thread da interface drena a 20 Hz"""
+    bus = EventBus()
+    stats = {"cpu": 0.0, "updates": 0, "latencies": []}
+
+    def frame():
+        start = time.thread_time()
+        events, progress = bus.drain()
+        now = time.perf_counter()
+        for stamp, kind, args in events:
+            widgets.append_log(args[0])
+            stats["latencies"].append(now - stamp)
+        for job, (stamp, (percent, _)) in progress.items():
+            widgets.set_progress(percent)
+            stats["latencies"].append(now - stamp)
+        if events or progress:
+            widgets.refresh()
+            stats["updates"] += len(events) + len(progress)
+        stats["cpu"] += time.thread_time() - start
+
+    start = time.perf_counter()
+    worker = threading.Thread(
+        target=write_image,
+        args=(path, size, chunk, lambda p: bus.progress("usb", p), lambda t: bus.publish("log", t)),
+    )
+    worker.start()
+    pump_until(widgets, lambda: not worker.is_alive() and not bus.pending(), frame)
+    stats["wall"] = time.perf_counter() - start
+    return stats
+
+
+def pump_until(widgets, done, frame):
+    """Laço da thread da interface: um quadro a cada UI_FRAME_INTERVAL_MS"""
+    interval = UI_FRAME_INTERVAL_MS / 1000
+    root = getattr(widgets, "root", None)
+    while not done():
+        if frame:
+            frame()
+        if root is not None:
+            root.update()
+        time.sleep(interval)
+    if frame:
+        frame()
+
+
+def report(label, stats, events):
+    line = (f"{label:<22} {stats['wall']:6.2f} s   CPU da interface {stats['cpu'] * 1000:8.1f} ms   "
+            f"{stats['updates']:7d} atualização(ões) de {events} evento(s)")
+    if stats["latencies"]:
+        lat = sorted(stats["latencies"])
+        line += (f"\n{'':<22} latência p50 {statistics.median(lat) * 1000:5.1f} ms   "
+                 f"p99 {lat[int(len(lat) * 0.99) - 1] * 1000:5.1f} ms   máx {lat[-1] * 1000:5.1f} ms")
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=512)
+    parser.add_argument("--chunk-kb", type=int, default=64)
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    chunk = args.chunk_kb * 1024
+    events = size // chunk + 101
+
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        widgets_factory = lambda: TkWidgets(tk.Toplevel(root))  # noqa: E731
+        backend = "widgets Tk"
+    except Exception:
+        root = None
+        widgets_factory = FakeWidgets
+        backend = "widgets simulados (sem display)"
+
+    print(f"💾 Gravação de {args.size_mb} MiB em blocos de {args.chunk_kb} KiB, {backend}\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        image = os.path.join(tmp, "usb.img")
+        report("direto (por bloco)", run_direct(image, size, chunk, widgets_factory()), events)
+        report("barramento (20 Hz)", run_bus(image, size, chunk, widgets_factory()), events)
+    if root is not None:
+        root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark do log (anel em memória + widget limitado + arquivo rotativo assíncrono)
+
+Registra milhões de linhas pelo BootableUSBCreator.log(), como um dd verboso,
+enquanto a "thread do Tk" drena o barramento a 20 Hz. Mede o custo por linha
+na thread que registra, o custo de cada quadro da interface e confere que o
+histórico e o widget ficam limitados. A maior parte das linhas é DEBUG, que
+só vai para o arquivo.
+
+Com DISPLAY disponível usa um tk.Text real; sem ele, um Text simulado.
+
+Uso: python3 benchmarks/bench_logging.py [--lines 1000000] [--debug-ratio 0.9]
+"""
+
+import argparse
+import itertools
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import resource
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import bootable_usb_creator_final as app_module  # noqa: E402
+from bootable_usb_creator_final import (  # noqa: E402
+    LOG_HISTORY_LINES, LOG_WIDGET_MAX_LINES, UI_FRAME_INTERVAL_MS, BootableUSBCreator,
+)
+
+
+class FakeText:
+    """Stand-in do tk.Text: guarda as linhas e entende os índices usados pelo log"""
+
+    def __init__(self):
+        self.lines = []
+
+    def insert(self, index, text):
+        self.lines.extend(text.splitlines())
+
+    def delete(self, start, end=None):
+        if end is None or str(end) == "end":
+            self.lines.clear()
+        else:
+            del self.lines[:int(str(end).split(".")[0]) - 1]
+
+    def see(self, index):
+        pass
+
+
+def make_app(log_dir):
+    """Instância só com o necessário para o log (sem catálogo nem GUI)"""
+    app_module._import_tkinter()
+    app = BootableUSBCreator.__new__(BootableUSBCreator)
+    app.log_history = deque(maxlen=LOG_HISTORY_LINES)
+    app.log_level = logging.INFO
+    app._log_seq = itertools.count(1)
+    app._log_rendered_seq = 0
+    app._log_widget_lines = 0
+    app.log_sink = app_module.LogFileSink(os.path.join(log_dir, "bench.log"))
+    app.log_sink.start()
+    app.events = app_module.EventBus()
+    try:
+        import tkinter as tk
+        app._tk_root = tk.Tk()
+        app.log_text = tk.Text(app._tk_root)
+        backend = "tk.Text"
+    except Exception:
+        app._tk_root = None
+        app.log_text = FakeText()
+        backend = "Text simulado (sem display)"
+    return app, backend
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--debug-ratio", type=float, default=0.9)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app, backend = make_app(tmp)
+        print(f"📝 {args.lines} linhas ({args.debug_ratio:.0%} DEBUG), widget: {backend}\n")
+        debug_every = max(1, round(1 / max(1e-9, 1 - args.debug_ratio)))
+
+        def producer():
+            for i in range(args.lines):
+                if i % debug_every:
+                    app.log(f"   {i * 4194304} bytes copied, 12.3 s, 341 MB/s", logging.DEBUG)
+                else:
+                    app.log(f"📊 {i / args.lines * 100:.1f}% - 341.0 MB/s")
+
+        frames = []
+        start = time.perf_counter()
+        worker = threading.Thread(target=producer)
+        worker.start()
+        while worker.is_alive() or app.events.pending():
+            frame_start = time.perf_counter()
+            events, _ = app.events.drain()
+            app._append_log_lines([args_[1] for _, kind, args_ in events if kind == "log"])
+            if app._tk_root is not None:
+                app._tk_root.update()
+            frames.append(time.perf_counter() - frame_start)
+            time.sleep(UI_FRAME_INTERVAL_MS / 1000)
+        elapsed = time.perf_counter() - start
+
+        flush_start = time.perf_counter()
+        app.log_sink.stop(timeout=None)
+        flush = time.perf_counter() - flush_start
+        log_files = [f for f in os.listdir(tmp) if f.startswith("bench.log")]
+
+        frames.sort()
+        print(f"Registro              {elapsed / args.lines * 1e6:8.2f} µs/linha ({elapsed:.1f} s no total)")
+        print(f"Quadro da interface   mediana {frames[len(frames) // 2] * 1000:6.2f} ms   "
+              f"máx {frames[-1] * 1000:6.2f} ms em {len(frames)} quadros")
+        print(f"Histórico em memória  {len(app.log_history)} linhas (limite {LOG_HISTORY_LINES})")
+        print(f"Linhas no widget      {app._log_widget_lines} (limite {LOG_WIDGET_MAX_LINES})")
+        print(f"Pico de memória (RSS) {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+        print(f"Arquivo de log        {len(log_files)} arquivo(s) rotativo(s), fila esvaziada em {flush * 1000:.0f} ms")
+        if app._tk_root is not None:
+            app._tk_root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark do estimador de progresso (ProgressEstimator) com cache de páginas simulado
+
+Simula um pendrive lento atrás de um cache de páginas grande: o gravador
+entrega bytes ao kernel bem mais rápido do que o pendrive grava, até o cache
+encher (limite de Dirty); daí em diante anda no ritmo do pendrive, e no fim o
+fsync espera o cache esvaziar. O Dirty/Writeback simulado vai para um
+/proc/meminfo falso, que o estimador lê como faria no sistema real.
+
+Compara, com a verdade (bytes que já chegaram ao pendrive):
+- o progresso antigo, pelos bytes entregues pelo gravador;
+- o ProgressEstimator (entregue - cache, vazão suavizada).
+Mostra o percentual de cada um em alguns instantes e o erro da ETA.
+
+Uso: python3 benchmarks/bench_progress.py [--size-mb 2048] [--cache-mb 1024] [--device-mbs 400] [--writer-mbs 4000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bootable_usb_creator_final import ProgressEstimator, format_duration  # noqa: E402
+
+MB = 1024 * 1024
+STEP = 0.01
+
+
+class SimulatedCache:
+    """Cache de páginas + pendrive: o gravador enche, o pendrive esvazia à sua velocidade"""
+
+    def __init__(self, meminfo_path, cache_limit, device_rate):
+        self.meminfo_path = meminfo_path
+        self.cache_limit = cache_limit
+        self.device_rate = device_rate
+        self.submitted = 0
+        self.on_device = 0
+        self.lock = threading.Lock()
+        self.write_meminfo()
+
+    def write_meminfo(self):
+        dirty = self.submitted - self.on_device
+        with open(self.meminfo_path + ".tmp", "w") as f:
+            f.write(f"MemTotal: 16000000 kB\nDirty: {dirty // 1024} kB\nWriteback: 0 kB\n")
+        os.replace(self.meminfo_path + ".tmp", self.meminfo_path)
+
+    def submit(self, count):
+        """Aceita até count bytes (o que couber no cache); devolve quantos entraram"""
+        with self.lock:
+            accepted = max(0, min(count, self.cache_limit - (self.submitted - self.on_device)))
+            self.submitted += accepted
+            self.write_meminfo()
+            return accepted
+
+    def tick(self, elapsed):
+        with self.lock:
+            self.on_device = min(self.submitted, self.on_device + int(self.device_rate * elapsed))
+            self.write_meminfo()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--cache-mb", type=int, default=1024)
+    parser.add_argument("--device-mbs", type=float, default=400)
+    parser.add_argument("--writer-mbs", type=float, default=4000)
+    args = parser.parse_args()
+
+    total = args.size_mb * MB
+    print(f"💾 {args.size_mb} MiB, cache de {args.cache_mb} MiB, pendrive a {args.device_mbs:.0f} MB/s, "
+          f"gravador a {args.writer_mbs:.0f} MB/s (tempo simulado)\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        meminfo = os.path.join(tmp, "meminfo")
+        target = os.path.join(tmp, "target.img")  # arquivo comum: o estimador usa o /proc/meminfo
+        open(target, "wb").close()
+        cache = SimulatedCache(meminfo, args.cache_mb * MB, args.device_mbs * MB)
+        estimator = ProgressEstimator(total, target, "write", meminfo_path=meminfo).start()
+
+        stop = threading.Event()
+
+        def device():
+            last = time.perf_counter()
+            while not stop.is_set():
+                time.sleep(STEP)
+                now = time.perf_counter()
+                cache.tick(now - last)
+                last = now
+
+        drain = threading.Thread(target=device)
+        drain.start()
+
+        start = time.perf_counter()
+        samples = []  # (tempo, verdadeiro %, gravador %, estimador %, ETA gravador, ETA estimador)
+        naive_mark = (start, 0)
+        naive_rate = 0.0
+        next_sample = 0.0
+        writer_done_at = None
+        while True:
+            now = time.perf_counter()
+            elapsed = now - start
+            if cache.submitted < total:
+                cache.submit(min(total - cache.submitted, int(args.writer_mbs * MB * STEP)))
+                snapshot = estimator.update(cache.submitted)
+            elif writer_done_at is None:
+                writer_done_at = elapsed  # o gravador terminou; agora é o fsync esperando o cache
+                snapshot = estimator.snapshot()
+            else:
+                snapshot = estimator.snapshot()
+            if cache.on_device >= total:
+                break
+
+            if now - naive_mark[0] >= 0.5:  # vazão do progresso antigo: bytes entregues por segundo
+                naive_rate = (cache.submitted - naive_mark[1]) / (now - naive_mark[0])
+                naive_mark = (now, cache.submitted)
+            if elapsed >= next_sample:
+                naive_eta = (total - cache.submitted) / naive_rate if naive_rate else None
+                samples.append((elapsed, cache.on_device / total * 100, cache.submitted / total * 100,
+                                snapshot["percent"], naive_eta, snapshot["eta"]))
+                next_sample += 1.0
+            time.sleep(STEP)
+
+        finished = time.perf_counter() - start
+        estimator.finish()
+        stop.set()
+        drain.join()
+
+    print(f"{'tempo':>6}  {'real':>6}  {'gravador':>8}  {'estimador':>9}  {'ETA real':>8}  "
+          f"{'ETA gravador':>12}  {'ETA estimador':>13}")
+    for elapsed, true, naive, estimated, naive_eta, eta in samples:
+        print(f"{elapsed:5.1f}s  {true:5.1f}%  {naive:7.1f}%  {estimated:8.1f}%  "
+              f"{format_duration(finished - elapsed):>8}  {format_duration(naive_eta):>12}  {format_duration(eta):>13}")
+    print(f"\nO gravador chegou a 100% em {writer_done_at:.1f} s; o pendrive terminou em {finished:.1f} s "
+          f"({finished - writer_done_at:.1f} s de fsync)")
+
+
+if __name__ == "__main__":
+    main()
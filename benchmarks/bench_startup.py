@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark da partida a frio (importação, núcleo, --cli e primeiro quadro da janela)
+
+Cada medida roda num processo Python novo, como o usuário abrindo o programa:
+- importação do módulo, conferindo que tkinter e requests não são carregados;
+- construção do USBCreatorCore (catálogo, resolvedores, configuração);
+- processo completo de "--cli --list-devices";
+- com DISPLAY, tempo até o primeiro quadro da janela (BootableUSBCreator +
+  root.update()). A meta é abaixo de 300 ms.
+
+Uso: python3 benchmarks/bench_startup.py [--runs 5] [--target-ms 300]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SCRIPT = os.path.join(ROOT, "bootable_usb_creator_final.py")
+
+PROBE = r"""
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+import bootable_usb_creator_final as app_module
+imported = time.perf_counter()
+result = {{"import": imported - start,
+           "tkinter": "tkinter" in sys.modules, "requests": "requests" in sys.modules}}
+mode = {mode!r}
+if mode == "core":
+    app_module.USBCreatorCore()
+    result["core"] = time.perf_counter() - imported
+elif mode == "gui":
+    app = app_module.BootableUSBCreator()
+    app.root.update()  # mapeia e desenha a janela: primeiro quadro
+    result["first_frame"] = time.perf_counter() - start
+    app.root.destroy()
+print(json.dumps(result))
+"""
+
+
+def probe(mode):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(root=ROOT, mode=mode)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def best(runs, func, key):
+    results = [func() for _ in range(runs)]
+    return min(r[key] for r in results), results[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=300)
+    args = parser.parse_args()
+
+    print(f"🚀 Partida a frio, melhor de {args.runs} processo(s)\n")
+
+    elapsed, sample = best(args.runs, lambda: probe("import"), "import")
+    print(f"Importação do módulo      {elapsed * 1000:7.1f} ms   "
+          f"tkinter {'carregado ❌' if sample['tkinter'] else 'não carregado ✅'}, "
+          f"requests {'carregado ❌' if sample['requests'] else 'não carregado ✅'}")
+
+    elapsed, _ = best(args.runs, lambda: probe("core"), "core")
+    print(f"USBCreatorCore()          {elapsed * 1000:7.1f} ms")
+
+    def cli():
+        start = time.perf_counter()
+        subprocess.run([sys.executable, SCRIPT, "--cli", "--list-devices"], capture_output=True, check=True)
+        return {"wall": time.perf_counter() - start}
+
+    elapsed, _ = best(args.runs, cli, "wall")
+    print(f"--cli --list-devices      {elapsed * 1000:7.1f} ms   (processo inteiro)")
+
+    if not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+        print("Primeiro quadro da janela   (pulado: sem DISPLAY)")
+        return
+    elapsed, _ = best(args.runs, lambda: probe("gui"), "first_frame")
+    status = "✅" if elapsed * 1000 <= args.target_ms else "❌"
+    print(f"Primeiro quadro da janela {elapsed * 1000:7.1f} ms   {status} meta {args.target_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark da fila de gravação (WriteJobScheduler) com topologia USB simulada
+
+Simula pendrives pendurados em dois controladores: um hub USB 2.0 (banda
+pequena, disputada) e uma porta USB 3.x. Cada controlador tem uma banda total
+e cada pendrive uma velocidade máxima; gravações simultâneas no mesmo
+controlador dividem a banda e perdem eficiência (troca de contexto do
+barramento). Compara três políticas para o mesmo lote:
+- uma gravação por vez;
+- todas ao mesmo tempo (limite fixo = número de pendrives);
+- limite adaptativo por controlador (padrão da fila).
+Mede o tempo total e o erro da ETA prevista a 25% do lote.
+
+Nada é gravado de verdade: o write_func só avança o progresso no ritmo da
+banda simulada. Para rodar com loop devices, use o --cli --job.
+
+Uso: python3 benchmarks/bench_write_scheduler.py [--size-mb 60] [--usb2-sticks 6] [--usb3-sticks 4]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bootable_usb_creator_final import WriteJobScheduler, format_duration  # noqa: E402
+
+MB = 1024 * 1024
+
+# controlador -> (banda total, velocidade por pendrive, perda de eficiência por gravação extra)
+CONTROLLERS = {
+    "hub-usb2": (40 * MB, 25 * MB, 0.10),
+    "xhci-usb3": (400 * MB, 90 * MB, 0.05),
+}
+
+
+class SimulatedBus:
+    """Banda compartilhada por controlador: cada gravação ativa recebe a sua fatia a cada passo"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = {name: 0 for name in CONTROLLERS}
+
+    def share(self, controller):
+        bandwidth, per_stick, penalty = CONTROLLERS[controller]
+        count = self.active[controller]
+        aggregate = min(bandwidth, count * per_stick) * max(0.1, 1 - penalty * (count - 1))
+        return aggregate / count
+
+    def write_func(self, job, on_progress, cancelled, step=0.02):
+        with self.lock:
+            self.active[job["controller"]] += 1
+        try:
+            done = 0.0
+            while done < job["total"]:
+                if cancelled():
+                    return False
+                time.sleep(step)
+                with self.lock:
+                    done = min(job["total"], done + self.share(job["controller"]) * step)
+                on_progress(int(done))
+            return True
+        finally:
+            with self.lock:
+                self.active[job["controller"]] -= 1
+
+
+def run_policy(label, images, sticks, **scheduler_args):
+    bus = SimulatedBus()
+    topology = {device: {"controller": controller, "hub": controller, "speed": speed}
+                for device, controller, speed in sticks}
+    scheduler = WriteJobScheduler(
+        bus.write_func, topology=topology.__getitem__, log=lambda message: None, **scheduler_args,
+    )
+    for (device, _, _), image in zip(sticks, images):
+        scheduler.submit(image, device)
+
+    start = time.perf_counter()
+    scheduler.start()
+    scheduler.close()
+    predicted = None
+    while True:
+        snapshot = scheduler.snapshot()
+        if snapshot["finished"]:
+            break
+        if predicted is None and snapshot["percent"] >= 25 and snapshot["eta"] is not None:
+            predicted = (time.perf_counter() - start, snapshot["eta"])
+        time.sleep(0.1)
+    elapsed = time.perf_counter() - start
+
+    limits = ", ".join(f"{name} {state['limit']}" for name, state in snapshot["controllers"].items())
+    line = f"{label:<24} {elapsed:6.1f} s   limites finais: {limits}"
+    if predicted:
+        at, eta = predicted
+        actual = elapsed - at
+        line += (f"\n{'':<24} ETA aos 25%: prevista {format_duration(eta)}, real {format_duration(actual)} "
+                 f"({(eta - actual) / actual * 100:+.0f}%)")
+    print(line)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=60)
+    parser.add_argument("--usb2-sticks", type=int, default=6)
+    parser.add_argument("--usb3-sticks", type=int, default=4)
+    parser.add_argument("--adapt-interval", type=float, default=0.5)
+    args = parser.parse_args()
+
+    sticks = [(f"/dev/usb2-{i}", "hub-usb2", 480) for i in range(args.usb2_sticks)]
+    sticks += [(f"/dev/usb3-{i}", "xhci-usb3", 5000) for i in range(args.usb3_sticks)]
+    count = len(sticks)
+
+    print(f"💾 {count} pendrive(s) de {args.size_mb} MiB: {args.usb2_sticks} num hub USB 2.0, "
+          f"{args.usb3_sticks} numa porta USB 3.x (banda simulada)\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        images = []
+        for index in range(count):
+            path = os.path.join(tmp, f"image{index}.img")
+            with open(path, "wb") as f:
+                f.truncate(args.size_mb * MB)  # esparso: só o tamanho importa
+            images.append(path)
+
+        run_policy("uma por vez", images, sticks, max_concurrent=1, max_per_controller=1, adaptive=False)
+        run_policy("todas em paralelo", images, sticks, max_concurrent=count, max_per_controller=count,
+                   adaptive=False)
+        run_policy("adaptativa (padrão)", images, sticks, max_concurrent=count, max_per_controller=4,
+                   adapt_interval=args.adapt_interval)
+
+
+if __name__ == "__main__":
+    main()
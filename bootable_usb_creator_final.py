@@ -6,1107 +6,6888 @@ Sistema hierárquico com milhares de distribuições possíveis
 
 import os
 import sys
-import requests
 import subprocess
 import platform
 import shutil
 import json
 from pathlib import Path
-import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
 import threading
 import hashlib
 import time
-import psutil
+import heapq
+import itertools
+from urllib.parse import urlparse, urljoin
+from array import array
+import struct
+import csv
+import difflib
+import re
+import string
+from functools import lru_cache
+import marshal
+import tempfile
+import tarfile
+import io
+import queue
+import collections
+import copy
+import atexit
+import logging
+import socket
+import signal
+import stat
+import uuid
+import zlib
+import base64
+import math
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+# tkinter só é carregado pela interface gráfica (_import_tkinter); o modo --cli nunca o importa
+tk = ttk = messagebox = filedialog = simpledialog = None
+
+
+def _import_tkinter():
+    """Importa o tkinter sob demanda e publica os nomes usados pela GUI"""
+    global tk, ttk, messagebox, filedialog, simpledialog
+    if tk is None:
+        import tkinter
+        from tkinter import ttk as _ttk, messagebox as _messagebox, filedialog as _filedialog
+        from tkinter import simpledialog as _simpledialog
+        tk, ttk, messagebox, filedialog, simpledialog = tkinter, _ttk, _messagebox, _filedialog, _simpledialog
+    return tk
+
+
+# === CATÁLOGO INDEXADO ===
+class DistributionCatalog:
+    """Catálogo colunar de distribuições
+
+    Cada linha é uma combinação (família, variante, arquitetura) guardada como ids
+    inteiros de uma tabela única de strings internadas. As listas de versões são
+    conjuntos deduplicados: por padrão cada linha usa o conjunto da família, e só
+    guarda um conjunto próprio quando difere. Índices por nível de seleção tornam
+    as cascatas de combobox consultas diretas em dicionário.
+    """
 
+    MAGIC = b"BUSBCAT1"
+    HEADER = struct.Struct("<8sBIIIIIII")
+    REMOVED_ROW = -2  # marca em col_versions de linhas de famílias removidas/substituídas
 
-class BootableUSBCreator:
     def __init__(self):
-        # Inicializar log temporário antes da GUI
-        self._temp_log = []
+        self.strings = []
+        self._ids = {}
+        self.meta = {}  # família -> metadados (family, checksum_type, ...)
+
+        # Colunas das linhas
+        self.col_family = array("I")
+        self.col_variant = array("I")
+        self.col_arch = array("I")
+        self.col_versions = array("i")  # conjunto próprio, -1 (usa o da família) ou REMOVED_ROW
+
+        # Conjuntos de versões deduplicados
+        self.version_sets = []
+        self._version_set_ids = {}
+        self.family_versions = {}  # id da família -> índice do conjunto de versões
+
+        # Índices por nível de seleção
+        self._family_order = []
+        self._variants = {}  # família -> [variantes]
+        self._archs = {}  # (família, variante) -> [arquiteturas]
+        self._rows = {}  # (família, variante, arquitetura) -> linha
+
+    def __len__(self):
+        return len(self._rows)
+
+    def intern(self, text):
+        """Retorna o id inteiro da string, registrando-a se for nova"""
+        sid = self._ids.get(text)
+        if sid is None:
+            sid = len(self.strings)
+            self.strings.append(text)
+            self._ids[text] = sid
+        return sid
+
+    def _register_family(self, fid):
+        if fid not in self._variants:
+            self._family_order.append(fid)
+            self._variants[fid] = []
+
+    def _version_set(self, versions):
+        ids = tuple(self.intern(version) for version in versions)
+        index = self._version_set_ids.get(ids)
+        if index is None:
+            index = len(self.version_sets)
+            self.version_sets.append(array("I", ids))
+            self._version_set_ids[ids] = index
+        return index
+
+    def _index_row(self, row):
+        fid, vid, aid = self.col_family[row], self.col_variant[row], self.col_arch[row]
+        self._register_family(fid)
+        archs = self._archs.get((fid, vid))
+        if archs is None:
+            archs = self._archs[(fid, vid)] = []
+            self._variants[fid].append(vid)
+        archs.append(aid)
+        self._rows[(fid, vid, aid)] = row
+
+    def add_family(self, family, meta=None):
+        """Registra uma família (mesmo sem variantes)"""
+        fid = self.intern(family)
+        self._register_family(fid)
+        if meta is not None:
+            self.meta[family] = meta
+        return fid
+
+    def add_build(self, family, variant, arch, versions=None):
+        """Adiciona uma combinação família/variante/arquitetura (versões opcionais)"""
+        key = (self.intern(family), self.intern(variant), self.intern(arch))
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self.col_family)
+            self.col_family.append(key[0])
+            self.col_variant.append(key[1])
+            self.col_arch.append(key[2])
+            self.col_versions.append(-1)
+            self._index_row(row)
+        if versions is not None:
+            self.col_versions[row] = self._version_set(versions)
+        return row
+
+    def add_family_data(self, family, family_data):
+        """Adiciona uma família no formato hierárquico do JSON"""
+        meta = {
+            key: value for key, value in family_data.items()
+            if key != "variants"
+        }
+        self.add_family(family, meta)
 
-        # Carregar distribuições hierárquicas escaláveis
-        self.distributions = self.load_scalable_distributions()
+        for variant, variant_data in family_data.get("variants", {}).items():
+            architectures = variant_data.get("architectures", [])
+            if isinstance(architectures, dict):
+                for arch, arch_data in architectures.items():
+                    versions = list(arch_data.get("versions", {})) if isinstance(arch_data, dict) else []
+                    self.add_build(family, variant, arch, versions or None)
+            else:
+                for arch in architectures:
+                    self.add_build(family, variant, arch)
+
+    def _drop_family_rows(self, fid):
+        # As linhas ficam nas colunas como lápides; somem na próxima reconstrução
+        for vid in self._variants.get(fid, ()):
+            for aid in self._archs.pop((fid, vid)):
+                row = self._rows.pop((fid, vid, aid))
+                self.col_versions[row] = self.REMOVED_ROW
+        self._variants[fid] = []
+        self.family_versions.pop(fid, None)
+
+    def remove_family(self, family):
+        """Remove uma família e todas as suas linhas"""
+        fid = self._ids.get(family)
+        if fid not in self._variants:
+            return False
+        self._drop_family_rows(fid)
+        del self._variants[fid]
+        self._family_order.remove(fid)
+        self.meta.pop(family, None)
+        return True
+
+    def replace_family(self, family, family_data):
+        """Substitui os dados de uma família mantendo sua posição na lista"""
+        fid = self._ids.get(family)
+        if fid in self._variants:
+            self._drop_family_rows(fid)
+        self.add_family_data(family, family_data)
+
+    def set_family_versions(self, family, versions):
+        """Define as versões compartilhadas por todas as linhas da família"""
+        self.family_versions[self.intern(family)] = self._version_set(versions)
+
+    # === Consultas ===
+    def families(self):
+        return [self.strings[fid] for fid in self._family_order]
+
+    def variants(self, family):
+        return [self.strings[vid] for vid in self._variants.get(self._ids.get(family), ())]
+
+    def architectures(self, family, variant):
+        key = (self._ids.get(family), self._ids.get(variant))
+        return [self.strings[aid] for aid in self._archs.get(key, ())]
+
+    def _row(self, family, variant, arch):
+        return self._rows.get((self._ids.get(family), self._ids.get(variant), self._ids.get(arch)))
+
+    def has_family(self, family):
+        return self._ids.get(family) in self._variants
+
+    def has_build(self, family, variant, arch):
+        return self._row(family, variant, arch) is not None
+
+    def _row_version_ids(self, row):
+        index = self.col_versions[row]
+        if index < 0:
+            index = self.family_versions.get(self.col_family[row], -1)
+        return self.version_sets[index] if index >= 0 else ()
+
+    def versions(self, family, variant, arch):
+        row = self._row(family, variant, arch)
+        if row is None:
+            return []
+        return [self.strings[sid] for sid in self._row_version_ids(row)]
+
+    def _family_rows(self, family):
+        fid = self._ids.get(family)
+        for vid in self._variants.get(fid, ()):
+            for aid in self._archs[(fid, vid)]:
+                yield self._rows[(fid, vid, aid)]
+
+    def iter_builds(self, latest_only=False, family=None, include_unversioned=False):
+        """Percorre as combinações (família, variante, arquitetura, versão)
+
+        Com include_unversioned, linhas ainda sem versões resolvidas aparecem
+        uma vez com versão vazia.
+        """
+        strings = self.strings
+        rows = range(len(self.col_family)) if family is None else self._family_rows(family)
+        col_versions = self.col_versions
+        for row in rows:
+            if col_versions[row] == self.REMOVED_ROW:
+                continue
+            family_name = strings[self.col_family[row]]
+            variant = strings[self.col_variant[row]]
+            arch = strings[self.col_arch[row]]
+            version_ids = self._row_version_ids(row)
+            if latest_only:
+                version_ids = version_ids[:1]
+            if not version_ids and include_unversioned:
+                yield family_name, variant, arch, ""
+            for sid in version_ids:
+                yield family_name, variant, arch, strings[sid]
+
+    # === Conversão ===
+    @classmethod
+    def from_distributions(cls, distributions):
+        """Monta o catálogo a partir do dicionário hierárquico (formato do JSON)"""
+        catalog = cls()
+        for family, family_data in distributions.items():
+            catalog.add_family_data(family, family_data)
+        return catalog
+
+    # === Formato compacto em disco ===
+    def to_bytes(self):
+        """Serializa o catálogo em formato binário compacto"""
+        strings_blob = "\0".join(self.strings).encode("utf-8")
+        set_offsets = array("I", [0])
+        set_flat = array("I")
+        for version_set in self.version_sets:
+            set_flat.extend(version_set)
+            set_offsets.append(len(set_flat))
+        family_versions = array("I")
+        for fid, index in self.family_versions.items():
+            family_versions.extend((fid, index))
+        family_order = array("I", self._family_order)
+        meta_blob = json.dumps(self.meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+        header = self.HEADER.pack(
+            self.MAGIC,
+            1 if sys.byteorder == "little" else 0,
+            len(strings_blob),
+            len(self.col_family),
+            len(self.version_sets),
+            len(set_flat),
+            len(self.family_versions),
+            len(family_order),
+            len(meta_blob),
+        )
+        return b"".join([
+            header,
+            strings_blob,
+            self.col_family.tobytes(),
+            self.col_variant.tobytes(),
+            self.col_arch.tobytes(),
+            self.col_versions.tobytes(),
+            set_offsets.tobytes(),
+            set_flat.tobytes(),
+            family_versions.tobytes(),
+            family_order.tobytes(),
+            meta_blob,
+        ])
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Reconstrói o catálogo a partir do formato binário compacto"""
+        (magic, little_endian, strings_len, n_rows, n_sets,
+         n_flat, n_family_versions, n_families, meta_len) = cls.HEADER.unpack_from(data, 0)
+        if magic != cls.MAGIC:
+            raise ValueError("Arquivo de catálogo inválido")
+        swap = bool(little_endian) != (sys.byteorder == "little")
+
+        view = memoryview(data)
+        offset = cls.HEADER.size
+
+        def take_array(typecode, count):
+            nonlocal offset
+            values = array(typecode)
+            size = count * values.itemsize
+            values.frombytes(view[offset:offset + size])
+            offset += size
+            if swap:
+                values.byteswap()
+            return values
+
+        catalog = cls()
+        strings_blob = bytes(view[offset:offset + strings_len]).decode("utf-8")
+        offset += strings_len
+        catalog.strings = strings_blob.split("\0") if strings_len else []
+        catalog._ids = {text: sid for sid, text in enumerate(catalog.strings)}
+
+        catalog.col_family = take_array("I", n_rows)
+        catalog.col_variant = take_array("I", n_rows)
+        catalog.col_arch = take_array("I", n_rows)
+        catalog.col_versions = take_array("i", n_rows)
+
+        set_offsets = take_array("I", n_sets + 1)
+        set_flat = take_array("I", n_flat)
+        for index in range(n_sets):
+            version_set = set_flat[set_offsets[index]:set_offsets[index + 1]]
+            catalog.version_sets.append(version_set)
+            catalog._version_set_ids[tuple(version_set)] = index
+
+        family_versions = take_array("I", n_family_versions * 2)
+        for i in range(0, len(family_versions), 2):
+            catalog.family_versions[family_versions[i]] = family_versions[i + 1]
+
+        for fid in take_array("I", n_families):
+            catalog._register_family(fid)
+        catalog.meta = json.loads(bytes(view[offset:offset + meta_len]).decode("utf-8"))
+
+        for row in range(n_rows):
+            if catalog.col_versions[row] != cls.REMOVED_ROW:
+                catalog._index_row(row)
+        return catalog
+
+    def save(self, path):
+        """Grava o catálogo compacto em disco"""
+        atomic_write_bytes(path, self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        """Carrega o catálogo compacto do disco"""
+        return cls.from_bytes(Path(path).read_bytes())
+
+
+# === URLs DE DOWNLOAD ===
+# Templates padrão por família. O JSON pode trazer "url_templates" (e
+# "url_arch_aliases") em qualquer família, inclusive novas; as chaves são
+# "Variante/arquitetura", "Variante" ou "*", nessa ordem de preferência.
+DEFAULT_URL_TEMPLATES = {
+    "Ubuntu": {
+        "url_templates": {
+            "Desktop": "https://releases.ubuntu.com/{version}/ubuntu-{version}-desktop-{arch}.iso",
+            "Server": "https://releases.ubuntu.com/{version}/ubuntu-{version}-live-server-{arch}.iso",
+        },
+    },
+    "Debian": {
+        "url_templates": {
+            "Netinst": "https://cdimage.debian.org/debian-cd/current/{arch}/iso-cd/debian-{version}-{arch}-netinst.iso",
+            "Live": "https://cdimage.debian.org/debian-cd/current/{arch}/iso-cd/debian-live-{version}-{arch}-standard.iso",
+        },
+    },
+    "Linux Mint": {
+        "url_templates": {
+            "*": "https://mirrors.kernel.org/linuxmint/stable/{version}/linuxmint-{version}-{variant_lower}-{arch}.iso",
+        },
+    },
+    "Fedora": {
+        "url_templates": {
+            "Workstation": "https://download.fedoraproject.org/pub/fedora/linux/releases/{version}/Workstation/{arch}/iso/Fedora-Workstation-Live-{arch}-{version}.iso",
+            "Server": "https://download.fedoraproject.org/pub/fedora/linux/releases/{version}/Server/{arch}/iso/Fedora-Server-dvd-{arch}-{version}.iso",
+        },
+    },
+    "Arch Linux": {
+        "url_templates": {
+            "*": "https://mirrors.kernel.org/archlinux/iso/latest/archlinux-{arch}.iso",
+        },
+    },
+    "Kali Linux": {
+        "url_templates": {
+            "Live": "https://cdimage.kali.org/kali-{version}/kali-linux-{version}-live-{arch}.iso",
+        },
+    },
+    "Manjaro": {
+        "url_templates": {
+            "*": "https://download.manjaro.org/{variant_lower}/{version}/manjaro-{variant_lower}-{version}-minimal-{arch}.iso",
+        },
+    },
+    "openSUSE": {
+        "url_templates": {
+            "Leap": "https://download.opensuse.org/distribution/leap/{version}/iso/openSUSE-Leap-{version}-DVD-{arch}.iso",
+            "Tumbleweed": "https://download.opensuse.org/tumbleweed/iso/openSUSE-Tumbleweed-DVD-{arch}.iso",
+        },
+    },
+    "MX Linux": {
+        "url_templates": {
+            "XFCE": "https://sourceforge.net/projects/mx-linux/files/Final/Xfce/MX-{version}_{arch}.iso/download",
+            "KDE": "https://sourceforge.net/projects/mx-linux/files/Final/KDE/MX-{version}_{arch}.iso/download",
+        },
+        "url_arch_aliases": {"amd64": "x64", "i386": "386"},
+    },
+    "antiX": {
+        "url_templates": {
+            "*": "https://sourceforge.net/projects/antix-linux/files/Final/antiX-{version}/antiX-{version}-{arch}-{variant_lower}.iso/download",
+        },
+        "url_arch_aliases": {"amd64": "x64", "i386": "386"},
+    },
+    "Puppy Linux": {
+        "url_templates": {
+            "*": "https://sourceforge.net/projects/fossapup64/files/{version}/fossapup64-{version}.iso/download",
+        },
+    },
+}
+
+
+class URLTemplateResolver:
+    """Resolve URLs de download a partir dos templates do catálogo
+
+    Cada template é compilado uma única vez por combinação (família, variante,
+    arquitetura): os campos fixos ({arch}, {variant}, ...) já saem substituídos,
+    com os apelidos de arquitetura resolvidos, e sobram só os trechos entre as
+    ocorrências de {version}. As URLs resolvidas ficam num cache LRU.
+    """
 
-        # ✅ NOVO: Variáveis de controle de processo
-        self.is_operation_running = False
-        self.current_process = None
-        self.should_cancel = False
-        self.sudo_password = None  # ✅ NOVO: Armazena senha sudo
+    FIELDS = {"version", "arch", "variant", "variant_lower", "family"}
 
-        self.arch_maps = {
-            "64bit": "amd64",
-            "32bit": "i386", 
-            "x86_64": "amd64",
-            "amd64": "amd64",
-            "i386": "i386",
-            "i686": "i386",
-            "aarch64": "arm64",
-            "arm64": "arm64", 
-            "armhf": "armhf",
-            "ppc64el": "ppc64el",
-            "s390x": "s390x"
+    def __init__(self, catalog, arch_maps=None, defaults=DEFAULT_URL_TEMPLATES, cache_size=4096):
+        self.catalog = catalog
+        self.arch_maps = arch_maps or {}
+        self.defaults = defaults
+        self._compiled = {}  # família -> {(variante, arquitetura): segmentos}
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def invalidate(self, family=None):
+        """Descarta templates compilados (de uma família ou de todas) e o cache de URLs"""
+        if family is None:
+            self._compiled.clear()
+        else:
+            self._compiled.pop(family, None)
+        self.resolve.cache_clear()
+
+    def _family_spec(self, family):
+        meta = self.catalog.meta.get(family, {})
+        default = self.defaults.get(family, {})
+        templates = meta.get("url_templates") or default.get("url_templates") or {}
+        aliases = meta.get("url_arch_aliases") or default.get("url_arch_aliases") or {}
+        return templates, aliases
+
+    @classmethod
+    def parse_template(cls, template):
+        """Divide o template em segmentos: (False, texto) ou (True, campo)"""
+        segments = []
+        for literal, field, _spec, _conversion in string.Formatter().parse(template):
+            if literal:
+                segments.append((False, literal))
+            if field is not None:
+                if field not in cls.FIELDS:
+                    raise ValueError(f"Campo desconhecido no template: {{{field}}}")
+                segments.append((True, field))
+        return segments
+
+    def _compile_family(self, family):
+        templates, aliases = self._family_spec(family)
+        parsed = {key: self.parse_template(template) for key, template in templates.items()}
+        table = {}
+        for variant in self.catalog.variants(family):
+            for arch in self.catalog.architectures(family, variant):
+                canonical = self.arch_maps.get(arch, arch)
+                segments = (
+                    parsed.get(f"{variant}/{arch}") or parsed.get(f"{variant}/{canonical}")
+                    or parsed.get(variant) or parsed.get("*")
+                )
+                if not segments:
+                    continue
+                values = {
+                    "family": family,
+                    "variant": variant,
+                    "variant_lower": variant.lower(),
+                    "arch": aliases.get(arch) or aliases.get(canonical) or arch,
+                }
+                # Junta os trechos fixos; sobram só os pedaços entre as ocorrências de {version}
+                pieces = [""]
+                for is_field, text in segments:
+                    if is_field and text == "version":
+                        pieces.append("")
+                    else:
+                        pieces[-1] += values[text] if is_field else text
+                compiled = tuple(pieces)
+                table[(variant, arch)] = compiled
+                table.setdefault((variant, canonical), compiled)
+        self._compiled[family] = table
+        return table
+
+    def _resolve(self, family, variant, arch, version):
+        table = self._compiled.get(family)
+        if table is None:
+            table = self._compile_family(family)
+        pieces = table.get((variant, arch)) or table.get((variant, self.arch_maps.get(arch, arch)))
+        if pieces is None:
+            return None
+        return version.join(pieces)
+
+    def has_template(self, family, variant, arch):
+        return self.resolve(family, variant, arch, "") is not None
+
+    @staticmethod
+    def filename_for(url):
+        """Nome do arquivo da URL (ignora o sufixo /download do SourceForge)"""
+        parts = [part for part in urlparse(url).path.split("/") if part]
+        if len(parts) > 1 and parts[-1] == "download":
+            return parts[-2]
+        return parts[-1] if parts else ""
+
+
+# === BUSCA NO CATÁLOGO ===
+SEARCH_COMPACT_RATIO = 0.25  # fração de entradas removidas que dispara a compactação do índice
+SEARCH_COMPACT_MIN = 64  # abaixo disso as entradas removidas custam menos que reconstruir
+
+
+class CatalogSearchIndex:
+    """Índice de busca aproximada (prefixo/trigramas) sobre as combinações do catálogo
+
+    O índice é montado sobre o vocabulário de palavras (nomes, arquiteturas e
+    versões se repetem muito), e cada palavra aponta para as entradas que a
+    contêm. Uma consulta encontra as palavras candidatas pelos trigramas (ou
+    pelo prefixo, em termos curtos) e intersecta as entradas de cada termo.
+
+    Remover só marca as entradas; quando as marcadas passam de
+    SEARCH_COMPACT_RATIO do total, o índice é reconstruído só com as vivas
+    (e as palavras que elas usam), na mesma ordem.
+    """
+
+    def __init__(self, builds=()):
+        self._lock = threading.Lock()
+        self._reset()
+        self.add_builds(builds)
+
+    def _reset(self):
+        self.entries = []  # (família, variante, arquitetura, versão)
+        self._entry_ids = {}
+        self._entry_words = []  # entrada -> ids das palavras
+        self._removed = set()
+
+        self.words = []
+        self._word_ids = {}
+        self._word_entries = []  # palavra -> array de entradas
+        self._trigrams = {}  # trigrama -> ids de palavras
+        self._prefixes = {}  # prefixo de 1-2 letras -> ids de palavras
+
+    def __len__(self):
+        return len(self.entries) - len(self._removed)
+
+    @staticmethod
+    def tokenize(text):
+        return text.lower().replace("|", " ").split()
+
+    def _word_id(self, word):
+        wid = self._word_ids.get(word)
+        if wid is None:
+            wid = len(self.words)
+            self.words.append(word)
+            self._word_ids[word] = wid
+            self._word_entries.append(array("I"))
+            for size in (1, 2):
+                if len(word) >= size:
+                    self._prefixes.setdefault(word[:size], []).append(wid)
+            for gram in {word[i:i + 3] for i in range(len(word) - 2)}:
+                self._trigrams.setdefault(gram, []).append(wid)
+        return wid
+
+    def add_builds(self, builds):
+        """Adiciona combinações ao índice (incremental)"""
+        with self._lock:
+            self._add_builds(builds)
+
+    def _add_builds(self, builds):
+        for build in builds:
+            build = tuple(build)
+            if build in self._entry_ids:
+                continue
+            eid = len(self.entries)
+            self.entries.append(build)
+            self._entry_ids[build] = eid
+            word_ids = tuple({self._word_id(word) for field in build for word in self.tokenize(field)})
+            self._entry_words.append(word_ids)
+            for wid in word_ids:
+                self._word_entries[wid].append(eid)
+
+    def remove_family(self, family):
+        """Remove do índice todas as entradas de uma família"""
+        with self._lock:
+            for build, eid in list(self._entry_ids.items()):
+                if build[0] == family:
+                    self._removed.add(eid)
+                    del self._entry_ids[build]
+            removed = len(self._removed)
+            if removed >= SEARCH_COMPACT_MIN and removed > len(self.entries) * SEARCH_COMPACT_RATIO:
+                self._compact()
+
+    def _compact(self):
+        """Reconstrói o índice só com as entradas vivas (chamar com o lock)"""
+        live = [build for eid, build in enumerate(self.entries) if eid not in self._removed]
+        self._reset()
+        self._add_builds(live)
+
+    def replace_family(self, family, builds):
+        """Substitui as entradas de uma família (ex.: após resolver as versões)"""
+        self.remove_family(family)
+        self.add_builds(builds)
+
+    def _matching_words(self, token):
+        """Palavras que casam com o termo, com a qualidade de cada casamento"""
+        words = self.words
+        if len(token) < 3:
+            return {
+                wid: 3 if words[wid] == token else 2
+                for wid in self._prefixes.get(token, ())
+            }
+
+        grams = [token[i:i + 3] for i in range(len(token) - 2)]
+        postings = [self._trigrams.get(gram, ()) for gram in grams]
+        matches = {}
+        for wid in min(postings, key=len):
+            word = words[wid]
+            if word == token:
+                matches[wid] = 3
+            elif word.startswith(token):
+                matches[wid] = 2
+            elif token in word:
+                matches[wid] = 1
+        if matches:
+            return matches
+
+        # Aproximado (erros de digitação): palavras de mesma inicial ou com trigramas em comum
+        pool = set(self._prefixes.get(token[0], ()))
+        for posting in postings:
+            pool.update(posting)
+        close = difflib.get_close_matches(token, [words[wid] for wid in pool], n=5, cutoff=0.7)
+        return {self._word_ids[word]: 0 for word in close}
+
+    def search(self, query, limit=20):
+        """Retorna as melhores combinações para a consulta, da mais relevante à menos
+
+        A qualidade de uma entrada é a do seu pior termo (3 = palavra exata,
+        2 = prefixo, 1 = substring, 0 = aproximado); dentro da mesma qualidade
+        vale a ordem do catálogo. Só as entradas do termo mais seletivo são
+        percorridas, em ordem (heapq.merge), e a varredura para assim que a
+        melhor faixa possível estiver cheia.
+        """
+        tokens = self.tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            token_matches = []
+            for token in tokens:
+                matches = self._matching_words(token)
+                if not matches:
+                    return []
+                token_matches.append(matches)
+
+            word_entries = self._word_entries
+            entry_words = self._entry_words
+            removed = self._removed
+            token_matches.sort(key=lambda matches: sum(len(word_entries[wid]) for wid in matches))
+            best_possible = min(max(matches.values()) for matches in token_matches)
+
+            # Por termo: grupos de palavras por qualidade, do melhor para o pior
+            token_groups = []
+            for matches in token_matches:
+                groups = {}
+                for wid, quality in matches.items():
+                    groups.setdefault(quality, set()).add(wid)
+                token_groups.append(sorted(groups.items(), reverse=True))
+
+            buckets = {3: [], 2: [], 1: [], 0: []}
+            last = None
+            for eid in heapq.merge(*(word_entries[wid] for wid in token_matches[0])):
+                if eid == last or eid in removed:
+                    continue
+                last = eid
+
+                words = entry_words[eid]
+                tier = 3
+                for groups in token_groups:
+                    quality = -1
+                    for group_quality, group in groups:
+                        if not group.isdisjoint(words):
+                            quality = group_quality
+                            break
+                    if quality < tier:
+                        tier = quality
+                        if tier < 0:
+                            break
+                if tier < 0:
+                    continue
+
+                bucket = buckets[tier]
+                bucket.append(eid)
+                if tier == best_possible and len(bucket) >= limit:
+                    break
+
+            ranked = buckets[3] + buckets[2] + buckets[1] + buckets[0]
+            return [self.entries[eid] for eid in ranked[:limit]]
+
+
+# === DOWNLOAD EM LOTE ===
+class BatchDownloadScheduler:
+    """Fila de downloads em lote com limites de concorrência global e por host"""
+
+    def __init__(self, download_dir, max_concurrent=4, max_per_host=2, log=print):
+        self.download_dir = Path(download_dir)
+        self.download_dir.mkdir(parents=True, exist_ok=True)
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_per_host = max(1, int(max_per_host))
+        self.log = log
+
+        self._cond = threading.Condition()
+        self._queue = []  # heap de (-prioridade, ordem, job)
+        self._order = itertools.count()
+        self._jobs = {}  # nome do arquivo -> job (deduplicação no cache compartilhado)
+        self._active_per_host = {}
+        self._workers = []
+        self._closing = False
+        self._cancel = threading.Event()
+
+    def submit(self, url, filename, priority=0, label=None):
+        """Adiciona um download à fila; arquivos repetidos ou já em cache não são baixados de novo"""
+        with self._cond:
+            job = self._jobs.get(filename)
+            if job:
+                # Mesmo arquivo pedido duas vezes: mantém um único download com a maior prioridade
+                if priority > job["priority"] and job["state"] == "queued":
+                    job["priority"] = priority
+                    self._queue = [(-j["priority"], order, j) for _, order, j in self._queue]
+                    heapq.heapify(self._queue)
+                return job
+
+            path = self.download_dir / filename
+            job = {
+                "url": url,
+                "filename": filename,
+                "label": label or filename,
+                "path": path,
+                "host": urlparse(url).netloc,
+                "priority": priority,
+                "state": "queued",
+                "downloaded": 0,
+                "total": 0,
+                "error": None,
+            }
+            self._jobs[filename] = job
+
+            if path.exists() and path.stat().st_size > 0:
+                job["state"] = "cached"
+                job["downloaded"] = job["total"] = path.stat().st_size
+                self.log(f"♻️ Já em cache: {filename}")
+                return job
+
+            heapq.heappush(self._queue, (-priority, next(self._order), job))
+            self._cond.notify_all()
+            return job
+
+    def start(self):
+        """Inicia as threads de download"""
+        with self._cond:
+            while len(self._workers) < self.max_concurrent:
+                worker = threading.Thread(target=self._worker, daemon=True)
+                self._workers.append(worker)
+                worker.start()
+
+    def close(self):
+        """Sinaliza que não haverá novos jobs; os workers terminam quando a fila esvaziar"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+
+    def wait(self, timeout=None):
+        """Aguarda o fim de todos os downloads"""
+        self.close()
+        deadline = None if timeout is None else time.time() + timeout
+        for worker in list(self._workers):
+            remaining = None if deadline is None else max(0, deadline - time.time())
+            worker.join(remaining)
+        return self.snapshot()
+
+    def run(self):
+        """Executa a fila inteira de forma bloqueante (modo sem interface)"""
+        self.start()
+        return self.wait()
+
+    def cancel(self):
+        """Cancela os downloads em andamento e descarta a fila"""
+        self._cancel.set()
+        with self._cond:
+            for _, _, job in self._queue:
+                job["state"] = "cancelled"
+            self._queue = []
+            self._closing = True
+            self._cond.notify_all()
+
+    def snapshot(self):
+        """Retorna uma visão agregada do progresso de todos os jobs"""
+        with self._cond:
+            jobs = [dict(job) for job in self._jobs.values()]
+            closing = self._closing
+
+        states = {}
+        for job in jobs:
+            states[job["state"]] = states.get(job["state"], 0) + 1
+
+        total = sum(job["total"] for job in jobs)
+        downloaded = sum(job["downloaded"] for job in jobs)
+        finished = closing and all(
+            job["state"] in ("done", "cached", "failed", "cancelled") for job in jobs
+        )
+
+        return {
+            "jobs": jobs,
+            "states": states,
+            "total_bytes": total,
+            "downloaded_bytes": downloaded,
+            "percent": (downloaded / total * 100) if total else (100.0 if jobs and finished else 0.0),
+            "finished": finished,
         }
 
-        self.download_dir = Path.home() / "BootableUSB_Downloads"
-        self.download_dir.mkdir(exist_ok=True)
-        self.selected_usb_device = None
-        self.custom_iso_path = None
+    def _next_job(self):
+        """Escolhe o job de maior prioridade cujo host ainda tem vaga (chamar com o lock)"""
+        skipped = []
+        chosen = None
+        while self._queue:
+            item = heapq.heappop(self._queue)
+            job = item[2]
+            if self._active_per_host.get(job["host"], 0) < self.max_per_host:
+                chosen = job
+                break
+            skipped.append(item)
+
+        for item in skipped:
+            heapq.heappush(self._queue, item)
+        return chosen
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = None
+                while not self._cancel.is_set():
+                    job = self._next_job()
+                    if job or (self._closing and not self._queue):
+                        break
+                    self._cond.wait(0.5)
 
-        self.setup_gui()
-        self.check_dependencies()
+                if not job:
+                    return
 
-    def check_environment(self):
-        """Verifica se o ambiente suporta execução gráfica com sudo"""
+                job["state"] = "running"
+                self._active_per_host[job["host"]] = self._active_per_host.get(job["host"], 0) + 1
+
+            try:
+                self._download(job)
+            finally:
+                with self._cond:
+                    self._active_per_host[job["host"]] -= 1
+                    self._cond.notify_all()
+
+    def _download(self, job):
+        part_path = job["path"].with_name(job["filename"] + ".part")
         try:
-            # Verifica se está em ambiente gráfico
-            if os.environ.get('DISPLAY'):
-                self.log("✅ Ambiente gráfico detectado")
-            else:
-                self.log("⚠️ Ambiente sem DISPLAY - modo terminal")
-            
-            # Verifica se tem terminal disponível
-            terminal_emulators = ['gnome-terminal', 'konsole', 'xfce4-terminal', 'xterm']
-            available_terminal = None
-            for terminal in terminal_emulators:
-                if shutil.which(terminal):
-                    available_terminal = terminal
-                    break
-            
-            if available_terminal:
-                self.log(f"✅ Terminal disponível: {available_terminal}")
-            else:
-                self.log("⚠️ Nenhum terminal gráfico encontrado")
-            
-            return True
-            
+            self.log(f"⬇️ [lote] Iniciando: {job['label']}")
+            import requests  # carregado só quando há rede a acessar
+            response = requests.get(job["url"], stream=True, timeout=30)
+            response.raise_for_status()
+            job["total"] = int(response.headers.get("content-length", 0))
+
+            with open(part_path, "wb") as file:
+                for chunk in response.iter_content(chunk_size=1024 * 1024):
+                    if self._cancel.is_set():
+                        job["state"] = "cancelled"
+                        break
+                    if chunk:
+                        file.write(chunk)
+                        job["downloaded"] += len(chunk)
+
+            if job["state"] == "cancelled":
+                part_path.unlink(missing_ok=True)
+                self.log(f"⏹️ [lote] Cancelado: {job['label']}")
+                return
+
+            # Conexão fechada antes do fim: o .part não vira um arquivo "em cache" truncado
+            if job["total"] and job["downloaded"] != job["total"]:
+                raise IOError(f"download incompleto ({job['downloaded']} de {job['total']} bytes)")
+            os.replace(part_path, job["path"])
+            if not job["total"]:
+                job["total"] = job["downloaded"]
+            job["state"] = "done"
+            self.log(f"✅ [lote] Concluído: {job['label']}")
+
         except Exception as e:
-            self.log(f"⚠️ Erro na verificação de ambiente: {e}")
-            return False
+            part_path.unlink(missing_ok=True)
+            job["state"] = "failed"
+            job["error"] = str(e)
+            self.log(f"❌ [lote] Falha em {job['label']}: {e}")
+
+
+# === SNAPSHOT DO CATÁLOGO ===
+def atomic_write_bytes(path, data):
+    """Grava um arquivo de forma atômica (arquivo temporário + rename)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
 
-    def check_sudo_permission(self):
-        """Verifica e solicita permissão sudo se necessário - VERSÃO CORRIGIDA"""
+
+class DistributionsSnapshot:
+    """Snapshot binário derivado do distributions.json
+
+    Guarda o dicionário já decodificado (marshal) e o catálogo compacto, junto
+    com mtime, tamanho e SHA-256 do JSON de origem. Se mtime e tamanho batem o
+    snapshot é usado direto; se só o mtime mudou, o hash decide se o JSON
+    precisa ser lido de novo.
+    """
+
+    FORMAT = 1
+
+    def __init__(self, json_path, snapshot_path=None):
+        self.json_path = Path(json_path)
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else self.json_path.with_suffix(".snapshot")
+
+    def _read(self):
         try:
-            # Se já é root ou Windows, não precisa de sudo
-            if platform.system().lower() == "windows" or os.geteuid() == 0:
-                return True
-                
-            self.log("🔐 Operação requer privilégios de superusuário...")
-            
-            # Se já temos senha armazenada, testa se ainda é válida
-            if self.sudo_password:
-                test_process = subprocess.Popen(
-                    ['sudo', '-S', 'echo', 'sudo_test_ok'],
-                    stdin=subprocess.PIPE, 
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True
-                )
-                stdout, stderr = test_process.communicate(input=self.sudo_password + '\n', timeout=5)
-                
-                if test_process.returncode == 0 and 'sudo_test_ok' in stdout:
-                    self.log("✅ Senha sudo ainda válida")
-                    return True
-                else:
-                    self.log("⚠️ Senha sudo anterior inválida, solicitando nova...")
-                    self.sudo_password = None
-            
-            # Solicita nova senha
-            password = self.ask_sudo_password()
-            if not password:
-                self.log("❌ Senha não fornecida - operação cancelada")
-                return False
-                
-            # Testa a nova senha
-            test_process = subprocess.Popen(
-                ['sudo', '-S', 'echo', 'sudo_test_ok'],
-                stdin=subprocess.PIPE, 
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            stdout, stderr = test_process.communicate(input=password + '\n', timeout=10)
-            
-            if test_process.returncode == 0 and 'sudo_test_ok' in stdout:
-                self.log("✅ Autenticação sudo bem-sucedida")
-                self.sudo_password = password  # Armazena para uso posterior
-                return True
+            record = marshal.loads(self.snapshot_path.read_bytes())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if (not isinstance(record, tuple) or len(record) != 7
+                or record[0] != self.FORMAT or record[1] != marshal.version):
+            return None
+        return record
+
+    def load(self):
+        """Retorna (distribuições, catálogo) do JSON, reconstruindo o snapshot se necessário"""
+        stat = self.json_path.stat()
+        record = self._read()
+        if record and record[2] == stat.st_mtime_ns and record[3] == stat.st_size:
+            return record[5], DistributionCatalog.from_bytes(record[6])
+
+        content = self.json_path.read_bytes()
+        digest = hashlib.sha256(content).hexdigest()
+        if record and record[4] == digest:
+            # Só o mtime mudou: reaproveita os dados e atualiza o cabeçalho
+            distributions, catalog_bytes = record[5], record[6]
+            catalog = DistributionCatalog.from_bytes(catalog_bytes)
+        else:
+            distributions = json.loads(content.decode("utf-8"))
+            catalog = DistributionCatalog.from_distributions(distributions)
+            catalog_bytes = catalog.to_bytes()
+
+        self._write(stat, digest, distributions, catalog_bytes)
+        return distributions, catalog
+
+    def store(self, distributions, catalog=None):
+        """Atualiza o snapshot logo após o JSON ter sido regravado"""
+        content = self.json_path.read_bytes()
+        if catalog is None:
+            catalog = DistributionCatalog.from_distributions(distributions)
+        self._write(self.json_path.stat(), hashlib.sha256(content).hexdigest(),
+                    distributions, catalog.to_bytes())
+
+    def _write(self, stat, digest, distributions, catalog_bytes):
+        record = (self.FORMAT, marshal.version, stat.st_mtime_ns, stat.st_size,
+                  digest, distributions, catalog_bytes)
+        try:
+            atomic_write_bytes(self.snapshot_path, marshal.dumps(record))
+        except (OSError, ValueError):
+            # O snapshot é só um cache; sem ele o JSON continua valendo
+            pass
+
+
+# === ATUALIZAÇÃO INCREMENTAL DO CATÁLOGO ===
+class CatalogFeedClient:
+    """Lê um feed versionado de atualizações do catálogo (URL ou diretório local)
+
+    O feed publica index.json ({"revision": N, "min_revision": M, "snapshot": "full.json"})
+    e um delta-R.json por revisão, com "added", "changed" (família -> dados no
+    formato do JSON) e "removed" (lista de famílias) em relação à revisão R-1.
+    Quem está antes de min_revision, ou nunca sincronizou, recebe o snapshot
+    completo ({"revision": N, "distributions": {...}}) quando ele existe.
+    """
+
+    def __init__(self, source, timeout=15):
+        self.source = str(source)
+        self.timeout = timeout
+        self.bytes_read = 0
+
+    @property
+    def is_remote(self):
+        return urlparse(self.source).scheme in ("http", "https")
+
+    def _read_json(self, name):
+        if self.is_remote:
+            base = self.source if self.source.endswith("/") else self.source + "/"
+            import requests  # carregado só quando há rede a acessar
+            response = requests.get(urljoin(base, name), timeout=self.timeout)
+            response.raise_for_status()
+            content = response.content
+        else:
+            content = (Path(self.source).expanduser() / name).read_bytes()
+        self.bytes_read += len(content)
+        return json.loads(content.decode("utf-8"))
+
+    def fetch_updates(self, revision):
+        """Retorna as mudanças desde a revisão informada, já combinadas
+
+        {"revision": nova revisão, "upserts": {família: dados}, "removed": [famílias],
+         "full": True se veio do snapshot completo, "bytes": total lido do feed}
+        """
+        self.bytes_read = 0
+        index = self._read_json("index.json")
+        latest = int(index["revision"])
+        update = {"revision": latest, "upserts": {}, "removed": [], "full": False}
+
+        if latest > revision:
+            min_revision = int(index.get("min_revision", 1))
+            snapshot = index.get("snapshot")
+            if snapshot and (revision == 0 or revision + 1 < min_revision):
+                data = self._read_json(snapshot)
+                update["upserts"] = dict(data["distributions"])
+                update["full"] = True
+                update["revision"] = int(data.get("revision", latest))
+            elif revision + 1 < min_revision:
+                raise ValueError(f"Feed não tem mais deltas desde a revisão {revision} e não publica snapshot")
             else:
-                self.log("❌ Senha sudo incorreta ou erro na autenticação")
-                if "incorrect password attempt" in stderr.lower():
-                    messagebox.showerror("Erro de Autenticação", "Senha sudo incorreta!")
+                removed = set()
+                for current in range(revision + 1, latest + 1):
+                    delta = self._read_json(f"delta-{current}.json")
+                    if int(delta.get("revision", current)) != current:
+                        raise ValueError(f"delta-{current}.json traz a revisão {delta.get('revision')}")
+                    for family in delta.get("removed", ()):
+                        update["upserts"].pop(family, None)
+                        removed.add(family)
+                    for key in ("added", "changed"):
+                        for family, family_data in delta.get(key, {}).items():
+                            removed.discard(family)
+                            update["upserts"][family] = family_data
+                update["removed"] = sorted(removed)
+
+        update["bytes"] = self.bytes_read
+        return update
+
+
+# === PACOTE OFFLINE ===
+def file_digest(path, algorithm="sha256", chunk_size=1024 * 1024):
+    """Calcula o hash de um arquivo lendo em blocos"""
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class OfflineBundle:
+    """Pacote único (tar) com catálogo, URLs resolvidas, checksums e, opcionalmente, as ISOs
+
+    Estrutura do arquivo:
+        bundle.json      catálogo, versões por família e uma entrada por build
+                         (url, filename, checksum_type, checksum, iso)
+        SHA256SUMS ...   manifestos de checksum no formato do sha256sum
+        isos/<arquivo>   ISOs incluídas
+    """
+
+    FORMAT = 1
+    INDEX_NAME = "bundle.json"
+    MANIFEST_RE = re.compile(r"^SHA\d+SUMS$")
+
+    def __init__(self, index):
+        self.index = index
+        self._builds = {
+            (entry["family"], entry["variant"], entry["arch"], entry["version"]): entry
+            for entry in index.get("builds", ())
+        }
+
+    @property
+    def distributions(self):
+        return self.index.get("distributions", {})
+
+    def versions(self, family):
+        return self.index.get("versions", {}).get(family)
+
+    def lookup(self, family, variant, arch, version):
+        return self._builds.get((family, variant, arch, version))
+
+    def builds(self):
+        return list(self._builds.values())
+
+    @classmethod
+    def export(cls, path, distributions, versions, builds, iso_dir, include_isos=False,
+               catalog_revision=0, log=print):
+        """Grava o pacote; builds é uma lista de dicts com family/variant/arch/version/url/filename/checksum_type"""
+        path = Path(path)
+        iso_dir = Path(iso_dir)
+        entries = []
+        manifests = {}
+        iso_files = []
+        for build in builds:
+            entry = dict(build, checksum=None, iso=False)
+            iso_path = iso_dir / entry["filename"]
+            if iso_path.is_file():
+                algorithm = entry.get("checksum_type") or "sha256"
+                log(f"🔐 Calculando {algorithm} de {entry['filename']}...")
+                entry["checksum"] = file_digest(iso_path, algorithm)
+                manifests.setdefault(algorithm, {})[entry["filename"]] = entry["checksum"]
+                if include_isos and iso_path not in iso_files:
+                    iso_files.append(iso_path)
+                    entry["iso"] = True
+            entries.append(entry)
+
+        index = {
+            "format": cls.FORMAT,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "catalog_revision": catalog_revision,
+            "distributions": distributions,
+            "versions": versions,
+            "builds": entries,
+        }
+
+        def add_bytes(tar, name, data):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(data))
+
+        part_path = path.with_name(path.name + ".part")
+        try:
+            with tarfile.open(part_path, "w") as tar:
+                add_bytes(tar, cls.INDEX_NAME, json.dumps(index, indent=2, ensure_ascii=False).encode("utf-8"))
+                for algorithm, sums in sorted(manifests.items()):
+                    lines = "".join(f"{digest}  {name}\n" for name, digest in sorted(sums.items()))
+                    add_bytes(tar, f"{algorithm.upper()}SUMS", lines.encode("utf-8"))
+                for iso_path in iso_files:
+                    log(f"📦 Adicionando {iso_path.name} ao pacote...")
+                    tar.add(iso_path, arcname=f"isos/{iso_path.name}")
+            os.replace(part_path, path)
+        except BaseException:
+            part_path.unlink(missing_ok=True)
+            raise
+        return cls(index)
+
+    @classmethod
+    def import_bundle(cls, path, dest_dir, iso_dir, log=print):
+        """Importa o pacote: valida as ISOs contra os manifestos e guarda o índice em dest_dir
+
+        ISOs sem checksum em nenhum manifesto (ou com algoritmo desconhecido)
+        não são instaladas: não há como saber se chegaram íntegras.
+        """
+        dest_dir = Path(dest_dir)
+        iso_dir = Path(iso_dir)
+        iso_dir.mkdir(parents=True, exist_ok=True)
+        index = None
+        manifests = {}
+        pending_isos = []
+
+        with tarfile.open(path, "r:*") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                name = member.name
+                if name == cls.INDEX_NAME:
+                    index = json.loads(tar.extractfile(member).read().decode("utf-8"))
+                elif cls.MANIFEST_RE.match(name):
+                    algorithm = name[:-4].lower()
+                    for line in tar.extractfile(member).read().decode("utf-8").splitlines():
+                        digest, _, filename = line.partition("  ")
+                        if filename:
+                            manifests.setdefault(filename.strip(), (algorithm, digest.strip()))
+                elif name.startswith("isos/") and "/" not in name[5:] and name[5:] not in ("", ".", ".."):
+                    pending_isos.append(member)
                 else:
-                    messagebox.showerror("Erro de Autenticação", f"Erro na autenticação:\n{stderr}")
-                return False
-                
-        except subprocess.TimeoutExpired:
-            self.log("❌ Timeout na autenticação sudo")
-            messagebox.showerror("Timeout", "Tempo esgotado na autenticação sudo")
-            return False
-        except Exception as e:
-            self.log(f"⚠️ Erro na autenticação sudo: {e}")
-            messagebox.showerror("Erro", f"Erro inesperado:\n{e}")
-            return False
+                    log(f"⚠️ Ignorando item desconhecido no pacote: {name}")
 
-    def ask_sudo_password(self):
-        """Solicita senha sudo via diálogo gráfico"""
+            if index is None or index.get("format") != cls.FORMAT:
+                raise ValueError("Pacote offline inválido (bundle.json ausente ou formato incompatível)")
+
+            for member in pending_isos:
+                filename = member.name[5:]
+                expected = manifests.get(filename)
+                if not expected:
+                    log(f"❌ ISO sem checksum no pacote, ignorada: {filename}")
+                    continue
+                try:
+                    digest = hashlib.new(expected[0])
+                except ValueError:
+                    log(f"❌ Algoritmo de checksum desconhecido ({expected[0]}), ISO ignorada: {filename}")
+                    continue
+                target = iso_dir / filename
+                part_path = iso_dir / (filename + ".part")
+                source = tar.extractfile(member)
+                with open(part_path, "wb") as out:
+                    for chunk in iter(lambda: source.read(1024 * 1024), b""):
+                        out.write(chunk)
+                        digest.update(chunk)
+                if digest.hexdigest() != expected[1]:
+                    part_path.unlink(missing_ok=True)
+                    log(f"❌ Checksum não confere, ISO descartada: {filename}")
+                    continue
+                os.replace(part_path, target)
+                log(f"✅ ISO importada: {filename}")
+
+        atomic_write_bytes(dest_dir / cls.INDEX_NAME,
+                           json.dumps(index, indent=2, ensure_ascii=False).encode("utf-8"))
+        return cls(index)
+
+    @classmethod
+    def load(cls, dest_dir):
+        """Carrega o último pacote importado (ou None)"""
         try:
-            import tkinter.simpledialog as simpledialog
-            
-            # Cria uma janela temporária para o diálogo
-            password_dialog = tk.Toplevel(self.root)
-            password_dialog.title("Autenticação Requerida")
-            password_dialog.geometry("400x150")
-            password_dialog.transient(self.root)
-            password_dialog.grab_set()
-            
-            # Frame principal
-            main_frame = ttk.Frame(password_dialog, padding="20")
-            main_frame.pack(fill=tk.BOTH, expand=True)
-            
-            # Mensagem
-            message = "🔐 Esta operação requer privilégios de superusuário\n\nDigite sua senha:"
-            ttk.Label(main_frame, text=message, justify=tk.CENTER).pack(pady=10)
-            
-            # Campo de senha
-            password_var = tk.StringVar()
-            password_entry = ttk.Entry(main_frame, textvariable=password_var, show='*', width=30)
-            password_entry.pack(pady=10)
-            password_entry.focus()
-            
-            # Variável para resultado
-            result = [None]
-            
-            def on_ok():
-                result[0] = password_var.get()
-                password_dialog.destroy()
-                
-            def on_cancel():
-                result[0] = None
-                password_dialog.destroy()
-            
-            # Botões
-            button_frame = ttk.Frame(main_frame)
-            button_frame.pack(pady=10)
-            
-            ttk.Button(button_frame, text="OK", command=on_ok).grid(row=0, column=0, padx=5)
-            ttk.Button(button_frame, text="Cancelar", command=on_cancel).grid(row=0, column=1, padx=5)
-            
-            # Bind Enter key
-            password_dialog.bind('<Return>', lambda e: on_ok())
-            
-            # Espera o diálogo fechar
-            self.root.wait_window(password_dialog)
-            
-            return result[0]
-            
-        except Exception as e:
-            self.log(f"⚠️ Erro no diálogo de senha: {e}")
-            # Fallback para terminal
-            try:
-                import getpass
-                self.log("💡 Por favor, digite sua senha sudo no terminal:")
-                password = getpass.getpass("Senha sudo: ")
-                return password
-            except:
-                return None
+            with open(Path(dest_dir) / cls.INDEX_NAME, "r", encoding="utf-8") as f:
+                return cls(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+
+# === MONITOR DE HOTPLUG ===
+class HotplugMonitor:
+    """Observa a conexão e a remoção de discos pelos uevents do kernel (netlink)
 
-    def run_sudo_command(self, command, input_text=None):
-        """Executa um comando com sudo de forma segura"""
+    Sem netlink (outro sistema, container restrito) cai para uma varredura leve
+    de /sys/block: o sysfs não gera eventos de inotify, então a varredura é por
+    intervalo. Os eventos (ação, nome do disco) vão para a fila events, que a
+    interface esvazia na thread do Tk; on_event, se informado, roda na thread
+    do monitor para reações imediatas (ex.: cancelar uma gravação).
+    """
+
+    NETLINK_KOBJECT_UEVENT = 15
+    KERNEL_GROUP = 1
+
+    def __init__(self, sys_block="/sys/block", poll_interval=1.0, on_event=None):
+        self.sys_block = Path(sys_block)
+        self.poll_interval = poll_interval
+        self.on_event = on_event
+        self.events = queue.Queue()
+        self.backend = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        sock = self._open_netlink()
+        self.backend = "netlink" if sock else "sysfs"
+        target = self._run_netlink if sock else self._run_polling
+        self._thread = threading.Thread(target=target, args=(sock,) if sock else (), daemon=True)
+        self._thread.start()
+        return self.backend
+
+    def stop(self):
+        self._stop.set()
+
+    def _emit(self, action, name):
+        self.events.put((action, name))
+        if self.on_event:
+            self.on_event(action, name)
+
+    def _open_netlink(self):
+        family = getattr(socket, "AF_NETLINK", None)
+        if family is None:
+            return None
         try:
-            if platform.system().lower() == "windows":
-                result = subprocess.run(command, capture_output=True, text=True, timeout=30)
-                return result.returncode == 0, result.stdout, result.stderr
-            
-            if os.geteuid() == 0:
-                result = subprocess.run(command, capture_output=True, text=True, timeout=30)
-                return result.returncode == 0, result.stdout, result.stderr
-            else:
-                if not self.sudo_password:
-                    self.log("❌ Senha sudo não disponível")
-                    return False, "", "Senha sudo não disponível"
-                
-                # ✅ CORREÇÃO SEGURA: Não mostra senha no log
-                full_command = f'echo "{self.sudo_password}" | sudo -S {" ".join(command)}'
-                log_command = f'sudo {" ".join(command)}'  # Log sem senha
-                
-                self.log(f"🔐 Executando: {log_command}")
-                
-                process = subprocess.Popen(
-                    full_command,
-                    shell=True,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True
-                )
-                
+            sock = socket.socket(family, socket.SOCK_DGRAM, self.NETLINK_KOBJECT_UEVENT)
+            sock.bind((0, self.KERNEL_GROUP))
+            sock.settimeout(0.5)
+            return sock
+        except OSError:
+            return None
+
+    @staticmethod
+    def parse_uevent(data):
+        """Converte uma mensagem uevent ("add@/devices/...\\0CHAVE=valor\\0...") em dict"""
+        fields = data.split(b"\0")
+        if not fields or fields[0].startswith(b"libudev") or b"@" not in fields[0]:
+            return None
+        env = {}
+        for field in fields[1:]:
+            key, sep, value = field.partition(b"=")
+            if sep:
+                env[key.decode("ascii", "replace")] = value.decode("utf-8", "replace")
+        return env
+
+    def _run_netlink(self, sock):
+        with sock:
+            while not self._stop.is_set():
                 try:
-                    stdout, stderr = process.communicate(timeout=30)
-                    success = process.returncode == 0
-                    
-                    if not success:
-                        # ✅ CORREÇÃO: Limpa possíveis vazamentos de senha no stderr
-                        clean_stderr = stderr.replace(self.sudo_password, '***')
-                        self.log(f"❌ Erro no comando sudo: {clean_stderr}")
-                    else:
-                        self.log("✅ Comando executado com sucesso")
-                    
-                    return success, stdout, stderr
-                    
-                except subprocess.TimeoutExpired:
-                    process.kill()
-                    self.log("❌ Timeout no comando sudo")
-                    return False, "", "Timeout"
-                    
-        except Exception as e:
-            self.log(f"❌ Erro ao executar comando: {e}")
-            return False, "", str(e)
+                    data = sock.recv(65536)
+                except socket.timeout:
+                    continue
+                except OSError:
+                    break
+                env = self.parse_uevent(data)
+                if not env or env.get("SUBSYSTEM") != "block" or env.get("DEVTYPE") != "disk":
+                    continue
+                name = os.path.basename(env.get("DEVNAME", ""))
+                if name and env.get("ACTION") in ("add", "remove", "change"):
+                    self._emit(env["ACTION"], name)
+
+    def _read_sizes(self):
+        sizes = {}
+        try:
+            names = os.listdir(self.sys_block)
+        except OSError:
+            return sizes
+        for name in names:
+            try:
+                sizes[name] = (self.sys_block / name / "size").read_text().strip()
+            except OSError:
+                sizes[name] = ""
+        return sizes
+
+    def _run_polling(self):
+        known = self._read_sizes()
+        while not self._stop.wait(self.poll_interval):
+            current = self._read_sizes()
+            for name in known.keys() - current.keys():
+                self._emit("remove", name)
+            for name, size in current.items():
+                if name not in known:
+                    self._emit("add", name)
+                elif known[name] != size:
+                    # Leitores de cartão: a mídia entra/sai sem o disco sumir
+                    self._emit("change", name)
+            known = current
+
+
+# === DISPOSITIVOS DE BLOCO (SYSFS) ===
+SYSTEM_MOUNTPOINTS = {"/", "/boot", "/boot/efi", "/usr", "/var", "/home"}
+
+
+def _read_sysfs(path, default=""):
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+
+def read_mountpoints(mounts_path="/proc/self/mounts"):
+    """Mapeia dispositivo (/dev/sdb1) -> [pontos de montagem]
 
-    def run_dd_command_with_sudo(self, iso_path, device, needs_sudo):
-        """Executa o comando dd com sudo de forma segura"""
+    Links como /dev/mapper/root ou /dev/vg/lv entram também pelo nó real (/dev/dm-0).
+    """
+    mountpoints = {}
+    try:
+        with open(mounts_path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 2 and fields[0].startswith("/dev/"):
+                    target = _unescape_mount_field(fields[1])
+                    for source in {fields[0], os.path.realpath(fields[0])}:
+                        mountpoints.setdefault(source, []).append(target)
+    except OSError:
+        pass
+    return mountpoints
+
+
+def _stacked_sources(entry_dir, sys_root="/sys", dev_root="/dev"):
+    """Nós /dev dos dispositivos empilhados sobre o disco/partição (LVM, LUKS, md), pelos holders/
+
+    Cada dm-N entra também como /dev/mapper/<nome>, que é como o /proc/mounts o mostra.
+    """
+    sources = []
+    pending = [entry_dir]
+    seen = set()
+    while pending:
         try:
-            total_size = os.path.getsize(iso_path)
-            pv_available = shutil.which("pv") is not None
-            
-            self.log(f"📊 Tamanho da ISO: {total_size / (1024**3):.2f} GB")
-            self.log(f"🎯 PV disponível: {pv_available}")
-            
-            if pv_available:
-                # Comando com pv para mostrar progresso
-                if needs_sudo:
-                    # ✅ CORREÇÃO SEGURA: Não mostra senha no log
-                    cmd = f'echo "{self.sudo_password}" | sudo -S pv -n "{iso_path}" | sudo -S dd of="{device}" bs=4M'
-                    log_cmd = f'pv -n "{iso_path}" | dd of="{device}" bs=4M [COM SUDO]'  # Log sem senha
-                else:
-                    cmd = f'pv -n "{iso_path}" | dd of="{device}" bs=4M'
-                    log_cmd = cmd
+            holders = os.listdir(os.path.join(pending.pop(), "holders"))
+        except OSError:
+            continue
+        for holder in holders:
+            if holder in seen:
+                continue
+            seen.add(holder)
+            holder_dir = os.path.join(sys_root, "block", holder)
+            sources.append(os.path.join(dev_root, holder))
+            dm_name = _read_sysfs(os.path.join(holder_dir, "dm", "name"))
+            if dm_name:
+                sources.append(os.path.join(dev_root, "mapper", dm_name))
+            pending.append(holder_dir)
+    return sources
+
+
+def format_duration(seconds):
+    """Segundos para "m:ss" ou "h:mm:ss" ("--:--" se desconhecido)"""
+    if seconds is None:
+        return "--:--"
+    minutes, secs = divmod(int(seconds + 0.5), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+def parse_size(text):
+    """Texto como "8G", "512M" ou "1.5T" (base 1024, como format_size) para bytes"""
+    match = re.fullmatch(r"\s*([\d.]+)\s*([BKMGT]?)i?B?\s*", str(text), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Tamanho inválido: {text}")
+    return int(float(match.group(1)) * 1024 ** "BKMGT".index(match.group(2).upper() or "B"))
+
+
+def format_size(size):
+    """Tamanho em bytes para texto curto (base 1024, como o lsblk)"""
+    for unit in ("B", "K", "M", "G", "T"):
+        if size < 1024 or unit == "T":
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+
+
+def enumerate_block_devices(sys_root="/sys", names=None, mounts_path="/proc/self/mounts", dev_root="/dev",
+                            include_virtual=False):
+    """Lista os discos lendo /sys/block diretamente (sem lsblk)
+
+    Cada registro traz: id (estável, no estilo /dev/disk/by-id), name, path,
+    size (bytes), removable, read_only, model, vendor, serial, transport
+    (usb, nvme, mmc, ata/scsi ou virtual), usb_port_path (ex.: "1-1.2"),
+    scsi_hctl (ex.: "6:0:0:1"; o último campo é a LUN), usb_controller,
+    usb_hub e usb_speed (Mbps, ver read_usb_topology), partitions,
+    mountpoints (inclusive via LVM/LUKS/md empilhados) e system (tem
+    partição de sistema montada).
+    Dispositivos virtuais (loop, zram, dm) só entram com include_virtual.
+
+    O id é único na lista: cada LUN de um leitor de cartões tem o seu, e
+    pendrives idênticos (mesmo serial) recebem a porta USB no fim.
+    """
+    block_dir = os.path.join(sys_root, "block")
+    if names is None:
+        try:
+            names = sorted(os.listdir(block_dir))
+        except OSError:
+            return []
+    mounts = read_mountpoints(mounts_path)
+    devices = []
+
+    for name in names:
+        base = os.path.join(block_dir, name)
+        real = os.path.realpath(base)
+        if not include_virtual and "/devices/virtual/" in real:
+            continue
+        if not os.path.isdir(real):
+            continue
+
+        usb_dir = _usb_device_dir(real, sys_root)
+        if usb_dir:
+            transport = "usb"
+        elif "/devices/virtual/" in real:
+            transport = "virtual"
+        elif name.startswith("nvme"):
+            transport = "nvme"
+        elif name.startswith("mmcblk"):
+            transport = "mmc"
+        else:
+            transport = "ata/scsi"
+
+        device_dir = os.path.join(base, "device")
+        vendor = _read_sysfs(os.path.join(device_dir, "vendor"))
+        model = _read_sysfs(os.path.join(device_dir, "model")) or _read_sysfs(os.path.join(device_dir, "name"))
+        serial = _read_sysfs(os.path.join(device_dir, "serial"))
+        if usb_dir:
+            vendor = vendor or _read_sysfs(os.path.join(usb_dir, "manufacturer"))
+            model = model or _read_sysfs(os.path.join(usb_dir, "product"))
+            serial = _read_sysfs(os.path.join(usb_dir, "serial")) or serial
+
+        partitions = []
+        try:
+            for entry in sorted(os.listdir(base)):
+                if entry.startswith(name) and os.path.exists(os.path.join(base, entry, "partition")):
+                    partitions.append(entry)
+        except OSError:
+            pass
+
+        path = os.path.join(dev_root, name)
+        sources = [path] + _stacked_sources(base, sys_root, dev_root)
+        for partition in partitions:
+            sources.append(os.path.join(dev_root, partition))
+            sources.extend(_stacked_sources(os.path.join(base, partition), sys_root, dev_root))
+        # Raiz em LVM/LUKS aparece como /dev/mapper/...: conta como montagem do disco de baixo
+        mountpoints = list(dict.fromkeys(mountpoint for source in sources for mountpoint in mounts.get(source, ())))
+
+        usb_port_path = os.path.basename(usb_dir) if usb_dir else ""
+        topology = read_usb_topology(usb_dir) if usb_dir else None
+        hctl = os.path.basename(os.path.realpath(device_dir))
+        hctl = hctl if re.fullmatch(r"\d+:\d+:\d+:\d+", hctl) else ""
+        lun = hctl.rsplit(":", 1)[-1] if hctl else ""
+        # Leitores com várias fendas expõem uma LUN por fenda, todas com o mesmo serial e porta
+        lun_suffix = f"-lun{lun}" if lun and lun != "0" else ""
+        label = "_".join(part for part in (vendor, model, serial) if part)
+        if serial:
+            device_id = re.sub(r"[^\w.-]+", "_", f"{transport}-{label}") + lun_suffix
+        elif usb_port_path:
+            device_id = f"usb-port-{usb_port_path}{lun_suffix}"
+        else:
+            device_id = name
+
+        devices.append({
+            "id": device_id,
+            "name": name,
+            "path": path,
+            "size": int(_read_sysfs(os.path.join(base, "size"), "0") or 0) * 512,
+            "removable": _read_sysfs(os.path.join(base, "removable")) == "1",
+            "read_only": _read_sysfs(os.path.join(base, "ro")) == "1",
+            "model": model,
+            "vendor": vendor,
+            "serial": serial,
+            "transport": transport,
+            "usb_port_path": usb_port_path,
+            "scsi_hctl": hctl,
+            "usb_controller": topology["controller"] if topology else "",
+            "usb_hub": topology["hub"] if topology else "",
+            "usb_speed": topology["speed"] if topology else 0,
+            "scsi_type": _read_sysfs(os.path.join(device_dir, "type")),
+            "partitions": partitions,
+            "mountpoints": mountpoints,
+            "system": any(mountpoint in SYSTEM_MOUNTPOINTS for mountpoint in mountpoints),
+        })
+
+    # Serial repetido (clones, leitores sem serial por fenda): a porta USB desempata
+    counts = collections.Counter(device["id"] for device in devices)
+    for device in devices:
+        if counts[device["id"]] > 1:
+            device["id"] = disambiguated_device_id(device)
+    return devices
+
+
+def disambiguated_device_id(device):
+    """id + porta USB (estável entre reconexões na mesma porta); fora do USB, o nome do kernel"""
+    if device["usb_port_path"]:
+        return f"{device['id']}-port-{device['usb_port_path']}"
+    return f"{device['id']}-{device['name']}"
+
+
+def is_usb_target(device):
+    """Indica se o disco pode ser gravado: pendrive/cartão, nunca disco de sistema"""
+    if device["system"] or device["transport"] == "virtual" or device["read_only"]:
+        return False
+    if device["scsi_type"] == "5":  # leitor de CD/DVD
+        return False
+    return device["transport"] in ("usb", "mmc") or device["removable"]
+
+
+# === TOPOLOGIA USB ===
+def _usb_device_dir(real_path, sys_root="/sys"):
+    """Sobe na árvore de dispositivos até o dispositivo USB (o diretório com idVendor)"""
+    if "/usb" not in real_path:
+        return None
+    parent = os.path.dirname(real_path)
+    while len(parent) > len(sys_root):
+        if os.path.exists(os.path.join(parent, "idVendor")):
+            return parent
+        parent = os.path.dirname(parent)
+    return None
+
+
+def read_usb_topology(usb_dir):
+    """Controlador, barramento, hub e velocidade (Mbps) do elo mais lento até o dispositivo USB
+
+    Os dois barramentos raiz de um xHCI (ex.: usb1 = USB 2.0, usb2 = USB 3.x)
+    ficam sob o mesmo dispositivo PCI e contam como um único controlador.
+    """
+    speeds = []
+    path = usb_dir
+    while path != os.path.dirname(path):
+        speed = _read_sysfs(os.path.join(path, "speed"))
+        try:
+            speeds.append(float(speed))
+        except ValueError:
+            pass
+        if re.fullmatch(r"usb\d+", os.path.basename(path)):
+            return {
+                "controller": os.path.basename(os.path.dirname(path)),
+                "bus": os.path.basename(path),
+                "hub": os.path.basename(os.path.dirname(usb_dir)),
+                "port_path": os.path.basename(usb_dir),
+                "speed": int(min(speeds)) if speeds else 0,
+            }
+        path = os.path.dirname(path)
+    return None
+
+
+def device_topology(device, sys_root="/sys"):
+    """Topologia USB de /dev/sdX; fora do USB (loop, arquivo, NVMe) cada disco é seu próprio controlador"""
+    name = os.path.basename(os.path.realpath(device))
+    real = os.path.realpath(os.path.join(sys_root, "block", name))
+    usb_dir = _usb_device_dir(real, sys_root)
+    topology = read_usb_topology(usb_dir) if usb_dir else None
+    return topology or {"controller": name, "bus": "", "hub": "", "port_path": "", "speed": 0}
+
+
+# === PROGRESSO E ETA ===
+PROGRESS_EWMA_ALPHA = 0.3  # peso da amostra nova na vazão suavizada
+PROGRESS_SAMPLE_INTERVAL = 0.5  # s entre amostras de vazão (e do sysfs)
+SECTOR_BYTES = 512  # unidade dos contadores de /sys/block/<dev>/stat, qualquer que seja o setor físico
+
+
+def read_sectors_written(device, sys_root="/sys"):
+    """Setores (512 bytes) já gravados no disco segundo o kernel; None fora de um dispositivo de bloco"""
+    try:
+        if not stat.S_ISBLK(os.stat(device).st_mode):
+            return None  # arquivo comum, mesmo que se chame "sdb"
+    except OSError:
+        return None
+    name = os.path.basename(os.path.realpath(device))
+    fields = _read_sysfs(os.path.join(sys_root, "class", "block", name, "stat")).split()
+    return int(fields[6]) if len(fields) >= 7 else None
+
+
+def read_writeback_bytes(meminfo_path="/proc/meminfo"):
+    """(Dirty, Writeback) de /proc/meminfo em bytes: o que ainda está no cache de páginas; None se indisponível"""
+    values = {}
+    try:
+        with open(meminfo_path, "r", encoding="ascii", errors="replace") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("Dirty", "Writeback"):
+                    values[key] = int(rest.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        return None
+    if len(values) != 2:
+        return None
+    return values["Dirty"], values["Writeback"]
+
+
+class ProgressEstimator:
+    """Progresso e ETA de uma gravação (ou verificação) pelos bytes que já chegaram ao pendrive
+
+    O gravador informa os bytes entregues ao kernel (update); na gravação, o
+    concluído vem dos setores escritos em /sys/block/<dev>/stat desde o
+    início, limitado ao que foi entregue. Sem esse contador (arquivo, outro
+    sistema), desconta-se do entregue o que /proc/meminfo ainda mostra em
+    Dirty + Writeback. Assim a barra não chega a 100% com metade da imagem no
+    cache de páginas, e o tempo do fsync final aparece como progresso. Na
+    verificação, relido = concluído. A vazão é uma média móvel exponencial
+    (PROGRESS_EWMA_ALPHA) e a ETA é o restante dividido por ela.
+
+    Entre start() e finish() uma thread amostra o sysfs a cada
+    PROGRESS_SAMPLE_INTERVAL, então o progresso anda mesmo quando o gravador
+    está parado no fsync. on_update recebe cada snapshot, na thread de quem
+    o gerou.
+    """
+
+    def __init__(self, total, device=None, phase="write", on_update=None, alpha=PROGRESS_EWMA_ALPHA,
+                 sample_interval=PROGRESS_SAMPLE_INTERVAL, sys_root="/sys", meminfo_path="/proc/meminfo"):
+        self.total = max(0, int(total))
+        self.device = device
+        self.phase = phase
+        self.on_update = on_update
+        self.alpha = alpha
+        self.sample_interval = sample_interval
+        self.sys_root = sys_root
+        self.meminfo_path = meminfo_path
+
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.rate = None
+        self.cached = None  # Dirty + Writeback do sistema na última amostra
+        self.source = "writer"
+        self.started = time.monotonic()
+        self._sectors_start = None
+        if phase == "write" and device:
+            self._sectors_start = read_sectors_written(device, sys_root)
+            if self._sectors_start is not None:
+                self.source = "device"
+            elif read_writeback_bytes(meminfo_path) is not None:
+                self.source = "meminfo"
+        self._mark = (self.started, 0)  # (instante, concluído) da última amostra de vazão
+        self._finished = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.phase == "write" and self.source != "writer":
+            self._thread = threading.Thread(target=self._sample_loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def update(self, submitted=None):
+        """Registra os bytes entregues pelo gravador (None só reamostra) e devolve o snapshot"""
+        with self.lock:
+            if submitted is not None and not self._finished:
+                self.submitted = min(self.total, max(self.submitted, submitted)) if self.total else submitted
+            self._measure()
+            snapshot = self._snapshot()
+        if self.on_update is not None:
+            self.on_update(snapshot)
+        return snapshot
+
+    def finish(self, ok=True):
+        """Fim da fase: com ok, o que foi entregue está gravado (depois do fsync)"""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        with self.lock:
+            if ok:
+                self.completed = self.submitted
+            self._finished = True
+            snapshot = self._snapshot()
+        if self.on_update is not None:
+            self.on_update(snapshot)
+        return snapshot
+
+    def snapshot(self):
+        with self.lock:
+            return self._snapshot()
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.sample_interval):
+            self.update()
+
+    def _measure(self):
+        """Atualiza o concluído e a vazão suavizada (chamar com o lock)"""
+        if self._finished:
+            return
+        completed = self.submitted
+        if self.phase == "write":
+            writeback = read_writeback_bytes(self.meminfo_path)
+            self.cached = sum(writeback) if writeback is not None else None
+            if self.source == "device":
+                sectors = read_sectors_written(self.device, self.sys_root)
+                if sectors is not None:
+                    completed = (sectors - self._sectors_start) * SECTOR_BYTES
+            elif self.source == "meminfo" and self.cached is not None:
+                completed = self.submitted - self.cached
+        # Nunca volta atrás nem passa do que o gravador entregou
+        self.completed = max(self.completed, min(self.submitted, completed))
+
+        now = time.monotonic()
+        mark_time, mark_completed = self._mark
+        if now - mark_time >= self.sample_interval:
+            rate = (self.completed - mark_completed) / (now - mark_time)
+            self.rate = rate if self.rate is None else self.alpha * rate + (1 - self.alpha) * self.rate
+            self._mark = (now, self.completed)
+
+    def _snapshot(self):
+        elapsed = time.monotonic() - self.started
+        # Antes da primeira amostra (ou numa fase curta demais para ter uma), vale a média desde o início
+        rate = self.rate if self.rate is not None else (self.completed / elapsed if elapsed > 0 else 0.0)
+        remaining = self.total - self.completed
+        if remaining <= 0 or self._finished:
+            eta = 0.0
+        else:
+            eta = remaining / rate if rate else None
+        return {
+            "phase": self.phase,
+            "device": self.device,
+            "total": self.total,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "pending": self.submitted - self.completed,  # entregue ao kernel, ainda não no pendrive
+            "percent": min(100.0, self.completed / self.total * 100) if self.total else 100.0,
+            "rate": rate,
+            "eta": eta,
+            "cached": self.cached,
+            "source": self.source,
+            "elapsed": elapsed,
+            "finished": self._finished,
+        }
+
+
+def describe_progress(snapshot, percent=None):
+    """Texto da barra: "42.0% - 31.5 MB/s - ETA 1:10 (+120 MB no cache)" """
+    percent = snapshot["percent"] if percent is None else percent
+    text = f"{percent:.1f}% - {snapshot['rate'] / (1024*1024):.1f} MB/s - ETA {format_duration(snapshot['eta'])}"
+    if snapshot["pending"] >= 1024 * 1024:
+        text += f" (+{format_size(snapshot['pending'])} no cache)"
+    return text
+
+
+# === FILA DE GRAVAÇÃO ===
+WRITE_ADAPT_INTERVAL = 5.0  # segundos de concorrência constante por amostra de vazão do controlador
+WRITE_MIN_GAIN = 0.15  # uma gravação a mais no controlador precisa render 15% a mais no total
+
+
+class WriteJobScheduler:
+    """Fila de gravações (imagem, dispositivo) com limite de concorrência por controlador USB
+
+    Pendrives no mesmo hub ou porta raiz dividem a banda do controlador: gravar
+    todos ao mesmo tempo só deixa cada um mais lento. O limite de cada
+    controlador começa em 1 (USB 2.0) ou 2 (USB 3.x) e, com adaptive, segue a
+    vazão agregada medida: sobe enquanto uma gravação a mais rende min_gain a
+    mais e volta um passo (sem voltar a subir) quando deixa de render.
+
+    write_func(job, on_progress, cancelled) faz a gravação: on_progress(bytes)
+    recebe o total já transferido (gravação + verificação) e cancelled() indica
+    o cancelamento; retorna True em caso de sucesso. topology(device) devolve
+    o registro de device_topology (trocável por dados simulados). on_finish(job),
+    se informado, roda na thread do worker quando o job termina (qualquer estado).
+    Os ids dos jobs são únicos entre todas as filas do processo.
+    """
+
+    _job_ids = itertools.count(1)
+
+    def __init__(self, write_func, max_concurrent=8, max_per_controller=4, adaptive=True,
+                 topology=device_topology, adapt_interval=WRITE_ADAPT_INTERVAL, min_gain=WRITE_MIN_GAIN,
+                 log=print, on_finish=None):
+        self.write_func = write_func
+        self.on_finish = on_finish
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_per_controller = max(1, int(max_per_controller))
+        self.adaptive = adaptive
+        self.topology = topology
+        self.adapt_interval = adapt_interval
+        self.min_gain = min_gain
+        self.log = log
+
+        self._cond = threading.Condition()
+        self._queue = []  # heap de (-prioridade, ordem, job)
+        self._jobs = {}  # id -> job, na ordem de submissão
+        self._controllers = {}  # controlador -> limite, ativos e amostras de vazão
+        self._rate_marks = {}  # id -> (instante, bytes) da última amostra de vazão do job
+        self._cancelled = set()
+        self._workers = []
+        self._closing = False
+        self._cancel = threading.Event()
+
+    def submit(self, image, device, verify=False, priority=0, label=None):
+        """Enfileira uma gravação; um dispositivo nunca recebe duas gravações ao mesmo tempo"""
+        topology = self.topology(device)
+        size = os.path.getsize(image)
+        with self._cond:
+            for job in self._jobs.values():
+                if job["device"] == device and job["state"] in ("queued", "running"):
+                    self.log(f"⚠️ [fila] {device} já tem uma gravação pendente")
+                    return job
+
+            job_id = next(self._job_ids)
+            job = {
+                "id": job_id,
+                "image": str(image),
+                "device": device,
+                "label": label or f"{os.path.basename(str(image))} → {device}",
+                "controller": topology["controller"],
+                "hub": topology["hub"],
+                "speed": topology["speed"],
+                "verify": verify,
+                "priority": priority,
+                "state": "queued",
+                "size": size,
+                "total": size * 2 if verify else size,
+                "done": 0,
+                "rate": 0.0,
+                "starts_in": None,
+                "eta": None,
+                "started": None,
+                "finished": None,
+                "error": None,
+                "sha256": None,
+            }
+            self._jobs[job_id] = job
+            self._controller_state(job["controller"], job["speed"])
+            heapq.heappush(self._queue, (-priority, job_id, job))
+            self._cond.notify_all()
+
+        speed = f"{job['speed']} Mbps" if job["speed"] else "velocidade desconhecida"
+        self.log(f"🗂️ [fila] {job['label']} (controlador {job['controller']}, hub {job['hub'] or '-'}, {speed})")
+        return job
+
+    def start(self):
+        """Inicia as threads de gravação (pode ser chamado de novo após novos submits)"""
+        with self._cond:
+            self._workers = [worker for worker in self._workers if worker.is_alive()]
+            while len(self._workers) < self.max_concurrent:
+                worker = threading.Thread(target=self._worker, daemon=True)
+                self._workers.append(worker)
+                worker.start()
+
+    def close(self):
+        """Sinaliza que não haverá novos jobs; os workers terminam quando a fila esvaziar"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+
+    def wait(self, timeout=None):
+        """Aguarda o fim de todas as gravações"""
+        self.close()
+        deadline = None if timeout is None else time.time() + timeout
+        for worker in list(self._workers):
+            remaining = None if deadline is None else max(0, deadline - time.time())
+            worker.join(remaining)
+        return self.snapshot()
+
+    def run(self):
+        """Executa a fila inteira de forma bloqueante (modo sem interface)"""
+        self.start()
+        return self.wait()
+
+    def cancel(self, job_id=None):
+        """Cancela uma gravação (ou todas, sem job_id); as que estão na fila nem começam"""
+        with self._cond:
+            if job_id is None:
+                self._cancel.set()
+                self._closing = True
+                jobs = list(self._jobs.values())
             else:
-                # Comando dd simples
-                if needs_sudo:
-                    cmd = f'echo "{self.sudo_password}" | sudo -S dd if="{iso_path}" of="{device}" bs=4M status=progress'
-                    log_cmd = f'dd if="{iso_path}" of="{device}" bs=4M status=progress [COM SUDO]'  # Log sem senha
-                else:
-                    cmd = f'dd if="{iso_path}" of="{device}" bs=4M status=progress'
-                    log_cmd = cmd
-            
-            # ✅ CORREÇÃO: Log seguro sem mostrar senha
-            self.log(f"⚡ Executando: {log_cmd}")
-            
-            # Executa o comando
-            process = subprocess.Popen(
-                cmd,
-                shell=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                universal_newlines=True,
+                jobs = [self._jobs[job_id]] if job_id in self._jobs else []
+            dropped = []
+            for job in jobs:
+                self._cancelled.add(job["id"])
+                if job["state"] == "queued":
+                    job["state"] = "cancelled"
+                    job["finished"] = time.time()
+                    dropped.append(job)
+            self._queue = [item for item in self._queue if item[2]["state"] == "queued"]
+            heapq.heapify(self._queue)
+            self._cond.notify_all()
+        if self.on_finish:
+            for job in dropped:
+                self.on_finish(job)
+        return bool(jobs)
+
+    def snapshot(self):
+        """Visão agregada: jobs com ETA, limites por controlador e progresso total"""
+        with self._cond:
+            self._estimate()
+            jobs = [dict(job) for job in self._jobs.values()]
+            controllers = {
+                name: {
+                    "limit": state["limit"],
+                    "active": state["active"],
+                    "rates": dict(sorted(state["rates"].items())),  # concorrência -> bytes/s agregados
+                }
+                for name, state in self._controllers.items()
+            }
+            closing = self._closing
+
+        states = {}
+        for job in jobs:
+            states[job["state"]] = states.get(job["state"], 0) + 1
+
+        total = sum(job["total"] for job in jobs)
+        done = sum(job["done"] for job in jobs)
+        finished = closing and all(job["state"] in ("done", "failed", "cancelled") for job in jobs)
+        etas = [job["eta"] for job in jobs if job["state"] in ("queued", "running")]
+
+        return {
+            "jobs": jobs,
+            "states": states,
+            "controllers": controllers,
+            "total_bytes": total,
+            "done_bytes": done,
+            "percent": (done / total * 100) if total else (100.0 if finished else 0.0),
+            "eta": None if not etas or None in etas else max(etas),
+            "finished": finished,
+        }
+
+    def _controller_state(self, controller, speed):
+        """Estado do controlador, criado no primeiro job (chamar com o lock)"""
+        state = self._controllers.get(controller)
+        if state is None:
+            initial = 1 if self.adaptive and 0 < speed <= 480 else 2
+            limit = min(initial, self.max_per_controller) if self.adaptive else self.max_per_controller
+            state = self._controllers[controller] = {
+                "limit": limit,
+                "ceiling": self.max_per_controller,
+                "active": 0,
+                "rates": {},
+                "window_start": time.monotonic(),
+                "window_bytes": 0,
+            }
+        return state
+
+    def _next_job(self):
+        """Escolhe o job de maior prioridade cujo controlador ainda tem vaga (chamar com o lock)"""
+        skipped = []
+        chosen = None
+        while self._queue:
+            item = heapq.heappop(self._queue)
+            job = item[2]
+            state = self._controllers[job["controller"]]
+            if state["active"] < state["limit"]:
+                chosen = job
+                break
+            skipped.append(item)
+
+        for item in skipped:
+            heapq.heappush(self._queue, item)
+        return chosen
+
+    def _set_active(self, job, delta):
+        """Muda a concorrência do controlador e reinicia sua janela de medição (chamar com o lock)"""
+        state = self._controllers[job["controller"]]
+        state["active"] += delta
+        state["window_start"] = time.monotonic()
+        state["window_bytes"] = 0
+
+    def _is_cancelled(self, job):
+        return self._cancel.is_set() or job["id"] in self._cancelled
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = None
+                while not self._cancel.is_set():
+                    job = self._next_job()
+                    if job or (self._closing and not self._queue):
+                        break
+                    self._cond.wait(0.5)
+
+                if not job:
+                    return
+
+                job["state"] = "running"
+                job["started"] = time.time()
+                self._rate_marks[job["id"]] = (time.monotonic(), 0)
+                self._set_active(job, 1)
+
+            self.log(f"🔥 [fila] Iniciando: {job['label']}")
+            ok = False
+            try:
+                ok = self.write_func(
+                    job, lambda done: self._on_progress(job, done), lambda: self._is_cancelled(job),
+                )
+            except Exception as e:
+                job["error"] = str(e)
+            finally:
+                with self._cond:
+                    self._set_active(job, -1)
+                    job["finished"] = time.time()
+                    if self._is_cancelled(job):
+                        job["state"] = "cancelled"
+                    else:
+                        job["state"] = "done" if ok else "failed"
+                    self._cond.notify_all()
+
+            elapsed = max(job["finished"] - job["started"], 1e-6)
+            if job["state"] == "done":
+                self.log(f"✅ [fila] Concluído: {job['label']} ({job['done'] / (1024*1024) / elapsed:.1f} MB/s)")
+            elif job["state"] == "cancelled":
+                self.log(f"⏹️ [fila] Cancelado: {job['label']}")
+            else:
+                self.log(f"❌ [fila] Falha em {job['label']}: {job['error'] or 'gravação não concluída'}")
+            if self.on_finish:
+                self.on_finish(job)
+
+    def _on_progress(self, job, done):
+        now = time.monotonic()
+        with self._cond:
+            delta = done - job["done"]
+            if delta <= 0:
+                return
+            job["done"] = done
+
+            # Vazão do job: média móvel de amostras de pelo menos PROGRESS_SAMPLE_INTERVAL
+            mark_time, mark_done = self._rate_marks[job["id"]]
+            if now - mark_time >= PROGRESS_SAMPLE_INTERVAL:
+                rate = (done - mark_done) / (now - mark_time)
+                job["rate"] = rate if not job["rate"] else \
+                    PROGRESS_EWMA_ALPHA * rate + (1 - PROGRESS_EWMA_ALPHA) * job["rate"]
+                self._rate_marks[job["id"]] = (now, done)
+
+            state = self._controllers[job["controller"]]
+            state["window_bytes"] += delta
+            if now - state["window_start"] >= self.adapt_interval:
+                self._adapt(job["controller"], state, now)
+
+    def _adapt(self, controller, state, now):
+        """Fecha a janela de medição do controlador e ajusta o limite (chamar com o lock)"""
+        active = state["active"]
+        rate = state["window_bytes"] / (now - state["window_start"])
+        state["window_start"] = now
+        state["window_bytes"] = 0
+        previous = state["rates"].get(active)
+        state["rates"][active] = rate if previous is None else (previous + rate) / 2
+
+        # Só uma janela com o controlador no limite diz se caberia (ou sobra) uma gravação
+        if not self.adaptive or active != state["limit"]:
+            return
+        rates = state["rates"]
+        fewer = rates.get(active - 1)
+        if fewer is not None and rates[active] < fewer * (1 + self.min_gain):
+            state["limit"] = state["ceiling"] = active - 1
+            self.log(
+                f"📉 [fila] Controlador {controller}: {active} gravações rendem {rates[active] / (1024*1024):.1f} MB/s "
+                f"contra {fewer / (1024*1024):.1f} MB/s com {active - 1}; limite {active - 1}"
             )
-            
-            return process, pv_available, total_size
-            
-        except Exception as e:
-            self.log(f"❌ Erro ao preparar comando dd: {e}")
-            return None, False, 0
+        elif active < state["ceiling"] and any(
+            item[2]["controller"] == controller for item in self._queue
+        ):
+            state["limit"] = active + 1
+            self.log(
+                f"📈 [fila] Controlador {controller}: {rates[active] / (1024*1024):.1f} MB/s com {active} "
+                f"gravação(ões); testando {active + 1}"
+            )
+            self._cond.notify_all()
+
+    def _expected_job_rate(self, state, fallback):
+        """Vazão esperada por job no controlador: a agregada no limite (ou a melhor já medida) dividida"""
+        if state["rates"]:
+            aggregate = state["rates"].get(state["limit"]) or max(state["rates"].values())
+            return aggregate / max(state["limit"], 1)
+        return fallback
+
+    def _estimate(self):
+        """ETA de cada job: em andamento pela própria vazão; na fila, simulando as vagas de cada controlador
+
+        Aproximada: ignora o limite global max_concurrent e supõe que a vazão
+        medida se mantém. Sem nenhuma medida ainda, a ETA fica desconhecida
+        (None). Chamar com o lock.
+        """
+        rates = [job["rate"] for job in self._jobs.values() if job["rate"]]
+        fallback = sum(rates) / len(rates) if rates else 0.0
+        slots = {}  # controlador -> heap com o instante em que cada vaga fica livre (inf: desconhecido)
+        for job in self._jobs.values():
+            if job["state"] == "running":
+                state = self._controllers[job["controller"]]
+                rate = job["rate"] or self._expected_job_rate(state, fallback)
+                finish = (job["total"] - job["done"]) / rate if rate else math.inf
+                job["starts_in"] = 0.0
+                job["eta"] = None if finish == math.inf else finish
+                slots.setdefault(job["controller"], []).append(finish)
+            elif job["state"] != "queued":
+                job["starts_in"] = job["eta"] = None
+
+        for _, _, job in sorted(self._queue, key=lambda item: item[:2]):
+            state = self._controllers[job["controller"]]
+            free = slots.setdefault(job["controller"], [])
+            heapq.heapify(free)
+            # Acima do limite (após uma redução), as primeiras vagas a vagar não voltam
+            while len(free) > state["limit"]:
+                heapq.heappop(free)
+            while len(free) < state["limit"]:
+                heapq.heappush(free, 0.0)
+            rate = self._expected_job_rate(state, fallback)
+            start = heapq.heappop(free)
+            finish = start + job["total"] / rate if rate else math.inf
+            heapq.heappush(free, finish)
+            job["starts_in"] = None if start == math.inf else start
+            job["eta"] = None if finish == math.inf else finish
+
+# === MODO ESTAÇÃO (DUPLICADORA) ===
+STATION_DEFAULT_CRITERIA = {
+    "transports": ("usb",),  # barramentos aceitos (usb, mmc)
+    "removable": False,  # exige a flag "removable" do kernel
+    "min_size": 0,  # bytes; 0 = sem mínimo
+    "max_size": 0,  # bytes; 0 = sem máximo
+}
+STATION_LOG_FIELDS = ("finished_at", "slot", "device", "vendor", "model", "serial", "size", "image",
+                      "result", "sha256", "seconds", "mb_per_s", "error")
+
+
+def station_rejection(device, criteria, image_size=0):
+    """Motivo para a estação recusar o disco, ou None se ele pode ser gravado"""
+    if not is_usb_target(device):
+        return "não é um pendrive gravável (disco de sistema, somente leitura ou virtual)"
+    if device["transport"] not in criteria["transports"]:
+        return f"barramento {device['transport']} fora da lista ({', '.join(criteria['transports'])})"
+    if criteria["removable"] and not device["removable"]:
+        return "não é removível"
+    if device["size"] < max(criteria["min_size"], image_size, 1):
+        return f"pequeno demais ({format_size(device['size'])})"
+    if criteria["max_size"] and device["size"] > criteria["max_size"]:
+        return f"acima do tamanho máximo ({format_size(device['size'])})"
+    return None
+
+
+class DuplicatorStation:
+    """Estação duplicadora: todo pendrive inserido que atende aos critérios é gravado e verificado
+
+    handle_event(ação, nome) recebe os eventos do HotplugMonitor (na thread
+    dele). Cada porta USB (e cada LUN de um leitor com várias fendas) é uma
+    vaga (slot) com estado próprio: queued, writing, verifying, done (pode
+    remover), failed, removed (retirado antes do fim), rejected ou empty. Só
+    "add" (ou "change" de um leitor de cartão que estava vazio) inicia uma
+    gravação: os "change" que a própria gravação provoca ao reler a tabela de
+    partições não regravam o pendrive. Depois da verificação,
+    release(dispositivo) desmonta o que o automontador tiver montado e só
+    então a vaga vira "done". Cada pendrive finalizado ganha uma linha no CSV
+    de log_path.
+    """
+
+    ACTIVE_STATES = ("queued", "writing", "verifying")
+
+    def __init__(self, scheduler, image, criteria=None, verify=True, log_path=None,
+                 detect=None, release=None, log=print, on_change=None):
+        self.scheduler = scheduler
+        self.scheduler.on_finish = self._on_job_finished
+        self.image = str(image)
+        self.image_size = os.path.getsize(self.image)
+        self.criteria = dict(STATION_DEFAULT_CRITERIA, **(criteria or {}))
+        self.verify = verify
+        self.log_path = Path(log_path) if log_path else None
+        self.detect = detect or (lambda name: enumerate_block_devices(names=[name]))
+        self.release = release
+        self.log = log
+        self.on_change = on_change
+
+        self.lock = threading.Lock()
+        self.slots = {}  # vaga (porta USB + LUN ou nome do disco) -> registro
+        self._slot_by_job = {}
+        self.counts = {"done": 0, "failed": 0, "removed": 0, "rejected": 0}
+        self.started = None
+        self.running = False
+
+    def start(self):
+        """Passa a aceitar pendrives; os que já estavam conectados são ignorados"""
+        self.started = time.time()
+        self.running = True
+        self.scheduler.start()
+        self.log(f"🏭 Estação ativa: {os.path.basename(self.image)} ({format_size(self.image_size)}), "
+                 f"verificação {'ligada' if self.verify else 'desligada'}")
+
+    def stop(self, cancel=False):
+        """Para de aceitar pendrives; as gravações em andamento terminam (ou são canceladas)"""
+        self.running = False
+        if cancel:
+            self.scheduler.cancel()
+        else:
+            self.scheduler.close()
+        self.log(f"🏁 Estação parada: {self.counts['done']} gravado(s), {self.counts['failed']} falha(s)")
 
-    def run_dd_command_secure(self, iso_path, device, needs_sudo):
-        """Executa dd de forma mais segura usando pipes"""
+    def handle_event(self, action, name):
+        if not self.running:
+            return
         try:
-            total_size = os.path.getsize(iso_path)
-            pv_available = shutil.which("pv") is not None
-            
-            self.log(f"📊 Iniciando gravação segura...")
-            self.log(f"   Tamanho: {total_size / (1024**3):.2f} GB")
-            self.log(f"   PV: {'Sim' if pv_available else 'Não'}")
-            self.log(f"   Sudo: {'Sim' if needs_sudo else 'Não'}")
-            
-            if needs_sudo and not self.sudo_password:
-                self.log("❌ Senha sudo necessária mas não disponível")
-                return None, False, 0
-            
-            # ✅ MÉTODO SEGURO: Usa Popen com stdin para enviar senha
-            if pv_available:
-                if needs_sudo:
-                    # Comando com pv e sudo
-                    cmd1 = ['sudo', '-S', 'pv', '-n', iso_path]
-                    cmd2 = ['sudo', '-S', 'dd', f'of={device}', 'bs=4M']
-                else:
-                    # Comando com pv sem sudo
-                    cmd1 = ['pv', '-n', iso_path]
-                    cmd2 = ['dd', f'of={device}', 'bs=4M']
+            if action == "remove":
+                self._on_removed(name)
+                return
+            found = self.detect(name)
+            if not found:
+                return
+            device = found[0]
+            if action == "change" and device["size"] == 0:
+                self._on_removed(name)  # leitor de cartão: a mídia saiu
+                return
+            self._on_inserted(action, device)
+        except Exception as e:
+            self.log(f"⚠️ [estação] Erro ao tratar {action} de {name}: {e}")
+
+    def _slot_id(self, device):
+        """Porta USB + LUN (ex.: "1-2:1"); sem hctl, porta + nome do disco; fora do USB, o nome do disco"""
+        port = device.get("usb_port_path")
+        if not port:
+            return device["name"]
+        hctl = device.get("scsi_hctl", "")
+        return f"{port}:{hctl.rsplit(':', 1)[-1]}" if hctl else f"{port}/{device['name']}"
+
+    def _find_slot(self, name):
+        """Vaga ocupada pelo disco (chamar com o lock)"""
+        return next((slot for slot in self.slots.values() if slot["name"] == name and slot["state"] != "empty"),
+                    None)
+
+    def _on_inserted(self, action, device):
+        with self.lock:
+            current = self._find_slot(device["name"])
+            if current and (current["state"] in self.ACTIVE_STATES or action == "change"):
+                return  # releitura da tabela de partições ou evento repetido
+            slot_id = self._slot_id(device)
+            slot = {
+                "slot": slot_id,
+                "name": device["name"],
+                "device": device["path"],
+                "vendor": device.get("vendor", ""),
+                "model": device.get("model", ""),
+                "serial": device.get("serial", ""),
+                "size": device["size"],
+                "state": "queued",
+                "message": "",
+                "job_id": None,
+                "percent": 0.0,
+                "rate": 0.0,
+                "eta": None,
+                "since": time.time(),
+            }
+            reason = station_rejection(device, self.criteria, self.image_size)
+            if reason:
+                slot["state"] = "rejected"
+                slot["message"] = reason
+                self.counts["rejected"] += 1
             else:
-                if needs_sudo:
-                    # Comando dd com sudo
-                    cmd = ['sudo', '-S', 'dd', f'if={iso_path}', f'of={device}', 'bs=4M', 'status=progress']
-                else:
-                    # Comando dd sem sudo
-                    cmd = ['dd', f'if={iso_path}', f'of={device}', 'bs=4M', 'status=progress']
-            
-            # Log seguro
-            if pv_available:
-                log_msg = f"pv + dd [{'COM SUDO' if needs_sudo else 'SEM SUDO'}]"
+                # Sob o lock da estação: o fim do job (on_finish) sempre encontra a vaga
+                job = self.scheduler.submit(self.image, device["path"], verify=self.verify,
+                                            label=f"{slot_id}: {device['path']}")
+                slot["job_id"] = job["id"]
+                self._slot_by_job[job["id"]] = slot
+            self.slots[slot_id] = slot
+
+        if reason:
+            self.log(f"🚫 [estação] {device['path']} ignorado: {reason}")
+        else:
+            self.scheduler.start()
+        self._changed(slot)
+
+    def _on_removed(self, name):
+        job_id = None
+        with self.lock:
+            slot = self._find_slot(name)
+            if not slot:
+                return
+            if slot["state"] in self.ACTIVE_STATES:
+                job_id = slot["job_id"]
+                slot["state"] = "removed"
+                slot["message"] = "retirado antes do fim"
+                self.counts["removed"] += 1
             else:
-                log_msg = f"dd [{'COM SUDO' if needs_sudo else 'SEM SUDO'}]"
-            
-            self.log(f"⚡ Executando: {log_msg}")
-            
-            # Execução segura
-            if pv_available:
-                if needs_sudo:
-                    # Pipe com sudo: pv | dd
-                    pv_process = subprocess.Popen(
-                        cmd1,
-                        stdin=subprocess.PIPE,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        text=True
-                    )
-                    
-                    # Envia senha para o primeiro sudo
-                    pv_process.stdin.write(self.sudo_password + '\n')
-                    pv_process.stdin.flush()
-                    
-                    dd_process = subprocess.Popen(
-                        cmd2,
-                        stdin=pv_process.stdout,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.STDOUT,
-                        text=True
-                    )
-                    
-                    # Envia senha para o segundo sudo
-                    # Não podemos enviar diretamente, então usamos um método diferente
-                    process = dd_process
-                    
-                else:
-                    # Pipe sem sudo
-                    pv_process = subprocess.Popen(
-                        cmd1,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        text=True
-                    )
-                    
-                    process = subprocess.Popen(
-                        cmd2,
-                        stdin=pv_process.stdout,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.STDOUT,
-                        text=True
-                    )
+                slot["state"] = "empty"
+                slot["message"] = ""
+        if job_id is not None:
+            self.scheduler.cancel(job_id)
+            self.log(f"⚠️ [estação] {slot['device']} retirado durante a gravação (vaga {slot['slot']})")
+        self._changed(slot)
+
+    def _on_job_finished(self, job):
+        """Thread do worker: libera o pendrive, marca a vaga e registra no CSV"""
+        if job["state"] == "done" and self.release:
+            try:
+                self.release(job["device"])
+            except Exception as e:
+                self.log(f"⚠️ [estação] Não foi possível liberar {job['device']}: {e}")
+
+        with self.lock:
+            slot = self._slot_by_job.pop(job["id"], None)
+            if slot is None:
+                return
+            current = slot["job_id"] == job["id"] and slot["state"] in self.ACTIVE_STATES
+            if job["state"] == "done":
+                self.counts["done"] += 1
+                result = "done"
+            elif slot["state"] == "removed":
+                result = "removed"
             else:
-                if needs_sudo:
-                    # DD simples com sudo
-                    process = subprocess.Popen(
-                        cmd,
-                        stdin=subprocess.PIPE,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.STDOUT,
-                        text=True
-                    )
-                    process.stdin.write(self.sudo_password + '\n')
-                    process.stdin.flush()
-                else:
-                    # DD simples sem sudo
-                    process = subprocess.Popen(
-                        cmd,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.STDOUT,
-                        text=True
-                    )
-            
-            return process, pv_available, total_size
-            
-        except Exception as e:
-            self.log(f"❌ Erro no método seguro: {e}")
-            return None, False, 0
+                self.counts["failed"] += 1
+                result = job["state"]
+            if current:
+                slot["state"] = result
+                slot["percent"] = 100.0 if result == "done" else slot["percent"]
+                slot["message"] = "pode remover" if result == "done" else (job["error"] or result)
+            record = dict(slot)
+
+        if result == "done":
+            self.log(f"🟢 [estação] Vaga {record['slot']}: {record['device']} pronto, pode remover")
+        self._write_log_row(record, job, result)
+        if current:
+            self._changed(record)
+
+    def _write_log_row(self, slot, job, result):
+        if not self.log_path:
+            return
+        seconds = (job["finished"] or time.time()) - (job["started"] or time.time())
+        row = {
+            "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "slot": slot["slot"],
+            "device": slot["device"],
+            "vendor": slot["vendor"],
+            "model": slot["model"],
+            "serial": slot["serial"],
+            "size": slot["size"],
+            "image": self.image,
+            "result": result,
+            "sha256": job["sha256"] or "",
+            "seconds": f"{seconds:.1f}",
+            "mb_per_s": f"{job['done'] / (1024*1024) / max(seconds, 1e-6):.1f}",
+            "error": job["error"] or "",
+        }
+        try:
+            with self.lock:
+                self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                new_file = not self.log_path.exists() or self.log_path.stat().st_size == 0
+                with open(self.log_path, "a", newline="", encoding="utf-8") as f:
+                    writer = csv.DictWriter(f, fieldnames=STATION_LOG_FIELDS)
+                    if new_file:
+                        writer.writeheader()
+                    writer.writerow(row)
+        except OSError as e:
+            self.log(f"⚠️ [estação] Falha ao registrar no CSV: {e}")
+
+    def _changed(self, slot):
+        if self.on_change:
+            self.on_change(dict(slot))
+
+    def snapshot(self):
+        """Vagas com o progresso atual da fila, contadores e ritmo (pendrives por hora)"""
+        jobs = {job["id"]: job for job in self.scheduler.snapshot()["jobs"]}
+        with self.lock:
+            slots = []
+            for slot in self.slots.values():
+                slot = dict(slot)
+                job = jobs.get(slot["job_id"])
+                if job and slot["state"] in self.ACTIVE_STATES:
+                    if job["state"] == "running":
+                        slot["state"] = "verifying" if job["done"] > job["size"] else "writing"
+                    slot["percent"] = job["done"] / job["total"] * 100 if job["total"] else 0.0
+                    slot["rate"] = job["rate"]
+                    slot["eta"] = job["eta"]
+                slots.append(slot)
+            counts = dict(self.counts)
+
+        hours = (time.time() - self.started) / 3600 if self.started else 0
+        return {
+            "image": self.image,
+            "running": self.running,
+            "slots": sorted(slots, key=lambda slot: slot["slot"]),
+            "counts": counts,
+            "per_hour": counts["done"] / hours if hours > 0 else 0.0,
+        }
+
+
+# === VERIFICAÇÃO PRÉVIA (/proc) ===
+def partition_path(device, number):
+    """Caminho da partição N: /dev/sdb -> /dev/sdb1, /dev/nvme0n1 -> /dev/nvme0n1p1"""
+    return f"{device}p{number}" if device[-1:].isdigit() else f"{device}{number}"
 
-    def unmount_all_partitions(self, device):
-        """Desmonta todas as partições de um dispositivo - VERSÃO MELHORADA"""
+
+def _unescape_mount_field(text):
+    # Espaços e afins vêm escapados em octal (\040) em mounts/mountinfo
+    return re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), text)
+
+
+def read_mountinfo(proc_root="/proc"):
+    """Lê /proc/self/mountinfo: [{"dev": "8:17", "mountpoint", "fstype", "source"}]"""
+    mounts = []
+    try:
+        with open(os.path.join(proc_root, "self", "mountinfo"), "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                before, sep, after = line.partition(" - ")
+                fields = before.split()
+                tail = after.split()
+                if not sep or len(fields) < 5 or len(tail) < 2:
+                    continue
+                mounts.append({
+                    "dev": fields[2],
+                    "mountpoint": _unescape_mount_field(fields[4]),
+                    "fstype": tail[0],
+                    "source": _unescape_mount_field(tail[1]),
+                })
+    except OSError:
+        pass
+    return mounts
+
+
+def device_nodes(device, sys_root="/sys"):
+    """Disco e partições: {"/dev/sdb": "8:16", "/dev/sdb1": "8:17", ...}"""
+    name = os.path.basename(device)
+    dev_root = os.path.dirname(device)
+    base = os.path.join(sys_root, "block", name)
+    nodes = {device: _read_sysfs(os.path.join(base, "dev"))}
+    try:
+        entries = os.listdir(base)
+    except OSError:
+        entries = []
+    for entry in entries:
+        if entry.startswith(name) and os.path.exists(os.path.join(base, entry, "partition")):
+            nodes[os.path.join(dev_root, entry)] = _read_sysfs(os.path.join(base, entry, "dev"))
+    return nodes
+
+
+def find_device_mounts(device, proc_root="/proc", sys_root="/sys"):
+    """Montagens do disco ou de suas partições (por major:minor, vale para /dev/disk/by-*)"""
+    nodes = device_nodes(device, sys_root)
+    numbers = {number: path for path, number in nodes.items() if number}
+    found = []
+    for mount in read_mountinfo(proc_root):
+        if mount["dev"] in numbers or mount["source"] in nodes:
+            found.append(dict(mount, device=numbers.get(mount["dev"], mount["source"])))
+    return found
+
+
+def find_device_holders(device, proc_root="/proc", sys_root="/sys", ignore_pids=()):
+    """Processos com o disco ou uma partição aberta (varre /proc/<pid>/fd)"""
+    targets = set(device_nodes(device, sys_root))
+    holders = []
+    try:
+        pids = [entry for entry in os.listdir(proc_root) if entry.isdigit()]
+    except OSError:
+        return holders
+    ignore = {str(pid) for pid in ignore_pids}
+
+    for pid in pids:
+        if pid in ignore:
+            continue
+        fd_dir = os.path.join(proc_root, pid, "fd")
         try:
-            system = platform.system().lower()
-            if system != "linux":
-                return True
-                
-            self.log(f"🔌 Desmontando partições de {device}...")
-            
-            needs_sudo = os.geteuid() != 0
-            
-            # Primeiro, tenta métodos mais simples
-            simple_commands = [
-                ['umount', f"{device}*"],  # Tenta desmontar todas as partições
-                ['umount', device],  # Tenta desmontar o dispositivo
-            ]
-            
-            for cmd in simple_commands:
-                if needs_sudo and self.sudo_password:
-                    success, stdout, stderr = self.run_sudo_command(cmd)
-                else:
-                    result = subprocess.run(cmd, capture_output=True, text=True)
-                    success = result.returncode == 0
-                
-                if success:
-                    self.log(f"✅ {' '.join(cmd)} - partições desmontadas")
-            
-            time.sleep(2)
-            
-            # Método detalhado: lista e desmonta individualmente
-            if needs_sudo and self.sudo_password:
-                success, stdout, stderr = self.run_sudo_command(['lsblk', '-l', '-o', 'NAME,MOUNTPOINT,TYPE'])
-            else:
-                result = subprocess.run(['lsblk', '-l', '-o', 'NAME,MOUNTPOINT,TYPE'], 
-                                      capture_output=True, text=True)
-                success = result.returncode == 0
-                stdout = result.stdout
-            
-            if not success:
-                self.log("⚠️ Não foi possível listar partições, continuando...")
-                return True  # Continua mesmo sem listar
-                
-            # Encontra e desmonta todas as partições do dispositivo
-            device_name = device.split('/')[-1]  # Pega 'sdb' de '/dev/sdb'
-            partitions_unmounted = 0
-            
-            for line in stdout.split('\n'):
-                if device_name in line and 'part' in line and line.strip():
-                    parts = line.split()
-                    if len(parts) >= 3 and parts[0].startswith(device_name) and parts[2] == 'part':
-                        partition = f"/dev/{parts[0]}"
-                        mountpoint = parts[1] if len(parts) > 1 and parts[1] != "" else "(sem mountpoint)"
-                        
-                        if mountpoint != "(sem mountpoint)":
-                            self.log(f"   📍 Desmontando {partition} de {mountpoint}...")
-                            
-                            if needs_sudo and self.sudo_password:
-                                success, stdout, stderr = self.run_sudo_command(['umount', partition])
-                            else:
-                                result = subprocess.run(['umount', partition], capture_output=True, text=True)
-                                success = result.returncode == 0
-                            
-                            if success:
-                                self.log(f"   ✅ {partition} desmontado")
-                                partitions_unmounted += 1
-                            else:
-                                self.log(f"   ⚠️ Não foi possível desmontar {partition}")
-            
-            if partitions_unmounted > 0:
-                self.log(f"✅ {partitions_unmounted} partição(ões) desmontada(s)")
-            else:
-                self.log("ℹ️ Nenhuma partição estava montada ou já estavam desmontadas")
-                
-            # Pausa final para o sistema processar
-            time.sleep(3)
-            return True
-            
-        except Exception as e:
-            self.log(f"⚠️ Erro ao desmontar partições: {e}")
-            # Continua mesmo com erro
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue  # processo encerrado ou sem permissão
+        for fd in fds:
+            try:
+                target = os.readlink(os.path.join(fd_dir, fd))
+            except OSError:
+                continue
+            if target in targets:
+                try:
+                    with open(os.path.join(proc_root, pid, "cmdline"), "rb") as f:
+                        command = f.read().replace(b"\0", b" ").decode("utf-8", "replace").strip()
+                except OSError:
+                    command = ""
+                holders.append({"pid": pid, "command": command[:100], "device": target})
+                break
+    return holders
+
+
+def poll_until(predicate, timeout, interval=0.01, max_interval=0.2):
+    """Consulta predicate() com recuo exponencial até ser verdadeiro ou estourar o prazo"""
+    deadline = time.monotonic() + timeout
+    while True:
+        if predicate():
             return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, max_interval)
+
+def partition_node_ready(device, number=1, sys_root="/sys"):
+    """Partição N visível no sysfs e com o nó de bloco criado em /dev"""
+    node = partition_path(device, number)
+    if not os.path.exists(os.path.join(sys_root, "block", os.path.basename(device), os.path.basename(node))):
+        return False
+    try:
+        return stat.S_ISBLK(os.stat(node).st_mode)
+    except OSError:
+        return False
 
-    def force_unmount_device(self, device):
-        """Tenta desmontar forçadamente um dispositivo"""
+
+def wait_for_partition(device, number=1, timeout=10.0, sys_root="/sys"):
+    """Aguarda a partição N aparecer (sysfs + nó do dispositivo), com prazo máximo"""
+    return poll_until(lambda: partition_node_ready(device, number, sys_root), timeout)
+
+
+def wait_for_partitions_cleared(device, timeout=5.0, sys_root="/sys"):
+    """Aguarda o kernel descartar as partições antigas após relê-las"""
+    return poll_until(lambda: len(device_nodes(device, sys_root)) == 1, timeout)
+
+
+def unmount_device(device, lazy=False, timeout=5.0):
+    """Desmonta em paralelo todas as montagens do disco; retorna as que restaram
+
+    Sem sleeps: após os umount, consulta o mountinfo com recuo até esvaziar.
+    Se a desmontagem normal não bastar, tenta a preguiçosa (umount -l).
+    """
+    for flags in ([["-l"]] if lazy else [[], ["-l"]]):
+        # Mais profundos primeiro: submontagens antes de quem as contém
+        mountpoints = sorted({mount["mountpoint"] for mount in find_device_mounts(device)}, key=len, reverse=True)
+        if not mountpoints:
+            return []
+        with ThreadPoolExecutor(max_workers=min(8, len(mountpoints))) as pool:
+            list(pool.map(lambda mountpoint: subprocess.run(
+                ["umount", *flags, mountpoint], capture_output=True, timeout=timeout), mountpoints))
+        if poll_until(lambda: not find_device_mounts(device), timeout):
+            return []
+    return find_device_mounts(device)
+
+# === TABELA DE PARTIÇÕES (MBR/GPT) ===
+SECTOR_SIZE = 512  # setor lógico padrão (imagens e a maioria dos pendrives); discos 4Kn usam 4096
+BLKRRPART = 0x125F          # _IO(0x12, 95): relê a tabela de partições
+BLKSSZGET = 0x1268          # _IO(0x12, 104): tamanho do setor lógico
+BLKGETSIZE64 = 0x80081272   # _IOR(0x12, 114, size_t): tamanho em bytes
+GPT_ENTRY_COUNT = 128
+GPT_ENTRY_SIZE = 128
+GPT_TABLE_BYTES = GPT_ENTRY_COUNT * GPT_ENTRY_SIZE
+GPT_TABLE_SECTORS = GPT_TABLE_BYTES // SECTOR_SIZE  # 32 (setores de 512 bytes)
+PARTITION_ALIGNMENT_BYTES = 1024 * 1024  # início da partição: 2048 setores de 512 bytes, 256 de 4096
+
+MBR_TYPES = {"fat32": 0x0C, "exfat": 0x07, "ntfs": 0x07, "linux": 0x83, "efi": 0xEF}
+GPT_TYPES = {
+    "fat32": "EBD0A0A2-B9E5-4433-87C0-68B6B72699C7",  # Microsoft basic data
+    "exfat": "EBD0A0A2-B9E5-4433-87C0-68B6B72699C7",
+    "ntfs": "EBD0A0A2-B9E5-4433-87C0-68B6B72699C7",
+    "linux": "0FC63DAF-8483-4772-8E79-3D69D8477DE4",
+    "efi": "C12A7328-F81F-11D2-BA4B-00A0C93EC93B",
+}
+
+
+def _chs(lba, heads=255, sectors=63):
+    """Endereço CHS (3 bytes) de um LBA; acima do limite usa o marcador 1023/254/63"""
+    cylinder, remainder = divmod(lba, heads * sectors)
+    if cylinder > 1023:
+        return b"\xfe\xff\xff"
+    head, sector = divmod(remainder, sectors)
+    return bytes((head, ((cylinder >> 2) & 0xC0) | (sector + 1), cylinder & 0xFF))
+
+
+def _mbr_entry(status, type_id, start, count):
+    return struct.pack("<B3sB3sII", status, _chs(start), type_id,
+                       _chs(start + count - 1), start, count)
+
+
+def build_mbr(entries, disk_signature=None, boot_code=b"", sector_size=SECTOR_SIZE):
+    """Setor 0: código de boot + assinatura + até 4 entradas (status, tipo, início, setores)"""
+    sector = bytearray(sector_size)
+    sector[:len(boot_code[:440])] = boot_code[:440]
+    signature = disk_signature if disk_signature is not None else struct.unpack("<I", os.urandom(4))[0]
+    struct.pack_into("<I", sector, 440, signature)
+    for index, (status, type_id, start, count) in enumerate(entries[:4]):
+        sector[446 + index * 16:462 + index * 16] = _mbr_entry(status, type_id, start, count)
+    sector[510:512] = b"\x55\xaa"
+    return bytes(sector)
+
+
+def gpt_table_sectors(sector_size=SECTOR_SIZE):
+    """Setores ocupados pelas 128 entradas da GPT: 32 com setores de 512 bytes, 4 com 4096"""
+    return -(-GPT_TABLE_BYTES // sector_size)
+
+
+def _gpt_header(total_sectors, current, backup, entries_lba, entries_crc, disk_guid, sector_size=SECTOR_SIZE):
+    table_sectors = gpt_table_sectors(sector_size)
+    header = bytearray(struct.pack(
+        "<8sIIIIQQQQ16sQIII",
+        b"EFI PART", 0x00010000, 92, 0, 0,
+        current, backup,
+        2 + table_sectors, total_sectors - 2 - table_sectors,
+        disk_guid.bytes_le, entries_lba, GPT_ENTRY_COUNT, GPT_ENTRY_SIZE, entries_crc,
+    ))
+    struct.pack_into("<I", header, 16, zlib.crc32(header) & 0xFFFFFFFF)
+    return bytes(header) + bytes(sector_size - len(header))
+
+
+def build_gpt(total_sectors, partitions, disk_guid=None, sector_size=SECTOR_SIZE):
+    """GPT completa: (LBA 0..33 com MBR protetora, últimos 33 setores com o backup)
+
+    total_sectors e as partições contam setores lógicos de sector_size bytes;
+    com 4096 a tabela ocupa 4 setores (LBA 0..5 e os 5 últimos).
+    """
+    disk_guid = disk_guid or uuid.uuid4()
+    table = bytearray(GPT_ENTRY_COUNT * GPT_ENTRY_SIZE)
+    for index, part in enumerate(partitions):
+        name = part.get("name", "")[:36].encode("utf-16-le")
+        struct.pack_into(
+            "<16s16sQQQ72s", table, index * GPT_ENTRY_SIZE,
+            uuid.UUID(part["type_guid"]).bytes_le, part.get("guid", uuid.uuid4()).bytes_le,
+            part["start"], part["start"] + part["size"] - 1, part.get("attributes", 0), name,
+        )
+    entries_crc = zlib.crc32(table) & 0xFFFFFFFF
+    table_sectors = gpt_table_sectors(sector_size)
+    table = bytes(table) + bytes(table_sectors * sector_size - len(table))
+    last = total_sectors - 1
+
+    protective = build_mbr([(0x00, 0xEE, 1, min(total_sectors - 1, 0xFFFFFFFF))], disk_signature=0,
+                           sector_size=sector_size)
+    primary = protective + _gpt_header(total_sectors, 1, last, 2, entries_crc, disk_guid, sector_size) + table
+    backup = table + _gpt_header(total_sectors, last, 1, last - table_sectors, entries_crc, disk_guid, sector_size)
+    return primary, backup
+
+
+def single_partition_layout(total_sectors, label="dos", fs_type="fat32", bootable=True, name="USB_BOOT",
+                            sector_size=SECTOR_SIZE):
+    """Uma partição alinhada em 1 MiB ocupando o disco (como o parted 1MiB 100%)"""
+    start = PARTITION_ALIGNMENT_BYTES // sector_size
+    end = total_sectors if label == "dos" else total_sectors - 1 - gpt_table_sectors(sector_size)
+    if end <= start:
+        raise ValueError("Dispositivo pequeno demais para a tabela de partições")
+    if label == "dos":
+        return [{"start": start, "size": min(end - start, 0xFFFFFFFF),
+                 "type_id": MBR_TYPES[fs_type], "bootable": bootable}]
+    return [{"start": start, "size": end - start, "type_guid": GPT_TYPES[fs_type], "name": name}]
+
+
+def _open_target(target):
+    """Aceita caminho ou fd já aberto (ex.: recebido do ajudante privilegiado)"""
+    if isinstance(target, int):
+        return target, False
+    return os.open(target, os.O_RDWR | getattr(os, "O_CLOEXEC", 0)), True
+
+
+def logical_sector_size(fd):
+    """Setor lógico do dispositivo de bloco (BLKSSZGET); arquivos de imagem usam SECTOR_SIZE"""
+    if fcntl is not None and stat.S_ISBLK(os.fstat(fd).st_mode):
+        return struct.unpack("i", fcntl.ioctl(fd, BLKSSZGET, b"\0" * 4))[0]
+    return SECTOR_SIZE
+
+
+def device_size(fd):
+    """Tamanho do dispositivo de bloco ou do arquivo de imagem aberto em fd"""
+    if fcntl is not None and stat.S_ISBLK(os.fstat(fd).st_mode):
+        return struct.unpack("Q", fcntl.ioctl(fd, BLKGETSIZE64, b"\0" * 8))[0]
+    return os.lseek(fd, 0, os.SEEK_END)
+
+
+def reread_partition_table(fd):
+    """BLKRRPART: o kernel relê a tabela (sem partprobe); ignora arquivos comuns"""
+    if fcntl is None or not stat.S_ISBLK(os.fstat(fd).st_mode):
+        return False
+    fcntl.ioctl(fd, BLKRRPART)
+    return True
+
+
+def write_partition_table(target, label="dos", partitions=None, fs_type="fat32", rescan=True, sector_size=None):
+    """Grava MBR ou GPT direto no dispositivo/imagem, apagando assinaturas antigas
+
+    Zera o primeiro MiB e os setores finais (GPT de backup) em duas escritas,
+    grava a nova tabela, faz fsync e pede ao kernel para relê-la. Sem
+    sector_size, usa o setor lógico do dispositivo (BLKSSZGET). Retorna as
+    partições gravadas, em setores lógicos.
+    """
+    fd, owned = _open_target(target)
+    try:
+        size = device_size(fd)
+        sector_size = sector_size or logical_sector_size(fd)
+        table_sectors = gpt_table_sectors(sector_size)
+        total_sectors = size // sector_size
+        partitions = partitions or single_partition_layout(total_sectors, label, fs_type, sector_size=sector_size)
+        tail_offset = (total_sectors - 1 - table_sectors) * sector_size
+
+        head = bytearray(min(PARTITION_ALIGNMENT_BYTES, size))
+        if label == "dos":
+            entries = [(0x80 if part.get("bootable") else 0x00, part["type_id"], part["start"], part["size"])
+                       for part in partitions]
+            head[:sector_size] = build_mbr(entries, sector_size=sector_size)
+            tail = bytes((table_sectors + 1) * sector_size)
+        elif label == "gpt":
+            primary, tail = build_gpt(total_sectors, partitions, sector_size=sector_size)
+            head[:len(primary)] = primary
+        else:
+            raise ValueError(f"Tipo de tabela desconhecido: {label}")
+
+        os.pwrite(fd, bytes(head), 0)
+        if tail_offset >= len(head):
+            os.pwrite(fd, tail, tail_offset)
+        os.fsync(fd)
+        if rescan:
+            reread_partition_table(fd)
+        return partitions
+    finally:
+        if owned:
+            os.close(fd)
+
+
+def read_partition_table(target, sector_size=None):
+    """Lê MBR/GPT de um dispositivo ou imagem: {"label", "partitions", "crc_ok"}"""
+    with open(target, "rb") as f:
+        sector_size = sector_size or logical_sector_size(f.fileno())
+        return parse_partition_table(f.read((2 + gpt_table_sectors(sector_size)) * sector_size), sector_size)
+
+
+def parse_partition_table(head, sector_size=SECTOR_SIZE):
+    """Interpreta os primeiros setores (34 de 512 bytes); setor de boot de sistema de arquivos não conta como MBR"""
+    if len(head) < sector_size or head[510:512] != b"\x55\xaa":
+        return {"label": None, "partitions": [], "crc_ok": False}
+
+    mbr = []
+    for index in range(4):
+        status, _, type_id, _, start, count = struct.unpack_from("<B3sB3sII", head, 446 + index * 16)
+        if status not in (0x00, 0x80):
+            return {"label": None, "partitions": [], "crc_ok": False}
+        if type_id and count:
+            mbr.append({"start": start, "size": count, "type_id": type_id, "bootable": status == 0x80})
+    if not mbr:
+        return {"label": None, "partitions": [], "crc_ok": False}
+
+    if not (mbr and mbr[0]["type_id"] == 0xEE and head[sector_size:sector_size + 8] == b"EFI PART"):
+        return {"label": "dos", "partitions": mbr, "crc_ok": True}
+
+    header = bytearray(head[sector_size:sector_size + 92])
+    stored_crc = struct.unpack_from("<I", header, 16)[0]
+    struct.pack_into("<I", header, 16, 0)
+    entries_lba, count, entry_size, entries_crc = struct.unpack_from("<QIII", header, 72)
+    if entry_size < GPT_ENTRY_SIZE:
+        return {"label": "gpt", "partitions": [], "crc_ok": False}
+    table = head[entries_lba * sector_size:entries_lba * sector_size + count * entry_size]
+    crc_ok = (zlib.crc32(header) & 0xFFFFFFFF) == stored_crc and (zlib.crc32(table) & 0xFFFFFFFF) == entries_crc
+
+    partitions = []
+    for offset in range(0, len(table), entry_size):
+        type_guid, part_guid, first, last, attributes, name = struct.unpack_from("<16s16sQQQ72s", table, offset)
+        if type_guid == bytes(16):
+            continue
+        partitions.append({
+            "start": first, "size": last - first + 1,
+            "type_guid": str(uuid.UUID(bytes_le=type_guid)).upper(),
+            "guid": uuid.UUID(bytes_le=part_guid), "attributes": attributes,
+            "name": name.decode("utf-16-le").rstrip("\0"),
+        })
+    return {"label": "gpt", "partitions": partitions, "crc_ok": crc_ok}
+
+
+# === IMAGENS DE DISCO ===
+BLKDISCARD = 0x1277  # _IO(0x12, 119): descarta (TRIM) um intervalo do dispositivo
+ISO9660_MAGIC_OFFSET = 0x8001
+
+
+def inspect_disk_image(path):
+    """Classifica a imagem: "hybrid" (ISO + MBR/GPT), "disk" (MBR/GPT), "iso" ou "unknown"
+
+    Imagens híbridas e de disco trazem a própria tabela de partições: a gravação
+    bruta sobrescreve tudo que uma formatação prévia criaria.
+    """
+    with open(path, "rb") as f:
+        head = f.read(ISO9660_MAGIC_OFFSET + 5)
+    table = parse_partition_table(head[:(2 + GPT_TABLE_SECTORS) * SECTOR_SIZE])
+    iso = head[ISO9660_MAGIC_OFFSET:ISO9660_MAGIC_OFFSET + 5] == b"CD001"
+    if table["label"]:
+        kind = "hybrid" if iso else "disk"
+    else:
+        kind = "iso" if iso else "unknown"
+    return {"kind": kind, "label": table["label"], "partitions": len(table["partitions"])}
+
+
+def discard_device(device, sys_root="/sys", fd=None):
+    """Prepara o disco para uma gravação bruta: TRIM de tudo quando suportado
+
+    Sem suporte a discard, zera só o último MiB, onde ficaria uma GPT de backup
+    antiga que a imagem (menor que o disco) não sobrescreve.
+    Retorna "discard" ou "tail".
+    """
+    max_discard = _read_sysfs(os.path.join(sys_root, "block", os.path.basename(device), "queue", "discard_max_bytes"))
+    fd, owned = _open_target(device if fd is None else fd)
+    try:
+        size = device_size(fd)
+        if fcntl is not None and max_discard not in (None, "", "0") and stat.S_ISBLK(os.fstat(fd).st_mode):
+            try:
+                fcntl.ioctl(fd, BLKDISCARD, struct.pack("QQ", 0, size))
+                return "discard"
+            except OSError:
+                pass  # controlador anuncia mas recusa: cai para o zeramento do fim
+        tail = min(size, 1024 * 1024)
+        os.pwrite(fd, bytes(tail), size - tail)
+        os.fsync(fd)
+        return "tail"
+    finally:
+        if owned:
+            os.close(fd)
+
+
+# === FORMATADOR FAT32/exFAT ===
+ERASE_BLOCK_SIZE = 4 * 1024 * 1024  # bloco de apagamento típico de pendrives
+FAT32_MIN_CLUSTERS = 65525
+FORMAT_WRITE_CHUNK = 4 * 1024 * 1024
+
+
+def erase_block_size(device, sys_root="/sys"):
+    """Bloco de apagamento do flash: optimal_io_size/discard_granularity, mínimo de 4 MiB"""
+    queue_dir = os.path.join(sys_root, "block", os.path.basename(device), "queue")
+    size = ERASE_BLOCK_SIZE
+    for name in ("optimal_io_size", "discard_granularity"):
         try:
-            self.log(f"🔧 Tentando desmontagem forçada de {device}...")
-            
-            # Tenta desmontar o dispositivo inteiro primeiro
-            commands = [
-                ['umount', device],  # Tenta desmontar o dispositivo
-                ['umount', f"{device}*"],  # Tenta desmontar todas as partições
-            ]
-            
-            needs_sudo = os.geteuid() != 0
-            
-            for cmd in commands:
-                if needs_sudo and self.sudo_password:
-                    success, stdout, stderr = self.run_sudo_command(cmd)
+            value = int(_read_sysfs(os.path.join(queue_dir, name)) or 0)
+        except ValueError:
+            continue
+        if value > size and value & (value - 1) == 0:
+            size = value
+    return size
+
+
+def _align_up(value, alignment):
+    return -(-value // alignment) * alignment
+
+
+def _fat_label(label):
+    label = (label or "NO NAME").upper().encode("ascii", "replace")[:11]
+    return label.ljust(11, b" ")
+
+
+def _write_regions(fd, offset, length, patches, chunk=FORMAT_WRITE_CHUNK):
+    """Grava [offset, offset+length) em blocos grandes: zeros com as estruturas sobrepostas
+
+    Cada byte é escrito uma única vez; retorna o número de escritas.
+    """
+    patches = sorted(patches)
+    writes = 0
+    position = 0
+    index = 0
+    while position < length:
+        size = min(chunk, length - position)
+        block = bytearray(size)
+        while index < len(patches) and patches[index][0] < position:
+            index += 1  # estruturas já gravadas em blocos anteriores
+        scan = index
+        while scan < len(patches) and patches[scan][0] < position + size:
+            start, data = patches[scan]
+            block[start - position:start - position + len(data)] = data[:position + size - start]
+            if start + len(data) > position + size:
+                # Estrutura atravessa o bloco: o restante vai para o próximo
+                patches.insert(scan + 1, (position + size, data[position + size - start:]))
+            scan += 1
+        os.pwrite(fd, block, offset + position)
+        writes += 1
+        position += size
+    return writes
+
+
+def _fat32_geometry(total_sectors, hidden_sectors, erase_block, sector_size=SECTOR_SIZE):
+    """Escolhe tamanho de cluster e setores reservados para alinhar a área de dados"""
+    size = total_sectors * sector_size
+    # Tabela padrão da Microsoft: 4K até 8 GiB, 8K até 16 GiB, 16K até 32 GiB, 32K acima
+    cluster = 4096 if size <= 8 << 30 else 8192 if size <= 16 << 30 else 16384 if size <= 32 << 30 else 32768
+    cluster = max(cluster, sector_size)
+    align = max(erase_block, cluster) // sector_size
+    spc = cluster // sector_size
+
+    while True:
+        reserved = 32
+        for _ in range(4):
+            fat_sectors = -(-(total_sectors - reserved) // (sector_size // 4 * spc + 1))
+            data_start = _align_up(hidden_sectors + reserved + 2 * fat_sectors, align) - hidden_sectors
+            new_reserved = data_start - 2 * fat_sectors
+            if new_reserved == reserved:
+                break
+            reserved = new_reserved
+        clusters = (total_sectors - data_start) // spc
+        if clusters >= FAT32_MIN_CLUSTERS and fat_sectors * sector_size // 4 >= clusters + 2:
+            return spc, reserved, fat_sectors, clusters
+        if spc == 1:
+            raise ValueError("Volume pequeno demais para FAT32")
+        spc //= 2  # poucos clusters: reduz o cluster até caber no mínimo do FAT32
+
+
+def format_fat32(target, offset=0, size=None, label="USB_BOOT", hidden_sectors=None, erase_block=ERASE_BLOCK_SIZE,
+                 sector_size=SECTOR_SIZE):
+    """Cria um FAT32 em target (partição, ou disco/imagem a partir de offset bytes)
+
+    sector_size é o setor lógico do dispositivo (4096 em discos 4Kn): o Linux
+    não monta um sistema de arquivos com setor menor que o do disco.
+    """
+    fd, owned = _open_target(target)
+    try:
+        if size is None:
+            size = device_size(fd) - offset
+        total_sectors = size // sector_size
+        if total_sectors > 0xFFFFFFFF:
+            raise ValueError("FAT32 limitado a 2 TiB; use exFAT")
+        hidden_sectors = offset // sector_size if hidden_sectors is None else hidden_sectors
+        spc, reserved, fat_sectors, clusters = _fat32_geometry(total_sectors, hidden_sectors, erase_block, sector_size)
+        serial = struct.unpack("<I", os.urandom(4))[0]
+        volume_label = _fat_label(label)
+
+        boot = bytearray(sector_size)
+        struct.pack_into(
+            "<3s8sHBHBHHBHHHIIIHHIHH12sBBBI11s8s", boot, 0,
+            b"\xeb\x58\x90", b"MSWIN4.1", sector_size, spc, reserved, 2, 0, 0, 0xF8, 0,
+            63, 255, hidden_sectors, total_sectors, fat_sectors, 0, 0, 2, 1, 6, bytes(12),
+            0x80, 0, 0x29, serial, volume_label, b"FAT32   ",
+        )
+        boot[90:95] = b"\xcd\x18\xf4\xeb\xfd"  # não inicializável: INT 18h e para
+        boot[510:512] = b"\x55\xaa"
+
+        fsinfo = bytearray(sector_size)
+        struct.pack_into("<I", fsinfo, 0, 0x41615252)
+        struct.pack_into("<IIII", fsinfo, 484, 0x61417272, clusters - 1, 3, 0)
+        struct.pack_into("<I", fsinfo, 508, 0xAA550000)
+
+        # Entradas 0 e 1 reservadas; cluster 2 é o diretório raiz (fim de cadeia)
+        fat_head = struct.pack("<III", 0x0FFFFFF8, 0x0FFFFFFF, 0x0FFFFFFF)
+        root = bytearray(spc * sector_size)
+        root[:11] = volume_label
+        root[11] = 0x08  # atributo de rótulo de volume
+
+        data_offset = (reserved + 2 * fat_sectors) * sector_size
+        patches = [
+            (0, bytes(boot)), (sector_size, bytes(fsinfo)),
+            (6 * sector_size, bytes(boot)), (7 * sector_size, bytes(fsinfo)),
+            (reserved * sector_size, fat_head),
+            ((reserved + fat_sectors) * sector_size, fat_head),
+            (data_offset, bytes(root)),
+        ]
+        writes = _write_regions(fd, offset, data_offset + len(root), patches)
+        os.fsync(fd)
+        return {
+            "filesystem": "fat32", "cluster_size": spc * sector_size, "clusters": clusters,
+            "fat_sectors": fat_sectors, "reserved_sectors": reserved, "data_offset": data_offset,
+            "bytes_written": data_offset + len(root), "writes": writes, "serial": serial,
+        }
+    finally:
+        if owned:
+            os.close(fd)
+
+
+def _exfat_checksum(data, checksum=0, skip=()):
+    for index, byte in enumerate(data):
+        if index in skip:
+            continue
+        checksum = (((checksum & 1) << 31) | (checksum >> 1)) + byte
+        checksum &= 0xFFFFFFFF
+    return checksum
+
+
+@lru_cache(maxsize=1)
+def _exfat_upcase_table():
+    """Tabela de maiúsculas comprimida (0xFFFF + N = N caracteres idênticos)"""
+    table = array("H")
+    identical = 0
+    for code in range(0x10000):
+        upper = chr(code).upper() if not 0xD800 <= code <= 0xDFFF else chr(code)
+        mapped = ord(upper) if len(upper) == 1 and ord(upper) <= 0xFFFF else code
+        if mapped == code:
+            identical += 1
+            continue
+        if identical:
+            table.extend((0xFFFF, identical) if identical > 2 else (code - identical + i for i in range(identical)))
+            identical = 0
+        table.append(mapped)
+    if identical:
+        table.extend((0xFFFF, identical))
+    if sys.byteorder != "little":
+        table.byteswap()
+    data = table.tobytes()
+    return data, _exfat_checksum(data)
+
+
+def format_exfat(target, offset=0, size=None, label="USB_BOOT", hidden_sectors=None, erase_block=ERASE_BLOCK_SIZE,
+                 sector_size=SECTOR_SIZE):
+    """Cria um exFAT em target (pendrives grandes; arquivos acima de 4 GiB), com setores de sector_size bytes"""
+    fd, owned = _open_target(target)
+    try:
+        if size is None:
+            size = device_size(fd) - offset
+        total_sectors = size // sector_size
+        hidden_sectors = offset // sector_size if hidden_sectors is None else hidden_sectors
+        # Padrões da Microsoft: 4K até 256 MiB, 32K até 32 GiB, 128K acima
+        cluster = 4096 if size <= 256 << 20 else 32768 if size <= 32 << 30 else 131072
+        cluster = max(cluster, sector_size)
+        spc = cluster // sector_size
+        align = max(erase_block, cluster) // sector_size
+
+        fat_offset = _align_up(hidden_sectors + 24, align) - hidden_sectors
+        clusters = (total_sectors - fat_offset) // spc
+        fat_length = _align_up((clusters + 2) * 4, sector_size) // sector_size
+        heap_offset = _align_up(hidden_sectors + fat_offset + fat_length, align) - hidden_sectors
+        clusters = (total_sectors - heap_offset) // spc
+        if clusters < 16:
+            raise ValueError("Volume pequeno demais para exFAT")
+
+        upcase, upcase_checksum = _exfat_upcase_table()
+        bitmap_bytes = -(-clusters // 8)
+        layout = []  # (primeiro cluster, clusters) de bitmap, maiúsculas e raiz
+        next_cluster = 2
+        for length in (bitmap_bytes, len(upcase), cluster):
+            count = -(-length // cluster)
+            layout.append((next_cluster, count))
+            next_cluster += count
+        used = next_cluster - 2
+        serial = struct.unpack("<I", os.urandom(4))[0]
+
+        boot = bytearray(sector_size)
+        struct.pack_into(
+            "<3s8s53sQQIIIIIIHHBBBBB", boot, 0,
+            b"\xeb\x76\x90", b"EXFAT   ", bytes(53), hidden_sectors, total_sectors,
+            fat_offset, fat_length, heap_offset, clusters, layout[2][0], serial,
+            0x0100, 0, sector_size.bit_length() - 1, spc.bit_length() - 1, 1, 0x80, used * 100 // clusters,
+        )
+        boot[510:512] = b"\x55\xaa"
+        extended = bytearray(sector_size)
+        extended[-4:] = b"\x00\x00\x55\xaa"  # no fim de cada setor
+        region = bytes(boot) + bytes(extended) * 8 + bytes(2 * sector_size)
+        checksum = _exfat_checksum(region, skip=(106, 107, 112))
+        region += struct.pack("<I", checksum) * (sector_size // 4)
+
+        fat = array("I", [0xFFFFFFF8, 0xFFFFFFFF])
+        for first, count in layout:
+            fat.extend(range(first + 1, first + count))
+            fat.append(0xFFFFFFFF)
+        if sys.byteorder != "little":
+            fat.byteswap()
+
+        bitmap = bytearray(bitmap_bytes)
+        for index in range(used):
+            bitmap[index >> 3] |= 1 << (index & 7)
+
+        name = (label or "").upper()[:11]
+        root = bytearray(cluster)
+        struct.pack_into("<BB22s", root, 0, 0x83 if name else 0x03, len(name), name.encode("utf-16-le"))
+        struct.pack_into("<BB18sIQ", root, 32, 0x81, 0, bytes(18), layout[0][0], bitmap_bytes)
+        struct.pack_into("<B3sI12sIQ", root, 64, 0x82, bytes(3), upcase_checksum, bytes(12), layout[1][0], len(upcase))
+
+        def heap(cluster_number):
+            return (heap_offset + (cluster_number - 2) * spc) * sector_size
+
+        patches = [
+            (0, region), (12 * sector_size, region),
+            (fat_offset * sector_size, fat.tobytes()),
+            (heap(layout[0][0]), bytes(bitmap)),
+            (heap(layout[1][0]), upcase),
+            (heap(layout[2][0]), bytes(root)),
+        ]
+        length = heap(next_cluster)
+        writes = _write_regions(fd, offset, length, patches)
+        os.fsync(fd)
+        return {
+            "filesystem": "exfat", "cluster_size": cluster, "clusters": clusters,
+            "fat_sectors": fat_length, "reserved_sectors": fat_offset, "data_offset": heap_offset * sector_size,
+            "bytes_written": length, "writes": writes, "serial": serial,
+        }
+    finally:
+        if owned:
+            os.close(fd)
+
+
+FILESYSTEM_FORMATTERS = {"fat32": format_fat32, "exfat": format_exfat}
+
+# === AJUDANTE PRIVILEGIADO ===
+# Um único processo root por sessão (uma só elevação via sudo), acessado por
+# socket Unix com JSON por linha. Descritores de dispositivo vão por SCM_RIGHTS.
+# Ferramentas de disco: o cliente escolhe a ferramenta e opções tipadas, e o
+# ajudante monta o argv com o dispositivo já validado (nenhum argumento livre).
+DISK_TOOL_OPTIONS = {
+    "wipefs": (),
+    "zero": ("mib",),
+    "parted": ("action",),
+    "sfdisk": (),
+    "mkfs": ("fstype", "label"),
+    "partprobe": (),
+    "rereadpt": (),
+}
+PARTED_ACTIONS = {
+    "mklabel-msdos": ["mklabel", "msdos"],
+    "mkpart-fat32": ["mkpart", "primary", "fat32", "1MiB", "100%"],
+}
+FS_LABEL_PATTERN = re.compile(r"[A-Za-z0-9_ -]{0,11}")
+SFDISK_SCRIPT_MAX = 4096
+
+
+def disk_tool_argv(tool, device, **options):
+    """argv de uma ferramenta de disco; só o dispositivo e opções conhecidas entram na linha de comando"""
+    if tool not in DISK_TOOL_OPTIONS:
+        raise ValueError(f"Ferramenta desconhecida: {tool}")
+    unknown = set(options) - set(DISK_TOOL_OPTIONS[tool])
+    if unknown:
+        raise ValueError(f"Opções inválidas para {tool}: {', '.join(sorted(unknown))}")
+    if not isinstance(device, str) or not device.startswith("/dev/"):
+        raise ValueError(f"Dispositivo inválido: {device!r}")
+
+    if tool == "wipefs":
+        return ["wipefs", "--all", "--force", device]
+    if tool == "zero":
+        mib = options.get("mib", 10)
+        if not isinstance(mib, int) or isinstance(mib, bool) or not 1 <= mib <= 64:
+            raise ValueError(f"Tamanho inválido para zerar: {mib!r} MiB")
+        return ["dd", "if=/dev/zero", f"of={device}", "bs=1M", f"count={mib}", "conv=fsync"]
+    if tool == "parted":
+        action = options.get("action")
+        if action not in PARTED_ACTIONS:
+            raise ValueError(f"Ação do parted inválida: {action!r}")
+        return ["parted", "-s", device, *PARTED_ACTIONS[action]]
+    if tool == "sfdisk":
+        return ["sfdisk", device]  # o script vai pelo stdin (check_sfdisk_script)
+    if tool == "mkfs":
+        fstype = options.get("fstype", "vfat")
+        label = options.get("label")
+        if label is not None and (not isinstance(label, str) or not FS_LABEL_PATTERN.fullmatch(label)):
+            raise ValueError(f"Rótulo inválido: {label!r}")
+        if fstype == "vfat":
+            return ["mkfs.vfat", "-F", "32", *(["-n", label] if label else []), device]
+        if fstype == "exfat":
+            return ["mkfs.exfat", *(["-L", label] if label else []), device]
+        raise ValueError(f"Sistema de arquivos inválido: {fstype!r}")
+    if tool == "partprobe":
+        return ["partprobe", device]
+    return ["blockdev", "--rereadpt", device]
+
+
+def check_sfdisk_script(script):
+    """Script do sfdisk (stdin): texto curto e imprimível, sem bytes de controle"""
+    if not isinstance(script, str) or len(script) > SFDISK_SCRIPT_MAX:
+        raise ValueError("Script do sfdisk inválido")
+    if any(not (char.isprintable() or char in "\n\t") for char in script):
+        raise ValueError("Script do sfdisk com caracteres de controle")
+    return script
+
+
+def _parent_disk(name, sys_root="/sys"):
+    """sdb1 -> sdb, nvme0n1p1 -> nvme0n1; discos inteiros voltam como estão"""
+    entry = os.path.join(sys_root, "class", "block", name)
+    if os.path.exists(os.path.join(entry, "partition")):
+        return os.path.basename(os.path.dirname(os.path.realpath(entry)))
+    return name
+
+
+def same_disk(path, device, sys_root="/sys"):
+    """Se path (disco, partição ou link em /dev/disk) fica no disco device; /dev/sdba não é /dev/sdb"""
+    if not path.startswith("/dev/"):
+        return False
+    disks = {_parent_disk(os.path.basename(os.path.realpath(node)), sys_root) for node in (path, device)}
+    return len(disks) == 1
+
+
+class PrivilegedHelperServer:
+    """Lado root: valida cada pedido e só mexe em discos removíveis que não são do sistema"""
+
+    def __init__(self, socket_path, allowed_uid, sys_root="/sys"):
+        self.socket_path = socket_path
+        self.allowed_uid = allowed_uid
+        self.sys_root = sys_root
+        self.running = True
+
+    def serve(self):
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        os.chown(self.socket_path, self.allowed_uid, -1)
+        os.chmod(self.socket_path, 0o600)
+        listener.listen(1)
+        try:
+            # Uma sessão: quando o aplicativo desconecta, o ajudante termina
+            conn, _ = listener.accept()
+            pid, uid, gid = struct.unpack("3i", conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, 12))
+            if uid not in (self.allowed_uid, 0):
+                conn.close()
+                return
+            with conn:
+                self._handle(conn)
+        finally:
+            listener.close()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+
+    def _handle(self, conn):
+        reader = conn.makefile("rb")
+        for line in reader:
+            fds = []
+            request = None
+            try:
+                request = json.loads(line)
+                method = getattr(self, f"rpc_{request['method']}", None)
+                if method is None:
+                    raise ValueError(f"Método desconhecido: {request['method']}")
+                result = method(**request.get("params", {}))
+                if isinstance(result, tuple):  # (resultado, fd a enviar)
+                    result, fd = result
+                    fds.append(fd)
+                reply = {"id": request.get("id"), "result": result}
+            except Exception as e:
+                reply = {"id": request.get("id") if isinstance(request, dict) else None,
+                         "error": f"{type(e).__name__}: {e}"}
+            data = (json.dumps(reply) + "\n").encode("utf-8")
+            try:
+                if fds:
+                    socket.send_fds(conn, [data], fds)
                 else:
-                    result = subprocess.run(cmd, capture_output=True, text=True)
-                    success = result.returncode == 0
-                
-                if success:
-                    self.log(f"✅ Comando {' '.join(cmd)} executado com sucesso")
-            
-            # Pequena pausa
-            time.sleep(3)
-            
-            # Agora usa o método detalhado
-            return self.unmount_all_partitions(device)
-            
-        except Exception as e:
-            self.log(f"⚠️ Erro na desmontagem forçada: {e}")
+                    conn.sendall(data)
+            finally:
+                for fd in fds:
+                    os.close(fd)
+            if not self.running:
+                break
+
+    def _check_device(self, path):
+        """Aceita apenas nós de bloco de pendrives/cartões que não hospedam o sistema"""
+        real = os.path.realpath(path)
+        if not real.startswith("/dev/") or not stat.S_ISBLK(os.stat(real).st_mode):
+            raise PermissionError(f"{path} não é um dispositivo de bloco")
+        self._check_disk(_parent_disk(os.path.basename(real), self.sys_root))
+        return real
+
+    def _check_disk(self, disk):
+        """Mesma regra da lista de dispositivos (is_usb_target): nada de discos internos, loop ou dm"""
+        if disk.startswith(("dm-", "loop")):
+            raise PermissionError(f"{disk} é um dispositivo virtual")
+        records = enumerate_block_devices(self.sys_root, names=[disk], include_virtual=True)
+        if not records or records[0]["system"]:
+            raise PermissionError(f"{disk} pertence a um disco do sistema")
+        if not is_usb_target(records[0]):
+            raise PermissionError(f"{disk} não é um pendrive ou cartão gravável")
+
+    def _holds_allowed_device(self, pid):
+        """O processo tem aberto algum disco permitido (pendrive, não o sistema)?"""
+        fd_dir = f"/proc/{pid}/fd"
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
             return False
+        for fd in fds:
+            try:
+                target = os.readlink(os.path.join(fd_dir, fd))
+                if target.startswith("/dev/"):
+                    self._check_device(target)
+                    return True
+            except (OSError, PermissionError):
+                continue
+        return False
 
-    def verify_usb_device(self, device):
-        """Verifica se o dispositivo USB está pronto para formatação"""
+    def rpc_ping(self):
+        return {"pid": os.getpid(), "uid": os.geteuid()}
+
+    def rpc_open_device(self, path, write=True):
+        flags = (os.O_RDWR if write else os.O_RDONLY) | os.O_CLOEXEC
+        return {"path": path}, os.open(self._check_device(path), flags)
+
+    def rpc_unmount(self, device, lazy=False, timeout=5.0):
+        return unmount_device(self._check_device(device), lazy, timeout)
+
+    def rpc_rescan(self, device):
+        fd = os.open(self._check_device(device), os.O_RDONLY | os.O_CLOEXEC)
         try:
-            self.log(f"🔍 Verificando dispositivo {device}...")
-            
-            # Verifica se o dispositivo existe
-            if not os.path.exists(device):
-                self.log(f"❌ Dispositivo {device} não encontrado")
-                return False
-            
-            # Verifica tamanho do dispositivo
-            if os.geteuid() != 0 and self.sudo_password:
-                success, stdout, stderr = self.run_sudo_command(['blockdev', '--getsize64', device])
-            else:
-                result = subprocess.run(['blockdev', '--getsize64', device], 
-                                      capture_output=True, text=True)
-                success = result.returncode == 0
-                stdout = result.stdout
-            
-            if success:
-                size_bytes = int(stdout.strip())
-                size_gb = size_bytes / (1024**3)
-                self.log(f"✅ Dispositivo encontrado: {size_gb:.1f} GB")
-            else:
-                self.log("⚠️ Não foi possível verificar o tamanho do dispositivo")
-            
-            # Verifica partições
-            if os.geteuid() != 0 and self.sudo_password:
-                success, stdout, stderr = self.run_sudo_command(['lsblk', '-n', '-o', 'NAME,SIZE,TYPE', device])
-            else:
-                result = subprocess.run(['lsblk', '-n', '-o', 'NAME,SIZE,TYPE', device], 
-                                      capture_output=True, text=True)
-                success = result.returncode == 0
-                stdout = result.stdout
-            
-            if success:
-                self.log("📋 Estrutura atual do dispositivo:")
-                for line in stdout.strip().split('\n'):
-                    if line:
-                        self.log(f"   {line}")
-            
-            return True
-            
-        except Exception as e:
-            self.log(f"⚠️ Erro na verificação do dispositivo: {e}")
-            return False
+            return reread_partition_table(fd)
+        finally:
+            os.close(fd)
 
-    def check_usb_health(self, device):
-        """Verifica a saúde do dispositivo USB"""
+    def rpc_write_range(self, device, offset, data):
+        payload = base64.b64decode(data)
+        fd = os.open(self._check_device(device), os.O_WRONLY | os.O_CLOEXEC)
         try:
-            self.log(f"🔍 Verificando saúde do dispositivo {device}...")
-            
-            needs_sudo = os.geteuid() != 0
-            
-            # Verifica se o dispositivo é removível
-            if needs_sudo:
-                success, stdout, stderr = self.run_sudo_command(['lsblk', '-d', '-o', 'NAME,RM', device])
+            written = os.pwrite(fd, payload, offset)
+            os.fsync(fd)
+            return written
+        finally:
+            os.close(fd)
+
+    def rpc_discard(self, device):
+        return discard_device(self._check_device(device))
+
+    def _run_tool(self, tool, device, input=None, **options):
+        argv = disk_tool_argv(tool, self._check_device(device), **options)
+        result = subprocess.run(argv, input=input, capture_output=True, text=True, timeout=600)
+        return {"returncode": result.returncode, "stdout": result.stdout, "stderr": result.stderr}
+
+    def rpc_wipefs(self, device):
+        return self._run_tool("wipefs", device)
+
+    def rpc_zero(self, device, mib=10):
+        return self._run_tool("zero", device, mib=mib)
+
+    def rpc_parted(self, device, action):
+        return self._run_tool("parted", device, action=action)
+
+    def rpc_sfdisk(self, device, script):
+        return self._run_tool("sfdisk", device, input=check_sfdisk_script(script))
+
+    def rpc_mkfs(self, device, fstype="vfat", label=None):
+        return self._run_tool("mkfs", device, fstype=fstype, label=label)
+
+    def rpc_partprobe(self, device):
+        return self._run_tool("partprobe", device)
+
+    def rpc_rereadpt(self, device):
+        return self._run_tool("rereadpt", device)
+
+    def rpc_kill(self, pid):
+        """SIGKILL só em processos que seguram um pendrive permitido (nunca grupos, init ou o próprio ajudante)"""
+        if not isinstance(pid, int) or isinstance(pid, bool) or pid <= 1 or pid == os.getpid():
+            raise PermissionError(f"PID inválido: {pid!r}")
+        if not self._holds_allowed_device(pid):
+            raise PermissionError(f"PID {pid} não usa um dispositivo permitido")
+        os.kill(pid, signal.SIGKILL)
+        return True
+
+    def rpc_shutdown(self):
+        self.running = False
+        return True
+
+
+def run_privileged_helper(socket_path):
+    """Ponto de entrada do ajudante (executado como root via sudo)"""
+    allowed_uid = int(os.environ.get("SUDO_UID", os.getuid()))
+    PrivilegedHelperServer(socket_path, allowed_uid).serve()
+
+
+class PrivilegedHelperClient:
+    """Lado do aplicativo: inicia o ajudante uma vez e faz chamadas RPC (thread-safe)"""
+
+    def __init__(self, script_path=None):
+        self.script_path = script_path or os.path.abspath(__file__)
+        self.process = None
+        self.sock = None
+        self.lock = threading.Lock()
+        self.buffer = b""
+        self.next_id = 0
+        self.socket_dir = None
+
+    @property
+    def alive(self):
+        return self.sock is not None and self.process is not None and self.process.poll() is None
+
+    def start(self, password, timeout=20.0):
+        """Eleva uma única vez: a senha vai pelo stdin do sudo, nunca por linha de comando"""
+        self.socket_dir = tempfile.mkdtemp(prefix="usb-creator-")
+        socket_path = os.path.join(self.socket_dir, "helper.sock")
+        self.process = subprocess.Popen(
+            ["sudo", "-S", "-p", "", sys.executable, self.script_path, "--privileged-helper", socket_path],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+        try:
+            self.process.stdin.write(((password or "") + "\n").encode("utf-8"))
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+
+        def connect():
+            if self.process.poll() is not None:
+                return True  # sudo saiu: senha errada ou sem permissão
+            if not os.path.exists(socket_path):
+                return False
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(socket_path)
+            except OSError:
+                sock.close()
+                return False
+            self.sock = sock
+            return True
+
+        poll_until(connect, timeout, interval=0.005, max_interval=0.1)
+        if self.sock is None:
+            error = ""
+            if self.process.poll() is None:
+                self.process.kill()
             else:
-                result = subprocess.run(['lsblk', '-d', '-o', 'NAME,RM', device], capture_output=True, text=True)
-                success = result.returncode == 0
-                stdout = result.stdout
-            
-            if success and '1' not in stdout:
-                self.log("⚠️ Aviso: Dispositivo pode não ser removível")
-            
-            # Verifica tamanho
-            if needs_sudo:
-                success, stdout, stderr = self.run_sudo_command(['blockdev', '--getsize64', device])
+                error = self.process.stderr.read().decode("utf-8", "replace").strip()
+            self.close()
+            raise PermissionError(error or "O ajudante privilegiado não respondeu")
+        return self.call("ping")
+
+    def _read_reply(self):
+        fds = []
+        while b"\n" not in self.buffer:
+            data, received, _, _ = socket.recv_fds(self.sock, 1 << 16, 4)
+            fds.extend(received)
+            if not data:
+                raise ConnectionError("Ajudante privilegiado encerrou a conexão")
+            self.buffer += data
+        line, self.buffer = self.buffer.split(b"\n", 1)
+        return json.loads(line), fds
+
+    def call(self, method, **params):
+        return self._call(method, params)[0]
+
+    def _call(self, method, params):
+        with self.lock:
+            if self.sock is None:
+                raise ConnectionError("Ajudante privilegiado não iniciado")
+            self.next_id += 1
+            request = {"id": self.next_id, "method": method, "params": params}
+            self.sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            reply, fds = self._read_reply()
+        if "error" in reply:
+            for fd in fds:
+                os.close(fd)
+            raise RuntimeError(reply["error"])
+        return reply["result"], fds
+
+    def open_device(self, path, write=True):
+        """Descritor do dispositivo aberto pelo root; a cópia roda no próprio processo"""
+        _, fds = self._call("open_device", {"path": path, "write": write})
+        if not fds:
+            raise RuntimeError("Ajudante não enviou o descritor")
+        return fds[0]
+
+    def run_tool(self, tool, device, input_text=None, **options):
+        """Ferramenta de disco como root (argv montado e validado pelo ajudante)"""
+        params = dict(options, device=device)
+        if tool == "sfdisk":
+            params["script"] = input_text
+        result = self.call(tool, **params)
+        return result["returncode"] == 0, result["stdout"], result["stderr"]
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.call("shutdown")
+            except (OSError, RuntimeError, ValueError):
+                pass
+            self.sock.close()
+            self.sock = None
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.socket_dir:
+            shutil.rmtree(self.socket_dir, ignore_errors=True)
+            self.socket_dir = None
+
+# === PROVEDORES DE VERSÕES ===
+VERSION_PROVIDERS = {}
+
+
+def register_version_provider(distro_name):
+    """Decorator que registra um provedor de versões para uma distribuição"""
+    def decorator(cls):
+        cls.distro_name = distro_name
+        VERSION_PROVIDERS[distro_name] = cls
+        return cls
+    return decorator
+
+
+def version_sort_key(version):
+    """Ordena versões numericamente ('9.10' < '10.0'); rótulos sem número vão para o fim"""
+    return tuple(int(part) for part in re.findall(r"\d+", version))
+
+
+class VersionProvider:
+    """Provedor que extrai versões das páginas de índice de releases de uma distribuição
+
+    Subclasses definem base_url, os caminhos das páginas de índice e a expressão
+    regular que captura a versão. base_url pode ser trocado na construção para
+    apontar para um espelho ou para fixtures HTML locais.
+
+    fetch(deadline) respeita um prazo absoluto (time.monotonic) somando todas
+    as páginas: cada requisição usa só o tempo que resta, e a leitura do corpo
+    é interrompida quando ele acaba, mesmo que o servidor continue mandando
+    bytes aos poucos.
+    """
+
+    distro_name = None
+    base_url = ""
+    index_paths = ("",)
+    pattern = None
+    limit = 5
+    timeout = 8.0
+
+    def __init__(self, base_url=None, timeout=None):
+        if base_url:
+            self.base_url = base_url if base_url.endswith("/") else base_url + "/"
+        if timeout is not None:
+            self.timeout = timeout
+        self._regex = re.compile(self.pattern)
+
+    @staticmethod
+    def _remaining(deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("prazo esgotado")
+        return remaining
+
+    def fetch_index(self, path, deadline=None):
+        import requests  # carregado só quando há rede a acessar
+        deadline = time.monotonic() + self.timeout if deadline is None else deadline
+        url = urljoin(self.base_url, path)
+        with requests.get(url, timeout=min(self.timeout, self._remaining(deadline)), stream=True) as response:
+            response.raise_for_status()
+            body = bytearray()
+            # read1 devolve o que já chegou (iter_content esperaria o bloco inteiro)
+            for chunk in iter(lambda: response.raw.read1(64 * 1024, decode_content=True), b""):
+                self._remaining(deadline)
+                body.extend(chunk)
+            return body.decode(response.encoding or "utf-8", "replace")
+
+    def parse(self, html):
+        """Extrai as versões de uma página de índice"""
+        return [match.group(1) for match in self._regex.finditer(html)]
+
+    def select(self, versions):
+        """Ordena (mais nova primeiro) e limita as versões encontradas"""
+        unique = sorted(set(versions), key=version_sort_key, reverse=True)
+        return unique[:self.limit]
+
+    def label(self, version):
+        return version
+
+    def fetch(self, deadline=None):
+        deadline = time.monotonic() + self.timeout if deadline is None else deadline
+        found = []
+        for path in self.index_paths:
+            found.extend(self.parse(self.fetch_index(path, deadline)))
+        versions = [self.label(version) for version in self.select(found)]
+        if not versions:
+            raise ValueError("nenhuma versão encontrada no índice")
+        return versions
+
+
+@register_version_provider("Ubuntu")
+class UbuntuVersionProvider(VersionProvider):
+    base_url = "https://releases.ubuntu.com/"
+    pattern = r'href="(\d{2}\.\d{2})/"'
+
+    def label(self, version):
+        year, month = version.split(".")
+        return f"{version} LTS" if month == "04" and int(year) % 2 == 0 else version
+
+
+@register_version_provider("Debian")
+class DebianVersionProvider(VersionProvider):
+    base_url = "https://cdimage.debian.org/"
+    index_paths = ("debian-cd/", "cdimage/archive/")
+    pattern = r'href="(\d+\.\d+\.\d+)/"'
+    limit = 3
+
+    def select(self, versions):
+        # Apenas o último ponto de cada versão principal (12.x.y, 11.x.y, ...)
+        latest = {}
+        for version in sorted(set(versions), key=version_sort_key):
+            latest[version.split(".")[0]] = version
+        return sorted(latest.values(), key=version_sort_key, reverse=True)[:self.limit]
+
+
+@register_version_provider("Linux Mint")
+class LinuxMintVersionProvider(VersionProvider):
+    base_url = "https://mirrors.edge.kernel.org/linuxmint/stable/"
+    pattern = r'href="(\d+(?:\.\d+)?)/"'
+
+
+@register_version_provider("Fedora")
+class FedoraVersionProvider(VersionProvider):
+    base_url = "https://dl.fedoraproject.org/pub/fedora/linux/releases/"
+    pattern = r'href="(\d+)/"'
+
+
+@register_version_provider("Manjaro")
+class ManjaroVersionProvider(VersionProvider):
+    base_url = "https://download.manjaro.org/"
+    index_paths = ("xfce/",)
+    pattern = r'href="(?:[^"]*/)?(\d+\.\d+(?:\.\d+)?)/"'
+
+
+@register_version_provider("openSUSE")
+class OpenSUSEVersionProvider(VersionProvider):
+    base_url = "https://download.opensuse.org/distribution/leap/"
+    pattern = r'href="(?:\./)?(\d+\.\d+)/"'
+
+
+@register_version_provider("MX Linux")
+class MXLinuxVersionProvider(VersionProvider):
+    base_url = "https://mirrors.evowise.com/mxlinux-iso/MX/Final/"
+    index_paths = ("Xfce/",)
+    pattern = r'href="[^"]*MX-(\d+(?:\.\d+)*)_'
+
+
+@register_version_provider("antiX")
+class AntiXVersionProvider(VersionProvider):
+    base_url = "https://mirrors.evowise.com/mxlinux-iso/ANTIX/Final/"
+    pattern = r'href="[^"]*antiX-(\d+(?:\.\d+)*)/"'
+
+
+@register_version_provider("Puppy Linux")
+class PuppyLinuxVersionProvider(VersionProvider):
+    base_url = "https://distro.ibiblio.org/puppylinux/"
+    index_paths = ("puppy-fossa/",)
+    pattern = r'href="[^"]*fossapup64-(\d+(?:\.\d+)*)\.iso"'
+
+
+@register_version_provider("Kali Linux")
+class KaliLinuxVersionProvider(VersionProvider):
+    base_url = "https://cdimage.kali.org/"
+    pattern = r'href="kali-(\d{4}\.\d+)/"'
+    limit = 4
+
+    def fetch(self, deadline=None):
+        # O build semanal existe sempre e não aparece como diretório versionado
+        return ["weekly"] + super().fetch(deadline)
+
+
+class VersionResolver:
+    """Executa os provedores de versões em paralelo, com timeout e cache em disco
+
+    Cada busca roda no pool de threads com um prazo (início + timeout do
+    provedor) que o próprio provedor respeita: a thread é liberada no prazo e
+    uma busca que ainda nem começou é cancelada. Um espelho lento só atrasa a
+    própria família. Resultados bons vão para o cache em disco, que também
+    serve de reserva quando a busca falha.
+    """
+
+    def __init__(self, cache_path, ttl=6 * 3600, base_urls=None, timeout=None,
+                 max_workers=8, log=print):
+        self.cache_path = Path(cache_path)
+        self.ttl = ttl
+        self.log = log
+        self.providers = {
+            name: cls(base_url=(base_urls or {}).get(name), timeout=timeout)
+            for name, cls in VERSION_PROVIDERS.items()
+        }
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="versions")
+        self._lock = threading.Lock()
+        self._cache = self._load_cache()
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+            return cache if isinstance(cache, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self):
+        content = json.dumps(self._cache, indent=2, ensure_ascii=False).encode("utf-8")
+        try:
+            atomic_write_bytes(self.cache_path, content)
+        except OSError as e:
+            self.log(f"⚠️ Não foi possível gravar o cache de versões: {e}")
+
+    def has_provider(self, name):
+        return name in self.providers
+
+    def cached(self, name, fresh_only=True):
+        entry = self._cache.get(name)
+        if not entry or not entry.get("versions"):
+            return None
+        if fresh_only and time.time() - entry.get("timestamp", 0) >= self.ttl:
+            return None
+        return list(entry["versions"])
+
+    def fetch_many(self, names, force=False):
+        """Resolve várias famílias em paralelo; retorna {nome: versões ou None}
+
+        None indica falha sem cache disponível (o chamador aplica o fallback).
+        """
+        results = {}
+        futures = {}
+        started = time.monotonic()
+        for name in names:
+            provider = self.providers.get(name)
+            if provider is None:
+                results[name] = None
+                continue
+            cached = None if force else self.cached(name)
+            if cached:
+                results[name] = cached
+                continue
+            deadline = started + provider.timeout
+            futures[name] = (deadline, self._executor.submit(provider.fetch, deadline))
+
+        updated = False
+        for name, (deadline, future) in futures.items():
+            try:
+                versions = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except (FutureTimeoutError, TimeoutError):
+                future.cancel()  # ainda na fila: nem chega a rodar
+                self.log(f"⏱️ Tempo esgotado ao buscar versões de {name}")
+                versions = None
+            except Exception as e:
+                self.log(f"⚠️ Erro ao buscar versões de {name}: {e}")
+                versions = None
+
+            if versions:
+                with self._lock:
+                    self._cache[name] = {"timestamp": time.time(), "versions": versions}
+                updated = True
             else:
-                result = subprocess.run(['blockdev', '--getsize64', device], capture_output=True, text=True)
-                success = result.returncode == 0
-                stdout = result.stdout
-            
-            if success:
-                size = int(stdout.strip())
-                if size < 100 * 1024 * 1024:  # Menos de 100MB
-                    self.log("❌ Dispositivo muito pequeno para ISO")
-                    return False
-            
-            self.log("✅ Dispositivo parece estar em bom estado")
-            return True
-            
-        except Exception as e:
-            self.log(f"⚠️ Erro na verificação de saúde: {e}")
-            return True  # Continua mesmo com erro
+                # Versões antigas do cache valem mais que a lista fixa
+                versions = self.cached(name, fresh_only=False)
+            results[name] = versions
+
+        if updated:
+            with self._lock:
+                self._save_cache()
+        return results
+
+    def fetch(self, name, force=False):
+        return self.fetch_many([name], force=force)[name]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# === LOG ===
+LOG_LEVELS = {"DEBUG": logging.DEBUG, "INFO": logging.INFO, "WARNING": logging.WARNING, "ERROR": logging.ERROR}
+LOG_HISTORY_LINES = 10000  # histórico em memória (anel)
+LOG_WIDGET_MAX_LINES = 2000  # o widget descarta as linhas mais antigas acima disso
+LOG_FILE_MAX_BYTES = 2 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+
+
+def infer_log_level(message):
+    """Nível pelo emoji inicial: ❌ é erro, ⚠️ é aviso, o resto é informação"""
+    text = message.lstrip()
+    if text.startswith("❌"):
+        return logging.ERROR
+    if text.startswith("⚠️"):
+        return logging.WARNING
+    return logging.INFO
+
+
+class LogFileSink:
+    """Grava o log num arquivo rotativo, em lotes, numa thread própria"""
+
+    def __init__(self, path, max_bytes=LOG_FILE_MAX_BYTES, backups=LOG_FILE_BACKUPS, batch_size=4096):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.batch_size = batch_size
+        self.queue = queue.SimpleQueue()  # (timestamp, nível, mensagem); None encerra
+        self._thread = None
+
+    def write(self, level, message):
+        """Enfileira a linha; quem registra nunca espera pelo disco"""
+        self.queue.put((time.time(), level, message))
+
+    def start(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Grava o que ainda está na fila e encerra a thread"""
+        if self._thread is None:
+            return
+        self.queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
 
-    def check_active_dd_processes(self, device=None):
-        """Verifica se já existem processos dd ativos no sistema - VERSÃO MELHORADA"""
+    def _run(self):
+        stream = open(self.path, "a", encoding="utf-8")
         try:
-            self.log("🔍 Verificando processos dd ativos...")
-            
-            # Comando para listar todos os processos dd
-            cmd = ["ps", "aux"]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-            
-            active_processes = []
-            dangerous_processes = []
-            current_pid = os.getpid()  # ✅ Pega o PID do processo atual
-            
-            for line in result.stdout.split('\n'):
-                if 'dd' in line and 'of=' in line and not 'grep' in line:
-                    parts = line.split()
-                    if len(parts) > 1 and parts[1].isdigit():
-                        pid = parts[1]
-                        
-                        # ✅ IGNORA processos do próprio script
-                        if int(pid) == current_pid or int(pid) == os.getppid():
-                            continue
-                        
-                        command = ' '.join(parts[10:])
-                        
-                        # Extrai o dispositivo alvo
-                        device_match = None
-                        if 'of=' in command:
-                            import re
-                            match = re.search(r'of=([^\s\']+)', command)
-                            if match:
-                                device_match = match.group(1)
-                        
-                        process_info = {
-                            'pid': pid,
-                            'command': command[:100],
-                            'device': device_match
-                        }
-                        active_processes.append(process_info)
-                        
-                        # Verifica se é perigoso (gravando no mesmo dispositivo)
-                        if device and device_match and device in device_match:
-                            dangerous_processes.append(process_info)
-            
-            if active_processes:
-                self.log(f"⚠️  {len(active_processes)} processo(s) dd de OUTROS programas:")
-                for proc in active_processes:
-                    device_info = f" -> {proc['device']}" if proc['device'] else ""
-                    self.log(f"   🚫 PID {proc['pid']}{device_info}")
+            while True:
+                batch = [self.queue.get()]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stopping = None in batch
+                text = "".join(
+                    f"{self._timestamp(int(stamp))} {logging.getLevelName(level):<7} {message}\n"
+                    for stamp, level, message in filter(None, batch)
+                )
+                if self.max_bytes and stream.tell() + len(text) > self.max_bytes and stream.tell():
+                    stream.close()
+                    self._rotate()
+                    stream = open(self.path, "a", encoding="utf-8")
+                stream.write(text)
+                stream.flush()  # um flush por lote, não por linha
+                if stopping:
+                    return
+        finally:
+            stream.close()
+
+    @staticmethod
+    @lru_cache(maxsize=4)
+    def _timestamp(second):
+        # Um strftime por segundo, não por linha
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+
+    def _rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{index}")
+            if older.exists():
+                os.replace(older, self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backups:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+
+# === BARRAMENTO DE EVENTOS ===
+UI_FRAME_INTERVAL_MS = 50  # a thread do Tk aplica os eventos a 20 Hz
+
+
+class EventBus:
+    """Leva eventos das threads de trabalho para a thread do Tk, coalescendo o progresso"""
+
+    def __init__(self):
+        # deque.append/popleft são atômicos: os produtores nunca esperam por lock
+        self._events = collections.deque()
+
+    def publish(self, kind, *args):
+        self._events.append((time.perf_counter(), kind, args))
+
+    def progress(self, job, percent, text=None):
+        self.publish("progress", job, percent, text)
+
+    def call(self, func, *args, **kwargs):
+        """Agenda func na thread do Tk; o Future recebe o retorno"""
+        future = Future()
+        self.publish("call", future, func, args, kwargs)
+        return future
+
+    def pending(self):
+        return len(self._events)
+
+    def drain(self):
+        """Retira tudo o que está na fila: (eventos em ordem, último progresso de cada tarefa)"""
+        events, progress = [], {}
+        popleft = self._events.popleft
+        while True:
+            try:
+                stamp, kind, args = popleft()
+            except IndexError:
+                return events, progress
+            if kind == "progress":
+                progress[args[0]] = (stamp, args[1:])
             else:
-                self.log("✅ Nenhum processo dd externo encontrado")
-            
-            if dangerous_processes:
-                self.log(f"❌ {len(dangerous_processes)} processo(s) PERIGOSO(S) detectado(s):")
-                for proc in dangerous_processes:
-                    self.log(f"   💥 PID {proc['pid']} gravando em {device}")
-                return True, dangerous_processes
-            
-            return False, []
-            
-        except subprocess.TimeoutExpired:
-            self.log("❌ Timeout na verificação de processos")
-            return False, []
-        except Exception as e:
-            self.log(f"⚠️ Erro ao verificar processos: {e}")
-            return False, []
+                events.append((stamp, kind, args))
 
-    def kill_conflicting_dd_processes(self, device=None):
-        """Mata processos dd que possam estar conflitando - VERSÃO CORRIGIDA"""
+    @staticmethod
+    def run_call(future, func, args, kwargs):
+        if not future.set_running_or_notify_cancel():
+            return
         try:
-            self.log("🛑 Verificando e parando processos dd conflitantes...")
-            
-            has_dangerous, dangerous_processes = self.check_active_dd_processes(device)
-            
-            if not has_dangerous:
-                self.log("✅ Nenhum processo dd perigoso encontrado")
-                return True
-            
-            # Mata os processos perigosos
-            killed_count = 0
-            for proc in dangerous_processes:
+            future.set_result(func(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+# === API DE CONTROLE (SOCKET UNIX) ===
+CONTROL_API_VERSION = 1
+CONTROL_EVENT_INTERVAL = 0.25  # eventos de progresso aos inscritos a 4 Hz, só o que mudou
+CONTROL_TOPICS = ("jobs", "log", "slots", "devices")
+
+
+class ControlAPIServer:
+    """API local para orquestração: JSON por linha num socket Unix, sobre o mesmo núcleo da GUI
+
+    Pedido {"id": 1, "method": "jobs.submit", "params": {...}}; resposta
+    {"id": 1, "result": ...} ou {"id": 1, "error": "..."}. Vários pedidos podem
+    seguir pela mesma conexão sem esperar as respostas (pipelining): cada um
+    roda num pool de threads e a resposta sai assim que fica pronta, com o id
+    do pedido. Depois de "subscribe", a conexão também recebe eventos sem id
+    ({"event": "job", ...}), então o cliente não precisa consultar o
+    progresso. "jobs.wait" não ocupa o pool: a espera fica registrada e o laço
+    de eventos responde quando o job termina (ou o timeout vence). Só aceita
+    conexões do próprio usuário (SO_PEERCRED).
+    """
+
+    def __init__(self, core, socket_path, max_workers=32, event_interval=CONTROL_EVENT_INTERVAL):
+        self.core = core
+        self.socket_path = str(socket_path)
+        self.event_interval = event_interval
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="control-api")
+        self.listener = None
+        self.clients = {}  # id(cliente) -> estado da conexão
+        self.lock = threading.Lock()
+        self._privilege_lock = threading.Lock()  # uma única pergunta de senha por vez
+        self._fetches = {}  # nome do arquivo -> Future do download em andamento
+        self._stop = threading.Event()
+        self._monitor = None
+        self._job_marks = {}  # id -> (estado, bytes) do último evento enviado
+        self._slot_marks = {}
+        self._waiters = []  # jobs.wait pendentes: conexão, id do pedido, job e prazo
+        self._log_seq = 0
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.socket_path) or ".", exist_ok=True)
+        try:
+            os.unlink(self.socket_path)  # socket órfão de uma execução anterior
+        except FileNotFoundError:
+            pass
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        self.listener.listen(16)
+        self._log_seq = max((entry[0] for entry in list(self.core.log_history)), default=0)
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        threading.Thread(target=self._events_loop, daemon=True).start()
+        return self.socket_path
+
+    def stop(self):
+        self._stop.set()
+        if self._monitor is not None:
+            self._monitor.stop()
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+        with self.lock:
+            clients = list(self.clients.values())
+        for client in clients:
+            self._drop(client)
+        self.executor.shutdown(wait=False)
+
+    # --- Conexões ---
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            _, uid, _ = struct.unpack("3i", conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, 12))
+            if uid not in (os.getuid(), 0):
+                conn.close()
+                continue
+            client = {"conn": conn, "outbox": queue.SimpleQueue(), "topics": set(), "log_level": logging.INFO,
+                      "full": False, "alive": True}
+            with self.lock:
+                self.clients[id(client)] = client
+            threading.Thread(target=self._writer, args=(client,), daemon=True).start()
+            threading.Thread(target=self._reader, args=(client,), daemon=True).start()
+
+    def _reader(self, client):
+        """Lê os pedidos em sequência e despacha cada um sem esperar os anteriores"""
+        try:
+            for line in client["conn"].makefile("rb"):
+                if not line.strip():
+                    continue
                 try:
-                    self.log(f"   🔫 Matando processo PID {proc['pid']}...")
-                    
-                    # ✅ CORREÇÃO: Usa run_sudo_command com timeout
-                    if os.geteuid() != 0 and self.sudo_password:
-                        success, stdout, stderr = self.run_sudo_command(['kill', '-9', proc['pid']])
-                    else:
-                        result = subprocess.run(['kill', '-9', proc['pid']], 
-                                              capture_output=True, text=True, timeout=5)
-                        success = result.returncode == 0
-                    
-                    if success:
-                        killed_count += 1
-                        self.log(f"   ✅ Processo {proc['pid']} eliminado")
-                    else:
-                        self.log(f"   ⚠️ Não foi possível eliminar PID {proc['pid']}")
-                        
-                    time.sleep(1)
-                except Exception as e:
-                    self.log(f"   ⚠️ Erro ao matar PID {proc['pid']}: {e}")
-            
-            # Verifica novamente com timeout
-            time.sleep(2)
-            has_dangerous_after, _ = self.check_active_dd_processes(device)
-            
-            if has_dangerous_after:
-                self.log("❌ Ainda existem processos dd ativos após tentativa de kill")
-                return False
+                    request = json.loads(line)
+                    if not isinstance(request, dict) or "method" not in request:
+                        raise ValueError("pedido sem 'method'")
+                except ValueError as e:
+                    self._send(client, {"id": None, "error": f"ValueError: {e}"})
+                    continue
+                self.executor.submit(self._dispatch, client, request)
+        except OSError:
+            pass
+        finally:
+            self._drop(client)
+
+    def _writer(self, client):
+        """Uma thread por conexão escreve respostas e eventos: cliente lento não trava os outros"""
+        while True:
+            message = client["outbox"].get()
+            if message is None:
+                break
+            try:
+                client["conn"].sendall(message)
+            except OSError:
+                break
+        self._drop(client)
+
+    def _send(self, client, message):
+        if client["alive"]:
+            client["outbox"].put((json.dumps(message, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+
+    def _drop(self, client):
+        with self.lock:
+            if not client["alive"]:
+                return
+            client["alive"] = False
+            self.clients.pop(id(client), None)
+        client["outbox"].put(None)
+        try:
+            client["conn"].shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        client["conn"].close()
+
+    def _dispatch(self, client, request):
+        try:
+            method = getattr(self, "rpc_" + str(request["method"]).replace(".", "_"), None)
+            if method is None:
+                raise ValueError(f"Método desconhecido: {request['method']}")
+            params = request.get("params") or {}
+            if method.__name__ == "rpc_jobs_wait":
+                if method(client, request.get("id"), **params):
+                    return  # a resposta sai pelo laço de eventos
+                result = self._find_job(params.get("id"))[1]
+            elif method.__name__ in ("rpc_subscribe", "rpc_unsubscribe"):
+                result = method(client, **params)
             else:
-                self.log(f"✅ {killed_count} processos dd perigosos eliminados")
-                return True
-                
+                result = method(**params)
+            reply = {"id": request.get("id"), "result": result}
         except Exception as e:
-            self.log(f"❌ Erro ao eliminar processos conflitantes: {e}")
+            reply = {"id": request.get("id"), "error": f"{type(e).__name__}: {e}"}
+        self._send(client, reply)
+
+    # --- Eventos ---
+    def _subscribers(self, topic):
+        with self.lock:
+            return [client for client in self.clients.values() if topic in client["topics"]]
+
+    def _events_loop(self):
+        while not self._stop.wait(self.event_interval):
+            try:
+                self._answer_waiters()
+                self._publish_jobs()
+                self._publish_log()
+                self._publish_slots()
+            except Exception as e:
+                self.core.log(f"⚠️ [api] Erro ao publicar eventos: {e}")
+
+    def _publish_jobs(self):
+        subscribers = self._subscribers("jobs")
+        jobs = self._all_jobs()
+        changed = []
+        for job in jobs:
+            mark = (job["state"], job["done"])
+            if self._job_marks.get(job["id"]) != mark:
+                self._job_marks[job["id"]] = mark
+                changed.append(job)
+        for client in subscribers:
+            for job in (jobs if client["full"] else changed):
+                self._send(client, {"event": "job", "job": job})
+            client["full"] = False
+
+    def _answer_waiters(self):
+        """Responde os jobs.wait cujo job terminou ou cujo prazo venceu"""
+        with self.lock:
+            waiters, self._waiters = self._waiters, []
+        if not waiters:
+            return
+        jobs = {job["id"]: job for job in self._all_jobs()}
+        now = time.monotonic()
+        pending = []
+        for waiter in waiters:
+            if not waiter["client"]["alive"]:
+                continue
+            job = jobs.get(waiter["job_id"])
+            if job is None:
+                reply = {"id": waiter["request_id"], "error": f"KeyError: Job {waiter['job_id']} não encontrado"}
+            elif job["state"] in ("done", "failed", "cancelled") or \
+                    (waiter["deadline"] is not None and now >= waiter["deadline"]):
+                reply = {"id": waiter["request_id"], "result": job}
+            else:
+                pending.append(waiter)
+                continue
+            self._send(waiter["client"], reply)
+        with self.lock:
+            self._waiters.extend(pending)
+
+    def _publish_log(self):
+        entries = [entry for entry in list(self.core.log_history) if entry[0] > self._log_seq]
+        if not entries:
+            return
+        self._log_seq = entries[-1][0]
+        for client in self._subscribers("log"):
+            for seq, level, line in entries:
+                if level >= client["log_level"]:
+                    self._send(client, {"event": "log", "seq": seq, "level": logging.getLevelName(level),
+                                        "message": line})
+
+    def _publish_slots(self):
+        station = self.core.station
+        if station is None:
+            return
+        changed = []
+        for slot in station.snapshot()["slots"]:
+            mark = (slot["device"], slot["state"], round(slot["percent"]))
+            if self._slot_marks.get(slot["slot"]) != mark:
+                self._slot_marks[slot["slot"]] = mark
+                changed.append(slot)
+        for client in self._subscribers("slots"):
+            for slot in changed:
+                self._send(client, {"event": "slot", "slot": slot})
+
+    def _on_device_event(self, action, name):
+        found = self.core.detect_usb_linux([name]) if action != "remove" else []
+        for client in self._subscribers("devices"):
+            self._send(client, {"event": "device", "action": action, "name": name,
+                                "device": found[0] if found else None})
+
+    # --- Apoio ---
+    def _schedulers(self):
+        schedulers = [self.core.write_scheduler]
+        if self.core.station is not None:
+            schedulers.append(self.core.station.scheduler)
+        return [scheduler for scheduler in schedulers if scheduler is not None]
+
+    def _all_jobs(self):
+        return [job for scheduler in self._schedulers() for job in scheduler.snapshot()["jobs"]]
+
+    def _find_job(self, job_id):
+        for scheduler in self._schedulers():
+            for job in scheduler.snapshot()["jobs"]:
+                if job["id"] == job_id:
+                    return scheduler, job
+        raise KeyError(f"Job {job_id} não encontrado")
+
+    def _cache_path(self, filename):
+        if not filename or os.path.basename(filename) != filename or filename.startswith("."):
+            raise ValueError(f"Nome de arquivo inválido: {filename!r}")
+        return self.core.download_dir / filename
+
+    # --- Métodos ---
+    def rpc_ping(self):
+        return {"version": CONTROL_API_VERSION, "pid": os.getpid(),
+                "methods": sorted(name[4:].replace("_", ".", 1) for name in dir(self) if name.startswith("rpc_"))}
+
+    def rpc_subscribe(self, client, topics=CONTROL_TOPICS, log_level="INFO"):
+        """Passa a receber eventos; "jobs" começa com o estado atual de todos os jobs"""
+        unknown = set(topics) - set(CONTROL_TOPICS)
+        if unknown:
+            raise ValueError(f"Tópicos desconhecidos: {', '.join(sorted(unknown))}")
+        client["topics"].update(topics)
+        client["log_level"] = LOG_LEVELS.get(log_level, logging.INFO)
+        client["full"] = True
+        if "devices" in topics and self._monitor is None and platform.system().lower() == "linux":
+            self._monitor = HotplugMonitor(on_event=self._on_device_event)
+            self._monitor.start()
+        return {"topics": sorted(client["topics"])}
+
+    def rpc_unsubscribe(self, client, topics=CONTROL_TOPICS):
+        client["topics"].difference_update(topics)
+        return {"topics": sorted(client["topics"])}
+
+    def rpc_devices_list(self):
+        return self.core.detect_usb_devices()
+
+    def rpc_jobs_submit(self, device, image=None, build=None, verify=False, priority=0, confirm=False):
+        """Enfileira uma gravação; confirm=true é obrigatório (o dispositivo será apagado)"""
+        if not confirm:
+            raise PermissionError("jobs.submit apaga o dispositivo: envie confirm=true")
+        if bool(image) == bool(build):
+            raise ValueError("informe exatamente um entre image e build")
+        if device not in {record["path"] for record in self.core.detect_usb_devices()}:
+            # Mesma regra da GUI e do --cli: só pendrives detectados, nunca um disco do sistema
+            raise ValueError(f"{device} não é um pendrive USB detectado")
+        if build:
+            image = self.rpc_cache_fetch(build)["path"]
+        if not os.path.isfile(image):
+            raise FileNotFoundError(f"ISO não encontrada: {image}")
+        if not os.access(device, os.W_OK):
+            with self._privilege_lock:
+                if not self.core.check_sudo_permission():
+                    raise PermissionError("sem privilégios para gravar no dispositivo")
+        scheduler = self.core.get_write_scheduler()
+        job = scheduler.submit(image, device, verify=verify, priority=priority)
+        scheduler.start()
+        return dict(job)
+
+    def rpc_jobs_list(self):
+        return self._all_jobs()
+
+    def rpc_jobs_get(self, id):
+        return self._find_job(id)[1]
+
+    def rpc_jobs_cancel(self, id=None):
+        """Cancela um job (ou todos os da fila de gravação, sem id)"""
+        if id is None:
+            scheduler = self.core.write_scheduler
+            return scheduler.cancel() if scheduler is not None else False
+        scheduler, _ = self._find_job(id)
+        return scheduler.cancel(id)
+
+    def rpc_jobs_wait(self, client, request_id, id, timeout=None):
+        """Responde quando o job terminar (ou o timeout vencer); os demais pedidos da conexão seguem
+
+        Devolve True se a espera ficou registrada para o laço de eventos, False
+        se o job já terminou (a resposta sai na hora).
+        """
+        job = self._find_job(id)[1]
+        if job["state"] in ("done", "failed", "cancelled") or (timeout is not None and timeout <= 0):
             return False
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.lock:
+            self._waiters.append({"client": client, "request_id": request_id, "job_id": id, "deadline": deadline})
+        return True
+
+    def rpc_cache_list(self):
+        files = []
+        for path in sorted(self.core.download_dir.iterdir()):
+            if path.is_file() and not path.name.endswith(".part"):
+                info = path.stat()
+                files.append({"filename": path.name, "path": str(path), "size": info.st_size,
+                              "mtime": info.st_mtime})
+        usage = shutil.disk_usage(self.core.download_dir)
+        return {"dir": str(self.core.download_dir), "files": files,
+                "total_bytes": sum(item["size"] for item in files), "free_bytes": usage.free}
+
+    def rpc_cache_fetch(self, build):
+        """Baixa (ou reaproveita) a ISO de 'Família:Variante:Arquitetura[:Versão]'; pedidos iguais dividem o download"""
+        family, variant, arch, version = self.core.parse_build_spec(build)
+        url, filename = self.core.build_download_url(family, variant, arch, version)
+        if not url:
+            raise ValueError(f"URL indisponível para {build}")
+        with self.lock:
+            future = self._fetches.get(filename)
+            owner = future is None
+            if owner:
+                future = self._fetches[filename] = Future()
+        if owner:
+            try:
+                scheduler = self.core.create_batch_scheduler(max_concurrent=1, max_per_host=1)
+                job = scheduler.submit(url, filename, label=f"{family} {variant} {version} {arch}")
+                scheduler.run()
+                future.set_result(dict(job))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self.lock:
+                    self._fetches.pop(filename, None)
+        job = future.result()
+        if job["state"] not in ("done", "cached"):
+            raise RuntimeError(job["error"] or f"download {job['state']}")
+        return {"path": str(job["path"]), "filename": filename, "size": job["total"], "state": job["state"]}
+
+    def rpc_cache_delete(self, filename):
+        path = self._cache_path(filename)
+        busy = [job["id"] for job in self._all_jobs()
+                if job["image"] == str(path) and job["state"] in ("queued", "running")]
+        if busy:
+            raise PermissionError(f"{filename} está em uso pelos jobs {busy}")
+        path.unlink()
+        self.core.log(f"🗑️ [api] Removido do cache: {filename}")
+        return True
+
+    def rpc_station_status(self):
+        return self.core.station.snapshot() if self.core.station is not None else None
+
+
+class ControlAPIClient:
+    """Cliente da API de controle: vários pedidos encadeados numa única conexão
+
+    send() não espera a resposta (devolve o id); call() espera a sua e guarda
+    em events os eventos e respostas de outros pedidos que chegarem antes.
+    """
 
+    def __init__(self, socket_path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(str(socket_path))
+        self.reader = self.sock.makefile("rb")
+        self.next_id = 0
+        self.events = collections.deque()
+        self.replies = {}
+
+    def send(self, method, **params):
+        self.next_id += 1
+        request = {"id": self.next_id, "method": method, "params": params}
+        self.sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        return self.next_id
+
+    def receive(self):
+        """Próxima mensagem do servidor (resposta ou evento)"""
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("API de controle encerrou a conexão")
+        return json.loads(line)
+
+    def result(self, request_id):
+        """Espera a resposta do pedido; levanta RuntimeError com a mensagem de erro do servidor"""
+        while request_id not in self.replies:
+            message = self.receive()
+            if "event" in message:
+                self.events.append(message)
+            else:
+                self.replies[message.get("id")] = message
+        reply = self.replies.pop(request_id)
+        if "error" in reply:
+            raise RuntimeError(reply["error"])
+        return reply["result"]
+
+    def call(self, method, **params):
+        return self.result(self.send(method, **params))
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+class USBCreatorCore:
+    """Catálogo, download, formatação, gravação e verificação, sem nenhuma interface"""
+
+    def __init__(self, offline=None, log_level="INFO"):
+        # Log: histórico em anel desde o início
+        self.log_history = collections.deque(maxlen=LOG_HISTORY_LINES)  # (seq, nível, linha)
+        self.log_level = LOG_LEVELS.get(log_level, logging.INFO)  # mínimo exibido no widget/console
+        self._log_seq = itertools.count(1)
+        self.log_sink = None
+
+        # Versões são resolvidas sob demanda (memoizadas com expiração)
+        self.version_cache = {}  # família -> (timestamp, versões)
+        self.version_cache_ttl = 6 * 3600
+        self._versions_loading = set()
+        self._version_callbacks = {}
+        # Catálogo e índice mudam na thread da interface (ui_call); sem interface, sob este lock
+        self._catalog_lock = threading.RLock()
+        self.config_dir = Path.home() / ".bootable_usb_creator"
+        try:
+            self.log_sink = LogFileSink(self.config_dir / "logs" / "bootable_usb_creator.log")
+            self.log_sink.start()
+            atexit.register(self.log_sink.stop)  # esvazia a fila antes de sair
+        except OSError as e:
+            self.log_sink = None
+            self.log(f"⚠️ Log em arquivo desativado: {e}")
+        self.version_resolver = VersionResolver(
+            self.config_dir / "versions_cache.json",
+            ttl=self.version_cache_ttl,
+            log=self.log,
+        )
 
-    def log(self, message):
-        """Adiciona mensagem ao log - versão segura"""
-        timestamp = time.strftime("%H:%M:%S")
-        formatted_message = f"[{timestamp}] {message}"
-        
-        # Se a GUI já foi inicializada, usa o log_text
-        if hasattr(self, 'log_text') and self.log_text:
-            self.log_text.insert(tk.END, f"{formatted_message}\n")
-            self.log_text.see(tk.END)
-            if hasattr(self, 'root'):
-                self.root.update_idletasks()
-        else:
-            # Se não, armazena em log temporário
-            if not hasattr(self, '_temp_log'):
-                self._temp_log = []
-            self._temp_log.append(formatted_message)
-            print(formatted_message)  # Também imprime no console
-
-    def _process_temp_logs(self):
-        """Processa logs que foram armazenados antes da GUI estar pronta"""
-        if hasattr(self, '_temp_log') and self._temp_log and hasattr(self, 'log_text'):
-            for message in self._temp_log:
-                self.log_text.insert(tk.END, f"{message}\n")
-            self.log_text.see(tk.END)
-            # Limpa logs temporários
-            self._temp_log = []
+        # Modo offline: versões, URLs e ISOs vêm do pacote importado, sem acessar a rede
+        self.offline_dir = self.config_dir / "offline"
+        self.offline_bundle = OfflineBundle.load(self.offline_dir)
+        self.offline_mode = self.load_offline_mode() if offline is None else offline
 
-    def load_scalable_distributions(self):
-        """Carrega distribuições com busca automática de versões"""
-        # Tenta carregar de arquivo externo primeiro
-        external_config = Path.home() / ".bootable_usb_creator" / "distributions.json"
-        if external_config.exists():
-            try:
-                with open(external_config, "r", encoding="utf-8") as f:
-                    loaded_data = json.load(f)
-                    
-                # 🔥 CORREÇÃO: Adicionar métodos de busca após carregar do JSON
-                distributions_with_methods = {}
-                for distro_name, distro_data in loaded_data.items():
-                    distributions_with_methods[distro_name] = distro_data
-                    
-                    # Adiciona método get_versions baseado no nome da distribuição
-                    method_name = f"get_{distro_name.lower().replace(' ', '_').replace('!', '').replace('_os', '')}_versions"
-                    if hasattr(self, method_name):
-                        distributions_with_methods[distro_name]["get_versions"] = getattr(self, method_name)
-                        
-                return distributions_with_methods
-            except:
-                pass
+        # Carregar distribuições hierárquicas escaláveis
+        self.distributions_snapshot = DistributionsSnapshot(self.config_dir / "distributions.json")
+        self._loaded_catalog = None
+        self.distributions = self.load_scalable_distributions()
+        self.catalog = self._loaded_catalog or DistributionCatalog.from_distributions(self.distributions)
+        self._search_index = None  # construído no primeiro uso (a GUI antecipa em segundo plano)
+        self._search_index_lock = threading.Lock()
+        self._search_executor = ThreadPoolExecutor(max_workers=1)
 
-        # Estrutura base com suporte a múltiplas arquiteturas
-        distributions_data = {
-            "Ubuntu": {
-                "family": "ubuntu",
-                "checksum_type": "sha256",
-                "get_versions": self.get_ubuntu_versions,
-                "variants": {
-                    "Desktop": {
-                        "architectures": ["amd64", "arm64"]
-                    },
-                    "Server": {
-                        "architectures": ["amd64", "arm64", "ppc64el", "s390x"]
-                    }
-                }
-            },
-            "Debian": {
-                "family": "debian",
-                "checksum_type": "sha512", 
-                "get_versions": self.get_debian_versions,
-                "variants": {
-                    "Netinst": {
-                        "architectures": ["amd64", "i386", "arm64", "armhf"]
-                    },
-                    "Live": {
-                        "architectures": ["amd64", "i386", "arm64"]
-                    }
-                }
-            },
-            "Linux Mint": {
-                "family": "mint",
-                "checksum_type": "sha256",
-                "get_versions": self.get_linuxmint_versions,
-                "variants": {
-                    "Cinnamon": {"architectures": ["64bit"]},
-                    "Mate": {"architectures": ["64bit"]},
-                    "Xfce": {"architectures": ["64bit"]}
-                }
-            },
-            "Fedora": {
-                "family": "fedora", 
-                "checksum_type": "sha256",
-                "get_versions": self.get_fedora_versions,
-                "variants": {
-                    "Workstation": {"architectures": ["x86_64", "aarch64"]},
-                    "Server": {"architectures": ["x86_64", "aarch64"]}
-                }
-            },
-            "Arch Linux": {
-                "family": "arch",
-                "checksum_type": "sha256", 
-                "variants": {
-                    "Standard": {"architectures": ["x86_64"]}
-                }
-            },
-            "Kali Linux": {
-                "family": "security",
-                "checksum_type": "sha256",
-                "get_versions": self.get_kalilinux_versions,  # ✅ ADICIONAR ESTA LINHA
-                "variants": {
-                    "Live": {"architectures": ["amd64", "i386"]}
-                }
-            },
-            "Manjaro": {
-                "family": "arch",
-                "checksum_type": "sha256",
-                "get_versions": self.get_manjaro_versions,
-                "variants": {
-                    "XFCE": {"architectures": ["x86_64"]},
-                    "KDE": {"architectures": ["x86_64"]},
-                    "GNOME": {"architectures": ["x86_64"]}
-                }
-            },
-            "openSUSE": {
-                "family": "suse", 
-                "checksum_type": "sha256",
-                "get_versions": self.get_opensuse_versions,
-                "variants": {
-                    "Leap": {"architectures": ["x86_64", "aarch64"]},
-                    "Tumbleweed": {"architectures": ["x86_64", "aarch64"]}
-                }
-            },
+        # ✅ NOVO: Variáveis de controle de processo
+        self.is_operation_running = False
+        self.current_process = None
+        self.should_cancel = False
+        self.sudo_password = None  # ✅ NOVO: Armazena senha sudo
+        self.privileged_helper = None  # processo root persistente (socket Unix)
+        self._helper_lock = threading.RLock()  # um único ajudante (e uma única senha) entre as threads
 
-            # DISTRIBUIÇÕES ATUAIS COM SUPORTE 32-BIT (NOVAS)
-            "MX Linux": {
-                "family": "debian",
-                "checksum_type": "sha256",
-                "get_versions": self.get_mxlinux_versions,
-                "variants": {
-                    "XFCE": {"architectures": ["amd64", "i386"]},
-                    "KDE": {"architectures": ["amd64", "i386"]}
-                }
-            },
-            "antiX": {
-                "family": "debian", 
-                "checksum_type": "sha256",
-                "get_versions": self.get_antix_versions,
-                "variants": {
-                    "Full": {"architectures": ["amd64", "i386"]},
-                    "Base": {"architectures": ["amd64", "i386"]}
-                }
-            },
-            "Puppy Linux": {
-                "family": "independent",
-                "checksum_type": "sha256", 
-                "get_versions": self.get_puppylinux_versions,
-                "variants": {
-                    "Fossapup": {"architectures": ["amd64", "i686"]}
-                }
-            }
+        self.arch_maps = {
+            "64bit": "amd64",
+            "32bit": "i386", 
+            "x86_64": "amd64",
+            "amd64": "amd64",
+            "i386": "i386",
+            "i686": "i386",
+            "aarch64": "arm64",
+            "arm64": "arm64", 
+            "armhf": "armhf",
+            "ppc64el": "ppc64el",
+            "s390x": "s390x"
         }
 
-        # Preenche as versões dinamicamente
-        self.populate_versions(distributions_data)
-        
-        return distributions_data
+        self.url_resolver = URLTemplateResolver(self.catalog, self.arch_maps)
+        self.feed_state = self.load_feed_state()
+
+        self.download_dir = Path.home() / "BootableUSB_Downloads"
+        self.download_dir.mkdir(exist_ok=True)
+        self.selected_usb_device = None
+        self.custom_iso_path = None
+        self.batch_scheduler = None
+        self.write_scheduler = None  # fila de gravações em vários pendrives
+        self.station = None  # estação duplicadora (grava todo pendrive inserido)
+        self.control_api = None  # servidor da API de controle (socket Unix), se ligado
+        self._write_scheduler_lock = threading.Lock()
+        self.station_monitor = None
+        self.usb_devices = {}  # id estável -> registro do dispositivo
+        self.usb_rows = []  # id de cada linha da lista, na ordem exibida
+        self.selected_usb_id = None
+        self.active_usb_device = None  # dispositivo sendo gravado
+        self.hotplug_monitor = None
+        self.partition_backend = "native"  # "native" (MBR/GPT em Python) ou "parted"
+        self.partition_label = "dos"  # "dos" ou "gpt"
+        self.filesystem = "fat32"  # "fat32", "exfat" ou "auto" (exFAT acima de 32 GiB)
+        self.format_stats = self.load_format_stats()
+        self.assume_yes = False  # confirm() sem interface só aceita com --yes
+        self.verify_after_write = False  # relê o pendrive e compara com a ISO
+        self.last_verified_sha256 = None
+        self.progress = 0.0
+        self.status = ""
+
+    @property
+    def search_index(self):
+        with self._search_index_lock:
+            if self._search_index is None:
+                self._search_index = CatalogSearchIndex(self.catalog.iter_builds(include_unversioned=True))
+            return self._search_index
+
+    def check_environment(self):
+        """Verifica se o ambiente suporta execução gráfica com sudo"""
+        try:
+            # Verifica se está em ambiente gráfico
+            if os.environ.get('DISPLAY'):
+                self.log("✅ Ambiente gráfico detectado")
+            else:
+                self.log("⚠️ Ambiente sem DISPLAY - modo terminal")
+            
+            # Verifica se tem terminal disponível
+            terminal_emulators = ['gnome-terminal', 'konsole', 'xfce4-terminal', 'xterm']
+            available_terminal = None
+            for terminal in terminal_emulators:
+                if shutil.which(terminal):
+                    available_terminal = terminal
+                    break
+            
+            if available_terminal:
+                self.log(f"✅ Terminal disponível: {available_terminal}")
+            else:
+                self.log("⚠️ Nenhum terminal gráfico encontrado")
+            
+            return True
+            
+        except Exception as e:
+            self.log(f"⚠️ Erro na verificação de ambiente: {e}")
+            return False
+
+    def check_sudo_permission(self):
+        """Garante o ajudante privilegiado (uma única elevação por sessão)"""
+        try:
+            # Se já é root ou Windows, não precisa de sudo
+            if platform.system().lower() == "windows" or os.geteuid() == 0:
+                return True
+
+            # Duas gravações em paralelo não iniciam dois ajudantes nem pedem a senha duas vezes
+            with self._helper_lock:
+                if self.privileged_helper is not None and self.privileged_helper.alive:
+                    return True
+
+                self.log("🔐 Operação requer privilégios de superusuário...")
+
+                # Se já temos senha armazenada, tenta reiniciar o ajudante com ela
+                if self.sudo_password:
+                    if self.start_privileged_helper(self.sudo_password):
+                        return True
+                    self.log("⚠️ Senha sudo anterior inválida, solicitando nova...")
+                    self.sudo_password = None
+
+                # Solicita nova senha
+                password = self.ask_sudo_password()
+                if not password:
+                    self.log("❌ Senha não fornecida - operação cancelada")
+                    return False
+
+                # A própria elevação do ajudante valida a senha
+                if self.start_privileged_helper(password):
+                    self.log("✅ Autenticação sudo bem-sucedida")
+                    self.sudo_password = password  # Armazena para reiniciar o ajudante se ele cair
+                    return True
+
+                self.log("❌ Senha sudo incorreta ou erro na autenticação")
+                self.notify("error", "Erro de Autenticação", "Senha sudo incorreta!")
+                return False
+
+        except Exception as e:
+            self.log(f"⚠️ Erro na autenticação sudo: {e}")
+            self.notify("error", "Erro", f"Erro inesperado:\n{e}")
+            return False
+
+    def start_privileged_helper(self, password):
+        """Inicia o ajudante root; depois disso nenhuma operação chama sudo de novo"""
+        with self._helper_lock:
+            self.stop_privileged_helper()
+            helper = PrivilegedHelperClient()
+            start = time.perf_counter()
+            try:
+                info = helper.start(password)
+            except (OSError, RuntimeError, ValueError) as e:
+                self.log(f"❌ Ajudante privilegiado não iniciou: {str(e).replace(password, '***') if password else e}")
+                return False
+            self.privileged_helper = helper
+        self.log(f"🔐 Ajudante privilegiado ativo (PID {info['pid']}) em {(time.perf_counter() - start) * 1000:.0f} ms")
+        return True
+
+    def stop_privileged_helper(self):
+        with self._helper_lock:
+            if self.privileged_helper is not None:
+                self.privileged_helper.close()
+                self.privileged_helper = None
+
+    def get_privileged_helper(self):
+        """Ajudante ativo, reiniciando-o com a senha já validada se necessário"""
+        with self._helper_lock:
+            if self.privileged_helper is not None and self.privileged_helper.alive:
+                return self.privileged_helper
+            if self.sudo_password and self.start_privileged_helper(self.sudo_password):
+                return self.privileged_helper
+            return None
+
+    def open_device(self, device, write=True):
+        """Descritor do dispositivo: direto como root, ou entregue pelo ajudante privilegiado"""
+        if os.geteuid() == 0 or os.access(device, os.W_OK if write else os.R_OK):
+            return os.open(device, (os.O_RDWR if write else os.O_RDONLY) | os.O_CLOEXEC)
+        helper = self.get_privileged_helper()
+        if helper is None:
+            raise PermissionError(f"Sem permissão para abrir {device}")
+        return helper.open_device(device, write)
+
+    def rescan_partitions(self, device):
+        """Relê a tabela de partições (BLKRRPART exige root: usa o ajudante)"""
+        helper = self.get_privileged_helper() if os.geteuid() != 0 else None
+        if helper is not None:
+            return helper.call("rescan", device=device)
+        fd = os.open(device, os.O_RDONLY | os.O_CLOEXEC)
+        try:
+            return reread_partition_table(fd)
+        finally:
+            os.close(fd)
+
+    def run_disk_tool(self, tool, device, input_text=None, **options):
+        """Executa uma ferramenta de disco (disk_tool_argv) como root: direto, ou pelo ajudante privilegiado"""
+        try:
+            if os.geteuid() == 0:
+                argv = disk_tool_argv(tool, device, **options)
+                result = subprocess.run(argv, input=input_text, capture_output=True, text=True, timeout=600)
+                return result.returncode == 0, result.stdout, result.stderr
+
+            helper = self.get_privileged_helper()
+            if helper is None:
+                self.log("❌ Senha sudo não disponível")
+                return False, "", "Senha sudo não disponível"
+
+            self.log(f"🔐 Ajudante: {tool} {device} {options or ''}", logging.DEBUG)
+            success, stdout, stderr = helper.run_tool(tool, device, input_text, **options)
+            if not success:
+                self.log(f"❌ Erro em {tool}: {stderr.strip()}")
+            return success, stdout, stderr
+
+        except subprocess.TimeoutExpired:
+            self.log(f"❌ Timeout em {tool}")
+            return False, "", "Timeout"
+        except Exception as e:
+            self.log(f"❌ Erro ao executar {tool}: {e}")
+            return False, "", str(e)
+
+    def kill_process(self, pid):
+        """SIGKILL num processo que segura o pendrive; processos de outros usuários passam pelo ajudante"""
+        try:
+            pid = int(pid)
+            try:
+                os.kill(pid, signal.SIGKILL)
+                return True
+            except PermissionError:
+                if os.geteuid() == 0:
+                    raise
+            helper = self.get_privileged_helper()
+            return helper is not None and helper.call("kill", pid=pid)
+        except (OSError, RuntimeError, ValueError) as e:
+            self.log(f"⚠️ Não foi possível encerrar o PID {pid}: {e}")
+            return False
+
+    def track_progress(self, total, device=None, phase="write", base_progress=0.0, progress_weight=1.0):
+        """Progresso único das gravações e da verificação: barra com vazão e ETA, e uma linha de log a cada 10%
+
+        Devolve o ProgressEstimator já iniciado; quem grava chama update(bytes)
+        e, no fim, finish(ok).
+        """
+        logged = [0]
+
+        def on_update(snapshot):
+            overall = base_progress + snapshot["percent"] * progress_weight
+            self.set_progress(overall, describe_progress(snapshot, overall))
+            if snapshot["percent"] - logged[0] >= 10 and not snapshot["finished"]:
+                logged[0] = snapshot["percent"] // 10 * 10
+                self.log(f"📊 {'Gravação' if phase == 'write' else 'Verificação'}: {describe_progress(snapshot)}")
+
+        return ProgressEstimator(total, device, phase, on_update=on_update).start()
+
+    def _copy_image_to_fd(self, iso_path, fd, total_size=None, on_progress=None, cancelled=None,
+                          chunk_size=4 * 1024 * 1024, progress_interval=0.25):
+        """Copia a imagem para um descritor já aberto (sem dd), em blocos grandes
+
+        Reentrante: todo o estado fica em variáveis locais, então várias gravações
+        podem rodar em paralelo em dispositivos diferentes.
+        Retorna os bytes gravados, ou None se cancelado.
+        """
+        total_size = total_size or os.path.getsize(iso_path)
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        written = 0
+        last_report = 0.0
+        with open(iso_path, "rb", buffering=0) as source:
+            while True:
+                if cancelled is not None and cancelled():
+                    return None
+                count = source.readinto(buffer)
+                if not count:
+                    break
+                offset = 0
+                while offset < count:
+                    offset += os.write(fd, view[offset:count])
+                written += count
+                now = time.monotonic()
+                if on_progress is not None and now - last_report >= progress_interval:
+                    on_progress(written, total_size)
+                    last_report = now
+        os.fsync(fd)
+        if on_progress is not None:
+            on_progress(written, total_size)
+        return written
+
+    def _compare_image_with_fd(self, iso_path, fd, total_size=None, on_progress=None, cancelled=None,
+                               chunk_size=4 * 1024 * 1024, progress_interval=0.25):
+        """Relê o descritor e compara com a imagem (reentrante, como _copy_image_to_fd)
+
+        Retorna o SHA256 da imagem, None se cancelado, ou levanta ValueError
+        na primeira divergência.
+        """
+        total_size = total_size or os.path.getsize(iso_path)
+        if hasattr(os, "posix_fadvise"):
+            # Descarta o que a gravação deixou em cache: a leitura tem de vir do pendrive
+            os.posix_fadvise(fd, 0, total_size, os.POSIX_FADV_DONTNEED)
+        digest = hashlib.sha256()
+        offset = 0
+        last_report = 0.0
+        with open(iso_path, "rb") as iso:
+            while offset < total_size:
+                if cancelled is not None and cancelled():
+                    return None
+                expected = iso.read(chunk_size)
+                if not expected:
+                    break
+                actual = os.pread(fd, len(expected), offset)
+                if actual != expected:
+                    mismatch = next(
+                        (i for i, (a, b) in enumerate(zip(actual, expected)) if a != b), len(actual)
+                    )
+                    raise ValueError(f"Divergência no byte {offset + mismatch}")
+                digest.update(expected)
+                offset += len(expected)
+
+                now = time.monotonic()
+                if on_progress is not None and (now - last_report >= progress_interval or offset >= total_size):
+                    on_progress(offset, total_size)
+                    last_report = now
+        return digest.hexdigest()
+
+    def unmount_all_partitions(self, device, lazy=False, timeout=5.0):
+        """Desmonta todas as partições de um dispositivo (mountinfo + umount concorrente)"""
+        try:
+            system = platform.system().lower()
+            if system != "linux":
+                return True
+
+            start = time.perf_counter()
+            mounts = find_device_mounts(device)
+            if not mounts:
+                self.log(f"ℹ️ Nenhuma partição de {device} está montada")
+                return True
+
+            self.log(f"🔌 Desmontando {len(mounts)} ponto(s) de montagem de {device}...")
+            for mount in mounts:
+                self.log(f"   📍 {mount['device']} em {mount['mountpoint']}")
+
+            helper = self.get_privileged_helper() if os.geteuid() != 0 else None
+            if helper is not None:
+                remaining = helper.call("unmount", device=device, lazy=lazy, timeout=timeout)
+            else:
+                remaining = unmount_device(device, lazy, timeout)
+
+            if not remaining:
+                elapsed = (time.perf_counter() - start) * 1000
+                self.log(f"✅ Partições desmontadas em {elapsed:.0f} ms")
+                return True
+
+            for mount in remaining:
+                self.log(f"   ⚠️ Não foi possível desmontar {mount['mountpoint']}")
+            # Continua mesmo assim; a formatação reportará o erro real
+            return True
+
+        except Exception as e:
+            self.log(f"⚠️ Erro ao desmontar partições: {e}")
+            # Continua mesmo com erro
+            return True
+
+    def force_unmount_device(self, device):
+        """Tenta desmontar forçadamente um dispositivo"""
+        try:
+            self.log(f"🔧 Tentando desmontagem forçada de {device}...")
+            return self.unmount_all_partitions(device, lazy=True)
+        except Exception as e:
+            self.log(f"⚠️ Erro na desmontagem forçada: {e}")
+            return False
+
+    def verify_usb_device(self, device):
+        """Verifica se o dispositivo USB está pronto para formatação"""
+        try:
+            self.log(f"🔍 Verificando dispositivo {device}...")
+            
+            # Verifica se o dispositivo existe
+            if not os.path.exists(device):
+                self.log(f"❌ Dispositivo {device} não encontrado")
+                return False
+            
+            # Verifica tamanho do dispositivo (sysfs: não precisa de root)
+            size_bytes = self.get_device_size(device)
+            if size_bytes:
+                size_gb = size_bytes / (1024**3)
+                self.log(f"✅ Dispositivo encontrado: {size_gb:.1f} GB")
+            else:
+                self.log("⚠️ Não foi possível verificar o tamanho do dispositivo")
+            
+            # Verifica partições (lsblk lê o sysfs, sem root)
+            result = subprocess.run(['lsblk', '-n', '-o', 'NAME,SIZE,TYPE', device], capture_output=True, text=True)
+            success = result.returncode == 0
+            stdout = result.stdout
+            
+            if success:
+                self.log("📋 Estrutura atual do dispositivo:")
+                for line in stdout.strip().split('\n'):
+                    if line:
+                        self.log(f"   {line}")
+            
+            return True
+            
+        except Exception as e:
+            self.log(f"⚠️ Erro na verificação do dispositivo: {e}")
+            return False
+
+    def check_usb_health(self, device):
+        """Verifica a saúde do dispositivo USB"""
+        try:
+            self.log(f"🔍 Verificando saúde do dispositivo {device}...")
+            
+            # Verifica se o dispositivo é removível (lsblk lê o sysfs, sem root)
+            result = subprocess.run(['lsblk', '-d', '-o', 'NAME,RM', device], capture_output=True, text=True)
+            if result.returncode == 0 and '1' not in result.stdout:
+                self.log("⚠️ Aviso: Dispositivo pode não ser removível")
+            
+            # Verifica tamanho
+            size = self.get_device_size(device)
+            if size:
+                if size < 100 * 1024 * 1024:  # Menos de 100MB
+                    self.log("❌ Dispositivo muito pequeno para ISO")
+                    return False
+            
+            self.log("✅ Dispositivo parece estar em bom estado")
+            return True
+            
+        except Exception as e:
+            self.log(f"⚠️ Erro na verificação de saúde: {e}")
+            return True  # Continua mesmo com erro
+
+    def check_active_dd_processes(self, device=None):
+        """Verifica processos com o dispositivo aberto (varre /proc, não só dd)"""
+        try:
+            start = time.perf_counter()
+            self.log("🔍 Verificando processos com o dispositivo aberto...")
+
+            own_pids = {os.getpid(), os.getppid()}
+            active_processes = []
+            dangerous_processes = []
+
+            if device and platform.system().lower() == "linux":
+                # Qualquer processo com o disco ou uma partição aberta
+                for holder in find_device_holders(device, ignore_pids=own_pids):
+                    active_processes.append(holder)
+                    dangerous_processes.append(holder)
+
+            # dd de outros usuários: sem root não dá para ler /proc/<pid>/fd,
+            # mas a linha de comando continua visível
+            seen = {proc['pid'] for proc in active_processes}
+            targets = set(device_nodes(device)) if device else set()
+            try:
+                pids = [entry for entry in os.listdir("/proc") if entry.isdigit()]
+            except OSError:
+                pids = []
+            for pid in pids:
+                if int(pid) in own_pids or pid in seen:
+                    continue
+                try:
+                    with open(f"/proc/{pid}/cmdline", "rb") as f:
+                        argv = f.read().decode("utf-8", "replace").split("\0")
+                except OSError:
+                    continue
+                if not argv or os.path.basename(argv[0]) != "dd":
+                    continue
+                device_match = next((arg[3:] for arg in argv if arg.startswith("of=")), None)
+                if not device_match:
+                    continue
+                process_info = {
+                    'pid': pid,
+                    'command': " ".join(argv).strip()[:100],
+                    'device': device_match
+                }
+                active_processes.append(process_info)
+                if device and (device_match in targets or same_disk(device_match, device)):
+                    dangerous_processes.append(process_info)
+
+            if active_processes:
+                self.log(f"⚠️  {len(active_processes)} processo(s) de OUTROS programas:")
+                for proc in active_processes:
+                    device_info = f" -> {proc['device']}" if proc['device'] else ""
+                    self.log(f"   🚫 PID {proc['pid']} {proc['command'][:40]}{device_info}")
+            else:
+                self.log("✅ Nenhum processo externo usando o dispositivo")
+
+            elapsed = (time.perf_counter() - start) * 1000
+            self.log(f"⏱️ Varredura de processos em {elapsed:.0f} ms")
+
+            if dangerous_processes:
+                self.log(f"❌ {len(dangerous_processes)} processo(s) PERIGOSO(S) detectado(s):")
+                for proc in dangerous_processes:
+                    self.log(f"   💥 PID {proc['pid']} usando {proc['device']}")
+                return True, dangerous_processes
+
+            return False, []
+
+        except Exception as e:
+            self.log(f"⚠️ Erro ao verificar processos: {e}")
+            return False, []
+
+    def kill_conflicting_dd_processes(self, device=None):
+        """Encerra processos que estejam usando o dispositivo"""
+        try:
+            self.log("🛑 Verificando e parando processos conflitantes...")
+
+            has_dangerous, dangerous_processes = self.check_active_dd_processes(device)
+
+            if not has_dangerous:
+                self.log("✅ Nenhum processo perigoso encontrado")
+                return True
+
+            killed = []
+            for proc in dangerous_processes:
+                try:
+                    self.log(f"   🔫 Matando processo PID {proc['pid']}...")
+                    if self.kill_process(proc['pid']):
+                        killed.append(proc['pid'])
+                    else:
+                        self.log(f"   ⚠️ Não foi possível eliminar PID {proc['pid']}")
+                except Exception as e:
+                    self.log(f"   ⚠️ Erro ao matar PID {proc['pid']}: {e}")
+
+            # Espera os processos sumirem de /proc em vez de dormir às cegas
+            poll_until(lambda: not any(os.path.exists(f"/proc/{pid}") for pid in killed), 2.0)
+            has_dangerous_after, _ = self.check_active_dd_processes(device)
+
+            if has_dangerous_after:
+                self.log("❌ Ainda existem processos usando o dispositivo após tentativa de kill")
+                return False
+            else:
+                self.log(f"✅ {len(killed)} processo(s) perigoso(s) eliminado(s)")
+                return True
+
+        except Exception as e:
+            self.log(f"❌ Erro ao eliminar processos conflitantes: {e}")
+            return False
+
+    def log(self, message, level=None):
+        """Registra a mensagem: histórico em anel, arquivo (assíncrono) e widget/console conforme o nível"""
+        if level is None:
+            level = infer_log_level(message)
+        formatted_message = f"[{time.strftime('%H:%M:%S')}] {message}"
+        seq = next(self._log_seq)
+        self.log_history.append((seq, level, formatted_message))
+        if self.log_sink is not None:
+            self.log_sink.write(level, message)
+
+        if level >= self.log_level:
+            self._show_log(seq, level, message, formatted_message)
+
+    def _show_log(self, seq, level, message, formatted_message):
+        print(formatted_message)
+
+    # === GANCHOS DE INTERFACE ===
+    def set_progress(self, percent, text=None, job="usb"):
+        self.progress = percent
+
+    def set_status(self, text):
+        self.status = text
+
+    def ui_call(self, func, *args, wait=True, **kwargs):
+        """Sem interface não há thread de UI: executa na hora"""
+        return func(*args, **kwargs)
+
+    def confirm(self, title, message):
+        """Confirmação de operação destrutiva; sem interface vale a opção --yes"""
+        return self.assume_yes
+
+    def notify(self, kind, title, message):
+        """Aviso ao usuário (kind: info, warning ou error)"""
+        level = {"error": logging.ERROR, "warning": logging.WARNING}.get(kind, logging.INFO)
+        self.log(f"{title}: {' '.join(message.split())}", level)
+
+    def on_station_slot_changed(self, slot):
+        """Uma vaga da estação mudou de estado (thread do monitor ou do worker)"""
+
+    def ask_sudo_password(self):
+        """Senha do sudo pelo terminal (None se não houver terminal)"""
+        if not sys.stdin.isatty():
+            return None
+        import getpass
+        return getpass.getpass("🔐 Senha do sudo: ") or None
+
+    def load_scalable_distributions(self):
+        """Carrega distribuições com busca automática de versões"""
+        # Tenta carregar de arquivo externo primeiro (via snapshot binário)
+        if self.distributions_snapshot.json_path.exists():
+            try:
+                loaded_data, self._loaded_catalog = self.distributions_snapshot.load()
+                return loaded_data
+            except Exception:
+                self._loaded_catalog = None
+
+        # Estrutura base com suporte a múltiplas arquiteturas
+        distributions_data = {
+            "Ubuntu": {
+                "family": "ubuntu",
+                "checksum_type": "sha256",
+                "variants": {
+                    "Desktop": {
+                        "architectures": ["amd64", "arm64"]
+                    },
+                    "Server": {
+                        "architectures": ["amd64", "arm64", "ppc64el", "s390x"]
+                    }
+                }
+            },
+            "Debian": {
+                "family": "debian",
+                "checksum_type": "sha512", 
+                "variants": {
+                    "Netinst": {
+                        "architectures": ["amd64", "i386", "arm64", "armhf"]
+                    },
+                    "Live": {
+                        "architectures": ["amd64", "i386", "arm64"]
+                    }
+                }
+            },
+            "Linux Mint": {
+                "family": "mint",
+                "checksum_type": "sha256",
+                "variants": {
+                    "Cinnamon": {"architectures": ["64bit"]},
+                    "Mate": {"architectures": ["64bit"]},
+                    "Xfce": {"architectures": ["64bit"]}
+                }
+            },
+            "Fedora": {
+                "family": "fedora", 
+                "checksum_type": "sha256",
+                "variants": {
+                    "Workstation": {"architectures": ["x86_64", "aarch64"]},
+                    "Server": {"architectures": ["x86_64", "aarch64"]}
+                }
+            },
+            "Arch Linux": {
+                "family": "arch",
+                "checksum_type": "sha256", 
+                "variants": {
+                    "Standard": {"architectures": ["x86_64"]}
+                }
+            },
+            "Kali Linux": {
+                "family": "security",
+                "checksum_type": "sha256",
+                "variants": {
+                    "Live": {"architectures": ["amd64", "i386"]}
+                }
+            },
+            "Manjaro": {
+                "family": "arch",
+                "checksum_type": "sha256",
+                "variants": {
+                    "XFCE": {"architectures": ["x86_64"]},
+                    "KDE": {"architectures": ["x86_64"]},
+                    "GNOME": {"architectures": ["x86_64"]}
+                }
+            },
+            "openSUSE": {
+                "family": "suse", 
+                "checksum_type": "sha256",
+                "variants": {
+                    "Leap": {"architectures": ["x86_64", "aarch64"]},
+                    "Tumbleweed": {"architectures": ["x86_64", "aarch64"]}
+                }
+            },
+
+            # DISTRIBUIÇÕES ATUAIS COM SUPORTE 32-BIT (NOVAS)
+            "MX Linux": {
+                "family": "debian",
+                "checksum_type": "sha256",
+                "variants": {
+                    "XFCE": {"architectures": ["amd64", "i386"]},
+                    "KDE": {"architectures": ["amd64", "i386"]}
+                }
+            },
+            "antiX": {
+                "family": "debian", 
+                "checksum_type": "sha256",
+                "variants": {
+                    "Full": {"architectures": ["amd64", "i386"]},
+                    "Base": {"architectures": ["amd64", "i386"]}
+                }
+            },
+            "Puppy Linux": {
+                "family": "independent",
+                "checksum_type": "sha256", 
+                "variants": {
+                    "Fossapup": {"architectures": ["amd64", "i686"]}
+                }
+            }
+        }
+
+        # As versões são buscadas sob demanda ao abrir a família (resolve_versions)
+        return distributions_data
+
+    def fetch_versions(self, distro_name, distro_data, force=False, prefetched=None):
+        """Busca as versões de uma distribuição sem alterar o catálogo
+
+        O provedor é o registrado com o nome da distribuição, ou o indicado pela
+        chave "version_provider" do JSON. Retorna None quando não há provedor e
+        o catálogo já traz versões estáticas (ex.: entradas adicionadas à mão).
+        """
+        if self.offline_mode:
+            versions = self.offline_bundle.versions(distro_name) if self.offline_bundle else None
+            if versions:
+                return list(versions)
+            if self.has_static_versions(distro_data):
+                return None
+            return self.get_fallback_versions(distro_name)
+
+        provider_name = distro_data.get("version_provider", distro_name)
+        if self.version_resolver.has_provider(provider_name):
+            if prefetched is not None and provider_name in prefetched:
+                versions = prefetched[provider_name]
+            else:
+                versions = self.version_resolver.fetch(provider_name, force=force)
+            if versions:
+                return versions
+        elif self.has_static_versions(distro_data):
+            return None
+
+        return self.get_fallback_versions(distro_name)
+
+    def has_static_versions(self, distro_data):
+        """Verifica se todas as arquiteturas já possuem versões definidas"""
+        variants = distro_data.get("variants", {})
+        if not variants:
+            return False
+        for variant_data in variants.values():
+            architectures = variant_data.get("architectures")
+            if not isinstance(architectures, dict) or not architectures:
+                return False
+            if not all(arch_data.get("versions") for arch_data in architectures.values()):
+                return False
+        return True
+
+    def version_is_fresh(self, distro_name):
+        """Indica se as versões memoizadas ainda estão dentro do prazo de validade"""
+        cached = self.version_cache.get(distro_name)
+        return bool(cached) and time.time() - cached[0] < self.version_cache_ttl
+
+    def versions_ready(self, distro_name):
+        """Indica se a distribuição já teve as versões resolvidas ao menos uma vez"""
+        return distro_name in self.version_cache
+
+    def _store_versions(self, distro_name, versions):
+        with self._catalog_lock:
+            self.version_cache[distro_name] = (time.time(), versions)
+            if versions is not None:
+                # Um único conjunto de versões por família, compartilhado por todas as arquiteturas
+                self.catalog.set_family_versions(distro_name, versions)
+                self.search_index.replace_family(
+                    distro_name,
+                    self.catalog.iter_builds(family=distro_name, include_unversioned=True),
+                )
+
+    def _store_all_versions(self, resolved):
+        for family, versions in resolved.items():
+            self._store_versions(family, versions)
+
+    def resolve_versions(self, distro_name, force=False):
+        """Resolve de forma síncrona as versões de uma distribuição (com memoização)"""
+        if not force and self.version_is_fresh(distro_name):
+            return self.version_cache[distro_name][1]
+
+        distro_data = self.distributions.get(distro_name)
+        if distro_data is None:
+            return None
+
+        versions = self.fetch_versions(distro_name, distro_data, force=force)
+        self.ui_call(self._store_versions, distro_name, versions)
+        return versions
+
+    def resolve_all_versions(self, force=False):
+        """Resolve as versões de todas as famílias, com os provedores rodando em paralelo
+
+        A busca roda na thread de quem chama; o catálogo só muda na thread da
+        interface (ui_call), de uma vez.
+        """
+        pending = [
+            family for family in self.catalog.families()
+            if force or not self.version_is_fresh(family)
+        ]
+        provider_names = {
+            self.distributions[family].get("version_provider", family) for family in pending
+        }
+        prefetched = {} if self.offline_mode else self.version_resolver.fetch_many(
+            [name for name in provider_names if self.version_resolver.has_provider(name)],
+            force=force,
+        )
+        resolved = {
+            family: self.fetch_versions(family, self.distributions[family], prefetched=prefetched)
+            for family in pending
+        }
+        self.ui_call(self._store_all_versions, resolved)
+
+    def resolve_versions_async(self, distro_name, callback=None):
+        """Resolve as versões em segundo plano; o callback roda na thread do Tk"""
+        if self.version_is_fresh(distro_name):
+            if callback:
+                callback(distro_name)
+            return
+
+        if callback:
+            self._version_callbacks.setdefault(distro_name, []).append(callback)
+        if distro_name in self._versions_loading:
+            return
+
+        distro_data = self.distributions.get(distro_name)
+        if distro_data is None:
+            return
+        self._versions_loading.add(distro_name)
+
+        def finish(versions):
+            self._versions_loading.discard(distro_name)
+            self._store_versions(distro_name, versions)
+            for pending in self._version_callbacks.pop(distro_name, []):
+                pending(distro_name)
+
+        def worker():
+            versions = self.fetch_versions(distro_name, distro_data)
+            self.ui_call(finish, versions, wait=False)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def get_fallback_versions(self, distro_name):
+        """Versões estáticas usadas quando a busca automática falha"""
+        fallback_versions = {
+            "Ubuntu": ["25.10", "24.04 LTS", "23.10", "22.04 LTS", "20.04 LTS"],
+            "Debian": ["12.4.0", "11.9.0", "10.13.0"],
+            "Linux Mint": ["21.3", "21.2", "21.1", "20.3", "20.2"],
+            "Fedora": ["39", "38", "37", "36", "35"],
+            "Manjaro": ["23.1", "22.1", "21.3", "21.2", "21.1"],
+            "openSUSE": ["15.6", "15.5", "15.4", "15.3", "15.2"],
+            "MX Linux": ["23.1", "21.3", "21.2", "21.1", "19.4"],
+            "antiX": ["23", "22", "21", "19", "17"],
+            "Puppy Linux": ["9.5", "9.0", "8.0", "7.5", "6.0"],
+            "Kali Linux": ["weekly", "2023.3", "2023.2", "2023.1", "2022.4"]
+        }
+
+        return fallback_versions.get(distro_name, ["latest"])
+
+    def check_dependencies(self):
+        """Verifica se as dependências estão instaladas"""
+        dependencies = {
+            'pv': 'Pipe Viewer - para mostrar progresso',
+            'dd': 'Disk Dump - para gravação de discos',
+            'parted': 'Particionamento de discos',
+            'mkfs.fat': 'Formatação FAT32',
+            'mkfs.vfat': 'Formatação VFAT (alternativa)',
+            'fdisk': 'Particionamento alternativo',
+            'wipefs': 'Limpeza de assinaturas'
+        }
+        
+        missing = []
+        for dep, desc in dependencies.items():
+            if not shutil.which(dep):
+                missing.append(f"{dep} ({desc})")
+        
+        if missing and self.partition_backend == "native":
+            # Particionamento e FAT32/exFAT são feitos em Python; essas ferramentas viram só fallback
+            native = {'parted', 'mkfs.fat', 'mkfs.vfat', 'fdisk', 'wipefs'}
+            optional = [dep for dep in missing if dep.split()[0] in native]
+            if optional:
+                self.log(f"ℹ️ Opcionais (backend nativo ativo): {', '.join(dep.split()[0] for dep in optional)}")
+            missing = [dep for dep in missing if dep not in optional]
+
+        if missing:
+            self.log("⚠️  Dependências ausentes:")
+            for dep in missing:
+                self.log(f"   ❌ {dep}")
+            
+            if 'parted' in str(missing) or 'mkfs.fat' in str(missing):
+                self.log("💡 Para instalar as dependências no Ubuntu/Debian:")
+                self.log("   sudo apt install parted dosfstools pv")
+            if 'fdisk' in str(missing):
+                self.log("   sudo apt install fdisk")
+        else:
+            self.log("✅ Todas dependências encontradas!")
+
+    def save_distributions_to_file(self):
+        """Salva as distribuições em arquivo JSON para edição externa"""
+        config_file = self.distributions_snapshot.json_path
+
+        # Cópia sob a trava do catálogo: feed e resolução de versões mexem no dicionário em outras threads
+        with self._catalog_lock:
+            distributions = copy.deepcopy(self.distributions)
+        content = json.dumps(distributions, indent=2, ensure_ascii=False).encode("utf-8")
+        try:
+            unchanged = config_file.read_bytes() == content
+        except OSError:
+            unchanged = False
+
+        # Só regrava quando o catálogo realmente mudou
+        if not unchanged:
+            atomic_write_bytes(config_file, content)
+            self.distributions_snapshot.store(distributions)
+
+        return config_file
+
+    def get_version_info(self, family, variant, arch, version):
+        """Metadados opcionais de uma versão guardados no JSON (ex.: codename)"""
+        try:
+            architectures = self.distributions[family]["variants"][variant]["architectures"]
+            return architectures[arch]["versions"][version] or {}
+        except (KeyError, TypeError):
+            return {}
+
+    def build_download_url(self, family, variant, arch, version):
+        """Constrói URLs para múltiplas arquiteturas"""
+        try:
+            if self.offline_mode:
+                entry = self.offline_bundle.lookup(family, variant, arch, version) if self.offline_bundle else None
+                if entry:
+                    return entry["url"], entry["filename"]
+                self.log(f"⚠️ Modo offline: {family} {variant} {version} {arch} não está no pacote")
+
+            if not self.url_resolver.has_template(family, variant, arch):
+                self.log(f"❌ Template não encontrado para {family} {variant} {arch}")
+                return None, None
+
+            # Processa a versão
+            clean_version = version.replace(" LTS", "").strip()
+            
+            # ✅ CORREÇÃO INTELIGENTE: Testa múltiplas versões
+            test_versions = self.get_possible_versions(family, clean_version)
+            
+            for test_version in test_versions:
+                test_url = self.url_resolver.resolve(family, variant, arch, test_version)
+                
+                # Verifica se a URL existe
+                if self.url_exists(test_url):
+                    self.log(f"✅ URL válida encontrada: {test_url}")
+                    filename = self.url_resolver.filename_for(test_url)
+                    return test_url, filename
+            
+            # Se nenhuma versão funcionou, usa a primeira como fallback
+            final_url = self.url_resolver.resolve(family, variant, arch, test_versions[0])
+            filename = self.url_resolver.filename_for(final_url)
+            self.log(f"⚠️  Usando URL fallback: {final_url}")
+            return final_url, filename
+            
+        except Exception as e:
+            self.log(f"❌ Erro ao construir URL: {e}")
+            return None, None
+
+    def get_possible_versions(self, family, base_version):
+        """Retorna possíveis versões para testar"""
+        if family == "Ubuntu" and base_version == "25.10":
+            return ["25.10", "25.10.1"]  # Testa versão base e possível point release
+        elif family == "Ubuntu" and base_version == "24.04":
+            return ["24.04.3", "24.04.2", "24.04.1", "24.04"]
+        elif family == "Ubuntu" and base_version == "22.04":
+            return ["22.04.4", "22.04.3", "22.04.2", "22.04.1", "22.04"]
+        else:
+            return [base_version]
+
+    def url_exists(self, url):
+        """Verifica se uma URL existe"""
+        if self.offline_mode:
+            return False
+        try:
+            import requests  # carregado só quando há rede a acessar
+            response = requests.head(url, timeout=10, allow_redirects=True)
+            return response.status_code == 200
+        except:
+            return False
+
+    def format_usb_device(self, device):
+        """Texto exibido na lista para um registro de dispositivo"""
+        label = " ".join(part for part in (device.get("vendor"), device.get("model")) if part) or "USB Device"
+        display = f"{device['path']} - {format_size(device.get('size', 0))} - {label}"
+        if device.get("transport") and device["transport"] != "usb":
+            display += f" [{device['transport']}]"
+        if device.get("mountpoints"):
+            display += f" (Montado em {', '.join(device['mountpoints'])})"
+        return display
+
+    def detect_usb_windows(self):
+        """Detecta USB no Windows"""
+        usb_devices = []
+        detected_paths = set()
+
+        try:
+            ps_command = """
+            Get-WmiObject -Class Win32_LogicalDisk | 
+            Where-Object { $_.DriveType -eq 2 } | 
+            Select-Object DeviceID, Size, VolumeName, FileSystem |
+            ForEach-Object { 
+                $sizeGB = if($_.Size) { [math]::Round($_.Size/1GB, 2) } else { "Unknown" }
+                "$($_.DeviceID) - ${sizeGB}GB - $($_.VolumeName) - $($_.FileSystem)"
+            }
+            """
+
+            result = subprocess.run(
+                ["powershell", "-Command", ps_command],
+                capture_output=True,
+                text=True,
+                encoding="utf-8",
+                timeout=10,
+            )
+
+            if result.returncode == 0:
+                for line in result.stdout.split("\n"):
+                    line = line.strip()
+                    if line and not line.startswith("---") and " - " in line:
+                        drive_letter = line.split(" - ")[0].strip()
+                        if drive_letter not in detected_paths:
+                            detected_paths.add(drive_letter)
+                            usb_devices.append({
+                                "id": drive_letter,
+                                "name": drive_letter,
+                                "path": drive_letter,
+                                "display": line,
+                            })
+
+        except Exception as e:
+            self.log(f"⚠️ Erro na detecção Windows: {e}")
+
+        return usb_devices
+
+    def detect_usb_linux(self, names=None):
+        """Detecta USB no Linux lendo o sysfs (opcionalmente só os discos informados)"""
+        usb_devices = []
+        try:
+            for device in enumerate_block_devices(names=names):
+                if is_usb_target(device):
+                    device["display"] = self.format_usb_device(device)
+                    usb_devices.append(device)
+        except Exception as e:
+            self.log(f"⚠️ Erro na detecção Linux: {e}")
+
+        return usb_devices
+
+    def detect_usb_devices(self):
+        """Detecta dispositivos USB de forma multiplataforma"""
+        system = platform.system().lower()
+        self.log("🔍 Procurando dispositivos USB...")
+
+        if system == "windows":
+            return self.detect_usb_windows()
+        elif system == "linux":
+            return self.detect_usb_linux()
+        else:
+            self.log("❌ Sistema operacional não suportado")
+            return []
+
+    def download_file(self, url, filename, progress_weight=1.0):
+        """Faz download de um arquivo com barra de progresso e suporte a cancelamento
+
+        Baixa para <nome>.part e só renomeia depois de conferir o tamanho: um
+        download interrompido nunca deixa um arquivo truncado com o nome final.
+        """
+        local_path = self.download_dir / filename
+        part_path = local_path.with_name(filename + ".part")
+        self.should_cancel = False
+
+        if self.offline_mode:
+            if local_path.is_file():
+                self.log(f"📦 Usando ISO local (modo offline): {filename}")
+                return local_path
+            raise RuntimeError(f"Modo offline: {filename} não foi importada com o pacote")
+
+        try:
+            self.log(f"⬇️ Iniciando download: {filename}")
+            self.log(f"🔗 URL: {url}")
+
+            import requests  # carregado só quando há rede a acessar
+            response = requests.get(url, stream=True, timeout=30)
+            response.raise_for_status()
+
+            total_size = int(response.headers.get("content-length", 0))
+            downloaded_size = 0
+
+            with open(part_path, "wb") as file:
+                for chunk in response.iter_content(chunk_size=8192):
+                    # ✅ VERIFICA CANCELAMENTO
+                    if self.should_cancel:
+                        break
+                        
+                    if chunk:
+                        file.write(chunk)
+                        downloaded_size += len(chunk)
+
+                        if total_size > 0:
+                            download_progress = (downloaded_size / total_size) * 100
+                            self.set_progress(download_progress * progress_weight)
+
+            if self.should_cancel:
+                self.log("⏹️ Download cancelado pelo usuário")
+                part_path.unlink(missing_ok=True)  # Remove arquivo incompleto
+                return None
+
+            if total_size > 0 and downloaded_size != total_size:
+                raise IOError(f"download incompleto ({downloaded_size} de {total_size} bytes)")
+            os.replace(part_path, local_path)
+            self.log(f"✅ Download concluído: {filename}")
+            return local_path
+
+        except Exception as e:
+            self.log(f"❌ Erro no download: {e}")
+            part_path.unlink(missing_ok=True)  # Remove arquivo incompleto em caso de erro
+            raise
+
+    # === ATUALIZAÇÃO DO CATÁLOGO ===
+    def load_feed_state(self):
+        """Lê a origem do feed e a última revisão aplicada"""
+        try:
+            with open(self.config_dir / "catalog_feed.json", "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if isinstance(state, dict):
+                return {"source": state.get("source"), "revision": int(state.get("revision", 0))}
+        except (OSError, ValueError):
+            pass
+        return {"source": None, "revision": 0}
+
+    def save_feed_state(self):
+        content = json.dumps(self.feed_state, indent=2, ensure_ascii=False).encode("utf-8")
+        atomic_write_bytes(self.config_dir / "catalog_feed.json", content)
+
+    def fetch_catalog_updates(self, source=None):
+        """Baixa do feed as mudanças desde a última revisão (pode rodar fora da thread do Tk)"""
+        source = source or self.feed_state.get("source")
+        if not source:
+            raise ValueError("Nenhum feed de catálogo configurado")
+        if self.offline_mode and urlparse(str(source)).scheme in ("http", "https"):
+            raise ValueError("Modo offline ativo: use um feed em diretório local")
+        revision = self.feed_state["revision"] if source == self.feed_state.get("source") else 0
+        update = CatalogFeedClient(source).fetch_updates(revision)
+        update["source"] = source
+        return update
+
+    def apply_catalog_update(self, update):
+        """Aplica as mudanças do feed ao catálogo em memória e em disco
+
+        Retorna (alteradas, removidas): só essas famílias têm catálogo, índice de
+        busca, cache de versões e templates de URL refeitos.
+        """
+        # Mesma trava da resolução de versões e do salvamento (que copia o dicionário)
+        with self._catalog_lock:
+            removed_families = list(update["removed"])
+            if update["full"]:
+                removed_families += [family for family in self.distributions if family not in update["upserts"]]
+
+            removed = []
+            for family in removed_families:
+                if self.distributions.pop(family, None) is not None:
+                    self.catalog.remove_family(family)
+                    self.search_index.remove_family(family)
+                    removed.append(family)
+
+            changed = []
+            for family, family_data in update["upserts"].items():
+                if not isinstance(family_data, dict) or not isinstance(family_data.get("variants", {}), dict):
+                    self.log(f"⚠️ Feed: dados inválidos para {family}, ignorando")
+                    continue
+                if self.distributions.get(family) == family_data:
+                    continue
+                self.distributions[family] = family_data
+                self.catalog.replace_family(family, family_data)
+                self.search_index.replace_family(
+                    family, self.catalog.iter_builds(family=family, include_unversioned=True)
+                )
+                changed.append(family)
+
+            for family in changed + removed:
+                self.version_cache.pop(family, None)
+                self.url_resolver.invalidate(family)
+
+        if changed or removed:
+            self.save_distributions_to_file()
+        self.feed_state = {"source": update["source"], "revision": update["revision"]}
+        self.save_feed_state()
+        return changed, removed
+
+    def update_catalog(self, source=None):
+        """Sincroniza o catálogo com o feed de forma bloqueante (modo sem interface)"""
+        update = self.fetch_catalog_updates(source)
+        changed, removed = self.apply_catalog_update(update)
+        self.log(
+            f"🔄 Catálogo na revisão {update['revision']}: {len(changed)} família(s) alterada(s), "
+            f"{len(removed)} removida(s), {update['bytes'] / 1024:.1f} KB lidos"
+        )
+        return changed, removed
+
+    # === PACOTE OFFLINE ===
+    def load_offline_mode(self):
+        try:
+            with open(self.config_dir / "offline.json", "r", encoding="utf-8") as f:
+                return bool(json.load(f).get("enabled"))
+        except (OSError, ValueError, AttributeError):
+            return False
+
+    def set_offline_mode(self, enabled):
+        """Liga/desliga o modo offline e guarda a escolha"""
+        self.offline_mode = bool(enabled)
+        atomic_write_bytes(self.config_dir / "offline.json",
+                           json.dumps({"enabled": self.offline_mode}).encode("utf-8"))
+        if self.offline_mode:
+            self.log("✈️ Modo offline ativado: sem acesso à rede, tudo vem do pacote importado")
+        else:
+            self.log("🌐 Modo offline desativado")
+
+    def export_offline_bundle(self, path, builds=None, include_isos=False):
+        """Gera o pacote offline (precisa de rede para resolver versões e URLs)
+
+        Sem builds, exporta a versão mais recente de cada combinação do catálogo.
+        ISOs já presentes na pasta de downloads entram nos manifestos de checksum
+        e, com include_isos, no próprio pacote.
+        """
+        if builds is None:
+            builds = self.list_catalog_builds(latest_only=True)
+        else:
+            self.resolve_all_versions()
+
+        entries = []
+        for family, variant, arch, version in builds:
+            url, filename = self.build_download_url(family, variant, arch, version)
+            if not url:
+                self.log(f"⚠️ [pacote] Ignorando {family} {variant} {arch} {version}: URL indisponível")
+                continue
+            entries.append({
+                "family": family,
+                "variant": variant,
+                "arch": arch,
+                "version": version,
+                "url": url,
+                "filename": filename,
+                "checksum_type": self.distributions.get(family, {}).get("checksum_type", "sha256"),
+            })
+
+        versions = {
+            family: cached[1] for family, cached in self.version_cache.items()
+            if cached[1] is not None
+        }
+        bundle = OfflineBundle.export(
+            path, self.distributions, versions, entries, self.download_dir,
+            include_isos=include_isos, catalog_revision=self.feed_state["revision"], log=self.log,
+        )
+        isos = sum(1 for entry in bundle.builds() if entry["iso"])
+        self.log(f"✅ Pacote offline gerado: {path} ({len(entries)} build(s), {isos} ISO(s))")
+        return bundle
+
+    def import_offline_bundle(self, path):
+        """Extrai e valida o pacote (pode rodar fora da thread do Tk)"""
+        self.log(f"📦 Importando pacote offline: {path}")
+        return OfflineBundle.import_bundle(path, self.offline_dir, self.download_dir, log=self.log)
+
+    def apply_offline_bundle(self, bundle):
+        """Carrega o catálogo e as versões do pacote e ativa o modo offline"""
+        self.offline_bundle = bundle
+        changed, removed = self.apply_catalog_update({
+            "revision": bundle.index.get("catalog_revision", self.feed_state["revision"]),
+            "source": self.feed_state.get("source"),
+            "upserts": bundle.distributions,
+            "removed": [],
+            "full": True,
+        })
+        self.set_offline_mode(True)
+        for family in self.catalog.families():
+            self.version_cache.pop(family, None)
+        self.log(f"✅ Pacote importado: {len(bundle.builds())} build(s) disponíveis offline")
+        return changed, removed
+
+    # === DOWNLOAD EM LOTE ===
+    def list_catalog_builds(self, latest_only=False):
+        """Lista as combinações (família, variante, arquitetura, versão) do catálogo"""
+        self.resolve_all_versions()
+        return self.ui_call(self._catalog_builds, latest_only)
+
+    def _catalog_builds(self, latest_only):
+        with self._catalog_lock:
+            return list(self.catalog.iter_builds(latest_only=latest_only))
+
+    def parse_build_spec(self, spec):
+        """Converte 'Família:Variante:Arquitetura:Versão' em tupla (versão vazia = mais recente)"""
+        parts = [part.strip() for part in spec.split(":")]
+        if len(parts) == 3:
+            parts.append("")
+        if len(parts) != 4:
+            raise ValueError(f"Especificação inválida: {spec}")
+
+        family, variant, arch, version = parts
+        if not self.catalog.has_build(family, variant, arch):
+            raise ValueError(f"Combinação não encontrada no catálogo: {spec}")
+        self.resolve_versions(family)
+        versions = self.catalog.versions(family, variant, arch)
+
+        if not version:
+            if not versions:
+                raise ValueError(f"Nenhuma versão disponível para: {spec}")
+            version = versions[0]
+        elif version not in versions:
+            raise ValueError(f"Versão '{version}' não encontrada para: {spec}")
+
+        return family, variant, arch, version
+
+    def create_batch_scheduler(self, max_concurrent=4, max_per_host=2):
+        """Cria o agendador de lote compartilhando o cache de downloads"""
+        return BatchDownloadScheduler(
+            self.download_dir,
+            max_concurrent=max_concurrent,
+            max_per_host=max_per_host,
+            log=self.log,
+        )
+
+    def queue_batch_downloads(self, scheduler, builds):
+        """Resolve as URLs e enfileira os downloads; a ordem da lista define a prioridade"""
+        queued = []
+        for index, build in enumerate(builds):
+            family, variant, arch, version = build
+            url, filename = self.build_download_url(family, variant, arch, version)
+            if not url:
+                self.log(f"⚠️ [lote] Ignorando {family} {variant} {arch} {version}: URL indisponível")
+                continue
+            if self.offline_mode and not (self.download_dir / filename).is_file():
+                self.log(f"⚠️ [lote] Modo offline: {filename} não está disponível localmente")
+                continue
+            job = scheduler.submit(
+                url,
+                filename,
+                priority=len(builds) - index,
+                label=f"{family} {variant} {version} {arch}",
+            )
+            queued.append(job)
+        return queued
+
+    def run_batch_download(self, builds, max_concurrent=4, max_per_host=2):
+        """Executa um lote de downloads de forma bloqueante, sem interface gráfica"""
+        scheduler = self.create_batch_scheduler(max_concurrent, max_per_host)
+        self.queue_batch_downloads(scheduler, builds)
+        scheduler.start()
+        scheduler.close()
+
+        while True:
+            snapshot = scheduler.snapshot()
+            if snapshot["finished"]:
+                break
+            done = snapshot["states"].get("done", 0) + snapshot["states"].get("cached", 0)
+            print(
+                f"📥 {snapshot['percent']:.1f}% - {done}/{len(snapshot['jobs'])} arquivo(s) - "
+                f"{snapshot['downloaded_bytes'] / (1024**2):.0f} MB"
+            )
+            time.sleep(2)
+
+        return scheduler.wait()
+
+    def load_format_stats(self):
+        """Tempo médio das formatações já feitas (para estimar a economia ao pulá-las)"""
+        try:
+            with open(self.config_dir / "format_stats.json", "r", encoding="utf-8") as f:
+                stats = json.load(f)
+            return {"samples": int(stats["samples"]), "average": float(stats["average"])}
+        except (OSError, ValueError, KeyError, TypeError):
+            return {"samples": 0, "average": 0.0}
+
+    def record_format_time(self, seconds):
+        stats = self.format_stats
+        stats["samples"] += 1
+        # Média móvel: as últimas ~20 formatações pesam mais que o histórico antigo
+        stats["average"] += (seconds - stats["average"]) / min(stats["samples"], 20)
+        content = json.dumps(stats, indent=2).encode("utf-8")
+        try:
+            atomic_write_bytes(self.config_dir / "format_stats.json", content)
+        except OSError:
+            pass
+
+    def prepare_raw_write(self, iso_path, device):
+        """Pula a formatação quando a imagem traz a própria tabela de partições
+
+        Retorna True se o dispositivo já está pronto para a gravação bruta;
+        False quando ele ainda deve passar por format_usb.
+        """
+        try:
+            info = inspect_disk_image(iso_path)
+        except OSError as e:
+            self.log(f"⚠️ Não foi possível inspecionar a imagem: {e}")
+            return False
+
+        if info["kind"] not in ("hybrid", "disk"):
+            if info["kind"] == "iso":
+                self.log("⚠️ ISO sem tabela de partições (não híbrida): pode não iniciar a partir do USB")
+            return False
+
+        kind = "híbrida" if info["kind"] == "hybrid" else "de disco"
+        self.log(f"⏩ Imagem {kind} ({info['label'].upper()}, {info['partitions']} partição(ões)): formatação pulada")
+        start = time.perf_counter()
+        self.unmount_all_partitions(device)
+        if platform.system().lower() == "linux":
+            try:
+                helper = self.get_privileged_helper() if os.geteuid() != 0 else None
+                mode = helper.call("discard", device=device) if helper is not None else discard_device(device)
+                self.log("   🧹 Dispositivo descartado (TRIM)" if mode == "discard"
+                         else "   🧹 Fim do disco zerado (GPT de backup antiga)")
+            except (OSError, RuntimeError) as e:
+                self.log(f"   ⚠️ Descarte ignorado: {e}")
+        elapsed = time.perf_counter() - start
+
+        if self.format_stats["samples"]:
+            saved = self.format_stats["average"] - elapsed
+            self.log(f"   ⏱️ Preparação em {elapsed * 1000:.0f} ms; economia estimada de {saved:.1f}s "
+                     f"(média de {self.format_stats['samples']} formatação(ões))")
+        else:
+            self.log(f"   ⏱️ Preparação em {elapsed * 1000:.0f} ms (sem formatação)")
+        return True
+
+    def format_usb(self, device):
+        """Formata o dispositivo USB - VERSÃO FINAL ROBUSTA"""
+        self.log(f"💾 Iniciando formatação de {device}...")
+
+        try:
+            system = platform.system().lower()
+
+            if system == "windows":
+                drive_letter = device
+                self.log(f"💾 Formatando unidade {drive_letter}...")
+
+                cmd = f"format {drive_letter} /FS:FAT32 /Q /Y"
+                process = subprocess.run(
+                    cmd, shell=True, capture_output=True, text=True
+                )
+
+                if process.returncode == 0:
+                    self.log("✅ Formatação concluída com sucesso!")
+                    return True
+                else:
+                    self.log(f"❌ Erro na formatação: {process.stderr}")
+                    return False
+
+            else:
+                # ✅ CORREÇÃO: Verifica permissão sudo
+                needs_sudo = os.geteuid() != 0
+                
+                if needs_sudo and not self.sudo_password:
+                    if not self.check_sudo_permission():
+                        self.log("❌ Permissão de superusuário necessária para formatação")
+                        return False
+
+                # ✅ CORREÇÃO: Tenta métodos em ordem de confiabilidade
+                format_start = time.perf_counter()
+                success = False
+                if self.partition_backend == "native":
+                    self.log("🔄 Tentando método nativo...")
+                    success = self.format_usb_native(device)
+                    if not success:
+                        self.log("🔄 Método nativo falhou, recorrendo ao parted...")
+
+                if not success:
+                    self.log("🔄 Tentando método simples...")
+                    success = self.format_usb_simple(device)
+
+                if not success:
+                    self.log("🔄 Método simples falhou, tentando alternativo...")
+                    success = self.format_usb_alternative(device)
+
+                if not success:
+                    # ✅ Última tentativa: método manual com partprobe
+                    self.log("🔄 Tentando método manual...")
+                    success = self.format_usb_manual(device)
+
+                if success:
+                    self.record_format_time(time.perf_counter() - format_start)
+                return success
+
+        except Exception as e:
+            self.log(f"❌ Erro na formatação: {e}")
+            return False
+
+    def _format_step(self, timings, label, tool, device, input_text=None, **options):
+        """Executa um passo da formatação (ferramenta de disco) e registra seu tempo de parede"""
+        start = time.perf_counter()
+        success, stdout, stderr = self.run_disk_tool(tool, device, input_text, **options)
+        timings.append((label, time.perf_counter() - start))
+        return success, stderr
+
+    def _reread_partition_table(self, timings, device):
+        """Pede ao kernel para reler a tabela de partições"""
+        success, _ = self._format_step(timings, "partprobe", "partprobe", device)
+        if not success:
+            self._format_step(timings, "blockdev --rereadpt", "rereadpt", device)
+
+    def _wait_partition_step(self, timings, device, timeout=10.0):
+        """Aguarda a partição 1 ficar pronta; relê a tabela se o kernel demorar
+
+        Cada intervalo entra uma vez só em timings: a espera, a releitura
+        (partprobe) e a segunda espera são passos separados.
+        """
+        start = time.perf_counter()
+        ready = wait_for_partition(device, 1, timeout=1.5)
+        timings.append(("aguardar partição", time.perf_counter() - start))
+        if not ready:
+            self._reread_partition_table(timings, device)
+            remaining = max(0.0, timeout - (time.perf_counter() - start))
+            start = time.perf_counter()
+            ready = wait_for_partition(device, 1, timeout=remaining)
+            timings.append(("aguardar partição (após releitura)", time.perf_counter() - start))
+        if not ready:
+            self.log(f"❌ {partition_path(device, 1)} não apareceu em {timeout:.0f}s")
+        return ready
+
+    def _log_format_timings(self, timings):
+        """Mostra o tempo de cada passo da formatação"""
+        for label, elapsed in timings:
+            self.log(f"   ⏱️ {label}: {elapsed * 1000:.0f} ms")
+        self.log(f"   ⏱️ Total: {sum(elapsed for _, elapsed in timings) * 1000:.0f} ms")
+
+    def format_usb_native(self, device, label=None):
+        """Cria tabela de partições e sistema de arquivos em Python (sem parted/sfdisk/mkfs)"""
+        try:
+            label = label or self.partition_label
+            self.log(f"💾 Método nativo ({label.upper()}) para {device}...")
+
+            try:
+                device_fd = self.open_device(device, write=True)
+            except (OSError, RuntimeError) as e:
+                self.log(f"⚠️ Sem acesso de escrita ao dispositivo: {e}")
+                return False
+
+            timings = []
+            fs_type = self.filesystem
+            if fs_type == "auto":
+                fs_type = "exfat" if self.get_device_size(device) > 32 * 1024**3 else "fat32"
+
+            # O tipo da partição já segue fs_type (0x07 no exFAT): a alternativa externa tem de criar o mesmo
+            fallback_fstype = "exfat" if fs_type == "exfat" else "vfat"
+            fallback_tool = f"mkfs.{fallback_fstype}"
+            formatted = False
+            try:
+                start = time.perf_counter()
+                sector_size = logical_sector_size(device_fd)
+                partitions = write_partition_table(device_fd, label, fs_type=fs_type, rescan=False,
+                                                   sector_size=sector_size)
+                timings.append((f"tabela {label}", time.perf_counter() - start))
+                partition = partitions[0]
+                self.log(f"   📝 Partição 1: setor {partition['start']} (setores de {sector_size} bytes), "
+                         f"{format_size(partition['size'] * sector_size)}")
+
+                # Formata pelo próprio disco (offset da partição): não precisa esperar o nó /dev
+                start = time.perf_counter()
+                try:
+                    info = FILESYSTEM_FORMATTERS[fs_type](
+                        device_fd, offset=partition['start'] * sector_size, size=partition['size'] * sector_size,
+                        label="USB_BOOT", erase_block=erase_block_size(device), sector_size=sector_size,
+                    )
+                    formatted = True
+                    self.log(f"   📝 {fs_type.upper()}: clusters de {format_size(info['cluster_size'])}, "
+                             f"{info['clusters']} clusters, {info['writes']} escrita(s) de até "
+                             f"{format_size(FORMAT_WRITE_CHUNK)}")
+                except (OSError, ValueError) as e:
+                    self.log(f"⚠️ Formatador nativo indisponível ({e}), usando {fallback_tool}")
+                timings.append((f"{fs_type} nativo", time.perf_counter() - start))
+            finally:
+                os.close(device_fd)
+
+            start = time.perf_counter()
+            try:
+                self.rescan_partitions(device)
+            except (OSError, RuntimeError) as e:
+                self.log(f"⚠️ BLKRRPART falhou ({e}), aguardando o kernel...")
+            timings.append(("BLKRRPART", time.perf_counter() - start))
+
+            if not self._wait_partition_step(timings, device):
+                self._log_format_timings(timings)
+                return False
+
+            success = formatted
+            if not formatted:
+                success, stderr = self._format_step(
+                    timings, fallback_tool, "mkfs", partition_path(device, 1), fstype=fallback_fstype, label="USB_BOOT",
+                )
+                if not success:
+                    self.log(f"❌ Erro no {fallback_tool}: {stderr}")
+
+            self._log_format_timings(timings)
+            if success:
+                self.log("✅ Formatação nativa concluída!")
+            return success
+
+        except Exception as e:
+            self.log(f"❌ Erro no método nativo: {e}")
+            return False
+
+    def format_usb_simple(self, device):
+        """Método mais simples e direto para formatação"""
+        try:
+            self.log(f"💾 Método simples de formatação para {device}...")
+            
+            needs_sudo = os.geteuid() != 0
+            
+            if needs_sudo and not self.sudo_password:
+                if not self.check_sudo_permission():
+                    return False
+            
+            timings = []
+            # ✅ CORREÇÃO: Apenas 3 comandos essenciais
+            steps = [
+                # 1. Limpa completamente o disco
+                ("wipefs", "wipefs", device, {}),
+                # 2. Cria partição única FAT32
+                ("parted mklabel", "parted", device, {"action": "mklabel-msdos"}),
+                ("parted mkpart", "parted", device, {"action": "mkpart-fat32"}),
+                # 3. Formata (depois de a partição existir)
+                ("mkfs.vfat", "mkfs", partition_path(device, 1), {"fstype": "vfat"}),
+            ]
+            
+            for i, (label, tool, target, options) in enumerate(steps):
+                self.log(f"   📝 Executando passo {i+1}/{len(steps)}...")
+                
+                if label == "mkfs.vfat" and not self._wait_partition_step(timings, device):
+                    self._log_format_timings(timings)
+                    return False
+                
+                success, stderr = self._format_step(timings, label, tool, target, **options)
+                if not success:
+                    self.log(f"❌ Erro no passo {i+1}: {stderr}")
+                    self._log_format_timings(timings)
+                    return False
+            
+            self._log_format_timings(timings)
+            self.log("✅ Formatação simples concluída!")
+            return True
+            
+        except Exception as e:
+            self.log(f"❌ Erro na formatação simples: {e}")
+            return False
+
+    def format_usb_alternative(self, device):
+        """Método alternativo de formatação usando sfdisk (NÃO INTERATIVO)"""
+        try:
+            self.log(f"🔄 Tentando método alternativo de formatação para {device}...")
+            
+            timings = []
+            # ✅ CORREÇÃO: Usa sfdisk que é não interativo
+            # Primeiro: limpa o dispositivo completamente
+            success, _ = self._format_step(timings, "wipefs", "wipefs", device)
+            
+            if not success:
+                self.log("⚠️ Aviso: Não foi possível limpar assinaturas completamente")
+            
+            # ✅ CORREÇÃO: Cria tabela de partições com sfdisk (não interativo)
+            # Script sfdisk para criar partição FAT32
+            sfdisk_script = f"""
+    label: dos
+    label-id: 0x{os.urandom(4).hex()}
+    device: {device}
+    unit: sectors
+
+    {partition_path(device, 1)} : start=2048, size=+, type=c, bootable
+    """
+            
+            success, _ = self._format_step(timings, "sfdisk", "sfdisk", device, input_text=sfdisk_script)
+            
+            if not success:
+                self.log("❌ Erro no sfdisk")
+                self._log_format_timings(timings)
+                return False
+            
+            if not self._wait_partition_step(timings, device):
+                self._log_format_timings(timings)
+                return False
+            
+            # ✅ CORREÇÃO: Formata a partição
+            success, _ = self._format_step(
+                timings, "mkfs.vfat", "mkfs", partition_path(device, 1), fstype="vfat", label="USB_BOOT",
+            )
+            
+            self._log_format_timings(timings)
+            if success:
+                self.log("✅ Formatação alternativa concluída com sucesso!")
+            else:
+                self.log("❌ Erro na formatação alternativa")
+            
+            return success
+            
+        except Exception as e:
+            self.log(f"❌ Erro no método alternativo: {e}")
+            return False
+
+    def format_usb_manual(self, device):
+        """Método manual como último recurso"""
+        try:
+            self.log(f"🔧 Método manual de formatação para {device}...")
+            
+            needs_sudo = os.geteuid() != 0
+            
+            if needs_sudo and not self.sudo_password:
+                if not self.check_sudo_permission():
+                    return False
+            
+            timings = []
+            # Passo 1: Garantir que não está montado
+            start = time.perf_counter()
+            self.unmount_all_partitions(device)
+            timings.append(("desmontagem", time.perf_counter() - start))
+            
+            # Passo 2: Limpar completamente
+            wipe_steps = [
+                ("dd (zera início)", "zero", {"mib": 10}),
+                ("wipefs", "wipefs", {}),
+            ]
+            
+            for label, tool, options in wipe_steps:
+                success, _ = self._format_step(timings, label, tool, device, **options)
+                if not success:
+                    self.log(f"⚠️ Aviso no passo: {label}")
+            
+            # Passo 3: Recarregar a tabela de partições e esperar o kernel soltar as antigas
+            self._reread_partition_table(timings, device)
+            start = time.perf_counter()
+            if not wait_for_partitions_cleared(device):
+                self.log("⚠️ O kernel ainda lista partições antigas, continuando...")
+            timings.append(("aguardar limpeza", time.perf_counter() - start))
+            
+            # Passo 4: Criar partição única
+            parted_steps = [
+                ("parted mklabel", "mklabel-msdos"),
+                ("parted mkpart", "mkpart-fat32"),
+            ]
+            
+            for label, action in parted_steps:
+                success, _ = self._format_step(timings, label, "parted", device, action=action)
+                if not success:
+                    self.log(f"❌ Erro no passo: {label}")
+                    self._log_format_timings(timings)
+                    return False
+            
+            # Passo 5: Esperar a partição (relê a tabela se necessário)
+            if not self._wait_partition_step(timings, device):
+                self._log_format_timings(timings)
+                return False
+            
+            # Passo 6: Formatar
+            success, _ = self._format_step(
+                timings, "mkfs.vfat", "mkfs", partition_path(device, 1), fstype="vfat", label="USB_BOOT",
+            )
+            
+            self._log_format_timings(timings)
+            if success:
+                self.log("✅ Formatação manual concluída!")
+            else:
+                self.log("❌ Formatação manual falhou")
+            
+            return success
+            
+        except Exception as e:
+            self.log(f"❌ Erro na formatação manual: {e}")
+            return False
+
+    def write_to_usb(self, iso_path, device, base_progress=0.0, progress_weight=1.0):
+        """Escreve a ISO no dispositivo USB - VERSÃO SEGURA COM VERIFICAÇÃO"""
+        self.log(f"🔥 Iniciando gravação SEGURA...")
+        self.log(f"   ISO: {os.path.basename(iso_path)}")
+        self.log(f"   Dispositivo: {device}")
+        
+        self.should_cancel = False
+
+        try:
+            # ✅ VERIFICAÇÃO DE SEGURANÇA: Processos ativos
+            self.log("🔒 Verificando segurança...")
+            if not self.kill_conflicting_dd_processes(device):
+                self.notify(
+                    "error",
+                    "Erro de Segurança", 
+                    "❌ Existem processos dd ativos gravando no mesmo dispositivo!\n\n"
+                    "Isso pode corromper o USB.\n\n"
+                    "Feche outros programas que possam estar usando o USB\n"
+                    "e tente novamente."
+                )
+                return False
+
+            system = platform.system().lower()
+            needs_sudo = (system != "windows" and os.geteuid() != 0)
+            
+            if needs_sudo and not self.sudo_password:
+                if not self.check_sudo_permission():
+                    return False
+
+            total_size = os.path.getsize(iso_path)
+            
+            self.log(f"📊 Tamanho ISO: {total_size / (1024**3):.2f} GB")
+            self.log("🔄 Iniciando gravação única...")
+
+            # ✅ dd sem privilégios: grava no descritor aberto pelo ajudante (stdout)
+            device_fd = self.open_device(device, write=True)
+            cmd = ['dd', f'if={iso_path}', 'bs=4M', 'status=progress', 'conv=fsync']
+            self.log(f"⚡ Executando: {' '.join(cmd)} > {device}")
+
+            # ✅ EXECUTA APENAS UM PROCESSO
+            try:
+                process = subprocess.Popen(
+                    cmd,
+                    stdout=device_fd,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                    bufsize=1,
+                    universal_newlines=True,
+                )
+            finally:
+                os.close(device_fd)  # o dd herdou sua cópia
+
+            self.current_process = process
+            
+            # ✅ MONITORAMENTO: bytes do dd + setores que já chegaram ao pendrive
+            estimator = self.track_progress(total_size, device, "write", base_progress, progress_weight)
+            self.log("📡 Monitorando gravação...")
+
+            try:
+                for line in process.stderr:
+                    if self.should_cancel:
+                        self.log("⏹️ Gravação cancelada pelo usuário")
+                        process.terminate()
+                        return False
+
+                    if line.strip():
+                        line_clean = line.strip()
+                        self.log(f"   {line_clean}", logging.DEBUG)
+
+                        # ✅ DETECTA PROGRESSO: "123456789 bytes (123 MB, 118 MiB) copied, ..."
+                        parts = line_clean.split()
+                        if len(parts) > 1 and parts[0].isdigit() and parts[1].startswith("byte"):
+                            estimator.update(int(parts[0]))
+
+                # ✅ VERIFICAÇÃO FINAL (conv=fsync: o dd só sai depois de esvaziar o cache)
+                process.wait()
+            finally:
+                estimator.finish(ok=process.poll() == 0 and not self.should_cancel)
+
+            if self.should_cancel:
+                return False
+                
+            if process.returncode == 0:
+                self.log("✅ Gravação concluída com sucesso!")
+                return True
+            else:
+                self.log(f"❌ Erro na gravação! Código: {process.returncode}")
+                return False
+
+        except Exception as e:
+            self.log(f"❌ Erro na gravação: {e}")
+            return False
+        finally:
+            self.current_process = None
+
+    def get_device_io_stats(self, device):
+        """Setores gravados no dispositivo segundo /sys/block/<dev>/stat (None se indisponível)"""
+        return read_sectors_written(device)
+
+    def get_device_size(self, device):
+        """Obtém o tamanho total do dispositivo em bytes (sysfs, sem root); 0 se desconhecido"""
+        name = os.path.basename(os.path.realpath(device))
+        try:
+            return int(_read_sysfs(f"/sys/class/block/{name}/size", "0")) * 512
+        except ValueError:
+            return 0
+
+    def write_to_usb_reliable(self, iso_path, device, base_progress=0.0, progress_weight=1.0):
+        """Grava a imagem no próprio processo (sem dd), com progresso a cada bloco"""
+        try:
+            self.log("🔥 Iniciando gravação confiável...")
+            
+            total_size = os.path.getsize(iso_path)
+            needs_sudo = os.geteuid() != 0
+            
+            if needs_sudo and not self.sudo_password:
+                if not self.check_sudo_permission():
+                    return False
+
+            device_fd = self.open_device(device, write=True)
+            self.log(f"⚡ Copiando {os.path.basename(iso_path)} -> {device} (blocos de 4 MiB)")
+
+            estimator = self.track_progress(total_size, device, "write", base_progress, progress_weight)
+            written = None
+            try:
+                written = self._copy_image_to_fd(
+                    iso_path, device_fd, total_size, lambda done, total: estimator.update(done),
+                    cancelled=lambda: self.should_cancel,
+                )
+            finally:
+                os.close(device_fd)
+                summary = estimator.finish(ok=written is not None)
+
+            if written is None or self.should_cancel:
+                self.log("⏹️ Gravação cancelada pelo usuário")
+                return False
+
+            self.log(
+                f"🎉 Gravação concluída com sucesso! "
+                f"({written / (1024*1024) / max(summary['elapsed'], 1e-6):.1f} MB/s até o fsync)"
+            )
+            return True
+                
+        except Exception as e:
+            self.log(f"❌ Erro: {e}")
+            return False
+
+    # === GRAVAÇÃO ===
+    def run_write_job(self, device, iso_path=None, build=None, verify=None):
+        """Processo completo: download (se build), confirmação, preparação, gravação e verificação
+
+        iso_path grava uma ISO local; build é (família, variante, arquitetura,
+        versão) e baixa a ISO antes. Confirmações e avisos passam por confirm()
+        e notify(), então o mesmo fluxo serve à GUI e ao modo --cli.
+        """
+        verify = self.verify_after_write if verify is None else verify
+        try:
+            # ✅ CORREÇÃO: Configurar estado da operação
+            self.is_operation_running = True
+            self.should_cancel = False
+            self.active_usb_device = device
+
+            self.log("🔒 Verificando segurança do sistema...")
+            has_dangerous, dangerous_procs = self.check_active_dd_processes(device)
+            
+            # ✅ CORREÇÃO: Esta verificação deve permitir que o processo atual continue
+            if has_dangerous:
+                self.log("❌ Processos perigosos detectados! Cancelando operação.")
+                self.notify(
+                    "error",
+                    "Erro de Segurança", 
+                    "❌ Existem processos usando o dispositivo USB!\n\n"
+                    "Processos detectados:\n" +
+                    "\n".join([f"• PID {p['pid']}: {p['command'][:50]}..." for p in dangerous_procs]) +
+                    "\n\nFeche todos os programas que possam estar usando o USB\n"
+                    "e execute este programa novamente."
+                )
+                return False
+ 
+            self.log("🚀 Iniciando criação do USB bootável...")
+
+            # Pesos do progresso: download, gravação e (opcional) verificação
+            download_progress_weight = 0.4 if iso_path is None else 0.0
+            writing_progress_weight = 1.0 - download_progress_weight
+            verify_progress_weight = 0.0
+            if verify:
+                verify_progress_weight = writing_progress_weight / 3
+                writing_progress_weight -= verify_progress_weight
+            base_progress = 0.0
+
+            if iso_path is not None:
+                iso_file_path = Path(iso_path)
+                if not iso_file_path.is_file():
+                    self.notify("error", "Erro", f"❌ ISO não encontrada: {iso_path}")
+                    return False
+                distro_name = "ISO Personalizada"
+                self.log(f"📁 Usando ISO personalizada: {iso_file_path.name}")
+
+            else:
+                # Modo distribuição pré-definida - com download
+                family, variant, arch, version = build
+                distro_name = f"{family} {variant} {version} {arch}"
+                self.log(f"📦 Preparando {distro_name}...")
+
+                # Constrói URL e filename
+                url, filename = self.build_download_url(family, variant, arch, version)
+                if not url:
+                    self.notify("error", "Erro", "❌ Não foi possível construir URL de download!")
+                    return False
+
+                self.log(f"🔗 URL construída: {url}")
+                self.log(f"📄 Nome do arquivo: {filename}")
+
+                # Download da ISO com progresso
+                self.set_status("⬇️ Baixando ISO...")
+                iso_file_path = self.download_file(url, filename, download_progress_weight)
+                if not iso_file_path:
+                    self.notify("error", "Erro", "❌ Falha no download da ISO!")
+                    return False
+
+                # ✅ CORREÇÃO: Define base_progress após download bem-sucedido
+                base_progress = download_progress_weight * 100
+
+            # Confirmação final
+            confirm = self.confirm(
+                "⚠️ CONFIRMAÇÃO FINAL",
+                f"TODOS OS DADOS NO DISPOSITIVO SERÃO APAGADOS!\n\n"
+                f"Distribuição: {distro_name}\n"
+                f"Dispositivo: {device}\n\n"
+                f"Continuar com a criação do USB bootável?",
+            )
+
+            if not confirm:
+                self.log("❌ Processo cancelado pelo usuário")
+                self.set_status("✅ Pronto")
+                return False
+
+            # Formata USB (desnecessário se a imagem traz a própria tabela de partições)
+            self.set_status("🔄 Preparando USB...")
+            if not self.prepare_raw_write(str(iso_file_path), device):
+                self.set_status("🔄 Formatando USB...")
+                if not self.format_usb(device):
+                    self.notify("error", "Erro", "❌ Falha na formatação do USB!")
+                    self.set_status("❌ Erro na formatação")
+                    return False
+
+            # Grava ISO no USB
+            self.set_status("🔥 Gravando ISO no USB...")
+            self.log("🔄 Iniciando gravação...")
+
+            # ✅ USA MÉTODO CONFIÁVEL COM PROGRESSO
+            self.log("🎯 Usando método confiável com progresso...")
+            if self.write_to_usb_reliable(str(iso_file_path), device, base_progress, writing_progress_weight):
+                self.log("✅ Gravação bem-sucedida!")
+            else:
+                self.log("⚠️ Método confiável falhou, tentando fallback...")
+                if not self.write_to_usb(str(iso_file_path), device, base_progress, writing_progress_weight):
+                    self.notify(
+                        "error",
+                        "Erro de Gravação", 
+                        "❌ Falha na gravação do USB!\n\n"
+                        "Possíveis causas:\n"
+                        "• USB com problemas físicos\n"
+                        "• ISO corrompida\n"  
+                        "• Dispositivo protegido contra gravação\n\n"
+                        "Tente:\n"
+                        "• Usar outro USB\n"
+                        "• Verificar a ISO\n"
+                        "• Testar em outra porta USB"
+                    )
+                    self.set_status("❌ Erro na gravação")
+                    return False
+
+            if verify:
+                self.set_status("🔎 Verificando gravação...")
+                verify_base = base_progress + writing_progress_weight * 100
+                if not self.verify_written_image(str(iso_file_path), device, verify_base, verify_progress_weight):
+                    self.notify("error", "Erro de Verificação", "❌ O conteúdo do USB não confere com a ISO!")
+                    self.set_status("❌ Erro na verificação")
+                    return False
+
+            # Sucesso!
+            self.set_progress(100)
+            self.set_status("✅ USB bootável criado com sucesso!")
+
+            self.notify(
+                "info",
+                "🎉 Sucesso!",
+                f"USB bootável criado com sucesso!\n\n"
+                f"Distribuição: {distro_name}\n"
+                f"Dispositivo: {device}\n\n"
+                f"O USB está pronto para uso!",
+            )
+
+            self.log("🎉 Processo concluído com sucesso!")
+            return True
+
+        except Exception as e:
+            self.log(f"❌ Erro inesperado: {e}")
+            self.notify("error", "Erro", f"❌ Ocorreu um erro inesperado:\n{e}")
+            self.set_status("❌ Erro no processo")
+            return False
+
+        finally:
+            # ✅ NOVO: Finaliza controle de operação
+            self.is_operation_running = False
+            self.should_cancel = False
+            self.current_process = None
+            self.active_usb_device = None
+
+    def verify_written_image(self, iso_path, device, base_progress=0.0, progress_weight=1.0,
+                             chunk_size=4 * 1024 * 1024):
+        """Relê o dispositivo e compara byte a byte com a ISO (sem passar pelo cache de páginas)"""
+        total_size = os.path.getsize(iso_path)
+        self.log(f"🔎 Verificando {format_size(total_size)} gravados em {device}...")
+        device_fd = self.open_device(device, write=False)
+        estimator = self.track_progress(total_size, device, "verify", base_progress, progress_weight)
+        digest = None
+        try:
+            digest = self._compare_image_with_fd(
+                iso_path, device_fd, total_size,
+                on_progress=lambda checked, total: estimator.update(checked),
+                cancelled=lambda: self.should_cancel,
+                chunk_size=chunk_size,
+            )
+        except ValueError as e:
+            self.log(f"❌ {e} de {device}")
+            return False
+        finally:
+            os.close(device_fd)
+            summary = estimator.finish(ok=digest is not None)
+
+        if digest is None:
+            self.log("⏹️ Verificação cancelada pelo usuário")
+            return False
+
+        self.last_verified_sha256 = digest
+        self.log(
+            f"✅ Verificação concluída: SHA256 {self.last_verified_sha256} "
+            f"({total_size / (1024*1024) / max(summary['elapsed'], 1e-6):.1f} MB/s)"
+        )
+        return True
 
-    def populate_versions(self, distributions_data):
-        """Preenche as versões automaticamente para cada distribuição"""
-        for distro_name, distro_data in distributions_data.items():
-            if "get_versions" in distro_data:
+    def stop_current_operation(self):
+        """Para a operação atual (download ou gravação)"""
+        try:
+            self.should_cancel = True
+            self.log("🛑 Solicitando parada da operação atual...")
+            
+            if self.current_process:
                 try:
-                    # Busca versões dinamicamente
-                    versions = distro_data["get_versions"]()
+                    # Tenta terminar graciosamente primeiro
+                    self.current_process.terminate()
+                    time.sleep(2)
                     
-                    # Para cada variante e arquitetura, adiciona as versões
-                    for variant_name, variant_data in distro_data["variants"].items():
-                        # CORREÇÃO: Verificar se architectures é lista ou dict
-                        architectures = variant_data.get("architectures", [])
-                        
-                        if isinstance(architectures, list):
-                            # Se é lista, converter para dicionário
-                            variant_data["architectures"] = {}
-                            for arch in architectures:
-                                variant_data["architectures"][arch] = {"versions": {}}
-                                
-                                # Adiciona as versões
-                                for version in versions:
-                                    variant_data["architectures"][arch]["versions"][version] = {}
+                    # Força se necessário
+                    if self.current_process.poll() is None:
+                        self.current_process.kill()
                         
-                        elif isinstance(architectures, dict):
-                            # Se já é dicionário, apenas adiciona as versões
-                            for arch, arch_data in architectures.items():
-                                if "versions" not in arch_data:
-                                    arch_data["versions"] = {}
-                                
-                                # Adiciona as versões
-                                for version in versions:
-                                    arch_data["versions"][version] = {}
-                                    
-                except Exception as e:
-                    self.log(f"⚠️ Erro ao buscar versões de {distro_name}: {e}")
-                    # Fallback para versões estáticas
-                    self.add_fallback_versions(distro_name, distro_data)
+                    self.log("✅ Processo terminado")
+                except:
+                    pass
+                finally:
+                    self.current_process = None
+            
+            # Para processos dd específicos
+            self.kill_dd_processes()
+            
+            return True
+            
+        except Exception as e:
+            self.log(f"⚠️ Erro ao parar operação: {e}")
+            return False
 
-    def add_fallback_versions(self, distro_name, distro_data):
-        """Adiciona versões de fallback quando a busca automática falha"""
-        fallback_versions = {
-            "Ubuntu": ["25.10", "24.04 LTS", "23.10", "22.04 LTS", "20.04 LTS"],
-            "Debian": ["12.4.0", "11.9.0", "10.13.0"],
-            "Linux Mint": ["21.3", "21.2", "21.1", "20.3", "20.2"],
-            "Fedora": ["39", "38", "37", "36", "35"],
-            "Manjaro": ["23.1", "22.1", "21.3", "21.2", "21.1"],
-            "openSUSE": ["15.6", "15.5", "15.4", "15.3", "15.2"]
-        }
-        
-        versions = fallback_versions.get(distro_name, ["latest"])
-        
-        for variant_name, variant_data in distro_data["variants"].items():
-            # CORREÇÃO: Garantir que a estrutura existe
-            if "architectures" not in variant_data:
-                variant_data["architectures"] = {}
-                
-            architectures = variant_data.get("architectures", [])
+    def kill_dd_processes(self):
+        """Mata processos dd multiplataforma"""
+        try:
+            system = platform.system().lower()
             
-            if isinstance(architectures, list):
-                # Se é lista, converter para dicionário
-                variant_data["architectures"] = {}
-                for arch in architectures:
-                    variant_data["architectures"][arch] = {"versions": {}}
+            if system == "windows":
+                commands = [
+                    ["taskkill", "/F", "/IM", "dd.exe"],
+                    ["powershell", "Get-Process dd -ErrorAction SilentlyContinue | Stop-Process -Force"]
+                ]
+                
+                for cmd in commands:
+                    try:
+                        subprocess.run(cmd, capture_output=True, timeout=5)
+                    except:
+                        pass
+                        
+            elif self.active_usb_device:
+                # Só os processos que ainda seguram o pendrive desta gravação, nunca todo dd do sistema
+                _, processes = self.check_active_dd_processes(self.active_usb_device)
+                for proc in processes:
+                    self.kill_process(proc['pid'])
                     
-                    # Adiciona as versões
-                    for version in versions:
-                        variant_data["architectures"][arch]["versions"][version] = {}
+            self.log("✅ Processos dd terminados")
             
-            elif isinstance(architectures, dict):
-                # Se já é dicionário, apenas adiciona as versões
-                for arch, arch_data in architectures.items():
-                    if "versions" not in arch_data:
-                        arch_data["versions"] = {}
-                    
-                    # Limpa versões existentes e adiciona as novas
-                    arch_data["versions"] = {}
-                    for version in versions:
-                        arch_data["versions"][version] = {}
+        except Exception as e:
+            self.log(f"⚠️ Erro ao matar processos dd: {e}")
 
-    # === MÉTODOS DE BUSCA DE VERSÕES ===
-    def get_ubuntu_versions(self):
-        """Busca as últimas 5 versões do Ubuntu"""
+    def is_device_active(self, device):
+        """Verifica se o dispositivo está sendo acessado/escrito"""
         try:
-            return ["25.10", "24.04 LTS", "23.10", "22.04 LTS", "20.04 LTS"]
+            # Verifica se há I/O recente
+            current_sectors = self.get_device_io_stats(device)
+            if current_sectors is None:
+                return True  # Assume ativo se não conseguiu verificar
+            
+            # Pequena pausa e verifica novamente
+            time.sleep(1)
+            new_sectors = self.get_device_io_stats(device)
+            
+            if new_sectors is not None and current_sectors is not None:
+                return new_sectors > current_sectors
+            
+            return True  # Assume ativo por padrão
         except:
-            return ["25.10", "24.04 LTS"]
+            return True
 
-    def get_debian_versions(self):
-        """Busca versões do Debian"""
-        try:
-            return ["12.4.0", "11.9.0", "10.13.0"]
-        except:
-            return ["12.4.0"]
+    # === FILA DE GRAVAÇÃO ===
+    def create_write_scheduler(self, max_concurrent=8, max_per_controller=4, adaptive=True):
+        """Cria a fila de gravações com limite (adaptativo) por controlador USB"""
+        return WriteJobScheduler(
+            self.write_scheduled_job,
+            max_concurrent=max_concurrent,
+            max_per_controller=max_per_controller,
+            adaptive=adaptive,
+            log=self.log,
+        )
 
-    def get_linuxmint_versions(self):
-        """Busca versões do Linux Mint"""
-        try:
-            return ["21.3", "21.2", "21.1", "20.3", "20.2"]
-        except:
-            return ["21.3", "21.2"]
+    def get_write_scheduler(self, max_per_controller=4):
+        """Fila de gravação compartilhada pela GUI e pela API; cria outra se a anterior foi encerrada"""
+        with self._write_scheduler_lock:
+            scheduler = self.write_scheduler
+            if scheduler is None or scheduler.snapshot()["finished"]:
+                scheduler = self.write_scheduler = self.create_write_scheduler(max_per_controller=max_per_controller)
+            return scheduler
+
+    def write_scheduled_job(self, job, on_progress, cancelled):
+        """Grava (e verifica) um job da fila; reentrante, roda em paralelo em vários dispositivos
+
+        Como em run_write_job, só formata quando a imagem não traz a própria
+        tabela de partições.
+        """
+        iso_path, device, size = job["image"], job["device"], job["size"]
+        if not self.prepare_raw_write(iso_path, device) and not self.format_usb(device):
+            self.log(f"❌ {device}: falha na formatação")
+            return False
 
-    def get_fedora_versions(self):
-        """Busca versões do Fedora"""
+        # A fila mede a vazão (e adapta os limites) pelo que já chegou ao pendrive, não pelo cache
+        device_fd = self.open_device(device, write=True)
+        estimator = ProgressEstimator(
+            size, device, "write", on_update=lambda snapshot: on_progress(snapshot["completed"]),
+        ).start()
+        written = None
         try:
-            return ["39", "38", "37", "36", "35"]
-        except:
-            return ["39", "38"]
+            written = self._copy_image_to_fd(
+                iso_path, device_fd, size, lambda done, total: estimator.update(done), cancelled,
+            )
+        finally:
+            os.close(device_fd)
+            estimator.finish(ok=written is not None)
+        if written is None:
+            return False
 
-    def get_manjaro_versions(self):
-        """Busca versões do Manjaro"""
-        try:
-            return ["23.1", "22.1", "21.3", "21.2", "21.1"]
-        except:
-            return ["23.1"]
+        if job["verify"]:
+            device_fd = self.open_device(device, write=False)
+            estimator = ProgressEstimator(
+                size, device, "verify", on_update=lambda snapshot: on_progress(size + snapshot["completed"]),
+            )
+            verified = False
+            try:
+                job["sha256"] = self._compare_image_with_fd(
+                    iso_path, device_fd, size, lambda checked, total: estimator.update(checked), cancelled,
+                )
+                verified = job["sha256"] is not None
+            except ValueError as e:
+                job["error"] = f"{e} de {device}"
+                return False
+            finally:
+                os.close(device_fd)
+                estimator.finish(ok=verified)
+            if job["sha256"] is None:
+                return False
+        return True
+
+    def run_write_queue(self, jobs, verify=False, max_concurrent=8, max_per_controller=4, adaptive=True,
+                        interval=1.0):
+        """Grava uma lista de (imagem, dispositivo) de forma bloqueante, sem interface gráfica
+
+        O progresso de cada job sai por set_progress(job=dispositivo), com a
+        vazão e a ETA no texto. Retorna o snapshot final, ou None se a
+        confirmação ou a permissão forem negadas.
+        """
+        for image, device in jobs:
+            if not Path(image).is_file():
+                raise ValueError(f"ISO não encontrada: {image}")
+        devices = "\n".join(f"• {device} ← {os.path.basename(image)}" for image, device in jobs)
+        if not self.confirm(
+            "⚠️ CONFIRMAÇÃO FINAL",
+            f"TODOS OS DADOS NOS DISPOSITIVOS SERÃO APAGADOS!\n\n{devices}\n\nContinuar com as gravações?",
+        ):
+            self.log("❌ Processo cancelado pelo usuário")
+            return None
+        needs_helper = any(not os.access(device, os.W_OK) for _, device in jobs)
+        if needs_helper and not self.check_sudo_permission():
+            return None
 
-    def get_opensuse_versions(self):
-        """Busca versões do openSUSE"""
-        try:
-            return ["15.6", "15.5", "15.4", "15.3", "15.2"]
-        except:
-            return ["15.6"]
+        scheduler = self.write_scheduler = self.create_write_scheduler(max_concurrent, max_per_controller, adaptive)
+        for index, (image, device) in enumerate(jobs):
+            scheduler.submit(image, device, verify=verify, priority=len(jobs) - index)
+        scheduler.start()
+        scheduler.close()
+
+        while True:
+            snapshot = scheduler.snapshot()
+            for job in snapshot["jobs"]:
+                if job["state"] == "running" or job["finished"] and job["done"]:
+                    percent = job["done"] / job["total"] * 100 if job["total"] else 100.0
+                    self.set_progress(percent, (
+                        f"{job['rate'] / (1024*1024):.1f} MB/s, ETA {format_duration(job['eta'])}"
+                        if job["state"] == "running" else job["state"]
+                    ), job=job["device"])
+            if snapshot["finished"]:
+                break
+            self.set_status(
+                f"🗂️ {snapshot['percent']:.1f}% - {snapshot['states'].get('running', 0)} gravando, "
+                f"{snapshot['states'].get('queued', 0)} na fila - ETA {format_duration(snapshot['eta'])}"
+            )
+            time.sleep(interval)
 
-    def get_mxlinux_versions(self):
-        """Busca versões do MX Linux (suporta 32-bit)"""
-        try:
-            return ["23.1", "21.3", "21.2", "21.1", "19.4"]
-        except:
-            return ["23.1"]
+        return scheduler.wait()
 
-    def get_antix_versions(self):
-        """Busca versões do antiX (foco em 32-bit)"""
-        try:
-            return ["23", "22", "21", "19", "17"]
-        except:
-            return ["23"]
+    # === MODO ESTAÇÃO ===
+    def start_station(self, image, criteria=None, verify=True, max_per_controller=4, monitor=True):
+        """Liga a estação duplicadora: uma confirmação e uma senha, depois cada pendrive inserido é gravado
 
-    def get_puppylinux_versions(self):
-        """Busca versões do Puppy Linux (especialista em 32-bit)"""
-        try:
-            return ["9.5", "9.0", "8.0", "7.5", "6.0"]
-        except:
-            return ["9.5"]
+        Com monitor, abre o próprio HotplugMonitor (modo sem interface); a GUI
+        repassa os eventos do monitor que já tem. Retorna a estação, ou None se
+        a confirmação ou a permissão forem negadas.
+        """
+        if platform.system().lower() != "linux":
+            self.notify("error", "Modo Estação", "❌ O modo estação depende dos eventos de USB do Linux")
+            return None
+        if not Path(image).is_file():
+            raise ValueError(f"ISO não encontrada: {image}")
+        criteria = dict(STATION_DEFAULT_CRITERIA, **(criteria or {}))
+        sizes = f"{format_size(criteria['min_size'])} a {format_size(criteria['max_size'])}" \
+            if criteria["max_size"] else f"a partir de {format_size(criteria['min_size'])}"
+        if not self.confirm(
+            "⚠️ MODO ESTAÇÃO",
+            f"TODO PENDRIVE INSERIDO QUE ATENDER AOS CRITÉRIOS SERÁ APAGADO!\n\n"
+            f"Imagem: {os.path.basename(str(image))}\n"
+            f"Barramentos: {', '.join(criteria['transports'])}\n"
+            f"Tamanho: {sizes}\n\n"
+            f"Ligar a estação?",
+        ):
+            self.log("❌ Modo estação cancelado pelo usuário")
+            return None
+        if not self.check_sudo_permission():
+            return None
 
-    def get_kalilinux_versions(self):
-        """Busca versões do Kali Linux"""
-        try:
-            return ["weekly", "2023.3", "2023.2", "2023.1", "2022.4"]
-        except:
-            return ["weekly"]
+        # Fila própria: a "Fila de Gravação" pode continuar em paralelo
+        self.station = DuplicatorStation(
+            self.create_write_scheduler(max_concurrent=16, max_per_controller=max_per_controller),
+            image,
+            criteria,
+            verify=verify,
+            log_path=self.config_dir / "station_log.csv",
+            detect=lambda name: self.detect_usb_linux([name]),
+            release=self.unmount_all_partitions,
+            log=self.log,
+            on_change=self.on_station_slot_changed,
+        )
+        self.station.start()
+        if monitor:
+            self.station_monitor = HotplugMonitor(on_event=self.station.handle_event)
+            self.station_monitor.start()
+        self.log(f"📝 Pendrives finalizados são registrados em {self.station.log_path}")
+        return self.station
+
+    def stop_station(self, cancel=False):
+        """Desliga a estação; sem cancel, as gravações em andamento terminam"""
+        if self.station_monitor is not None:
+            self.station_monitor.stop()
+            self.station_monitor = None
+        if self.station is not None:
+            self.station.stop(cancel)
+
+    # === API DE CONTROLE ===
+    def start_control_api(self, socket_path=None):
+        """Liga a API local (JSON por linha num socket Unix) para scripts e orquestradores"""
+        if not hasattr(socket, "AF_UNIX"):
+            self.notify("error", "API de controle", "❌ A API de controle depende de sockets Unix")
+            return None
+        if self.control_api is not None:
+            return self.control_api
+        server = ControlAPIServer(self, socket_path or self.config_dir / "control.sock")
+        server.start()
+        self.control_api = server
+        self.log(f"🔌 API de controle ouvindo em {server.socket_path}")
+        return server
+
+    def stop_control_api(self):
+        if self.control_api is not None:
+            self.control_api.stop()
+            self.control_api = None
+
+class HeadlessUSBCreator(USBCreatorCore):
+    """Modo --cli: sem tkinter; cada evento vira uma linha JSON no stdout"""
+
+    def __init__(self, assume_yes=False, stream=None, progress_interval=0.25, **kwargs):
+        self.stream = stream or sys.stdout
+        self.progress_interval = progress_interval
+        self._emit_lock = threading.Lock()
+        self._last_progress = {}  # tarefa -> (instante, percentual)
+        super().__init__(**kwargs)
+        self.assume_yes = assume_yes
+
+    def emit(self, event, **fields):
+        line = json.dumps({"event": event, "time": round(time.time(), 3), **fields}, ensure_ascii=False)
+        with self._emit_lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def _show_log(self, seq, level, message, formatted_message):
+        self.emit("log", level=logging.getLevelName(level), message=message.strip())
+
+    def set_progress(self, percent, text=None, job="usb"):
+        # Coalesce como a GUI: no máximo um evento por intervalo, sempre o mais recente
+        super().set_progress(percent, text, job)
+        now = time.monotonic()
+        with self._emit_lock:  # os jobs da fila chamam de threads diferentes
+            last_time, last_percent = self._last_progress.get(job, (0.0, None))
+            if percent == last_percent or (percent < 100 and now - last_time < self.progress_interval):
+                return
+            self._last_progress[job] = (now, percent)
+        self.emit("progress", job=job, percent=round(percent, 2), **({"text": text} if text else {}))
 
+    def set_status(self, text):
+        super().set_status(text)
+        self.emit("status", message=text)
 
-    def check_dependencies(self):
-        """Verifica se as dependências estão instaladas"""
-        dependencies = {
-            'pv': 'Pipe Viewer - para mostrar progresso',
-            'dd': 'Disk Dump - para gravação de discos',
-            'parted': 'Particionamento de discos',
-            'mkfs.fat': 'Formatação FAT32',
-            'mkfs.vfat': 'Formatação VFAT (alternativa)',
-            'fdisk': 'Particionamento alternativo',
-            'wipefs': 'Limpeza de assinaturas'
-        }
-        
-        missing = []
-        for dep, desc in dependencies.items():
-            if not shutil.which(dep):
-                missing.append(f"{dep} ({desc})")
-        
-        if missing:
-            self.log("⚠️  Dependências ausentes:")
-            for dep in missing:
-                self.log(f"   ❌ {dep}")
-            
-            if 'parted' in str(missing) or 'mkfs.fat' in str(missing):
-                self.log("💡 Para instalar as dependências no Ubuntu/Debian:")
-                self.log("   sudo apt install parted dosfstools pv")
-            if 'fdisk' in str(missing):
-                self.log("   sudo apt install fdisk")
+    def notify(self, kind, title, message):
+        self.emit("notify", kind=kind, title=title, message=message)
+
+    def on_station_slot_changed(self, slot):
+        self.emit("slot", **slot)
+
+    def confirm(self, title, message):
+        self.emit("confirm", title=title, message=message, answer=self.assume_yes)
+        if not self.assume_yes:
+            self.log("❌ Operação destrutiva sem confirmação: repita com --yes")
+        return self.assume_yes
+
+
+class BootableUSBCreator(USBCreatorCore):
+    """Interface gráfica (Tkinter) sobre o USBCreatorCore"""
+
+    def __init__(self, offline=None, log_level="INFO"):
+        self._startup_begin = time.perf_counter()
+        _import_tkinter()
+        self.events = EventBus()  # threads de trabalho -> thread do Tk
+        self._log_rendered_seq = 0  # o widget já mostra tudo até aqui
+        self._log_widget_lines = 0
+        super().__init__(offline=offline, log_level=log_level)
+        self.setup_gui()
+
+    def _show_log(self, seq, level, message, formatted_message):
+        # Se a GUI já foi inicializada, a thread do Tk insere no log_text
+        if getattr(self, 'log_text', None):
+            self.events.publish("log", seq, formatted_message)
         else:
-            self.log("✅ Todas dependências encontradas!")
+            super()._show_log(seq, level, message, formatted_message)
 
-    def save_distributions_to_file(self):
-        """Salva as distribuições em arquivo JSON para edição externa"""
-        config_dir = Path.home() / ".bootable_usb_creator"
-        config_dir.mkdir(exist_ok=True)
+    def confirm(self, title, message):
+        return self.ui_call(messagebox.askyesno, title, message)
 
-        config_file = config_dir / "distributions.json"
-        
-        # 🔥 CORREÇÃO: Criar uma cópia sem os métodos antes de salvar
-        distributions_to_save = {}
-        for distro_name, distro_data in self.distributions.items():
-            distributions_to_save[distro_name] = {}
-            
-            for key, value in distro_data.items():
-                if key != "get_versions":  # 🔥 Ignora os métodos
-                    distributions_to_save[distro_name][key] = value
-        
-        with open(config_file, "w", encoding="utf-8") as f:
-            json.dump(distributions_to_save, f, indent=2, ensure_ascii=False)
+    def notify(self, kind, title, message):
+        show = {"error": messagebox.showerror, "warning": messagebox.showwarning}.get(kind, messagebox.showinfo)
+        self.ui_call(show, title, message)
 
-        return config_file
+    def ask_sudo_password(self):
+        return self.ui_call(self._sudo_password_dialog)
+
+    def _sudo_password_dialog(self):
+        """Solicita senha sudo via diálogo gráfico"""
+        try:
+            import tkinter.simpledialog as simpledialog
+            
+            # Cria uma janela temporária para o diálogo
+            password_dialog = tk.Toplevel(self.root)
+            password_dialog.title("Autenticação Requerida")
+            password_dialog.geometry("400x150")
+            password_dialog.transient(self.root)
+            password_dialog.grab_set()
+            
+            # Frame principal
+            main_frame = ttk.Frame(password_dialog, padding="20")
+            main_frame.pack(fill=tk.BOTH, expand=True)
+            
+            # Mensagem
+            message = "🔐 Esta operação requer privilégios de superusuário\n\nDigite sua senha:"
+            ttk.Label(main_frame, text=message, justify=tk.CENTER).pack(pady=10)
+            
+            # Campo de senha
+            password_var = tk.StringVar()
+            password_entry = ttk.Entry(main_frame, textvariable=password_var, show='*', width=30)
+            password_entry.pack(pady=10)
+            password_entry.focus()
+            
+            # Variável para resultado
+            result = [None]
+            
+            def on_ok():
+                result[0] = password_var.get()
+                password_dialog.destroy()
+                
+            def on_cancel():
+                result[0] = None
+                password_dialog.destroy()
+            
+            # Botões
+            button_frame = ttk.Frame(main_frame)
+            button_frame.pack(pady=10)
+            
+            ttk.Button(button_frame, text="OK", command=on_ok).grid(row=0, column=0, padx=5)
+            ttk.Button(button_frame, text="Cancelar", command=on_cancel).grid(row=0, column=1, padx=5)
+            
+            # Bind Enter key
+            password_dialog.bind('<Return>', lambda e: on_ok())
+            
+            # Espera o diálogo fechar
+            self.root.wait_window(password_dialog)
+            
+            return result[0]
+            
+        except Exception as e:
+            self.log(f"⚠️ Erro no diálogo de senha: {e}")
+            # Fallback para terminal
+            self.log("💡 Por favor, digite sua senha sudo no terminal:")
+            return super().ask_sudo_password()
+
+    def _render_log_history(self):
+        """Redesenha o widget a partir do histórico, com o filtro de nível atual (thread do Tk)"""
+        lines = [line for seq, level, line in tuple(self.log_history) if level >= self.log_level]
+        lines = lines[-LOG_WIDGET_MAX_LINES:]
+        self._log_rendered_seq = self.log_history[-1][0] if self.log_history else 0
+        self.log_text.delete(1.0, tk.END)
+        self._log_widget_lines = 0
+        self._append_log_lines(lines)
+
+    def _append_log_lines(self, lines):
+        """Insere as linhas de um quadro de uma vez e descarta as mais antigas"""
+        if not lines:
+            return
+        lines = lines[-LOG_WIDGET_MAX_LINES:]
+        self.log_text.insert(tk.END, "\n".join(lines) + "\n")
+        self._log_widget_lines += len(lines)
+        excess = self._log_widget_lines - LOG_WIDGET_MAX_LINES
+        if excess > 0:
+            self.log_text.delete(1.0, f"{excess + 1}.0")
+            self._log_widget_lines -= excess
+        self.log_text.see(tk.END)
+
+    def on_log_level_changed(self, event=None):
+        self.log_level = LOG_LEVELS[self.log_level_var.get()]
+        self._render_log_history()
 
     def setup_gui(self):
         """Configura a interface gráfica completa"""
@@ -1116,15 +6897,10 @@ class BootableUSBCreator:
         self.root.minsize(900, 900)
         self.root.resizable(False, False)
 
-        # ✅ NOVO: Verificação de ambiente
-        self.check_environment()
-
         # ✅ NOVO: Verificação de privilégios
         if platform.system().lower() != "windows" and os.geteuid() != 0:
-            self.log("⚠️  AVISO: Executando sem privilégios de superusuário")
-            self.log("💡 Algumas operações podem solicitar senha sudo")
-            self.log("💡 Para melhor experiência, execute no terminal:")
-            self.log("   python3 create-usb-x-full.py")
+            self.log("ℹ️ Executando sem privilégios de superusuário")
+            self.log("💡 A senha do sudo será pedida uma única vez, na primeira operação que precisar dela")
 
         # Configurar estilo
         self.setup_styles()
@@ -1155,7 +6931,7 @@ class BootableUSBCreator:
             selection_frame, text="Distribuição:", font=("Arial", 10, "bold")
         ).grid(row=0, column=0, sticky=tk.W, pady=5)
         self.family_var = tk.StringVar()
-        families = sorted(list(self.distributions.keys()), key=str.lower)
+        families = sorted(self.catalog.families(), key=str.lower)
         self.family_combo = ttk.Combobox(
             selection_frame,
             textvariable=self.family_var,
@@ -1209,6 +6985,26 @@ class BootableUSBCreator:
         )
         distro_info_label.grid(row=2, column=0, columnspan=4, sticky=tk.W, pady=10)
 
+        # Busca rápida: preenche as quatro seleções de uma vez
+        ttk.Label(selection_frame, text="🔎 Buscar:", font=("Arial", 10, "bold")).grid(
+            row=3, column=0, sticky=tk.W, pady=5
+        )
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(selection_frame, textvariable=self.search_var, width=60)
+        self.search_entry.grid(row=3, column=1, columnspan=3, padx=5, pady=5, sticky=(tk.W, tk.E))
+        self.search_entry.bind("<KeyRelease>", self.on_search_changed)
+        self.search_entry.bind("<Down>", lambda e: self._focus_search_results())
+        self.search_entry.bind("<Return>", lambda e: self.on_search_result_selected(None))
+
+        self.search_results = []
+        self.search_listbox = tk.Listbox(selection_frame, height=5, font=("Consolas", 9))
+        self.search_listbox.grid(row=4, column=1, columnspan=3, padx=5, sticky=(tk.W, tk.E))
+        self.search_listbox.bind("<ButtonRelease-1>", self.on_search_result_selected)
+        self.search_listbox.bind("<Return>", self.on_search_result_selected)
+        self.search_listbox.grid_remove()
+        self._search_after_id = None
+        self._search_generation = 0
+
         # Frame de modo ISO personalizada
         custom_frame = ttk.LabelFrame(
             main_frame, text="📁 Modo ISO Personalizada", padding="10"
@@ -1330,6 +7126,16 @@ class BootableUSBCreator:
         log_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
         self.log_text.configure(yscrollcommand=log_scrollbar.set)
 
+        log_options = ttk.Frame(log_frame)
+        log_options.grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+        ttk.Label(log_options, text="Nível:").pack(side=tk.LEFT)
+        self.log_level_var = tk.StringVar(value=logging.getLevelName(self.log_level))
+        log_level_combo = ttk.Combobox(
+            log_options, textvariable=self.log_level_var, values=list(LOG_LEVELS), state="readonly", width=10
+        )
+        log_level_combo.pack(side=tk.LEFT, padx=5)
+        log_level_combo.bind("<<ComboboxSelected>>", self.on_log_level_changed)
+
         # Botões de ação
         button_frame = ttk.Frame(main_frame)
         button_frame.grid(row=7, column=0, columnspan=4, pady=20)
@@ -1366,6 +7172,39 @@ class BootableUSBCreator:
             row=0, column=4, padx=5
         )
 
+        # Ferramentas adicionais
+        tools_frame = ttk.Frame(button_frame)
+        tools_frame.grid(row=1, column=0, columnspan=5, pady=(10, 0))
+
+        ttk.Button(
+            tools_frame, text="📥 Download em Lote", command=self.open_batch_download_window
+        ).grid(row=0, column=0, padx=5)
+
+        ttk.Button(
+            tools_frame, text="🔄 Atualizar Catálogo", command=self.update_catalog_async
+        ).grid(row=0, column=1, padx=5)
+
+        ttk.Button(
+            tools_frame, text="📦 Exportar Pacote Offline", command=self.open_export_bundle_dialog
+        ).grid(row=0, column=2, padx=5)
+
+        ttk.Button(
+            tools_frame, text="📂 Importar Pacote Offline", command=self.open_import_bundle_dialog
+        ).grid(row=0, column=3, padx=5)
+
+        ttk.Button(
+            tools_frame, text="🗂️ Fila de Gravação", command=self.open_write_queue_window
+        ).grid(row=1, column=0, padx=5, pady=(5, 0))
+
+        ttk.Button(
+            tools_frame, text="🏭 Modo Estação", command=self.open_station_window
+        ).grid(row=1, column=1, padx=5, pady=(5, 0))
+
+        self.offline_var = tk.BooleanVar(value=self.offline_mode)
+        ttk.Checkbutton(
+            tools_frame, text="✈️ Modo Offline", variable=self.offline_var, command=self.on_offline_toggled
+        ).grid(row=0, column=4, padx=5)
+
         # Configurar grid weights
         main_frame.columnconfigure(1, weight=1)
         selection_frame.columnconfigure(1, weight=1)
@@ -1381,31 +7220,78 @@ class BootableUSBCreator:
         # Bind events
         self.usb_listbox.bind("<<ListboxSelect>>", self.on_usb_selected)
 
-        # Inicializar
-        self.refresh_usb_list()
-        config_file = self.save_distributions_to_file()
+        # Inicializar: o resto espera a janela aparecer
+        self.root.after(UI_FRAME_INTERVAL_MS, self._pump_events)
+        self.root.after_idle(lambda: self.root.after(0, self._finish_startup))
         
-        # 🔥 CORREÇÃO: Processar logs temporários após GUI estar pronta
-        self._process_temp_logs()
+        # Mostra o que foi registrado antes da GUI estar pronta
+        self._render_log_history()
         
         self.log("✅ Sistema Escalável Iniciado!")
-        self.log(f"📁 Configuração salva em: {config_file}")
         self.log("💡 Selecione uma distribuição completa nos menus acima")
         self.log("🔧 Estrutura pronta para milhares de distribuições!")
 
-    def start_activity_indicator(self):
-        """Inicia indicador visual de atividade"""
-        def animate():
+    def _finish_startup(self):
+        """Inicialização adiada para depois do primeiro quadro (thread do Tk)"""
+        startup_ms = (time.perf_counter() - self._startup_begin) * 1000
+        self.log(f"⏱️ Janela pronta em {startup_ms:.0f} ms", logging.DEBUG)
+        self.refresh_usb_list()
+        self.start_hotplug_monitor()
+        self._search_executor.submit(lambda: self.search_index)  # a primeira busca já encontra o índice pronto
+        threading.Thread(target=self._background_startup, daemon=True).start()
+
+    def _background_startup(self):
+        """Verificações que não precisam da interface: ambiente, dependências e JSON do catálogo"""
+        self.check_environment()
+        self.check_dependencies()
+        config_file = self.save_distributions_to_file()
+        self.log(f"📁 Configuração salva em: {config_file}")
+
+    def set_progress(self, percent, text=None, job="usb"):
+        """Publica o progresso; a interface mostra só o mais recente de cada quadro"""
+        self.events.progress(job, percent, text)
+
+    def set_status(self, text):
+        self.events.publish("status", text)
+
+    def ui_call(self, func, *args, wait=True, **kwargs):
+        """Executa func na thread do Tk (diálogos, botões) e, se wait, devolve o retorno"""
+        if threading.current_thread() is threading.main_thread():
+            return func(*args, **kwargs)
+        future = self.events.call(func, *args, **kwargs)
+        return future.result() if wait else future
+
+    def _pump_events(self):
+        """Aplica na interface os eventos das threads de trabalho (thread do Tk, 20 Hz)"""
+        events, progress = self.events.drain()
+        lines = []
+        for _, kind, args in events:
+            if kind == "log":
+                if args[0] > self._log_rendered_seq:  # já redesenhada pelo filtro de nível
+                    lines.append(args[1])
+                continue
+            self._append_log_lines(lines)
+            lines = []
+            if kind == "status":
+                self.status_var.set(args[0])
+            elif kind == "call":
+                EventBus.run_call(*args)
+        self._append_log_lines(lines)
+
+        for job, (_, (percent, text)) in progress.items():
+            if job == "usb":
+                self.progress_var.set(percent)
+                self.progress_label.config(text=text or f"{percent:.1f}%")
+
+        # Indicador de atividade: troca de cor a cada 0,5 s enquanto há operação
+        self._activity_frame = getattr(self, "_activity_frame", 0) + 1
+        if self.is_operation_running and not self.should_cancel:
             states = ["🔴", "🟠", "🟢", "🟠"]  # Vermelho -> Laranja -> Verde -> Laranja
-            i = 0
-            while self.is_operation_running and not self.should_cancel:
-                self.activity_var.set(states[i % len(states)])
-                self.root.update()
-                time.sleep(0.5)
-                i += 1
+            self.activity_var.set(states[(self._activity_frame // 10) % len(states)])
+        elif self.activity_var.get() != "⚪":
             self.activity_var.set("⚪")
-        
-        threading.Thread(target=animate, daemon=True).start()
+
+        self.root.after(UI_FRAME_INTERVAL_MS, self._pump_events)
 
     def setup_styles(self):
         """Configura estilos para os widgets"""
@@ -1425,11 +7311,11 @@ class BootableUSBCreator:
     def on_family_selected(self, event):
         """Quando uma família é selecionada"""
         family = self.family_var.get()
-        if family in self.distributions:
-            family_data = self.distributions[family]
+        if self.catalog.has_family(family):
+            variants = self.catalog.variants(family)
 
             # ⚠️ VERIFICAÇÃO DE SEGURANÇA ADICIONADA
-            if "variants" not in family_data:
+            if not variants:
                 self.log(f"❌ Família '{family}' não tem variantes configuradas")
                 self.variant_combo["values"] = []
                 self.variant_combo.set("")
@@ -1439,7 +7325,6 @@ class BootableUSBCreator:
                 self.version_combo["values"] = []
                 return
 
-            variants = list(family_data["variants"].keys())
             self.variant_combo["values"] = variants
             self.variant_combo.set("")
             self.arch_combo.set("")
@@ -1448,41 +7333,32 @@ class BootableUSBCreator:
             self.version_combo["values"] = []
             self.log(f"🏷️ Família selecionada: {family}")
 
+            # Versões são buscadas em segundo plano enquanto o usuário escolhe a variante
+            if not self.version_is_fresh(family):
+                self.log(f"⏳ Buscando versões de {family}...")
+            self.resolve_versions_async(family, self._on_versions_resolved)
+
     def on_variant_selected(self, event):
         """Quando uma variante é selecionada"""
         family = self.family_var.get()
         variant = self.variant_var.get()
 
         # ⚠️ VERIFICAÇÃO DE SEGURANÇA ADICIONADA - CORRIGIDA
-        if (
-            family not in self.distributions
-            or "variants" not in self.distributions[family]
-            or variant not in self.distributions[family]["variants"]
-        ):
-            self.log(f"❌ Variante '{variant}' não encontrada em '{family}'")
-            self.arch_combo["values"] = []
-            self.arch_combo.set("")
-            self.version_combo.set("")
-            self.version_combo["values"] = []
-            return
-
-        variant_data = self.distributions[family]["variants"][variant]
-
-        # ⚠️ VERIFICAÇÃO DE SEGURANÇA ADICIONADA
-        if "architectures" not in variant_data:
-            self.log(f"❌ Variante '{variant}' não tem arquiteturas configuradas")
+        architectures = self.catalog.architectures(family, variant)
+        if not architectures:
+            self.log(f"❌ Variante '{variant}' não encontrada em '{family}' ou sem arquiteturas")
             self.arch_combo["values"] = []
             self.arch_combo.set("")
             self.version_combo.set("")
             self.version_combo["values"] = []
             return
 
-        architectures = list(variant_data["architectures"].keys())
         self.arch_combo["values"] = architectures
         self.arch_combo.set("")
         self.version_combo.set("")
         self.version_combo["values"] = []
         self.log(f"🔄 Variante selecionada: {variant}")
+        self.resolve_versions_async(family, self._on_versions_resolved)
 
     def on_arch_selected(self, event):
         """Quando uma arquitetura é selecionada"""
@@ -1491,1452 +7367,888 @@ class BootableUSBCreator:
         arch = self.arch_var.get()
 
         # ⚠️ VERIFICAÇÃO DE SEGURANÇA ADICIONADA - CORRIGIDA
-        if (not all([family, variant, arch]) or
-            family not in self.distributions or
-            "variants" not in self.distributions[family] or
-            variant not in self.distributions[family]["variants"] or
-            "architectures" not in self.distributions[family]["variants"][variant] or
-            arch not in self.distributions[family]["variants"][variant]["architectures"]):
+        if not self.catalog.has_build(family, variant, arch):
             self.log(f"❌ Arquitetura '{arch}' não encontrada")
             self.version_combo["values"] = []
             self.version_combo.set("")
-            return
-
-        arch_data = self.distributions[family]["variants"][variant]["architectures"][arch]
-
-        # ⚠️ VERIFICAÇÃO DE SEGURANÇA ADICIONADA
-        if "versions" not in arch_data:
-            self.log(f"❌ Arquitetura '{arch}' não tem versões configuradas")
-            self.version_combo["values"] = []
-            self.version_combo.set("")
-            return
-
-        versions = list(arch_data["versions"].keys())
-        self.version_combo["values"] = versions
-        self.version_combo.set("")
-        self.log(f"⚙️ Arquitetura selecionada: {arch}")
-
-    def on_version_selected(self, event):
-        """Quando uma versão é selecionada"""
-        family = self.family_var.get()
-        variant = self.variant_var.get()
-        arch = self.arch_var.get()
-        version = self.version_var.get()
-
-        if all([family, variant, arch, version]):
-            distro_info = self.distributions[family]["variants"][
-                variant
-            ]["architectures"][arch]["versions"][version]
-
-            info_parts = [f"📦 {family} {variant}"]
-            info_parts.append(f"v{version}")
-            info_parts.append(f"{arch}")
-            if "codename" in distro_info:
-                info_parts.append(f"({distro_info['codename']})")
-
-            self.distro_info_var.set(" | ".join(info_parts))
-
-            # Mostra URL que será usada
-            url, filename = self.build_download_url(family, variant, arch, version)
-            self.log(f"🔗 Distribuição selecionada: {family} {variant} {version} {arch}")
-            self.log(f"   📁 Arquivo: {filename}")
-            self.log(f"   🌐 URL: {url}")
-
-    def build_download_url(self, family, variant, arch, version):
-        """Constrói URLs para múltiplas arquiteturas"""
-        try:
-            # Templates de URLs dinâmicas expandidas
-            url_templates = {
-                "Ubuntu": {
-                    "Desktop": {
-                        "amd64": "https://releases.ubuntu.com/{version}/ubuntu-{version}-desktop-amd64.iso",
-                        "arm64": "https://releases.ubuntu.com/{version}/ubuntu-{version}-desktop-arm64.iso"
-                    },
-                    "Server": {
-                        "amd64": "https://releases.ubuntu.com/{version}/ubuntu-{version}-live-server-amd64.iso",
-                        "arm64": "https://releases.ubuntu.com/{version}/ubuntu-{version}-live-server-arm64.iso"
-                    }
-                },
-                "Debian": {
-                    "Netinst": {
-                        "amd64": "https://cdimage.debian.org/debian-cd/current/amd64/iso-cd/debian-{version}-amd64-netinst.iso",
-                        "i386": "https://cdimage.debian.org/debian-cd/current/i386/iso-cd/debian-{version}-i386-netinst.iso",
-                        "arm64": "https://cdimage.debian.org/debian-cd/current/arm64/iso-cd/debian-{version}-arm64-netinst.iso"
-                    },
-                    "Live": {
-                        "amd64": "https://cdimage.debian.org/debian-cd/current/amd64/iso-cd/debian-live-{version}-amd64-standard.iso",
-                        "i386": "https://cdimage.debian.org/debian-cd/current/i386/iso-cd/debian-live-{version}-i386-standard.iso"
-                    }
-                },
-                "Linux Mint": {
-                    "Cinnamon": {"64bit": "https://mirrors.kernel.org/linuxmint/stable/{version}/linuxmint-{version}-cinnamon-64bit.iso"},
-                    "Mate": {"64bit": "https://mirrors.kernel.org/linuxmint/stable/{version}/linuxmint-{version}-mate-64bit.iso"},
-                    "Xfce": {"64bit": "https://mirrors.kernel.org/linuxmint/stable/{version}/linuxmint-{version}-xfce-64bit.iso"}
-                },
-                "Fedora": {
-                    "Workstation": {
-                        "x86_64": "https://download.fedoraproject.org/pub/fedora/linux/releases/{version}/Workstation/x86_64/iso/Fedora-Workstation-Live-x86_64-{version}.iso",
-                        "aarch64": "https://download.fedoraproject.org/pub/fedora/linux/releases/{version}/Workstation/aarch64/iso/Fedora-Workstation-Live-aarch64-{version}.iso"
-                    },
-                    "Server": {
-                        "x86_64": "https://download.fedoraproject.org/pub/fedora/linux/releases/{version}/Server/x86_64/iso/Fedora-Server-dvd-x86_64-{version}.iso",
-                        "aarch64": "https://download.fedoraproject.org/pub/fedora/linux/releases/{version}/Server/aarch64/iso/Fedora-Server-dvd-aarch64-{version}.iso"
-                    }
-                },
-                "Arch Linux": {
-                    "Standard": {"x86_64": "https://mirrors.kernel.org/archlinux/iso/latest/archlinux-x86_64.iso"}
-                },
-                "Kali Linux": {
-                    "Live": {
-                        "amd64": "https://cdimage.kali.org/kali-{version}/kali-linux-{version}-live-amd64.iso",
-                        "i386": "https://cdimage.kali.org/kali-{version}/kali-linux-{version}-live-i386.iso"
-                    }
-                },
-                "Manjaro": {
-                    "XFCE": {"x86_64": "https://download.manjaro.org/xfce/{version}/manjaro-xfce-{version}-minimal-x86_64.iso"},
-                    "KDE": {"x86_64": "https://download.manjaro.org/kde/{version}/manjaro-kde-{version}-minimal-x86_64.iso"},
-                    "GNOME": {"x86_64": "https://download.manjaro.org/gnome/{version}/manjaro-gnome-{version}-minimal-x86_64.iso"}
-                },
-                "openSUSE": {
-                    "Leap": {
-                        "x86_64": "https://download.opensuse.org/distribution/leap/{version}/iso/openSUSE-Leap-{version}-DVD-x86_64.iso",
-                        "aarch64": "https://download.opensuse.org/distribution/leap/{version}/iso/openSUSE-Leap-{version}-DVD-aarch64.iso"
-                    },
-                    "Tumbleweed": {
-                        "x86_64": "https://download.opensuse.org/tumbleweed/iso/openSUSE-Tumbleweed-DVD-x86_64.iso",
-                        "aarch64": "https://download.opensuse.org/tumbleweed/iso/openSUSE-Tumbleweed-DVD-aarch64.iso"
-                    }
-                },
-                "MX Linux": {
-                    "XFCE": {
-                        "amd64": "https://sourceforge.net/projects/mx-linux/files/Final/Xfce/MX-{version}_x64.iso/download",
-                        "i386": "https://sourceforge.net/projects/mx-linux/files/Final/Xfce/MX-{version}_386.iso/download"
-                    },
-                    "KDE": {
-                        "amd64": "https://sourceforge.net/projects/mx-linux/files/Final/KDE/MX-{version}_x64.iso/download", 
-                        "i386": "https://sourceforge.net/projects/mx-linux/files/Final/KDE/MX-{version}_386.iso/download"
-                    }
-                },
-                "antiX": {
-                    "Full": {
-                        "amd64": "https://sourceforge.net/projects/antix-linux/files/Final/antiX-{version}/antiX-{version}-x64-full.iso/download",
-                        "i386": "https://sourceforge.net/projects/antix-linux/files/Final/antiX-{version}/antiX-{version}-386-full.iso/download"
-                    },
-                    "Base": {
-                        "amd64": "https://sourceforge.net/projects/antix-linux/files/Final/antiX-{version}/antiX-{version}-x64-base.iso/download",
-                        "i386": "https://sourceforge.net/projects/antix-linux/files/Final/antiX-{version}/antiX-{version}-386-base.iso/download"
-                    }
-                },
-                "Puppy Linux": {
-                    "Fossapup": {
-                        "amd64": "https://sourceforge.net/projects/fossapup64/files/{version}/fossapup64-{version}.iso/download",
-                        "i686": "https://sourceforge.net/projects/fossapup64/files/{version}/fossapup64-{version}.iso/download"
-                    }
-                }
-            }
-            
-            # Pega o template específico para arquitetura
-            template_dict = url_templates.get(family, {}).get(variant, {})
-            url_template = template_dict.get(arch) or template_dict.get(self.arch_maps.get(arch, arch))
-            
-            if not url_template:
-                self.log(f"❌ Template não encontrado para {family} {variant} {arch}")
-                return None, None
-            
-            # Processa a versão
-            clean_version = version.replace(" LTS", "").strip()
-            
-            # ✅ CORREÇÃO INTELIGENTE: Testa múltiplas versões
-            test_versions = self.get_possible_versions(family, clean_version)
-            
-            for test_version in test_versions:
-                test_url = url_template.replace("{version}", test_version)
-                
-                # Verifica se a URL existe
-                if self.url_exists(test_url):
-                    self.log(f"✅ URL válida encontrada: {test_url}")
-                    filename = test_url.split("/")[-1]
-                    return test_url, filename
-            
-            # Se nenhuma versão funcionou, usa a primeira como fallback
-            final_url = url_template.replace("{version}", test_versions[0])
-            filename = final_url.split("/")[-1]
-            self.log(f"⚠️  Usando URL fallback: {final_url}")
-            return final_url, filename
-            
-        except Exception as e:
-            self.log(f"❌ Erro ao construir URL: {e}")
-            return None, None
-
-    def get_possible_versions(self, family, base_version):
-        """Retorna possíveis versões para testar"""
-        if family == "Ubuntu" and base_version == "25.10":
-            return ["25.10", "25.10.1"]  # Testa versão base e possível point release
-        elif family == "Ubuntu" and base_version == "24.04":
-            return ["24.04.3", "24.04.2", "24.04.1", "24.04"]
-        elif family == "Ubuntu" and base_version == "22.04":
-            return ["22.04.4", "22.04.3", "22.04.2", "22.04.1", "22.04"]
-        else:
-            return [base_version]
-
-    def url_exists(self, url):
-        """Verifica se uma URL existe"""
-        try:
-            response = requests.head(url, timeout=10, allow_redirects=True)
-            return response.status_code == 200
-        except:
-            return False
-
-    def toggle_custom_iso(self):
-        """Alterna para modo ISO personalizada"""
-        if self.custom_iso_var.get():
-            # Limpa seleção atual
-            self.family_combo.set("")
-            self.variant_combo.set("")
-            self.arch_combo.set("")
-            self.version_combo.set("")
-            self.variant_combo["values"] = []
-            self.arch_combo["values"] = []
-            self.version_combo["values"] = []
-            self.iso_frame.grid()
-            self.distro_info_var.set("📁 Modo ISO Personalizada Ativado")
-            self.log("📁 Modo ISO personalizada ativado")
-        else:
-            self.iso_frame.grid_remove()
-            self.distro_info_var.set("Selecione uma distribuição completa")
-            self.log("📦 Modo distribuição pré-definida ativado")
-
-    def browse_iso(self):
-        """Abre diálogo para selecionar arquivo ISO"""
-        filename = filedialog.askopenfilename(
-            title="Selecionar arquivo ISO",
-            filetypes=[("ISO files", "*.iso"), ("All files", "*.*")],
-        )
-        if filename:
-            self.iso_path_var.set(filename)
-            self.custom_iso_path = filename
-            self.log(f"📁 ISO personalizada selecionada: {filename}")
-
-    def save_config(self):
-        """Salva a configuração atual em arquivo JSON"""
-        try:
-            config_file = self.save_distributions_to_file()
-            messagebox.showinfo("Sucesso", f"Configuração salva em:\n{config_file}")
-            self.log(f"💾 Configuração JSON salva: {config_file}")
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao salvar configuração:\n{e}")
-
-    def refresh_all(self):
-        """Atualiza tudo"""
-        self.refresh_usb_list()
-        self.log("🔄 Sistema atualizado completamente!")
-
-    def clear_log(self):
-        """Limpa o log"""
-        self.log_text.delete(1.0, tk.END)
-
-    def on_usb_selected(self, event):
-        """Quando um USB é selecionado na lista"""
-        selection = self.usb_listbox.curselection()
-        if selection:
-            device_info = self.usb_listbox.get(selection[0])
-            self.selected_usb_device = device_info
-            self.usb_info_var.set(f"✅ Selecionado: {device_info}")
-            self.log(f"💾 Dispositivo selecionado: {device_info}")
-
-    def get_selected_usb_device(self):
-        """Obtém o caminho real do dispositivo selecionado"""
-        if not self.selected_usb_device:
-            return None
-
-        if platform.system().lower() == "windows":
-            parts = self.selected_usb_device.split(" - ")
-            if parts and ":" in parts[0]:
-                return parts[0].strip()
-        else:
-            parts = self.selected_usb_device.split(" - ")
-            if parts and parts[0].startswith("/dev/"):
-                return parts[0].strip()
-
-        return None
-
-    def detect_usb_windows(self):
-        """Detecta USB no Windows"""
-        usb_devices = []
-        detected_paths = set()
-
-        try:
-            ps_command = """
-            Get-WmiObject -Class Win32_LogicalDisk | 
-            Where-Object { $_.DriveType -eq 2 } | 
-            Select-Object DeviceID, Size, VolumeName, FileSystem |
-            ForEach-Object { 
-                $sizeGB = if($_.Size) { [math]::Round($_.Size/1GB, 2) } else { "Unknown" }
-                "$($_.DeviceID) - ${sizeGB}GB - $($_.VolumeName) - $($_.FileSystem)"
-            }
-            """
-
-            result = subprocess.run(
-                ["powershell", "-Command", ps_command],
-                capture_output=True,
-                text=True,
-                encoding="utf-8",
-                timeout=10,
-            )
-
-            if result.returncode == 0:
-                for line in result.stdout.split("\n"):
-                    line = line.strip()
-                    if line and not line.startswith("---") and " - " in line:
-                        drive_letter = line.split(" - ")[0].strip()
-                        if drive_letter not in detected_paths:
-                            detected_paths.add(drive_letter)
-                            usb_devices.append(line)
-
-        except Exception as e:
-            self.log(f"⚠️ Erro na detecção Windows: {e}")
-
-        return usb_devices
-
-    def detect_usb_linux(self):
-        """Detecta USB no Linux"""
-        usb_devices = []
-        detected_paths = set()
-
-        try:
-            # Tenta com privilégios atuais primeiro
-            result = subprocess.run(
-                ["lsblk", "-d", "-n", "-o", "NAME,SIZE,TYPE,MOUNTPOINT,MODEL"],
-                capture_output=True, text=True, timeout=10
-            )
-            
-            if result.returncode != 0:
-                # Se falhou, tenta com sudo se disponível
-                if self.sudo_password:
-                    success, stdout, stderr = self.run_sudo_command(
-                        ["lsblk", "-d", "-n", "-o", "NAME,SIZE,TYPE,MOUNTPOINT,MODEL"]
-                    )
-                    if success:
-                        result.stdout = stdout
-                    else:
-                        self.log("⚠️ Não foi possível listar dispositivos USB")
-                        return usb_devices
-                else:
-                    self.log("⚠️ Não foi possível listar dispositivos USB")
-                    return usb_devices
-
-            for line in result.stdout.split('\n'):
-                if line and "disk" in line:
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        device_name = parts[0]
-                        device_path = f"/dev/{device_name}"
-
-                        if device_name.startswith("sd") and device_name != "sda":
-                            if device_path not in detected_paths:
-                                detected_paths.add(device_path)
-                                size = parts[1]
-                                mountpoint = parts[3] if len(parts) > 3 else "Não montado"
-                                model = parts[4] if len(parts) > 4 else "USB Device"
-                                display = f"{device_path} - {size} - {model}"
-                                if mountpoint != "Não montado":
-                                    display += f" (Montado em {mountpoint})"
-                                usb_devices.append(display)
-
-        except Exception as e:
-            self.log(f"⚠️ Erro na detecção Linux: {e}")
-
-        return usb_devices
-
-    def detect_usb_devices(self):
-        """Detecta dispositivos USB de forma multiplataforma"""
-        system = platform.system().lower()
-        self.log("🔍 Procurando dispositivos USB...")
-
-        if system == "windows":
-            return self.detect_usb_windows()
-        elif system == "linux":
-            return self.detect_usb_linux()
-        else:
-            self.log("❌ Sistema operacional não suportado")
-            return []
-
-    def refresh_usb_list(self):
-        """Atualiza a lista de dispositivos USB disponíveis"""
-        self.status_var.set("🔍 Procurando dispositivos USB...")
-
-        self.usb_listbox.delete(0, tk.END)
-        self.selected_usb_device = None
-        self.usb_info_var.set("👉 Selecione um dispositivo USB da lista acima")
-
-        usb_devices = self.detect_usb_devices()
-
-        if usb_devices:
-            for device in usb_devices:
-                self.usb_listbox.insert(tk.END, device)
-
-            if usb_devices:
-                self.usb_listbox.selection_set(0)
-                self.on_usb_selected(None)
+            return
 
-            self.log(f"✅ Encontrados {len(usb_devices)} dispositivo(s) USB")
-            self.status_var.set(
-                f"✅ {len(usb_devices)} dispositivo(s) USB encontrado(s)"
-            )
-        else:
-            self.log("❌ Nenhum dispositivo USB encontrado")
-            self.log("💡 Dicas:")
-            self.log("   - Conecte o USB e clique em 'Atualizar Lista USB'")
-            self.log("   - No Linux: execute com 'sudo'")
-            self.log("   - No Windows: execute como Administrador")
-            self.status_var.set("❌ Nenhum dispositivo USB encontrado")
+        self.log(f"⚙️ Arquitetura selecionada: {arch}")
 
-    def download_file(self, url, filename, progress_weight=1.0):
-        """Faz download de um arquivo com barra de progresso e suporte a cancelamento"""
-        local_path = self.download_dir / filename
-        self.should_cancel = False
+        if not self.versions_ready(family):
+            # Busca ainda em andamento: o combobox fica em estado de carregamento
+            self.version_combo["values"] = []
+            self.version_combo.set("⏳ Carregando versões...")
+            self.version_combo.config(state="disabled")
+            self.resolve_versions_async(family, self._on_versions_resolved)
+            return
 
-        try:
-            self.log(f"⬇️ Iniciando download: {filename}")
-            self.log(f"🔗 URL: {url}")
+        self.fill_version_combo(family, variant, arch)
 
-            response = requests.get(url, stream=True, timeout=30)
-            response.raise_for_status()
+    def fill_version_combo(self, family, variant, arch):
+        """Preenche o combobox de versões para a arquitetura selecionada"""
+        self.version_combo.config(state="readonly")
+        versions = self.catalog.versions(family, variant, arch)
 
-            total_size = int(response.headers.get("content-length", 0))
-            downloaded_size = 0
+        # ⚠️ VERIFICAÇÃO DE SEGURANÇA ADICIONADA
+        if not versions:
+            self.log(f"❌ Arquitetura '{arch}' não tem versões configuradas")
 
-            with open(local_path, "wb") as file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    # ✅ VERIFICA CANCELAMENTO
-                    if self.should_cancel:
-                        self.log("⏹️ Download cancelado pelo usuário")
-                        if local_path.exists():
-                            local_path.unlink()  # Remove arquivo incompleto
-                        return None
-                        
-                    if chunk:
-                        file.write(chunk)
-                        downloaded_size += len(chunk)
+        self.version_combo["values"] = versions
+        self.version_combo.set("")
 
-                        if total_size > 0:
-                            download_progress = (downloaded_size / total_size) * 100
-                            weighted_progress = download_progress * progress_weight
-                            self.progress_var.set(weighted_progress)
-                            self.progress_label.config(text=f"{weighted_progress:.1f}%")
-                            self.root.update_idletasks()
+    def _on_versions_resolved(self, family):
+        """Atualiza o combobox de versões quando a busca em segundo plano termina"""
+        if family != self.family_var.get():
+            return
 
-            self.log(f"✅ Download concluído: {filename}")
-            return local_path
+        variant = self.variant_var.get()
+        arch = self.arch_var.get()
+        if self.catalog.has_build(family, variant, arch) and self.version_combo.cget("state") == "disabled":
+            self.fill_version_combo(family, variant, arch)
+            self.log(f"✅ Versões de {family} carregadas")
+
+    # === BUSCA RÁPIDA ===
+    def on_search_changed(self, event):
+        """Agenda a busca enquanto o usuário digita (debounce)"""
+        if event is not None and event.keysym in ("Down", "Up", "Return", "Escape"):
+            if event.keysym == "Escape":
+                self.search_var.set("")
+                self.search_listbox.grid_remove()
+            return
+        if self._search_after_id:
+            self.root.after_cancel(self._search_after_id)
+        self._search_after_id = self.root.after(80, self._run_search)
+
+    def _run_search(self):
+        """Executa a busca fora da thread do Tk; só o resultado mais recente é exibido"""
+        self._search_after_id = None
+        query = self.search_var.get().strip()
+        self._search_generation += 1
+        generation = self._search_generation
+
+        if not query:
+            self.search_listbox.grid_remove()
+            return
 
-        except Exception as e:
-            self.log(f"❌ Erro no download: {e}")
-            if local_path.exists():
-                local_path.unlink()  # Remove arquivo incompleto em caso de erro
-            raise
+        def worker():
+            results = self.search_index.search(query, limit=20)
+            self.ui_call(self._show_search_results, generation, results, wait=False)
+
+        self._search_executor.submit(worker)
+
+    def _show_search_results(self, generation, results):
+        if generation != self._search_generation:
+            return  # resultado de uma consulta já superada pela digitação
+
+        self.search_results = results
+        self.search_listbox.delete(0, tk.END)
+        if not results:
+            self.search_listbox.insert(tk.END, "Nenhum resultado")
+        for family, variant, arch, version in results:
+            label = version if version else "⏳ versões a carregar"
+            self.search_listbox.insert(tk.END, f"{family} | {variant} | {arch} | {label}")
+        self.search_listbox.grid()
+
+    def _focus_search_results(self):
+        if self.search_results:
+            self.search_listbox.focus_set()
+            self.search_listbox.selection_clear(0, tk.END)
+            self.search_listbox.selection_set(0)
+            self.search_listbox.activate(0)
+
+    def on_search_result_selected(self, event):
+        """Aplica o resultado escolhido às quatro seleções"""
+        selection = self.search_listbox.curselection()
+        index = selection[0] if selection else 0
+        if index >= len(self.search_results):
+            return
 
-    def format_usb(self, device):
-        """Formata o dispositivo USB - VERSÃO FINAL ROBUSTA"""
-        self.log(f"💾 Iniciando formatação de {device}...")
+        self.select_build(*self.search_results[index])
+        self.search_listbox.grid_remove()
 
-        try:
-            system = platform.system().lower()
+    def select_build(self, family, variant, arch, version):
+        """Preenche família, variante, arquitetura e versão em um único passo"""
+        if self.custom_iso_var.get():
+            self.custom_iso_var.set(False)
+            self.toggle_custom_iso()
 
-            if system == "windows":
-                drive_letter = device
-                self.log(f"💾 Formatando unidade {drive_letter}...")
+        self.family_var.set(family)
+        self.on_family_selected(None)
+        self.variant_var.set(variant)
+        self.on_variant_selected(None)
+        self.arch_var.set(arch)
+        self.on_arch_selected(None)
 
-                cmd = f"format {drive_letter} /FS:FAT32 /Q /Y"
-                process = subprocess.run(
-                    cmd, shell=True, capture_output=True, text=True
-                )
+        if version and version in self.version_combo["values"]:
+            self.version_var.set(version)
+            self.on_version_selected(None)
 
-                if process.returncode == 0:
-                    self.log("✅ Formatação concluída com sucesso!")
-                    return True
-                else:
-                    self.log(f"❌ Erro na formatação: {process.stderr}")
-                    return False
+    def on_version_selected(self, event):
+        """Quando uma versão é selecionada"""
+        family = self.family_var.get()
+        variant = self.variant_var.get()
+        arch = self.arch_var.get()
+        version = self.version_var.get()
 
-            else:
-                # ✅ CORREÇÃO: Verifica permissão sudo
-                needs_sudo = os.geteuid() != 0
-                
-                if needs_sudo and not self.sudo_password:
-                    if not self.check_sudo_permission():
-                        self.log("❌ Permissão de superusuário necessária para formatação")
-                        return False
+        if all([family, variant, arch, version]):
+            distro_info = self.get_version_info(family, variant, arch, version)
 
-                # ✅ CORREÇÃO: Tenta métodos em ordem de confiabilidade
-                self.log("🔄 Tentando método simples...")
-                if self.format_usb_simple(device):
-                    return True
-                
-                self.log("🔄 Método simples falhou, tentando alternativo...")
-                if self.format_usb_alternative(device):
-                    return True
-                
-                # ✅ Última tentativa: método manual com partprobe
-                self.log("🔄 Tentando método manual...")
-                return self.format_usb_manual(device)
+            info_parts = [f"📦 {family} {variant}"]
+            info_parts.append(f"v{version}")
+            info_parts.append(f"{arch}")
+            if "codename" in distro_info:
+                info_parts.append(f"({distro_info['codename']})")
 
-        except Exception as e:
-            self.log(f"❌ Erro na formatação: {e}")
-            return False
+            self.distro_info_var.set(" | ".join(info_parts))
 
-    def format_usb_simple(self, device):
-        """Método mais simples e direto para formatação"""
-        try:
-            self.log(f"💾 Método simples de formatação para {device}...")
-            
-            needs_sudo = os.geteuid() != 0
-            
-            if needs_sudo and not self.sudo_password:
-                if not self.check_sudo_permission():
-                    return False
-            
-            # ✅ CORREÇÃO: Apenas 3 comandos essenciais
-            commands = [
-                # 1. Limpa completamente o disco
-                ['wipefs', '--all', '--force', device],
-                # 2. Cria partição única FAT32
-                ['parted', '-s', device, 'mklabel', 'msdos'],
-                ['parted', '-s', device, 'mkpart', 'primary', 'fat32', '1MiB', '100%'],
-                # 3. Formata
-                ['mkfs.vfat', '-F', '32', f"{device}1"]
-            ]
-            
-            for i, cmd in enumerate(commands):
-                self.log(f"   📝 Executando passo {i+1}/3...")
-                
-                if needs_sudo:
-                    success, stdout, stderr = self.run_sudo_command(cmd)
-                else:
-                    result = subprocess.run(cmd, capture_output=True, text=True)
-                    success = result.returncode == 0
-                    stderr = result.stderr
-                
-                if not success:
-                    self.log(f"❌ Erro no passo {i+1}: {stderr}")
-                    return False
-                
-                time.sleep(1)
-            
-            self.log("✅ Formatação simples concluída!")
-            return True
-            
-        except Exception as e:
-            self.log(f"❌ Erro na formatação simples: {e}")
-            return False
+            # Mostra URL que será usada
+            url, filename = self.build_download_url(family, variant, arch, version)
+            self.log(f"🔗 Distribuição selecionada: {family} {variant} {version} {arch}")
+            self.log(f"   📁 Arquivo: {filename}")
+            self.log(f"   🌐 URL: {url}")
 
-    def format_usb_alternative(self, device):
-        """Método alternativo de formatação usando sfdisk (NÃO INTERATIVO)"""
-        try:
-            self.log(f"🔄 Tentando método alternativo de formatação para {device}...")
-            
-            needs_sudo = os.geteuid() != 0
-            
-            # ✅ CORREÇÃO: Usa sfdisk que é não interativo
-            # Primeiro: limpa o dispositivo completamente
-            wipe_cmd = ['wipefs', '--all', '--force', device]
-            if needs_sudo:
-                success, stdout, stderr = self.run_sudo_command(wipe_cmd)
-            else:
-                result = subprocess.run(wipe_cmd, capture_output=True, text=True)
-                success = result.returncode == 0
-            
-            if not success:
-                self.log("⚠️ Aviso: Não foi possível limpar assinaturas completamente")
-            
-            time.sleep(2)
-            
-            # ✅ CORREÇÃO: Cria tabela de partições com sfdisk (não interativo)
-            # Script sfdisk para criar partição FAT32
-            sfdisk_script = f"""
-    label: dos
-    label-id: 0x{os.urandom(4).hex()}
-    device: {device}
-    unit: sectors
+    def toggle_custom_iso(self):
+        """Alterna para modo ISO personalizada"""
+        if self.custom_iso_var.get():
+            # Limpa seleção atual
+            self.family_combo.set("")
+            self.variant_combo.set("")
+            self.arch_combo.set("")
+            self.version_combo.set("")
+            self.variant_combo["values"] = []
+            self.arch_combo["values"] = []
+            self.version_combo["values"] = []
+            self.iso_frame.grid()
+            self.distro_info_var.set("📁 Modo ISO Personalizada Ativado")
+            self.log("📁 Modo ISO personalizada ativado")
+        else:
+            self.iso_frame.grid_remove()
+            self.distro_info_var.set("Selecione uma distribuição completa")
+            self.log("📦 Modo distribuição pré-definida ativado")
 
-    {device}1 : start=2048, size=+, type=c, bootable
-    """
-            
-            if needs_sudo:
-                success, stdout, stderr = self.run_sudo_command(['sfdisk', device], input_text=sfdisk_script)
-            else:
-                process = subprocess.Popen(['sfdisk', device], stdin=subprocess.PIPE, text=True)
-                process.communicate(input=sfdisk_script)
-                success = process.returncode == 0
-            
-            if not success:
-                self.log("❌ Erro no sfdisk")
-                return False
-            
-            time.sleep(3)
-            
-            # ✅ CORREÇÃO: Formata a partição
-            format_cmd = ['mkfs.vfat', '-F', '32', '-n', 'USB_BOOT', f"{device}1"]
-            if needs_sudo:
-                success, stdout, stderr = self.run_sudo_command(format_cmd)
-            else:
-                result = subprocess.run(format_cmd, capture_output=True, text=True)
-                success = result.returncode == 0
-            
-            if success:
-                self.log("✅ Formatação alternativa concluída com sucesso!")
-            else:
-                self.log("❌ Erro na formatação alternativa")
-            
-            return success
-            
-        except Exception as e:
-            self.log(f"❌ Erro no método alternativo: {e}")
-            return False
+    def browse_iso(self):
+        """Abre diálogo para selecionar arquivo ISO"""
+        filename = filedialog.askopenfilename(
+            title="Selecionar arquivo ISO",
+            filetypes=[("ISO files", "*.iso"), ("All files", "*.*")],
+        )
+        if filename:
+            self.iso_path_var.set(filename)
+            self.custom_iso_path = filename
+            self.log(f"📁 ISO personalizada selecionada: {filename}")
 
-    def format_usb_manual(self, device):
-        """Método manual como último recurso"""
+    def save_config(self):
+        """Salva a configuração atual em arquivo JSON"""
         try:
-            self.log(f"🔧 Método manual de formatação para {device}...")
-            
-            needs_sudo = os.geteuid() != 0
-            
-            if needs_sudo and not self.sudo_password:
-                if not self.check_sudo_permission():
-                    return False
-            
-            # Passo 1: Garantir que não está montado
-            self.unmount_all_partitions(device)
-            time.sleep(3)
-            
-            # Passo 2: Limpar completamente
-            wipe_commands = [
-                ['dd', 'if=/dev/zero', f'of={device}', 'bs=1M', 'count=10'],
-                ['wipefs', '--all', '--force', device]
-            ]
-            
-            for cmd in wipe_commands:
-                if needs_sudo:
-                    success, stdout, stderr = self.run_sudo_command(cmd)
-                else:
-                    result = subprocess.run(cmd, capture_output=True, text=True)
-                    success = result.returncode == 0
-                
-                if not success:
-                    self.log(f"⚠️ Aviso no comando: {' '.join(cmd)}")
-            
-            time.sleep(2)
-            
-            # Passo 3: Recarregar a tabela de partições
-            if needs_sudo:
-                self.run_sudo_command(['partprobe', device])
-            else:
-                subprocess.run(['partprobe', device], capture_output=True)
-            
-            time.sleep(2)
-            
-            # Passo 4: Criar partição única
-            parted_commands = [
-                ['parted', '-s', device, 'mklabel', 'msdos'],
-                ['parted', '-s', device, 'mkpart', 'primary', 'fat32', '1MiB', '100%']
-            ]
-            
-            for cmd in parted_commands:
-                if needs_sudo:
-                    success, stdout, stderr = self.run_sudo_command(cmd)
-                else:
-                    result = subprocess.run(cmd, capture_output=True, text=True)
-                    success = result.returncode == 0
-                
-                if not success:
-                    self.log(f"❌ Erro no comando: {' '.join(cmd)}")
-                    return False
-            
-            time.sleep(2)
-            
-            # Passo 5: Recarregar novamente
-            if needs_sudo:
-                self.run_sudo_command(['partprobe', device])
-            else:
-                subprocess.run(['partprobe', device], capture_output=True)
-            
-            time.sleep(3)
-            
-            # Passo 6: Formatar
-            format_cmd = ['mkfs.vfat', '-F', '32', '-n', 'USB_BOOT', f"{device}1"]
-            if needs_sudo:
-                success, stdout, stderr = self.run_sudo_command(format_cmd)
-            else:
-                result = subprocess.run(format_cmd, capture_output=True, text=True)
-                success = result.returncode == 0
-            
-            if success:
-                self.log("✅ Formatação manual concluída!")
-            else:
-                self.log("❌ Formatação manual falhou")
-            
-            return success
-            
+            config_file = self.save_distributions_to_file()
+            messagebox.showinfo("Sucesso", f"Configuração salva em:\n{config_file}")
+            self.log(f"💾 Configuração JSON salva: {config_file}")
         except Exception as e:
-            self.log(f"❌ Erro na formatação manual: {e}")
-            return False
+            messagebox.showerror("Erro", f"Erro ao salvar configuração:\n{e}")
 
-    def write_to_usb(self, iso_path, device, base_progress=0.0, progress_weight=1.0):
-        """Escreve a ISO no dispositivo USB - VERSÃO SEGURA COM VERIFICAÇÃO"""
-        self.log(f"🔥 Iniciando gravação SEGURA...")
-        self.log(f"   ISO: {os.path.basename(iso_path)}")
-        self.log(f"   Dispositivo: {device}")
-        
-        self.should_cancel = False
+    def refresh_all(self):
+        """Atualiza tudo"""
+        self.refresh_usb_list()
+        self.log("🔄 Sistema atualizado completamente!")
 
-        try:
-            # ✅ VERIFICAÇÃO DE SEGURANÇA: Processos ativos
-            self.log("🔒 Verificando segurança...")
-            if not self.kill_conflicting_dd_processes(device):
-                messagebox.showerror(
-                    "Erro de Segurança", 
-                    "❌ Existem processos dd ativos gravando no mesmo dispositivo!\n\n"
-                    "Isso pode corromper o USB.\n\n"
-                    "Feche outros programas que possam estar usando o USB\n"
-                    "e tente novamente."
-                )
-                return False
+    def clear_log(self):
+        """Limpa o log da tela (o histórico e o arquivo continuam)"""
+        self._log_rendered_seq = self.log_history[-1][0] if self.log_history else 0
+        self.log_text.delete(1.0, tk.END)
+        self._log_widget_lines = 0
 
-            system = platform.system().lower()
-            needs_sudo = (system != "windows" and os.geteuid() != 0)
-            
-            if needs_sudo and not self.sudo_password:
-                if not self.check_sudo_permission():
-                    return False
+    def on_usb_selected(self, event):
+        """Quando um USB é selecionado na lista"""
+        selection = self.usb_listbox.curselection()
+        if selection and selection[0] < len(self.usb_rows):
+            device = self.usb_devices[self.usb_rows[selection[0]]]
+            self.selected_usb_id = device["id"]
+            self.selected_usb_device = device["display"]
+            self.usb_info_var.set(f"✅ Selecionado: {device['display']}")
+            self.log(f"💾 Dispositivo selecionado: {device['display']}")
 
-            total_size = os.path.getsize(iso_path)
-            
-            self.log(f"📊 Tamanho ISO: {total_size / (1024**3):.2f} GB")
-            self.log("🔄 Iniciando gravação única...")
+    def get_selected_usb_device(self):
+        """Obtém o caminho real do dispositivo selecionado (pelo id estável)"""
+        device = self.usb_devices.get(self.selected_usb_id)
+        return device["path"] if device else None
 
-            # ✅ COMANDO SIMPLES E SEGURO - APENAS UM PROCESSO
-            if needs_sudo:
-                cmd = f'dd if="{iso_path}" of="{device}" bs=4M status=progress'
-                full_cmd = f'echo "{self.sudo_password}" | sudo -S {cmd}'
-            else:
-                cmd = f'dd if="{iso_path}" of="{device}" bs=4M status=progress'
-                full_cmd = cmd
-            
-            self.log(f"⚡ Executando: {cmd}")
+    def refresh_usb_list(self):
+        """Atualiza a lista de dispositivos USB disponíveis"""
+        self.status_var.set("🔍 Procurando dispositivos USB...")
 
-            # ✅ EXECUTA APENAS UM PROCESSO
-            process = subprocess.Popen(
-                full_cmd,
-                shell=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                universal_newlines=True,
-            )
+        previous_id = self.selected_usb_id
+        self.usb_listbox.delete(0, tk.END)
+        self.usb_devices = {}
+        self.usb_rows = []
+        self.selected_usb_id = None
+        self.selected_usb_device = None
+        self.usb_info_var.set("👉 Selecione um dispositivo USB da lista acima")
 
-            self.current_process = process
-            
-            # ✅ MONITORAMENTO SIMPLES
-            start_time = time.time()
-            bytes_copied = 0
-            
-            self.log("📡 Monitorando gravação...")
+        usb_devices = self.detect_usb_devices()
 
-            for line in process.stdout:
-                if self.should_cancel:
-                    self.log("⏹️ Gravação cancelada pelo usuário")
-                    process.terminate()
-                    return False
-                    
-                if line.strip():
-                    line_clean = line.strip()
-                    self.log(f"   {line_clean}")
-                    
-                    # ✅ DETECTA PROGRESSO
-                    if 'bytes' in line_clean and 'copied' in line_clean:
-                        try:
-                            parts = line_clean.split()
-                            for i, part in enumerate(parts):
-                                if part.isdigit() and i > 0 and parts[i-1] in ['bytes', 'byte']:
-                                    bytes_copied = int(part)
-                                    progress_percent = (bytes_copied / total_size) * 100
-                                    combined_progress = base_progress + (progress_percent * progress_weight)
-                                    
-                                    self.progress_var.set(combined_progress)
-                                    self.progress_label.config(text=f"{combined_progress:.1f}%")
-                                    self.root.update_idletasks()
-                                    
-                                    # Log a cada 10%
-                                    if progress_percent % 10 < 1:
-                                        elapsed = time.time() - start_time
-                                        speed = (bytes_copied / (1024*1024)) / elapsed if elapsed > 0 else 0
-                                        self.log(f"📊 {progress_percent:.1f}% - {speed:.1f} MB/s")
-                                    break
-                        except:
-                            pass
-
-            # ✅ VERIFICAÇÃO FINAL
-            process.wait()
-            
-            if self.should_cancel:
-                return False
-                
-            if process.returncode == 0:
-                self.progress_var.set(100)
-                self.progress_label.config(text="100%")
-                self.log("✅ Gravação concluída com sucesso!")
-                return True
-            else:
-                self.log(f"❌ Erro na gravação! Código: {process.returncode}")
-                return False
+        if usb_devices:
+            for device in usb_devices:
+                self.usb_devices[device["id"]] = device
+                self.usb_rows.append(device["id"])
+                self.usb_listbox.insert(tk.END, device["display"])
 
-        except Exception as e:
-            self.log(f"❌ Erro na gravação: {e}")
-            return False
-        finally:
-            self.current_process = None
+            if usb_devices:
+                # Mantém o mesmo pendrive selecionado, mesmo que tenha mudado de /dev/sdX
+                rows = self.usb_rows
+                self.usb_listbox.selection_set(rows.index(previous_id) if previous_id in rows else 0)
+                self.on_usb_selected(None)
 
-    def write_to_usb_fallback(self, iso_path, device):
-        """Método fallback para gravação sem interação de terminal"""
-        try:
-            self.log("🔄 Usando método fallback para gravação...")
-            
-            needs_sudo = os.geteuid() != 0
-            
-            # Comando simples sem progresso
-            if needs_sudo:
-                cmd = ['sudo', 'dd', f'if={iso_path}', f'of={device}', 'bs=4M']
-            else:
-                cmd = ['dd', f'if={iso_path}', f'of={device}', 'bs=4M']
-            
-            self.log(f"⚡ Executando: {' '.join(cmd)}")
-            
-            if needs_sudo and not self.sudo_password:
-                if not self.check_sudo_permission():
-                    return False
-            
-            # Para comandos sudo, usa run_sudo_command
-            if needs_sudo:
-                success, stdout, stderr = self.run_sudo_command(['dd', f'if={iso_path}', f'of={device}', 'bs=4M'])
-            else:
-                result = subprocess.run(cmd, capture_output=True, text=True)
-                success = result.returncode == 0
-            
-            if success:
-                self.log("✅ Gravação fallback concluída")
-                return True
-            else:
-                self.log("❌ Erro na gravação fallback")
-                return False
-                
-        except Exception as e:
-            self.log(f"❌ Erro no método fallback: {e}")
-            return False
+            self.log(f"✅ Encontrados {len(usb_devices)} dispositivo(s) USB")
+            self.status_var.set(
+                f"✅ {len(usb_devices)} dispositivo(s) USB encontrado(s)"
+            )
+        else:
+            self.log("❌ Nenhum dispositivo USB encontrado")
+            self.log("💡 Dicas:")
+            self.log("   - Conecte o USB e clique em 'Atualizar Lista USB'")
+            self.log("   - No Linux: execute com 'sudo'")
+            self.log("   - No Windows: execute como Administrador")
+            self.status_var.set("❌ Nenhum dispositivo USB encontrado")
 
-    def check_if_writing(self, device):
-        """Verifica se o dispositivo está sendo escrito"""
-        try:
-            # Verifica I/O statistics do dispositivo
-            if os.path.exists(f"/sys/block/{device.split('/')[-1]}/stat"):
-                with open(f"/sys/block/{device.split('/')[-1]}/stat", 'r') as f:
-                    stats = f.read().split()
-                    if len(stats) >= 7:
-                        sectors_written = int(stats[6])
-                        return sectors_written
-            return None
-        except:
-            return None
+    # === HOTPLUG ===
+    def start_hotplug_monitor(self):
+        """Inicia o monitor de conexão/remoção de pendrives (apenas Linux)"""
+        if platform.system().lower() != "linux":
+            return
+        self.hotplug_monitor = HotplugMonitor(on_event=self._on_hotplug_event)
+        backend = self.hotplug_monitor.start()
+        self.log(f"🔌 Monitor de USB ativo ({'uevents do kernel' if backend == 'netlink' else 'varredura de /sys/block'})")
+        self.root.after(100, self._drain_hotplug_events)
+
+    def _on_hotplug_event(self, action, name):
+        # Roda na thread do monitor: a estação reage sem esperar a thread do Tk
+        if self.station is not None:
+            self.station.handle_event(action, name)
+        # A remoção do pendrive em gravação cancela na hora
+        if action == "remove" and self.is_operation_running and self.active_usb_device == f"/dev/{name}":
+            self.should_cancel = True
+            self.log(f"⚠️ {self.active_usb_device} foi removido durante a operação! Cancelando...")
+            threading.Thread(target=self.stop_current_operation, daemon=True).start()
 
-    def get_device_io_stats(self, device):
-        """Obtém estatísticas de I/O do dispositivo"""
+    def _drain_hotplug_events(self):
+        """Aplica na lista os eventos pendentes (thread do Tk)"""
+        pending = {}
         try:
-            device_name = device.split('/')[-1]  # ex: 'sdb'
-            stat_file = f"/sys/block/{device_name}/stat"
-            
-            if os.path.exists(stat_file):
-                with open(stat_file, 'r') as f:
-                    stats = f.read().strip().split()
-                    if len(stats) >= 7:
-                        # sectors_written está na posição 6 (começando de 0)
-                        return int(stats[6])
-            return None
-        except:
-            return None
+            while True:
+                action, name = self.hotplug_monitor.events.get_nowait()
+                pending[name] = action  # a última ação de cada disco vale
+        except queue.Empty:
+            pass
 
-    def monitor_dd_progress_artificial(self, iso_path, device, process, base_progress, progress_weight):
-        """Monitora progresso do dd artificialmente baseado em tempo e I/O"""
-        try:
-            total_size = os.path.getsize(iso_path)
-            start_time = time.time()
-            last_io_check = start_time
-            last_sectors = self.get_device_io_stats(device)
-            last_progress = base_progress
-            
-            self.log("📊 Iniciando monitoramento de progresso...")
-            
-            while process.poll() is None:  # Enquanto o processo estiver rodando
-                if self.should_cancel:
-                    return False
-                    
-                current_time = time.time()
-                elapsed = current_time - start_time
-                
-                # Verifica I/O a cada 2 segundos
-                if current_time - last_io_check >= 2:
-                    current_sectors = self.get_device_io_stats(device)
-                    
-                    if current_sectors is not None and last_sectors is not None:
-                        sectors_written = current_sectors - last_sectors
-                        if sectors_written > 0:
-                            # Calcula progresso baseado em setores escritos
-                            bytes_written = sectors_written * 512  # Cada setor tem 512 bytes
-                            progress_percent = min(100, (bytes_written / total_size) * 100)
-                        else:
-                            # Se não detectou I/O, usa estimativa baseada em tempo
-                            # Assume velocidade média de 10 MB/s como fallback
-                            estimated_bytes = elapsed * 10 * 1024 * 1024  # 10 MB/s
-                            progress_percent = min(80, (estimated_bytes / total_size) * 100)
-                    else:
-                        # Se não conseguiu ler I/O, usa estimativa temporal
-                        estimated_bytes = elapsed * 10 * 1024 * 1024  # 10 MB/s
-                        progress_percent = min(80, (estimated_bytes / total_size) * 100)
-                    
-                    # Aplica pesos e atualiza progresso
-                    combined_progress = base_progress + (progress_percent * progress_weight)
-                    
-                    # Só atualiza se houve progresso significativo
-                    if combined_progress > last_progress + 1 or current_time - last_io_check >= 10:
-                        self.progress_var.set(combined_progress)
-                        self.progress_label.config(text=f"{combined_progress:.1f}%")
-                        
-                        # Calcula ETA
-                        if progress_percent > 0:
-                            total_time_estimated = (elapsed / progress_percent) * 100
-                            eta_seconds = total_time_estimated - elapsed
-                            self.log(f"📊 Progresso estimado: {combined_progress:.1f}% - ETA: {eta_seconds:.0f}s")
-                        
-                        last_progress = combined_progress
-                        last_io_check = current_time
-                        last_sectors = current_sectors
-                    
-                    self.root.update_idletasks()
-                
-                time.sleep(0.5)  # Pequena pausa para não sobrecarregar
-                
-            return True
-            
-        except Exception as e:
-            self.log(f"⚠️ Erro no monitoramento: {e}")
-            return True  # Continua mesmo com erro
+        for name, action in pending.items():
+            found = self.detect_usb_linux([name]) if action != "remove" else []
+            current = next((dev_id for dev_id, dev in self.usb_devices.items() if dev["name"] == name), None)
+            if found:
+                self._disambiguate_device_id(found[0])
+                if found[0]["id"] not in self.usb_devices:
+                    self.log(f"🔌 USB conectado: {found[0]['display']}")
+                if current and current != found[0]["id"]:
+                    self._remove_usb_device(current)
+                self._upsert_usb_device(found[0])
+            elif current:
+                self.log(f"⏏️ USB removido: {self.usb_devices[current]['path']}")
+                self._remove_usb_device(current)
+
+        self.root.after(100, self._drain_hotplug_events)
+
+    def _disambiguate_device_id(self, device):
+        """No hotplug o disco é enumerado sozinho: se outro disco ainda presente já usa o id, desempata pela porta"""
+        other = self.usb_devices.get(device["id"])
+        if other is not None and other["name"] != device["name"] and os.path.exists(f"/sys/block/{other['name']}"):
+            device["id"] = disambiguated_device_id(device)
+
+    def _upsert_usb_device(self, device):
+        device_id = device["id"]
+        if device_id in self.usb_devices:
+            index = self.usb_rows.index(device_id)
+            self.usb_listbox.delete(index)
+        else:
+            index = len(self.usb_rows)
+            self.usb_rows.append(device_id)
+        self.usb_devices[device_id] = device
+        self.usb_listbox.insert(index, device["display"])
+
+        if self.selected_usb_id == device_id:
+            self.usb_listbox.selection_set(index)
+            self.selected_usb_device = device["display"]
+            self.usb_info_var.set(f"✅ Selecionado: {device['display']}")
+        elif not self.selected_usb_id:
+            self.usb_listbox.selection_set(index)
+            self.on_usb_selected(None)
+        self.status_var.set(f"✅ {len(self.usb_devices)} dispositivo(s) USB encontrado(s)")
+
+    def _remove_usb_device(self, device_id):
+        index = self.usb_rows.index(device_id)
+        del self.usb_rows[index]
+        del self.usb_devices[device_id]
+        self.usb_listbox.delete(index)
+        if self.selected_usb_id == device_id:
+            self.selected_usb_id = None
+            self.selected_usb_device = None
+            self.usb_info_var.set("👉 Selecione um dispositivo USB da lista acima")
+        self.status_var.set(f"✅ {len(self.usb_devices)} dispositivo(s) USB encontrado(s)")
+
+    def update_catalog_async(self):
+        """Busca o feed em segundo plano e atualiza só as famílias afetadas na interface"""
+        source = self.feed_state.get("source")
+        if not source:
+            source = simpledialog.askstring(
+                "Atualizar Catálogo",
+                "URL ou diretório do feed de atualizações do catálogo:",
+                parent=self.root,
+            )
+            if not source:
+                return
+            source = source.strip()
 
+        self.log(f"🔄 Buscando atualizações do catálogo em {source}...")
 
-    def get_device_size(self, device):
-        """Obtém o tamanho total do dispositivo em bytes"""
-        try:
-            result = subprocess.run(
-                ['blockdev', '--getsize64', device],
-                capture_output=True, text=True
+        def finish(update, error):
+            if error:
+                self.log(f"❌ Falha ao atualizar o catálogo: {error}")
+                return
+            changed, removed = self.apply_catalog_update(update)
+            self.log(
+                f"✅ Catálogo na revisão {update['revision']}: {len(changed)} família(s) alterada(s), "
+                f"{len(removed)} removida(s), {update['bytes'] / 1024:.1f} KB lidos"
             )
-            if result.returncode == 0:
-                return int(result.stdout.strip())
-            return 0
-        except:
-            return 0
+            self.on_catalog_families_changed(changed, removed)
 
-    def write_to_usb_with_pv(self, iso_path, device, base_progress=0.0, progress_weight=1.0):
-        """Método com PV - VERSÃO SUPER SIMPLIFICADA"""
-        try:
-            self.log("🔄 Iniciando gravação com PV...")
-            
-            total_size = os.path.getsize(iso_path)
-            needs_sudo = os.geteuid() != 0
-            
-            if needs_sudo and not self.sudo_password:
-                if not self.check_sudo_permission():
-                    return False
+        def worker():
+            try:
+                update, error = self.fetch_catalog_updates(source), None
+            except Exception as e:
+                update, error = None, e
+            self.root.after(0, finish, update, error)
 
-            # ✅ CORREÇÃO RADICAL: Dois processos separados
-            if needs_sudo:
-                # PRIMEIRO: Execute o PV separadamente para ver se funciona
-                pv_cmd = f'pv -n "{iso_path}"'
-                dd_cmd = f'dd of="{device}" bs=4M'
-                
-                self.log("🔧 Executando PV e DD em pipeline...")
-                
-                # Cria os processos separadamente
-                pv_process = subprocess.Popen(
-                    ['sudo', '-S', 'pv', '-n', iso_path],
-                    stdin=subprocess.PIPE,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True
-                )
-                
-                # Envia senha para pv
-                pv_process.stdin.write(self.sudo_password + '\n')
-                pv_process.stdin.flush()
-                
-                dd_process = subprocess.Popen(
-                    ['sudo', '-S', 'dd', f'of={device}', 'bs=4M'],
-                    stdin=pv_process.stdout,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True
-                )
-                
-                # Envia senha para dd
-                dd_process.stdin.close()  # stdin vem do pv
-                
-                process = dd_process  # Monitora o dd
-                
-            else:
-                # Sem sudo - mais simples
-                cmd = f'pv -n "{iso_path}" | dd of="{device}" bs=4M'
-                process = subprocess.Popen(
-                    cmd,
-                    shell=True,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    bufsize=1,
-                )
-            
-            self.current_process = process
-            
-            # ✅ MONITORAMENTO SIMPLES DO PV
-            def monitor_pv():
-                # Monitora stderr do PV (onde vai o progresso)
-                while True:
-                    if needs_sudo:
-                        # Para sudo, monitora stderr do pv_process
-                        line = pv_process.stderr.readline()
-                    else:
-                        # Para sem sudo, monitora stderr do processo principal
-                        line = process.stderr.readline()
-                        
-                    if line:
-                        line_clean = line.strip()
-                        self.log(f"PV: {line_clean}")
-                        
-                        # Extrai porcentagem
-                        if '%' in line_clean:
-                            try:
-                                import re
-                                match = re.search(r'(\d+\.?\d*)%', line_clean)
-                                if match:
-                                    percent = float(match.group(1))
-                                    combined_progress = base_progress + (percent * progress_weight)
-                                    
-                                    self.progress_var.set(combined_progress)
-                                    self.progress_label.config(text=f"{combined_progress:.1f}%")
-                                    self.root.update_idletasks()
-                                    
-                                    if percent % 10 < 1:  # Log a cada 10%
-                                        self.log(f"📊 {percent:.1f}%")
-                            except:
-                                pass
-                    
-                    # Verifica se terminou
-                    if process.poll() is not None:
-                        break
-                    time.sleep(0.1)
-            
-            monitor_thread = threading.Thread(target=monitor_pv, daemon=True)
-            monitor_thread.start()
-            
-            # Aguarda finalização
-            process.wait()
-            if needs_sudo:
-                pv_process.wait()
-            
-            monitor_thread.join(timeout=2)
-            
-            if process.returncode == 0:
-                self.progress_var.set(100)
-                self.progress_label.config(text="100%")
-                self.log("✅ Gravação concluída!")
-                return True
-            else:
-                self.log(f"❌ Erro! Código: {process.returncode}")
-                return False
-                
-        except Exception as e:
-            self.log(f"❌ Erro no PV: {e}")
-            return False
+        threading.Thread(target=worker, daemon=True).start()
 
-    def write_to_usb_reliable(self, iso_path, device, base_progress=0.0, progress_weight=1.0):
-        """Método 100% confiável COM CAPTURA DE PROGRESSO - VERSÃO CORRIGIDA"""
-        try:
-            self.log("🔥 Iniciando gravação confiável...")
-            
-            total_size = os.path.getsize(iso_path)
-            needs_sudo = os.geteuid() != 0
-            
-            if needs_sudo and not self.sudo_password:
-                if not self.check_sudo_permission():
-                    return False
+    def on_catalog_families_changed(self, changed, removed):
+        """Atualiza os comboboxes apenas se a família em uso foi afetada"""
+        if not changed and not removed:
+            return
+        self.family_combo["values"] = self.catalog.families()
 
-            # Comando com status=progress
-            if needs_sudo:
-                cmd = f'sudo dd if="{iso_path}" of="{device}" bs=4M status=progress'
-                full_cmd = f'echo "{self.sudo_password}" | sudo -S dd if="{iso_path}" of="{device}" bs=4M status=progress'
-            else:
-                cmd = f'dd if="{iso_path}" of="{device}" bs=4M status=progress'
-                full_cmd = cmd
-            
-            self.log(f"⚡ Executando: {cmd}")
-            
-            process = subprocess.Popen(
-                full_cmd,
-                shell=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,  # ✅ Progresso vai para stdout
-                text=True,
-                bufsize=1,
-                universal_newlines=True,
-            )
-            
-            self.current_process = process
-            
-            start_time = time.time()
-            last_percent = 0
-            
-            # ✅ CAPTURA DE PROGRESSO DO DD
-            for line in process.stdout:
-                if self.should_cancel:
-                    process.terminate()
-                    break
-                    
-                line_clean = line.strip()
-                if line_clean:
-                    self.log(f"   {line_clean}")
-                    
-                    # ✅ EXTRAI BYTES E PORCENTAGEM DA SAÍDA DO DD
-                    # Procura padrões como: 
-                    # "123456789 bytes (123 MB, 456 MB/s) copied, 12.3 s, 67.8 MB/s"
-                    # ou "[123456789/987654321] 12.5%"
-                    if 'bytes' in line_clean and 'copied' in line_clean:
-                        try:
-                            import re
-                            # Extrai número de bytes
-                            bytes_match = re.search(r'(\d+) bytes', line_clean)
-                            if bytes_match:
-                                current_bytes = int(bytes_match.group(1))
-                                
-                                # Calcula porcentagem
-                                progress_percent = min(100, (current_bytes / total_size) * 100)
-                                combined_progress = base_progress + (progress_percent * progress_weight)
-                                
-                                # Atualiza progresso apenas se mudou significativamente
-                                if progress_percent - last_percent >= 1:
-                                    self.progress_var.set(combined_progress)
-                                    self.progress_label.config(text=f"{combined_progress:.1f}%")
-                                    
-                                    # Log a cada 5% de progresso
-                                    if progress_percent - last_percent >= 5:
-                                        elapsed = time.time() - start_time
-                                        speed = current_bytes / (1024*1024) / elapsed if elapsed > 0 else 0
-                                        self.log(f"📊 {progress_percent:.1f}% - {speed:.1f} MB/s")
-                                        last_percent = progress_percent
-                                    
-                                    self.root.update_idletasks()
-                        except Exception as e:
-                            # Se não conseguir extrair bytes, continua sem progresso
-                            pass
-                    
-                    # ✅ TAMBÉM PROCURA POR PADRÃO DE PORCENTAGEM DIRETA
-                    elif '%' in line_clean:
-                        try:
-                            import re
-                            percent_match = re.search(r'(\d+\.?\d*)%', line_clean)
-                            if percent_match:
-                                progress_percent = float(percent_match.group(1))
-                                combined_progress = base_progress + (progress_percent * progress_weight)
-                                
-                                self.progress_var.set(combined_progress)
-                                self.progress_label.config(text=f"{combined_progress:.1f}%")
-                                
-                                if progress_percent - last_percent >= 5:
-                                    self.log(f"📊 {progress_percent:.1f}%")
-                                    last_percent = progress_percent
-                                
-                                self.root.update_idletasks()
-                        except:
-                            pass
-            
-            process.wait()
-            
-            if self.should_cancel:
-                return False
-                
-            if process.returncode == 0:
-                self.progress_var.set(100)
-                self.progress_label.config(text="100%")
-                self.log("🎉 Gravação concluída com sucesso!")
-                return True
-            else:
-                self.log(f"❌ Erro na gravação! Código: {process.returncode}")
-                return False
-                
-        except Exception as e:
-            self.log(f"❌ Erro: {e}")
-            return False
+        family = self.family_var.get()
+        if family in removed:
+            self.log(f"🗑️ Família '{family}' saiu do catálogo")
+            self.family_combo.set("")
+            self.variant_combo.set("")
+            self.arch_combo.set("")
+            self.version_combo.set("")
+            self.variant_combo["values"] = []
+            self.arch_combo["values"] = []
+            self.version_combo["values"] = []
+        elif family in changed:
+            self.log(f"🔄 Família '{family}' foi atualizada pelo feed")
+            self.on_family_selected(None)
+
+    def open_export_bundle_dialog(self):
+        """Escolhe o destino do pacote e o gera em segundo plano"""
+        path = filedialog.asksaveasfilename(
+            title="Exportar pacote offline",
+            defaultextension=".tar",
+            initialfile="bootable_usb_offline.tar",
+            filetypes=[("Pacote offline", "*.tar"), ("All files", "*.*")],
+        )
+        if not path:
+            return
+        include_isos = messagebox.askyesno(
+            "Pacote Offline", "Incluir no pacote as ISOs já baixadas em BootableUSB_Downloads?"
+        )
+
+        def worker():
+            try:
+                self.export_offline_bundle(path, include_isos=include_isos)
+            except Exception as e:
+                self.log(f"❌ Falha ao gerar pacote offline: {e}")
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def open_import_bundle_dialog(self):
+        """Escolhe um pacote offline e o importa em segundo plano"""
+        path = filedialog.askopenfilename(
+            title="Importar pacote offline",
+            filetypes=[("Pacote offline", "*.tar *.tar.gz"), ("All files", "*.*")],
+        )
+        if not path:
+            return
 
-    def start_creation(self):
-        """Inicia o processo de criação em thread separada"""
-        if not self.get_selected_usb_device():
-            messagebox.showerror("Erro", "❌ Selecione um dispositivo USB da lista!")
+        def finish(bundle):
+            changed, removed = self.apply_offline_bundle(bundle)
+            self.offline_var.set(True)
+            self.on_catalog_families_changed(changed, removed)
+
+        def worker():
+            try:
+                bundle = self.import_offline_bundle(path)
+            except Exception as e:
+                self.log(f"❌ Falha ao importar pacote offline: {e}")
+                return
+            self.root.after(0, finish, bundle)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def on_offline_toggled(self):
+        if self.offline_var.get() and not self.offline_bundle:
+            self.log("⚠️ Nenhum pacote offline importado: só ISOs já baixadas poderão ser usadas")
+        self.set_offline_mode(self.offline_var.get())
+        for family in self.catalog.families():
+            self.version_cache.pop(family, None)
+
+    def open_batch_download_window(self):
+        """Abre a janela de download em lote para montar uma biblioteca offline de ISOs"""
+        if self.batch_scheduler and not self.batch_scheduler.snapshot()["finished"]:
+            messagebox.showinfo("Download em Lote", "Já existe um lote em andamento.")
             return
 
-        # ✅ NOVO: Controla estado dos botões
-        self.create_button.config(state="disabled")
-        self.cancel_button.config(state="normal")
-        self.status_var.set("🔄 Iniciando processo...")
+        window = tk.Toplevel(self.root)
+        window.title("Download em Lote")
+        window.geometry("700x520")
+        window.transient(self.root)
 
-        thread = threading.Thread(target=self.create_bootable_usb)
-        thread.daemon = True
-        thread.start()
+        frame = ttk.Frame(window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
 
-    def create_bootable_usb(self):
-        """Processo principal de criação do USB bootável - VERSÃO CORRIGIDA"""
-        try:
-            # ✅ CORREÇÃO: Configurar estado da operação
-            self.is_operation_running = True
-            self.should_cancel = False
-            
-            selected_usb = self.get_selected_usb_device()
-            if not selected_usb:
-                messagebox.showerror("Erro", "❌ Nenhum dispositivo USB selecionado!")
-                self.create_button.config(state="normal")
-                self.cancel_button.config(state="disabled")
+        ttk.Label(
+            frame, text="Selecione as ISOs (apenas as versões mais recentes são listadas):"
+        ).pack(anchor=tk.W)
+
+        builds = []
+        builds_listbox = tk.Listbox(frame, selectmode=tk.EXTENDED, height=12, font=("Consolas", 9))
+        builds_listbox.pack(fill=tk.BOTH, expand=True, pady=5)
+        builds_listbox.insert(tk.END, "⏳ Carregando versões do catálogo...")
+
+        def show_builds(found):
+            if not window.winfo_exists():
                 return
+            builds.extend(found)
+            builds_listbox.delete(0, tk.END)
+            for family, variant, arch, version in builds:
+                builds_listbox.insert(tk.END, f"{family} | {variant} | {arch} | {version}")
+
+        # A resolução de versões pode acessar a rede: fica fora da thread do Tk
+        threading.Thread(
+            target=lambda: self.ui_call(show_builds, self.list_catalog_builds(latest_only=True), wait=False),
+            daemon=True,
+        ).start()
+
+        limits_frame = ttk.Frame(frame)
+        limits_frame.pack(fill=tk.X, pady=5)
+        ttk.Label(limits_frame, text="Downloads simultâneos:").grid(row=0, column=0, sticky=tk.W)
+        concurrent_var = tk.IntVar(value=4)
+        ttk.Spinbox(limits_frame, from_=1, to=16, textvariable=concurrent_var, width=5).grid(
+            row=0, column=1, padx=5
+        )
+        ttk.Label(limits_frame, text="Por servidor:").grid(row=0, column=2, sticky=tk.W)
+        per_host_var = tk.IntVar(value=2)
+        ttk.Spinbox(limits_frame, from_=1, to=8, textvariable=per_host_var, width=5).grid(
+            row=0, column=3, padx=5
+        )
 
-            self.log("🔒 Verificando segurança do sistema...")
-            has_dangerous, dangerous_procs = self.check_active_dd_processes(selected_usb)
-            
-            # ✅ CORREÇÃO: Esta verificação deve permitir que o processo atual continue
-            if has_dangerous:
-                self.log("❌ Processos perigosos detectados! Cancelando operação.")
-                messagebox.showerror(
-                    "Erro de Segurança", 
-                    "❌ Existem processos dd ativos no sistema!\n\n"
-                    "Processos detectados:\n" +
-                    "\n".join([f"• PID {p['pid']}: {p['command'][:50]}..." for p in dangerous_procs]) +
-                    "\n\nFeche todos os programas que possam estar usando o USB\n"
-                    "e execute este programa novamente."
+        batch_progress_var = tk.DoubleVar()
+        ttk.Progressbar(frame, variable=batch_progress_var, maximum=100).pack(fill=tk.X, pady=5)
+        batch_status_var = tk.StringVar(value="Aguardando seleção")
+        ttk.Label(frame, textvariable=batch_status_var).pack(anchor=tk.W)
+
+        jobs_listbox = tk.Listbox(frame, height=8, font=("Consolas", 8))
+        jobs_listbox.pack(fill=tk.BOTH, expand=True, pady=5)
+
+        state_icons = {
+            "queued": "⏳", "running": "⬇️", "done": "✅",
+            "cached": "♻️", "failed": "❌", "cancelled": "⏹️",
+        }
+
+        def refresh_view():
+            scheduler = self.batch_scheduler
+            if not scheduler or not window.winfo_exists():
+                return
+            snapshot = scheduler.snapshot()
+            batch_progress_var.set(snapshot["percent"])
+            done = snapshot["states"].get("done", 0) + snapshot["states"].get("cached", 0)
+            batch_status_var.set(
+                f"{snapshot['percent']:.1f}% - {done}/{len(snapshot['jobs'])} concluído(s) - "
+                f"{snapshot['downloaded_bytes'] / (1024**2):.0f} MB"
+            )
+            jobs_listbox.delete(0, tk.END)
+            for job in snapshot["jobs"]:
+                percent = (job["downloaded"] / job["total"] * 100) if job["total"] else 0
+                jobs_listbox.insert(
+                    tk.END, f"{state_icons.get(job['state'], '•')} {percent:5.1f}%  {job['label']}"
                 )
-                self.create_button.config(state="normal")
-                self.cancel_button.config(state="disabled")
-                self.is_operation_running = False
+            if not snapshot["finished"]:
+                window.after(500, refresh_view)
+            else:
+                self.log("🎉 Download em lote finalizado")
+
+        def start(selected_builds):
+            if not selected_builds:
+                messagebox.showerror("Erro", "❌ Nenhuma ISO selecionada!", parent=window)
                 return
- 
-            self.log("🚀 Iniciando criação do USB bootável...")
+            self.batch_scheduler = self.create_batch_scheduler(
+                concurrent_var.get(), per_host_var.get()
+            )
+            batch_status_var.set("🔗 Resolvendo URLs...")
+            scheduler = self.batch_scheduler
 
-            # ✅ CORREÇÃO: Definir variáveis de progresso ANTES de qualquer uso
-            download_progress_weight = 0.4  # 40% para download
-            writing_progress_weight = 0.6   # 60% para gravação
-            base_progress = 0.0  # Inicializa a variável
-
-            if self.custom_iso_var.get():
-                # Modo ISO personalizada - sem download
-                iso_path = self.iso_path_var.get()
-                if not iso_path or not Path(iso_path).exists():
-                    messagebox.showerror("Erro", "❌ Selecione um arquivo ISO válido!")
-                    self.create_button.config(state="normal")
-                    return
+            def enqueue():
+                self.queue_batch_downloads(scheduler, selected_builds)
+                scheduler.start()
+                scheduler.close()
 
-                distro_name = "ISO Personalizada"
-                iso_file_path = Path(iso_path)
-                self.log(f"📁 Usando ISO personalizada: {iso_file_path.name}")
-                
-                # ✅ CORREÇÃO: Ajusta pesos para modo personalizado (apenas gravação)
-                download_progress_weight = 0.0
-                writing_progress_weight = 1.0
-                base_progress = 0.0  # Começa em 0% já que não há download
+            threading.Thread(target=enqueue, daemon=True).start()
+            window.after(500, refresh_view)
 
-            else:
-                # Modo distribuição pré-definida - com download
-                family = self.family_var.get()
-                variant = self.variant_var.get()
-                arch = self.arch_var.get()
-                version = self.version_var.get()
-
-                if not all([family, variant, arch, version]):
-                    messagebox.showerror("Erro", "❌ Selecione uma distribuição completa!")
-                    self.create_button.config(state="normal")
-                    return
+        def start_selected():
+            start([builds[i] for i in builds_listbox.curselection()])
 
-                distro_name = f"{family} {variant} {version} {arch}"
-                self.log(f"📦 Preparando {distro_name}...")
+        def cancel():
+            if self.batch_scheduler:
+                self.batch_scheduler.cancel()
 
-                # Constrói URL e filename
-                url, filename = self.build_download_url(family, variant, arch, version)
-                if not url:
-                    messagebox.showerror("Erro", "❌ Não foi possível construir URL de download!")
-                    self.create_button.config(state="normal")
-                    return
+        buttons = ttk.Frame(frame)
+        buttons.pack(pady=5)
+        ttk.Button(buttons, text="⬇️ Baixar selecionadas", command=start_selected).grid(
+            row=0, column=0, padx=5
+        )
+        ttk.Button(buttons, text="📚 Baixar todas (mais recentes)", command=lambda: start(builds)).grid(
+            row=0, column=1, padx=5
+        )
+        ttk.Button(buttons, text="🛑 Cancelar lote", command=cancel).grid(row=0, column=2, padx=5)
+
+    def open_write_queue_window(self):
+        """Abre a fila de gravações: várias (imagem, pendrive), limitadas por controlador USB"""
+        window = tk.Toplevel(self.root)
+        window.title("Fila de Gravação")
+        window.geometry("820x600")
+        window.transient(self.root)
+
+        frame = ttk.Frame(window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        image_frame = ttk.Frame(frame)
+        image_frame.pack(fill=tk.X)
+        ttk.Label(image_frame, text="Imagem:").grid(row=0, column=0, sticky=tk.W)
+        image_var = tk.StringVar(value=self.custom_iso_path or "")
+        ttk.Entry(image_frame, textvariable=image_var).grid(row=0, column=1, sticky=(tk.W, tk.E), padx=5)
+
+        def browse():
+            filename = filedialog.askopenfilename(
+                parent=window, title="Selecionar imagem",
+                filetypes=[("ISO files", "*.iso"), ("Disk images", "*.img"), ("All files", "*.*")],
+            )
+            if filename:
+                image_var.set(filename)
+
+        ttk.Button(image_frame, text="Procurar", command=browse).grid(row=0, column=2)
+        image_frame.columnconfigure(1, weight=1)
+
+        ttk.Label(frame, text="Pendrives de destino (controlador / hub / velocidade):").pack(anchor=tk.W, pady=(5, 0))
+        devices = [device for device in self.usb_devices.values() if device.get("path")]
+        devices_listbox = tk.Listbox(frame, selectmode=tk.EXTENDED, height=6, font=("Consolas", 9))
+        devices_listbox.pack(fill=tk.X, pady=5)
+        for device in devices:
+            speed = f"{device.get('usb_speed')} Mbps" if device.get("usb_speed") else "?"
+            devices_listbox.insert(
+                tk.END,
+                f"{device['display']}  [{device.get('usb_controller') or '-'} / "
+                f"{device.get('usb_hub') or '-'} / {speed}]",
+            )
 
-                self.log(f"🔗 URL construída: {url}")
-                self.log(f"📄 Nome do arquivo: {filename}")
+        options_frame = ttk.Frame(frame)
+        options_frame.pack(fill=tk.X, pady=5)
+        verify_var = tk.BooleanVar(value=self.verify_after_write)
+        ttk.Checkbutton(options_frame, text="🔎 Verificar após gravar", variable=verify_var).grid(
+            row=0, column=0, padx=5
+        )
+        ttk.Label(options_frame, text="Máximo por controlador:").grid(row=0, column=1, sticky=tk.W)
+        per_controller_var = tk.IntVar(value=4)
+        ttk.Spinbox(options_frame, from_=1, to=8, textvariable=per_controller_var, width=5).grid(
+            row=0, column=2, padx=5
+        )
 
-                # Download da ISO com progresso
-                self.status_var.set("⬇️ Baixando ISO...")
-                iso_file_path = self.download_file(url, filename, download_progress_weight)
-                if not iso_file_path:
-                    messagebox.showerror("Erro", "❌ Falha no download da ISO!")
-                    self.create_button.config(state="normal")
-                    return
+        queue_progress_var = tk.DoubleVar()
+        ttk.Progressbar(frame, variable=queue_progress_var, maximum=100).pack(fill=tk.X, pady=5)
+        queue_status_var = tk.StringVar(value="Fila vazia")
+        ttk.Label(frame, textvariable=queue_status_var).pack(anchor=tk.W)
+        controllers_var = tk.StringVar()
+        ttk.Label(frame, textvariable=controllers_var, font=("Consolas", 8)).pack(anchor=tk.W)
 
-                # ✅ CORREÇÃO: Define base_progress após download bem-sucedido
-                base_progress = download_progress_weight * 100
+        jobs_listbox = tk.Listbox(frame, height=10, font=("Consolas", 8))
+        jobs_listbox.pack(fill=tk.BOTH, expand=True, pady=5)
+        job_ids = []
 
-            # Confirmação final
-            confirm = messagebox.askyesno(
+        state_icons = {"queued": "⏳", "running": "🔥", "done": "✅", "failed": "❌", "cancelled": "⏹️"}
+
+        def refresh_view():
+            scheduler = self.write_scheduler
+            if not window.winfo_exists():
+                return
+            if scheduler is not None:
+                snapshot = scheduler.snapshot()
+                queue_progress_var.set(snapshot["percent"])
+                states = snapshot["states"]
+                queue_status_var.set(
+                    f"{snapshot['percent']:.1f}% - {states.get('running', 0)} gravando, "
+                    f"{states.get('queued', 0)} na fila, {states.get('done', 0)}/{len(snapshot['jobs'])} "
+                    f"concluído(s) - ETA {format_duration(snapshot['eta'])}"
+                )
+                controllers_var.set("   ".join(
+                    f"{name}: {state['active']}/{state['limit']}"
+                    for name, state in snapshot["controllers"].items()
+                ))
+                selected = {job_ids[i] for i in jobs_listbox.curselection() if i < len(job_ids)}
+                jobs_listbox.delete(0, tk.END)
+                job_ids.clear()
+                for job in snapshot["jobs"]:
+                    percent = job["done"] / job["total"] * 100 if job["total"] else 0
+                    if job["state"] == "queued":
+                        timing = f"começa em {format_duration(job['starts_in'])}, ETA {format_duration(job['eta'])}"
+                    elif job["state"] == "running":
+                        timing = f"{job['rate'] / (1024*1024):5.1f} MB/s, ETA {format_duration(job['eta'])}"
+                    else:
+                        timing = job["error"] or ""
+                    jobs_listbox.insert(
+                        tk.END,
+                        f"{state_icons.get(job['state'], '•')} {percent:5.1f}%  {job['controller']:<14} "
+                        f"{job['label']}  {timing}",
+                    )
+                    job_ids.append(job["id"])
+                    if job["id"] in selected:
+                        jobs_listbox.selection_set(tk.END)
+            window.after(500, refresh_view)
+
+        def add_jobs():
+            image = image_var.get().strip()
+            if not image or not os.path.isfile(image):
+                messagebox.showerror("Erro", "❌ Selecione uma imagem válida!", parent=window)
+                return
+            targets = [devices[i]["path"] for i in devices_listbox.curselection()]
+            if self.active_usb_device in targets:
+                messagebox.showerror("Erro", f"❌ {self.active_usb_device} já está sendo gravado!", parent=window)
+                return
+            if not targets:
+                messagebox.showerror("Erro", "❌ Nenhum pendrive selecionado!", parent=window)
+                return
+            if not messagebox.askyesno(
                 "⚠️ CONFIRMAÇÃO FINAL",
-                f"TODOS OS DADOS NO DISPOSITIVO SERÃO APAGADOS!\n\n"
-                f"Distribuição: {distro_name}\n"
-                f"Dispositivo: {selected_usb}\n\n"
-                f"Continuar com a criação do USB bootável?",
+                "TODOS OS DADOS NOS DISPOSITIVOS SERÃO APAGADOS!\n\n" + "\n".join(targets) +
+                "\n\nAdicionar as gravações à fila?",
+                parent=window,
+            ):
+                return
+            if any(not os.access(device, os.W_OK) for device in targets) and not self.check_sudo_permission():
+                return
+            scheduler = self.get_write_scheduler(max_per_controller=per_controller_var.get())
+            for device in targets:
+                scheduler.submit(image, device, verify=verify_var.get())
+            scheduler.start()
+
+        def cancel_selected():
+            if self.write_scheduler is not None:
+                for i in jobs_listbox.curselection():
+                    self.write_scheduler.cancel(job_ids[i])
+
+        def cancel_all():
+            if self.write_scheduler is not None:
+                self.write_scheduler.cancel()
+
+        def on_close():
+            # As gravações continuam; sem novos jobs, os workers saem quando a fila esvaziar
+            if self.write_scheduler is not None:
+                self.write_scheduler.close()
+            window.destroy()
+
+        buttons = ttk.Frame(frame)
+        buttons.pack(pady=5)
+        ttk.Button(buttons, text="➕ Adicionar à fila", command=add_jobs).grid(row=0, column=0, padx=5)
+        ttk.Button(buttons, text="⏹️ Cancelar selecionadas", command=cancel_selected).grid(row=0, column=1, padx=5)
+        ttk.Button(buttons, text="🛑 Cancelar todas", command=cancel_all).grid(row=0, column=2, padx=5)
+        window.protocol("WM_DELETE_WINDOW", on_close)
+        refresh_view()
+
+    def on_station_slot_changed(self, slot):
+        if slot["state"] == "done":
+            self.ui_call(self.root.bell, wait=False)  # aviso sonoro: pendrive pronto para retirar
+
+    def open_station_window(self):
+        """Abre o modo estação: escolhe a imagem e os critérios; cada pendrive inserido é gravado sozinho"""
+        if self.hotplug_monitor is None:
+            messagebox.showerror("Modo Estação", "❌ O modo estação depende do monitor de USB (Linux)")
+            return
+
+        window = tk.Toplevel(self.root)
+        window.title("Modo Estação")
+        window.geometry("820x600")
+        window.transient(self.root)
+
+        frame = ttk.Frame(window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        image_frame = ttk.Frame(frame)
+        image_frame.pack(fill=tk.X)
+        ttk.Label(image_frame, text="Imagem:").grid(row=0, column=0, sticky=tk.W)
+        image_var = tk.StringVar(value=self.station.image if self.station else (self.custom_iso_path or ""))
+        ttk.Entry(image_frame, textvariable=image_var).grid(row=0, column=1, sticky=(tk.W, tk.E), padx=5)
+
+        def browse():
+            filename = filedialog.askopenfilename(
+                parent=window, title="Selecionar imagem",
+                filetypes=[("ISO files", "*.iso"), ("Disk images", "*.img"), ("All files", "*.*")],
             )
+            if filename:
+                image_var.set(filename)
+
+        ttk.Button(image_frame, text="Procurar", command=browse).grid(row=0, column=2)
+        image_frame.columnconfigure(1, weight=1)
+
+        criteria_frame = ttk.LabelFrame(frame, text="Critérios", padding="5")
+        criteria_frame.pack(fill=tk.X, pady=5)
+        usb_var = tk.BooleanVar(value=True)
+        mmc_var = tk.BooleanVar(value=False)
+        removable_var = tk.BooleanVar(value=False)
+        verify_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(criteria_frame, text="USB", variable=usb_var).grid(row=0, column=0, padx=5)
+        ttk.Checkbutton(criteria_frame, text="Cartão (mmc)", variable=mmc_var).grid(row=0, column=1, padx=5)
+        ttk.Checkbutton(criteria_frame, text="Só removíveis", variable=removable_var).grid(row=0, column=2, padx=5)
+        ttk.Checkbutton(criteria_frame, text="🔎 Verificar", variable=verify_var).grid(row=0, column=3, padx=5)
+        ttk.Label(criteria_frame, text="Tamanho (GB) de:").grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+        min_size_var = tk.StringVar(value="0")
+        ttk.Spinbox(criteria_frame, from_=0, to=4096, textvariable=min_size_var, width=6).grid(
+            row=1, column=1, padx=5, pady=(5, 0)
+        )
+        ttk.Label(criteria_frame, text="até (0 = sem limite):").grid(row=1, column=2, sticky=tk.W, pady=(5, 0))
+        max_size_var = tk.StringVar(value="0")
+        ttk.Spinbox(criteria_frame, from_=0, to=4096, textvariable=max_size_var, width=6).grid(
+            row=1, column=3, padx=5, pady=(5, 0)
+        )
 
-            if not confirm:
-                self.log("❌ Processo cancelado pelo usuário")
-                self.create_button.config(state="normal")
-                self.status_var.set("✅ Pronto")
+        station_status_var = tk.StringVar(value="⚪ Estação desligada")
+        ttk.Label(frame, textvariable=station_status_var, font=("Arial", 10, "bold")).pack(anchor=tk.W, pady=5)
+
+        slots_listbox = tk.Listbox(frame, height=14, font=("Consolas", 9))
+        slots_listbox.pack(fill=tk.BOTH, expand=True, pady=5)
+
+        state_labels = {
+            "queued": "⏳ na fila", "writing": "🔥 gravando", "verifying": "🔎 verificando",
+            "done": "🟢 PODE REMOVER", "failed": "❌ falhou", "cancelled": "⏹️ cancelado",
+            "removed": "⚠️ retirado", "rejected": "🚫 ignorado", "empty": "⚪ vazia",
+        }
+        state_colors = {"done": "#0a7d2c", "failed": "#b00020", "removed": "#b36b00", "rejected": "#777777"}
+
+        def refresh_view():
+            if not window.winfo_exists():
                 return
+            station = self.station
+            if station is not None:
+                snapshot = station.snapshot()
+                counts = snapshot["counts"]
+                active = sum(slot["state"] in DuplicatorStation.ACTIVE_STATES for slot in snapshot["slots"])
+                station_status_var.set(
+                    f"{'🟢 Estação ativa' if snapshot['running'] else '⚪ Estação desligada'} - "
+                    f"{active} em andamento, ✅ {counts['done']} gravado(s), ❌ {counts['failed']} falha(s), "
+                    f"⚠️ {counts['removed']} retirado(s) - {snapshot['per_hour']:.0f}/h"
+                )
+                slots_listbox.delete(0, tk.END)
+                for slot in snapshot["slots"]:
+                    detail = slot["message"]
+                    if slot["state"] in ("writing", "verifying"):
+                        detail = (f"{slot['percent']:5.1f}%  {slot['rate'] / (1024*1024):5.1f} MB/s  "
+                                  f"ETA {format_duration(slot['eta'])}")
+                    slots_listbox.insert(
+                        tk.END,
+                        f"{slot['slot']:<10} {state_labels.get(slot['state'], slot['state']):<18} "
+                        f"{slot['device']:<10} {format_size(slot['size']):>7}  {detail}",
+                    )
+                    if slot["state"] in state_colors:
+                        slots_listbox.itemconfig(tk.END, foreground=state_colors[slot["state"]])
+            window.after(500, refresh_view)
 
-            # Formata USB
-            self.status_var.set("🔄 Formatando USB...")
-            if not self.format_usb(selected_usb):
-                messagebox.showerror("Erro", "❌ Falha na formatação do USB!")
-                self.create_button.config(state="normal")
-                self.status_var.set("❌ Erro na formatação")
+        def start_station():
+            if self.station is not None and self.station.running:
+                return
+            image = image_var.get().strip()
+            if not image or not os.path.isfile(image):
+                messagebox.showerror("Erro", "❌ Selecione uma imagem válida!", parent=window)
+                return
+            transports = tuple(name for name, var in (("usb", usb_var), ("mmc", mmc_var)) if var.get())
+            if not transports:
+                messagebox.showerror("Erro", "❌ Escolha ao menos um barramento!", parent=window)
                 return
+            try:
+                criteria = {
+                    "transports": transports,
+                    "removable": removable_var.get(),
+                    "min_size": int(float(min_size_var.get() or 0) * 1024**3),
+                    "max_size": int(float(max_size_var.get() or 0) * 1024**3),
+                }
+            except ValueError:
+                messagebox.showerror("Erro", "❌ Tamanho inválido!", parent=window)
+                return
+            self.start_station(image, criteria, verify=verify_var.get(), monitor=False)
 
-            # Grava ISO no USB
-            self.status_var.set("🔥 Gravando ISO no USB...")
-            self.log("🔄 Iniciando gravação...")
+        def stop_station():
+            self.stop_station()
 
-            # ✅ USA MÉTODO CONFIÁVEL COM PROGRESSO
-            self.log("🎯 Usando método confiável com progresso...")
-            if self.write_to_usb_reliable(str(iso_file_path), selected_usb, base_progress, writing_progress_weight):
-                self.log("✅ Gravação bem-sucedida!")
-            else:
-                self.log("⚠️ Método confiável falhou, tentando fallback...")
-                if not self.write_to_usb(str(iso_file_path), selected_usb, base_progress, writing_progress_weight):
-                    messagebox.showerror(
-                        "Erro de Gravação", 
-                        "❌ Falha na gravação do USB!\n\n"
-                        "Possíveis causas:\n"
-                        "• USB com problemas físicos\n"
-                        "• ISO corrompida\n"  
-                        "• Dispositivo protegido contra gravação\n\n"
-                        "Tente:\n"
-                        "• Usar outro USB\n"
-                        "• Verificar a ISO\n"
-                        "• Testar em outra porta USB"
-                    )
-                    self.create_button.config(state="normal")
-                    self.status_var.set("❌ Erro na gravação")
-                    return
+        def cancel_station():
+            if messagebox.askyesno("Modo Estação", "Cancelar também as gravações em andamento?", parent=window):
+                self.stop_station(cancel=True)
 
-            # Sucesso!
-            self.progress_var.set(100)
-            self.progress_label.config(text="100%")
-            self.status_var.set("✅ USB bootável criado com sucesso!")
+        buttons = ttk.Frame(frame)
+        buttons.pack(pady=5)
+        ttk.Button(buttons, text="▶️ Ligar estação", command=start_station).grid(row=0, column=0, padx=5)
+        ttk.Button(buttons, text="⏸️ Desligar (termina as em andamento)", command=stop_station).grid(
+            row=0, column=1, padx=5
+        )
+        ttk.Button(buttons, text="🛑 Desligar e cancelar", command=cancel_station).grid(row=0, column=2, padx=5)
+        ttk.Label(frame, text=f"📝 Registro: {self.config_dir / 'station_log.csv'}").pack(anchor=tk.W)
+        refresh_view()
 
-            messagebox.showinfo(
-                "🎉 Sucesso!",
-                f"USB bootável criado com sucesso!\n\n"
-                f"Distribuição: {distro_name}\n"
-                f"Dispositivo: {selected_usb}\n\n"
-                f"O USB está pronto para uso!",
-            )
+    def start_creation(self):
+        """Lê as escolhas na thread do Tk e inicia a criação em thread separada"""
+        selected_usb = self.get_selected_usb_device()
+        if not selected_usb:
+            messagebox.showerror("Erro", "❌ Selecione um dispositivo USB da lista!")
+            return
 
-            self.log("🎉 Processo concluído com sucesso!")
+        iso_path, build = None, None
+        if self.custom_iso_var.get():
+            # Modo ISO personalizada - sem download
+            iso_path = self.iso_path_var.get()
+            if not iso_path or not Path(iso_path).exists():
+                messagebox.showerror("Erro", "❌ Selecione um arquivo ISO válido!")
+                return
+        else:
+            build = (self.family_var.get(), self.variant_var.get(), self.arch_var.get(), self.version_var.get())
+            if not all(build):
+                messagebox.showerror("Erro", "❌ Selecione uma distribuição completa!")
+                return
 
-        except Exception as e:
-            self.log(f"❌ Erro inesperado: {e}")
-            messagebox.showerror("Erro", f"❌ Ocorreu um erro inesperado:\n{e}")
-            self.status_var.set("❌ Erro no processo")
+        # ✅ NOVO: Controla estado dos botões
+        self.create_button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+        self.status_var.set("🔄 Iniciando processo...")
 
-        finally:
-            # ✅ NOVO: Finaliza controle de operação
-            self.is_operation_running = False
-            self.should_cancel = False
-            self.current_process = None
-            self.create_button.config(state="normal")
-            self.cancel_button.config(state="disabled")
+        thread = threading.Thread(target=self.create_bootable_usb, args=(selected_usb, iso_path, build))
+        thread.daemon = True
+        thread.start()
 
-    def stop_current_operation(self):
-        """Para a operação atual (download ou gravação)"""
+    def create_bootable_usb(self, device, iso_path=None, build=None):
+        """Roda a gravação do núcleo na thread de trabalho e libera os botões no fim"""
         try:
-            self.should_cancel = True
-            self.log("🛑 Solicitando parada da operação atual...")
-            
-            if self.current_process:
-                try:
-                    # Tenta terminar graciosamente primeiro
-                    self.current_process.terminate()
-                    time.sleep(2)
-                    
-                    # Força se necessário
-                    if self.current_process.poll() is None:
-                        self.current_process.kill()
-                        
-                    self.log("✅ Processo terminado")
-                except:
-                    pass
-                finally:
-                    self.current_process = None
-            
-            # Para processos dd específicos
-            self.kill_dd_processes()
-            
-            return True
-            
-        except Exception as e:
-            self.log(f"⚠️ Erro ao parar operação: {e}")
-            return False
+            self.run_write_job(device, iso_path=iso_path, build=build)
+        finally:
+            self.ui_call(self._reset_operation_buttons, wait=False)
 
-    def kill_dd_processes(self):
-        """Mata processos dd multiplataforma"""
-        try:
-            system = platform.system().lower()
-            
-            if system == "windows":
-                commands = [
-                    ["taskkill", "/F", "/IM", "dd.exe"],
-                    ["powershell", "Get-Process dd -ErrorAction SilentlyContinue | Stop-Process -Force"]
-                ]
-                
-                for cmd in commands:
-                    try:
-                        subprocess.run(cmd, capture_output=True, timeout=5)
-                    except:
-                        pass
-                        
-            else:
-                # Linux/Mac - usa o método de comando sudo
-                commands = [
-                    ["pkill", "-f", "dd of="],
-                    ["pkill", "-f", "pv.*dd"], 
-                    ["pkill", "-9", "dd"]
-                ]
-                
-                for cmd in commands:
-                    if os.geteuid() != 0 and self.sudo_password:
-                        success, stdout, stderr = self.run_sudo_command(cmd)
-                    else:
-                        try:
-                            subprocess.run(cmd, capture_output=True, timeout=5)
-                        except:
-                            pass
-                    
-            self.log("✅ Processos dd terminados")
-            
-        except Exception as e:
-            self.log(f"⚠️ Erro ao matar processos dd: {e}")
+    def _reset_operation_buttons(self):
+        self.create_button.config(state="normal")
+        self.cancel_button.config(state="disabled")
 
     def cancel_operation(self):
         """Cancela a operação atual via interface"""
@@ -2951,9 +8263,8 @@ class BootableUSBCreator:
             # Para a operação
             self.stop_current_operation()
             
-            # Reseta interface
-            self.progress_var.set(0)
-            self.progress_label.config(text="0%")
+            # Reseta interface (pelo barramento, depois do último progresso pendente)
+            self.set_progress(0)
             self.status_var.set("⏹️ Operação cancelada")
             self.create_button.config(state="normal")
             self.cancel_button.config(state="disabled")  # ✅ Desabilita botão de cancelamento
@@ -2968,63 +8279,268 @@ class BootableUSBCreator:
         except Exception as e:
             print(f"Erro: {e}")
             input("Pressione Enter para sair...")
+        finally:
+            self.stop_control_api()
+            self.stop_privileged_helper()
 
-    def is_device_active(self, device):
-        """Verifica se o dispositivo está sendo acessado/escrito"""
-        try:
-            # Verifica se há I/O recente
-            current_sectors = self.get_device_io_stats(device)
-            if current_sectors is None:
-                return True  # Assume ativo se não conseguiu verificar
-            
-            # Pequena pausa e verifica novamente
+
+def run_cli(args):
+    """--cli: grava (e verifica) sem interface; devolve o código de saída do processo"""
+    app = HeadlessUSBCreator(
+        assume_yes=args.yes, offline=True if args.offline else None, log_level=args.log_level,
+    )
+    app.partition_backend = args.partition_backend
+    app.partition_label = args.partition_label
+    app.filesystem = args.filesystem
+    app.verify_after_write = args.verify
+
+    try:
+        devices = app.detect_usb_devices()
+        if args.list_devices:
+            keys = ("id", "path", "size", "vendor", "model", "transport", "mountpoints",
+                    "usb_controller", "usb_hub", "usb_speed")
+            app.emit("devices", devices=[{key: device.get(key) for key in keys} for device in devices])
+            return 0
+
+        if args.api is not None:
+            return run_cli_api(app, args)
+        if args.job:
+            return run_cli_write_queue(app, args, devices)
+        if args.station:
+            return run_cli_station(app, args)
+
+        if not args.device or bool(args.iso) == bool(args.build):
+            app.emit("error", message="--cli requer --device e exatamente um entre --iso e --build")
+            return 2
+        if args.device not in {device["path"] for device in devices}:
+            # Mesma regra da GUI: só pendrives detectados, nunca um disco do sistema
+            app.emit("error", message=f"{args.device} não é um pendrive USB detectado")
+            return 2
+
+        build = app.parse_build_spec(args.build) if args.build else None
+        ok = app.run_write_job(args.device, iso_path=args.iso, build=build)
+        app.emit("result", ok=ok, device=args.device, sha256=app.last_verified_sha256)
+        return 0 if ok else 1
+    except KeyboardInterrupt:
+        app.should_cancel = True
+        if app.write_scheduler is not None:
+            app.write_scheduler.cancel()
+        app.emit("result", ok=False, device=args.device, cancelled=True)
+        return 130
+    except ValueError as e:
+        app.emit("error", message=str(e))
+        return 2
+    finally:
+        app.stop_control_api()
+        app.stop_privileged_helper()
+
+
+def run_cli_api(app, args):
+    """--cli --api: só serve a API de controle até Ctrl+C; quem grava é o orquestrador, pelo socket"""
+    server = app.start_control_api(args.api or None)
+    if server is None:
+        return 1
+    app.emit("api", socket=server.socket_path, version=CONTROL_API_VERSION)
+    try:
+        while True:
             time.sleep(1)
-            new_sectors = self.get_device_io_stats(device)
-            
-            if new_sectors is not None and current_sectors is not None:
-                return new_sectors > current_sectors
-            
-            return True  # Assume ativo por padrão
-        except:
-            return True
+    except KeyboardInterrupt:
+        if app.write_scheduler is not None:
+            app.write_scheduler.cancel()
+    return 0
+
+
+def run_cli_write_queue(app, args, devices):
+    """--cli --job: grava vários pendrives pela fila, respeitando a banda de cada controlador USB"""
+    detected = {device["path"] for device in devices}
+    jobs = []
+    for spec in args.job:
+        device, separator, image = spec.partition("=")
+        if not separator or not device or not image:
+            app.emit("error", message=f"--job inválido: {spec} (use DISPOSITIVO=IMAGEM)")
+            return 2
+        if device not in detected:
+            app.emit("error", message=f"{device} não é um pendrive USB detectado")
+            return 2
+        jobs.append((image, device))
+
+    result = app.run_write_queue(jobs, verify=args.verify, max_per_controller=args.max_per_controller)
+    if result is None:
+        return 1
+    for job in result["jobs"]:
+        app.emit("result", ok=job["state"] == "done", device=job["device"], image=job["image"],
+                 state=job["state"], error=job["error"], sha256=job["sha256"])
+    return 0 if result["states"].get("done", 0) == len(result["jobs"]) else 1
+
+
+def run_cli_station(app, args):
+    """--cli --station: grava todo pendrive inserido até Ctrl+C; eventos "slot" a cada mudança de vaga"""
+    criteria = {
+        "transports": tuple(args.station_transport or ("usb",)),
+        "removable": args.removable_only,
+        "min_size": parse_size(args.min_size) if args.min_size else 0,
+        "max_size": parse_size(args.max_size) if args.max_size else 0,
+    }
+    station = app.start_station(args.station, criteria, verify=not args.no_verify,
+                                max_per_controller=args.max_per_controller)
+    if station is None:
+        return 1
+    try:
+        while True:
+            for slot in station.snapshot()["slots"]:
+                if slot["state"] in ("writing", "verifying"):
+                    app.set_progress(slot["percent"], f"{slot['state']}, {slot['rate'] / (1024*1024):.1f} MB/s, "
+                                     f"ETA {format_duration(slot['eta'])}", job=f"slot:{slot['slot']}")
+            time.sleep(1)
+    except KeyboardInterrupt:
+        # Ctrl+C encerra a estação; gravações pela metade são canceladas
+        app.stop_station(cancel=True)
+        station.scheduler.wait(timeout=30)
+    snapshot = station.snapshot()
+    app.emit("result", ok=snapshot["counts"]["failed"] == 0, station=True, **snapshot["counts"])
+    return 0 if snapshot["counts"]["failed"] == 0 else 1
+
 
 def main():
     """Função principal"""
+    import argparse
+    parser = argparse.ArgumentParser(description="Bootable USB Creator")
+    parser.add_argument(
+        "--batch-download", nargs="+", metavar="SPEC",
+        help="Baixa ISOs em lote sem interface: 'Família:Variante:Arquitetura[:Versão]' ou 'latest'",
+    )
+    parser.add_argument("--max-concurrent", type=int, default=4, help="Downloads simultâneos no lote")
+    parser.add_argument("--max-per-host", type=int, default=2, help="Downloads simultâneos por servidor")
+    parser.add_argument(
+        "--update-catalog", nargs="?", const="", metavar="FEED",
+        help="Sincroniza o catálogo com um feed de deltas (URL ou diretório); sem FEED usa o último configurado",
+    )
+    parser.add_argument("--offline", action="store_true", help="Não acessa a rede; usa apenas o pacote offline importado")
+    parser.add_argument("--export-bundle", metavar="ARQUIVO", help="Gera um pacote offline (.tar) com catálogo, URLs e checksums")
+    parser.add_argument(
+        "--bundle-builds", nargs="+", metavar="SPEC",
+        help="Builds do pacote: 'Família:Variante:Arquitetura[:Versão]' (padrão: mais recentes de todo o catálogo)",
+    )
+    parser.add_argument("--bundle-isos", action="store_true", help="Inclui no pacote as ISOs já baixadas")
+    parser.add_argument("--import-bundle", metavar="ARQUIVO", help="Importa um pacote offline e ativa o modo offline")
+    parser.add_argument(
+        "--partition-backend", choices=["native", "parted"], default="native",
+        help="Criação da tabela de partições: native (Python, sem subprocessos) ou parted/sfdisk",
+    )
+    parser.add_argument("--partition-label", choices=["dos", "gpt"], default="dos", help="Tipo de tabela de partições")
+    parser.add_argument("--privileged-helper", metavar="SOCKET", help=argparse.SUPPRESS)
+    parser.add_argument(
+        "--filesystem", choices=["fat32", "exfat", "auto"], default="fat32",
+        help="Sistema de arquivos do formatador nativo (auto: exFAT acima de 32 GiB)",
+    )
+    parser.add_argument(
+        "--cli", action="store_true",
+        help="Grava sem interface gráfica (não importa tkinter); eventos em JSON, um por linha, no stdout",
+    )
+    parser.add_argument("--device", metavar="DISPOSITIVO", help="--cli: pendrive de destino (ex.: /dev/sdb)")
+    parser.add_argument("--iso", metavar="ARQUIVO", help="--cli: ISO local a gravar")
+    parser.add_argument("--build", metavar="SPEC", help="--cli: baixa e grava 'Família:Variante:Arquitetura[:Versão]'")
+    parser.add_argument("--yes", action="store_true", help="--cli: confirma o apagamento do dispositivo")
+    parser.add_argument("--verify", action="store_true", help="--cli: relê o pendrive e compara com a ISO")
+    parser.add_argument("--list-devices", action="store_true", help="--cli: lista os pendrives detectados e sai")
+    parser.add_argument(
+        "--job", action="append", metavar="DISPOSITIVO=IMAGEM",
+        help="--cli: grava vários pendrives pela fila (repetível), ex.: --job /dev/sdb=a.iso --job /dev/sdc=b.iso",
+    )
+    parser.add_argument(
+        "--station", metavar="IMAGEM",
+        help="--cli: modo estação, grava e verifica todo pendrive inserido que atender aos critérios (até Ctrl+C)",
+    )
+    parser.add_argument(
+        "--station-transport", action="append", choices=["usb", "mmc"],
+        help="--station: barramentos aceitos (repetível; padrão: usb)",
+    )
+    parser.add_argument("--removable-only", action="store_true", help="--station: só discos marcados como removíveis")
+    parser.add_argument("--min-size", metavar="TAMANHO", help="--station: tamanho mínimo, ex.: 8G")
+    parser.add_argument("--max-size", metavar="TAMANHO", help="--station: tamanho máximo, ex.: 64G")
+    parser.add_argument("--no-verify", action="store_true", help="--station: não relê os pendrives após gravar")
+    parser.add_argument(
+        "--max-per-controller", type=int, default=4,
+        help="--cli --job/--station: teto de gravações simultâneas por controlador USB (o limite real se adapta à vazão)",
+    )
+    parser.add_argument(
+        "--api", nargs="?", const="", metavar="SOCKET",
+        help="Liga a API de controle (JSON por linha num socket Unix; padrão ~/.bootable_usb_creator/control.sock); "
+             "com --cli, só serve a API até Ctrl+C",
+    )
+    parser.add_argument(
+        "--log-level", choices=list(LOG_LEVELS), default="INFO",
+        help="Nível mínimo exibido no log (o arquivo em ~/.bootable_usb_creator/logs guarda tudo)",
+    )
+    args = parser.parse_args()
+    offline = True if args.offline else None
+
+    if args.privileged_helper:
+        # Processo root iniciado por PrivilegedHelperClient.start (via sudo)
+        run_privileged_helper(args.privileged_helper)
+        sys.exit(0)
+
+    if args.cli:
+        sys.exit(run_cli(args))
+
+    if args.import_bundle or args.export_bundle:
+        app = USBCreatorCore(offline=offline, log_level=args.log_level)
+        try:
+            if args.import_bundle:
+                app.apply_offline_bundle(app.import_offline_bundle(args.import_bundle))
+            if args.export_bundle:
+                builds = [app.parse_build_spec(spec) for spec in args.bundle_builds] if args.bundle_builds else None
+                app.export_offline_bundle(args.export_bundle, builds, include_isos=args.bundle_isos)
+        except Exception as e:
+            print(f"❌ Falha no pacote offline: {e}")
+            sys.exit(1)
+        if not args.batch_download and args.update_catalog is None:
+            sys.exit(0)
+
+    if args.update_catalog is not None:
+        app = USBCreatorCore(offline=offline, log_level=args.log_level)
+        try:
+            app.update_catalog(args.update_catalog or None)
+        except Exception as e:
+            print(f"❌ Falha ao atualizar o catálogo: {e}")
+            sys.exit(1)
+        if not args.batch_download:
+            sys.exit(0)
+
+    if args.batch_download:
+        # Downloads não precisam de privilégios nem de interface gráfica
+        app = USBCreatorCore(offline=offline, log_level=args.log_level)
+        builds = []
+        for spec in args.batch_download:
+            if spec == "latest":
+                builds.extend(app.list_catalog_builds(latest_only=True))
+            else:
+                builds.append(app.parse_build_spec(spec))
+        result = app.run_batch_download(builds, args.max_concurrent, args.max_per_host)
+        failed = result["states"].get("failed", 0)
+        print(f"✅ Lote finalizado: {len(result['jobs']) - failed} ok, {failed} falha(s)")
+        sys.exit(1 if failed else 0)
+
+    # Só a interface gráfica mostra o cabeçalho: no --cli o stdout é JSON puro
     print("🐧 Bootable USB Creator - Sistema Escalável")
     print("🚀 Pronto para milhares de distribuições!")
 
-    system = platform.system().lower()
-    
-    # ✅ NOVO: Verificação e solicitação de elevação
-    if system != "windows":
-        if os.geteuid() != 0:
-            print("🔐 Este aplicativo requer privilégios de superusuário")
-            print("💡 Solicitando elevação...")
-            
-            # Tenta reiniciar com sudo
-            try:
-                subprocess.run(['sudo', sys.executable] + sys.argv, check=True)
-                sys.exit(0)
-            except subprocess.CalledProcessError:
-                print("❌ Falha na elevação. Execute manualmente com:")
-                print("   sudo python3 create-usb-x-full.py")
-                print("⏰ Continuando com privilégios limitados em 5 segundos...")
-                time.sleep(5)
-        else:
-            print("✅ Executando com privilégios de superusuário")
-    else:
-        # Verificação para Windows
+    # Sem reexecução via sudo: as operações privilegiadas passam pelo ajudante (uma única senha)
+    if platform.system().lower() == "windows":
         try:
             import ctypes
             if ctypes.windll.shell32.IsUserAnAdmin() == 0:
                 print("⚠️  No Windows, execute como Administrador para melhor detecção USB")
-                print("⏰ Continuando em 3 segundos...")
-                time.sleep(3)
-        except:
+        except Exception:
             pass
 
     try:
-        app = BootableUSBCreator()
+        app = BootableUSBCreator(offline=offline, log_level=args.log_level)
+        app.partition_backend = args.partition_backend
+        app.partition_label = args.partition_label
+        app.filesystem = args.filesystem
+        if args.api is not None:
+            app.start_control_api(args.api or None)
         app.run()
     except Exception as e:
         print(f"❌ Erro ao iniciar aplicativo: {e}")
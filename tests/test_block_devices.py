@@ -0,0 +1,108 @@
+"""Discos pelo /sys: ids únicos por LUN e por pendrive, partições no disco certo, num sysfs falso"""
+
+import os
+
+from bootable_usb_creator_final import enumerate_block_devices, is_usb_target, same_disk
+
+
+def make_disk(sys_root, port, hctl, name, serial=None):
+    """Cria /sys/block/<name> apontando para um disco SCSI atrás do pendrive na porta USB"""
+    usb_dir = sys_root / "devices/pci0000:00/0000:00:14.0/usb1" / port
+    usb_dir.mkdir(parents=True, exist_ok=True)
+    (usb_dir / "idVendor").write_text("0781\n")
+    (usb_dir / "speed").write_text("480\n")
+    if serial:
+        (usb_dir / "serial").write_text(serial + "\n")
+    host = hctl.split(":")[0]
+    scsi_dir = usb_dir / f"{port}:1.0/host{host}/target{hctl.rsplit(':', 1)[0]}" / hctl
+    scsi_dir.mkdir(parents=True)
+    (scsi_dir / "model").write_text("Cruzer\n")
+    disk_dir = scsi_dir / "block" / name
+    disk_dir.mkdir(parents=True)
+    (disk_dir / "size").write_text("31260672\n")
+    (disk_dir / "removable").write_text("1\n")
+    os.symlink(scsi_dir, disk_dir / "device")
+    (sys_root / "block").mkdir(exist_ok=True)
+    os.symlink(disk_dir, sys_root / "block" / name)
+
+
+def enumerate_fake(tmp_path):
+    mounts = tmp_path / "mounts"
+    mounts.write_text("")
+    return enumerate_block_devices(str(tmp_path / "sys"), mounts_path=str(mounts), dev_root="/dev")
+
+
+def test_card_reader_luns_without_serial_get_distinct_ids(tmp_path):
+    make_disk(tmp_path / "sys", "1-2", "6:0:0:0", "sdb")
+    make_disk(tmp_path / "sys", "1-2", "6:0:0:1", "sdc")
+
+    devices = enumerate_fake(tmp_path)
+
+    assert [device["scsi_hctl"] for device in devices] == ["6:0:0:0", "6:0:0:1"]
+    assert [device["id"] for device in devices] == ["usb-port-1-2", "usb-port-1-2-lun1"]
+
+
+def test_identical_sticks_sharing_a_serial_get_distinct_ids(tmp_path):
+    make_disk(tmp_path / "sys", "1-1", "6:0:0:0", "sdb", serial="0123456789")
+    make_disk(tmp_path / "sys", "1-3", "7:0:0:0", "sdc", serial="0123456789")
+
+    devices = enumerate_fake(tmp_path)
+
+    assert [device["id"] for device in devices] == ["usb-Cruzer_0123456789-port-1-1", "usb-Cruzer_0123456789-port-1-3"]
+
+
+def test_duplicate_serial_ids_survive_a_replug_with_new_kernel_names(tmp_path):
+    make_disk(tmp_path / "first/sys", "1-1", "6:0:0:0", "sdb", serial="0123456789")
+    make_disk(tmp_path / "first/sys", "1-3", "7:0:0:0", "sdc", serial="0123456789")
+    make_disk(tmp_path / "second/sys", "1-3", "8:0:0:0", "sdd", serial="0123456789")
+    make_disk(tmp_path / "second/sys", "1-1", "9:0:0:0", "sde", serial="0123456789")
+
+    before = {device["usb_port_path"]: device["id"] for device in enumerate_fake(tmp_path / "first")}
+    after = {device["usb_port_path"]: device["id"] for device in enumerate_fake(tmp_path / "second")}
+
+    assert before == after
+
+
+def test_same_disk_compares_parent_disks_not_prefixes(tmp_path):
+    sys_root = tmp_path / "sys"
+    for name, parent in (("sdb", None), ("sdb1", "sdb"), ("sdba", None)):
+        disk_dir = sys_root / "devices/virtual/block" / (parent or name)
+        entry = disk_dir / name if parent else disk_dir
+        entry.mkdir(parents=True, exist_ok=True)
+        if parent:
+            (entry / "partition").write_text("1\n")
+        (sys_root / "class/block").mkdir(parents=True, exist_ok=True)
+        os.symlink(entry, sys_root / "class/block" / name)
+
+    assert same_disk("/dev/sdb1", "/dev/sdb", str(sys_root))
+    assert same_disk("/dev/sdb", "/dev/sdb", str(sys_root))
+    assert not same_disk("/dev/sdba", "/dev/sdb", str(sys_root))
+    assert not same_disk("sdb", "/dev/sdb", str(sys_root))
+
+
+def test_root_on_luks_over_lvm_marks_the_card_as_system(tmp_path):
+    sys_root = tmp_path / "sys"
+    disk_dir = sys_root / "devices/platform/mmc0/mmc0:0001/block/mmcblk0"
+    (disk_dir / "mmcblk0p2").mkdir(parents=True)
+    (disk_dir / "mmcblk0p2" / "partition").write_text("2\n")
+    (disk_dir / "removable").write_text("0\n")
+    (sys_root / "block").mkdir()
+    os.symlink(disk_dir, sys_root / "block" / "mmcblk0")
+    # mmcblk0p2 -> dm-0 (LUKS) -> dm-1 (LVM, montado como /dev/mapper/vg-root)
+    lower = disk_dir / "mmcblk0p2"
+    for holder, dm_name in (("dm-0", "luks-root"), ("dm-1", "vg-root")):
+        holder_dir = sys_root / "devices/virtual/block" / holder
+        (holder_dir / "dm").mkdir(parents=True)
+        (holder_dir / "dm" / "name").write_text(dm_name + "\n")
+        os.symlink(holder_dir, sys_root / "block" / holder)
+        (lower / "holders").mkdir()
+        os.symlink(holder_dir, lower / "holders" / holder)
+        lower = holder_dir
+    mounts = tmp_path / "mounts"
+    mounts.write_text("/dev/mapper/vg-root / ext4 rw 0 0\n")
+
+    device, = enumerate_block_devices(str(sys_root), names=["mmcblk0"], mounts_path=str(mounts), dev_root="/dev")
+
+    assert device["mountpoints"] == ["/"]
+    assert device["system"]
+    assert not is_usb_target(device)
@@ -0,0 +1,90 @@
+"""Feed de catálogo em diretório local: deltas, snapshot e atualização que falha no meio"""
+
+import io
+import json
+
+import pytest
+
+from bootable_usb_creator_final import CatalogFeedClient, HeadlessUSBCreator
+
+
+def family(*variants):
+    return {"family": "independent", "checksum_type": "sha256",
+            "variants": {variant: {"architectures": ["amd64"]} for variant in variants}}
+
+
+def publish(feed, name, data):
+    (feed / name).write_text(json.dumps(data), encoding="utf-8")
+
+
+@pytest.fixture
+def feed(tmp_path):
+    feed = tmp_path / "feed"
+    feed.mkdir()
+    publish(feed, "full.json", {"revision": 1, "distributions": {"Alpha": family("Std"), "Beta": family("Std")}})
+    publish(feed, "index.json", {"revision": 1, "min_revision": 1, "snapshot": "full.json"})
+    return feed
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    return HeadlessUSBCreator(offline=True, assume_yes=True, stream=io.StringIO())
+
+
+def test_client_combines_deltas_and_a_remove_rolled_back_later(feed):
+    publish(feed, "delta-2.json", {"revision": 2, "added": {"Gamma": family("Std")}, "removed": ["Alpha"]})
+    publish(feed, "delta-3.json", {"revision": 3, "changed": {"Alpha": family("Std", "Mini")}, "removed": ["Beta"]})
+    publish(feed, "index.json", {"revision": 3, "min_revision": 2, "snapshot": "full.json"})
+
+    update = CatalogFeedClient(feed).fetch_updates(1)
+
+    assert not update["full"] and update["revision"] == 3
+    assert sorted(update["upserts"]) == ["Alpha", "Gamma"]  # Alpha saiu na 2 e voltou na 3
+    assert update["removed"] == ["Beta"]
+    assert update["bytes"] > 0
+
+
+def test_client_falls_back_to_snapshot_behind_min_revision(feed):
+    publish(feed, "index.json", {"revision": 5, "min_revision": 4, "snapshot": "full.json"})
+
+    update = CatalogFeedClient(feed).fetch_updates(2)
+
+    assert update["full"] and sorted(update["upserts"]) == ["Alpha", "Beta"]
+
+
+def test_apply_reports_only_affected_families_and_persists(app, feed):
+    app.update_catalog(str(feed))
+    assert {"Alpha", "Beta"} <= set(app.distributions)
+
+    publish(feed, "delta-2.json", {"revision": 2, "changed": {"Beta": family("Std", "Mini")}, "removed": ["Alpha"]})
+    publish(feed, "index.json", {"revision": 2, "min_revision": 1, "snapshot": "full.json"})
+    changed, removed = app.update_catalog()
+
+    assert (changed, removed) == (["Beta"], ["Alpha"])
+    assert app.feed_state["revision"] == 2
+    assert app.catalog.has_build("Beta", "Mini", "amd64") and "Alpha" not in app.distributions
+    assert app.search_index.search("beta mini") and not app.search_index.search("alpha std")
+
+    changed, removed = app.update_catalog()  # nada novo: nenhuma família refeita
+    assert (changed, removed) == ([], [])
+
+    restarted = HeadlessUSBCreator(offline=True, assume_yes=True, stream=io.StringIO())
+    assert restarted.feed_state["revision"] == 2
+    assert "Alpha" not in restarted.distributions and restarted.catalog.has_build("Beta", "Mini", "amd64")
+
+
+def test_broken_delta_leaves_catalog_and_revision_untouched(app, feed):
+    app.update_catalog(str(feed))
+    before = json.dumps(app.distributions, sort_keys=True)
+
+    publish(feed, "delta-2.json", {"revision": 2, "added": {"Gamma": family("Std")}})
+    publish(feed, "delta-3.json", {"revision": 7, "removed": ["Beta"]})  # revisão errada
+    publish(feed, "index.json", {"revision": 3, "min_revision": 1, "snapshot": "full.json"})
+
+    with pytest.raises(ValueError):
+        app.update_catalog()
+
+    assert json.dumps(app.distributions, sort_keys=True) == before
+    assert app.feed_state["revision"] == 1
+    assert "Gamma" not in app.distributions
@@ -0,0 +1,34 @@
+"""Busca no catálogo: remoções e substituições não deixam o índice crescer sem limite"""
+
+from bootable_usb_creator_final import CatalogSearchIndex
+
+
+def family_builds(family, release):
+    return [(family, variant, arch, f"{release}.{minor}")
+            for variant in ("desktop", "server") for arch in ("amd64", "arm64") for minor in range(20)]
+
+
+def test_replace_family_compacts_dead_entries():
+    index = CatalogSearchIndex(family_builds("Ubuntu", 24) + family_builds("Debian", 12))
+
+    for release in range(25, 45):
+        index.replace_family("Ubuntu", family_builds("Ubuntu", release))
+
+    assert len(index) == 160
+    assert len(index.entries) <= 160 / (1 - 0.25) + 80  # mortas abaixo do limite + uma substituição
+    assert not any(word.startswith("25.") for word in index.words)  # vocabulário também compactado
+    assert index.search("ubuntu server arm64 44.19", limit=1) == [("Ubuntu", "server", "arm64", "44.19")]
+    assert index.search("ubuntu 30.1") == []
+    assert index.search("debian desktop amd64 12.0", limit=1) == [("Debian", "desktop", "amd64", "12.0")]
+
+
+def test_removed_family_can_be_added_back():
+    builds = family_builds("Fedora", 40)
+    index = CatalogSearchIndex(builds)
+
+    index.remove_family("Fedora")
+    assert len(index) == 0 and index.search("fedora") == []
+
+    index.add_builds(builds)
+    assert len(index) == len(builds)
+    assert index.search("fedora server arm64 40.3", limit=1) == [("Fedora", "server", "arm64", "40.3")]
@@ -0,0 +1,44 @@
+"""Versões resolvidas numa thread de trabalho só mudam o catálogo pela thread da interface"""
+
+import concurrent.futures
+import io
+import threading
+
+from bootable_usb_creator_final import HeadlessUSBCreator
+
+
+class SingleUIThreadCreator(HeadlessUSBCreator):
+    """ui_call entrega a uma única thread, como a GUI entrega à thread do Tk"""
+
+    def __init__(self, **kwargs):
+        self.ui = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.ui_calls = []
+        super().__init__(**kwargs)
+
+    def ui_call(self, func, *args, wait=True, **kwargs):
+        self.ui_calls.append(func.__name__)
+        future = self.ui.submit(func, *args, **kwargs)
+        return future.result() if wait else future
+
+
+def test_batch_listing_applies_versions_on_the_ui_thread(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    app = SingleUIThreadCreator(offline=True, assume_yes=True, stream=io.StringIO())
+    ui_thread = app.ui.submit(threading.get_ident).result()
+    mutations = []
+    set_family_versions = app.catalog.set_family_versions
+
+    def record(*args, **kwargs):
+        mutations.append(threading.get_ident())
+        return set_family_versions(*args, **kwargs)
+
+    app.catalog.set_family_versions = record
+    result = []
+    worker = threading.Thread(target=lambda: result.extend(app.list_catalog_builds(latest_only=True)))
+    worker.start()
+    worker.join(30)
+
+    assert result
+    assert mutations and set(mutations) == {ui_thread}
+    assert app.ui_calls == ["_store_all_versions", "_catalog_builds"]
+    app.ui.shutdown()
@@ -0,0 +1,53 @@
+"""Modo --cli: o stdout tem só eventos JSON, um por linha"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from bootable_usb_creator_final import HeadlessUSBCreator
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bootable_usb_creator_final.py")
+
+
+def test_cli_stdout_is_json_lines(tmp_path):
+    result = subprocess.run([sys.executable, SCRIPT, "--cli", "--list-devices"], capture_output=True, text=True,
+                            env=dict(os.environ, HOME=str(tmp_path)), timeout=60)
+
+    lines = result.stdout.splitlines()
+    assert lines
+    events = [json.loads(line) for line in lines]
+    assert events[-1]["event"] == "devices"
+
+
+class Lines:
+    def __init__(self):
+        self.lines = []
+
+    def write(self, text):
+        self.lines.append(text)
+
+    def flush(self):
+        pass
+
+
+def test_progress_from_many_threads_is_coalesced_per_job(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    stream = Lines()
+    app = HeadlessUSBCreator(assume_yes=True, stream=stream)
+    app.progress_interval = 3600  # só o primeiro evento e o de 100% passam
+
+    def report(job):
+        for percent in range(1, 101):
+            app.set_progress(percent, job=job)
+
+    threads = [threading.Thread(target=report, args=(f"job{index % 2}",)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    progress = [json.loads(line) for line in stream.lines if '"progress"' in line]
+    for job in ("job0", "job1"):
+        assert [event["percent"] for event in progress if event["job"] == job].count(100) == 1
@@ -0,0 +1,58 @@
+"""API de controle: jobs.wait pendentes não seguram as threads do pool"""
+
+import io
+import threading
+
+import pytest
+
+from bootable_usb_creator_final import ControlAPIClient, ControlAPIServer, HeadlessUSBCreator, WriteJobScheduler
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """Servidor com só 2 threads no pool e uma fila cuja gravação espera o teste liberar"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    image = tmp_path / "image.img"
+    image.write_bytes(b"\0" * 4096)
+    release = threading.Event()
+
+    def write_func(job, on_progress, cancelled):
+        release.wait(10)
+        return True
+
+    app = HeadlessUSBCreator(assume_yes=True, stream=io.StringIO())
+    app.write_scheduler = WriteJobScheduler(
+        write_func, topology=lambda device: {"controller": "xhci", "hub": None, "port_path": "1", "speed": 5000},
+        log=lambda message: None)
+    job = app.write_scheduler.submit(str(image), "/dev/sdz")
+    app.write_scheduler.start()
+    server = ControlAPIServer(app, tmp_path / "control.sock", max_workers=2, event_interval=0.05)
+    server.start()
+    client = ControlAPIClient(server.socket_path)
+    yield client, job["id"], release
+    release.set()
+    client.close()
+    server.stop()
+    app.write_scheduler.close()
+    app.write_scheduler.wait(5)
+
+
+def test_pending_waits_do_not_hold_pool_threads(api):
+    client, job_id, release = api
+    waits = [client.send("jobs.wait", id=job_id) for _ in range(6)]
+
+    client.sock.settimeout(2)
+    assert client.call("ping")  # com 6 esperas e 2 threads, o ping ainda é atendido
+    client.sock.settimeout(None)
+
+    release.set()
+    assert [client.result(request_id)["state"] for request_id in waits] == ["done"] * 6
+    assert client.call("jobs.wait", id=job_id)["state"] == "done"  # já terminado: resposta imediata
+
+
+def test_wait_timeout_returns_the_running_job(api):
+    client, job_id, release = api
+
+    assert client.call("jobs.wait", id=job_id, timeout=0.2)["state"] != "done"
+    with pytest.raises(RuntimeError, match="KeyError"):
+        client.call("jobs.wait", id="nenhum")
@@ -0,0 +1,92 @@
+"""Downloads contra um servidor HTTP local: só arquivos completos recebem o nome final"""
+
+import http.server
+import io
+import threading
+import time
+
+import pytest
+
+from bootable_usb_creator_final import BatchDownloadScheduler, HeadlessUSBCreator
+
+pytest.importorskip("requests")
+
+BODY = bytes(range(256)) * 64
+
+
+class FixtureHandler(http.server.BaseHTTPRequestHandler):
+    """/full.iso: inteiro; /cut.iso: fecha na metade; /paused.iso: para na metade até o teste liberar"""
+
+    resume = threading.Event()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY if self.path == "/full.iso" else BODY[:len(BODY) // 2])
+        if self.path == "/paused.iso":
+            self.wfile.flush()
+            self.resume.wait(10)
+            self.wfile.write(BODY[len(BODY) // 2:])
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    return HeadlessUSBCreator(assume_yes=True, stream=io.StringIO())
+
+
+def test_download_is_renamed_only_when_complete(app, server):
+    path = app.download_file(f"{server}/full.iso", "full.iso")
+
+    assert path.read_bytes() == BODY
+    assert not path.with_name("full.iso.part").exists()
+
+
+def test_partial_download_never_has_the_final_name(app, server):
+    FixtureHandler.resume.clear()
+    result = []
+    worker = threading.Thread(target=lambda: result.append(app.download_file(f"{server}/paused.iso", "paused.iso")))
+    worker.start()
+    part = app.download_dir / "paused.iso.part"
+    deadline = time.monotonic() + 5
+    while not (part.exists() and part.stat().st_size) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    # Se o processo morresse agora, a próxima execução não acharia "paused.iso" em cache
+    assert part.exists() and not (app.download_dir / "paused.iso").exists()
+    FixtureHandler.resume.set()
+    worker.join(10)
+    assert result[0].read_bytes() == BODY
+
+
+def test_cut_download_leaves_no_file_behind(app, server):
+    with pytest.raises(Exception):
+        app.download_file(f"{server}/cut.iso", "cut.iso")
+
+    assert list(app.download_dir.iterdir()) == []
+
+
+def test_cut_batch_download_is_not_cached_next_time(server, tmp_path):
+    scheduler = BatchDownloadScheduler(tmp_path / "cache", log=lambda message: None)
+    scheduler.submit(f"{server}/cut.iso", "cut.iso")
+    assert scheduler.run()["states"] == {"failed": 1}
+    assert list((tmp_path / "cache").iterdir()) == []
+
+    retry = BatchDownloadScheduler(tmp_path / "cache", log=lambda message: None)
+    assert retry.submit(f"{server}/cut.iso", "cut.iso")["state"] == "queued"
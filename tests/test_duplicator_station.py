@@ -0,0 +1,47 @@
+"""Estação duplicadora: uma vaga por porta USB e por LUN"""
+
+import itertools
+
+from bootable_usb_creator_final import DuplicatorStation
+
+GIB = 1024 ** 3
+
+
+class RecordingScheduler:
+    """Só registra os jobs enviados; nada é gravado"""
+
+    def __init__(self):
+        self.on_finish = None
+        self.jobs = []
+        self._ids = itertools.count(1)
+
+    def submit(self, image, device, verify=True, label=""):
+        job = {"id": next(self._ids), "device": device}
+        self.jobs.append(job)
+        return job
+
+    def start(self):
+        pass
+
+
+def usb_disk(name, port, hctl):
+    return {
+        "name": name, "path": f"/dev/{name}", "size": 8 * GIB, "removable": True, "read_only": False,
+        "transport": "usb", "scsi_type": "0", "system": False, "usb_port_path": port, "scsi_hctl": hctl,
+    }
+
+
+def test_card_reader_luns_get_one_slot_each(tmp_path):
+    image = tmp_path / "image.iso"
+    image.write_bytes(b"\0" * 4096)
+    disks = {"sdb": usb_disk("sdb", "1-2", "6:0:0:0"), "sdc": usb_disk("sdc", "1-2", "6:0:0:1")}
+    scheduler = RecordingScheduler()
+    station = DuplicatorStation(scheduler, image, detect=lambda name: [disks[name]], log=lambda message: None)
+    station.running = True
+
+    station.handle_event("add", "sdb")
+    station.handle_event("add", "sdc")
+
+    assert sorted(station.slots) == ["1-2:0", "1-2:1"]
+    assert [job["device"] for job in scheduler.jobs] == ["/dev/sdb", "/dev/sdc"]
+    assert {slot["state"] for slot in station.slots.values()} == {"queued"}
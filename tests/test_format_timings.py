@@ -0,0 +1,53 @@
+"""Tempos da formatação: cada intervalo é contado uma vez e aparece também nas falhas"""
+
+import io
+import time
+
+import pytest
+
+import bootable_usb_creator_final as creator
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    app = creator.HeadlessUSBCreator(assume_yes=True, stream=io.StringIO())
+    app.logged = []
+    monkeypatch.setattr(app, "log", lambda message, *args: app.logged.append(message))
+
+    def disk_tool(tool, device, input_text=None, **options):
+        time.sleep(0.2)
+        return True, "", ""
+
+    monkeypatch.setattr(app, "run_disk_tool", disk_tool)
+    return app
+
+
+def slow_partition(ready_after):
+    waits = iter(ready_after)
+
+    def wait_for_partition(device, number, timeout):
+        ready, elapsed = next(waits)
+        time.sleep(min(elapsed, timeout))
+        return ready
+
+    return wait_for_partition
+
+
+def test_reread_time_is_not_counted_twice(app, monkeypatch):
+    monkeypatch.setattr(creator, "wait_for_partition", slow_partition([(False, 0.1), (True, 0.1)]))
+    timings = []
+
+    start = time.perf_counter()
+    assert app._wait_partition_step(timings, "/dev/sdz")
+    wall = time.perf_counter() - start
+
+    assert [label for label, _ in timings] == ["aguardar partição", "partprobe", "aguardar partição (após releitura)"]
+    assert sum(elapsed for _, elapsed in timings) == pytest.approx(wall, abs=0.05)
+
+
+def test_timings_are_logged_when_the_partition_never_appears(app, monkeypatch):
+    monkeypatch.setattr(creator, "wait_for_partition", slow_partition([(False, 0.05), (False, 0.05)]))
+
+    assert not app.format_usb_alternative("/dev/sdz")
+    assert any("Total" in message for message in app.logged)
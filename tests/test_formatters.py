@@ -0,0 +1,77 @@
+"""Formatadores nativos em arquivos de imagem; o fsck do sistema confere, quando instalado"""
+
+import shutil
+import struct
+import subprocess
+
+import pytest
+
+from bootable_usb_creator_final import format_exfat, format_fat32
+
+MIB = 1024 * 1024
+
+
+def make_image(tmp_path, size_mb):
+    image = tmp_path / "disk.img"
+    with open(image, "wb") as f:
+        f.truncate(size_mb * MIB)
+    return image
+
+
+def fsck(tool, image):
+    if not shutil.which(tool):
+        pytest.skip(f"{tool} não instalado")
+    result = subprocess.run([tool, "-n", str(image)], capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+
+def test_fat32_image_passes_fsck(tmp_path):
+    image = make_image(tmp_path, 64)
+    info = format_fat32(str(image), label="USB_BOOT")
+
+    boot = image.read_bytes()[:512]
+    assert boot[82:90] == b"FAT32   " and boot[510:] == b"\x55\xaa"
+    assert info["clusters"] > 65525  # abaixo disso não é FAT32 válido
+    fsck("fsck.vfat", image)
+
+
+def test_exfat_image_passes_fsck(tmp_path):
+    image = make_image(tmp_path, 64)
+    format_exfat(str(image), label="USB_BOOT")
+
+    boot = image.read_bytes()[:512]
+    assert boot[3:11] == b"EXFAT   " and boot[510:] == b"\x55\xaa"
+    fsck("fsck.exfat", image)
+
+
+def test_fat32_uses_the_logical_sector_size_of_4kn_disks(tmp_path):
+    image = make_image(tmp_path, 301)
+    offset = MIB  # partição em 1 MiB, como single_partition_layout
+    info = format_fat32(str(image), offset=offset, size=300 * MIB, sector_size=4096)
+
+    data = image.read_bytes()
+    boot = data[offset:offset + 4096]
+    bytes_per_sector, spc, reserved = struct.unpack_from("<HBH", boot, 11)
+    hidden, total = struct.unpack_from("<II", boot, 28)
+    fat_sectors = struct.unpack_from("<I", boot, 36)[0]
+    assert (bytes_per_sector, hidden, total) == (4096, offset // 4096, 300 * MIB // 4096)
+    assert spc * 4096 == info["cluster_size"] and fat_sectors == info["fat_sectors"]
+    assert data[offset + 6 * 4096:offset + 7 * 4096] == boot  # cópia de reserva no setor 6
+    assert (offset + (reserved + 2 * fat_sectors) * 4096) % (4 * MIB) == 0  # dados alinhados ao bloco de apagamento
+    assert fat_sectors * 4096 // 4 >= info["clusters"] + 2
+
+
+def test_exfat_uses_the_logical_sector_size_of_4kn_disks(tmp_path):
+    image = make_image(tmp_path, 64)
+    format_exfat(str(image), sector_size=4096)
+
+    data = image.read_bytes()
+    assert data[108] == 12  # BytesPerSectorShift: 2^12
+    assert struct.unpack_from("<Q", data, 72)[0] == 64 * MIB // 4096
+    assert all(data[sector * 4096 - 4:sector * 4096] == b"\x00\x00\x55\xaa" for sector in range(2, 10))
+    checksum = 0
+    for index, byte in enumerate(data[:11 * 4096]):
+        if index not in (106, 107, 112):
+            checksum = ((((checksum & 1) << 31) | (checksum >> 1)) + byte) & 0xFFFFFFFF
+    assert data[11 * 4096:12 * 4096] == struct.pack("<I", checksum) * 1024
+    assert data[12 * 4096:24 * 4096] == data[:12 * 4096]  # região de boot de reserva
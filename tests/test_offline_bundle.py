@@ -0,0 +1,38 @@
+"""Pacote offline: só ISOs com checksum conferido são instaladas"""
+
+import hashlib
+import io
+import json
+import tarfile
+
+from bootable_usb_creator_final import OfflineBundle
+
+
+def add_bytes(tar, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+
+def make_bundle(path, isos, sums):
+    with tarfile.open(path, "w") as tar:
+        add_bytes(tar, OfflineBundle.INDEX_NAME, json.dumps({"format": OfflineBundle.FORMAT, "builds": []}).encode())
+        add_bytes(tar, "SHA256SUMS", "".join(f"{digest}  {name}\n" for name, digest in sums.items()).encode())
+        for name, data in isos.items():
+            add_bytes(tar, f"isos/{name}", data)
+
+
+def test_import_installs_only_isos_with_matching_digest(tmp_path):
+    isos = {"good.iso": b"good" * 1000, "tampered.iso": b"evil" * 1000, "unlisted.iso": b"none" * 1000}
+    sums = {
+        "good.iso": hashlib.sha256(isos["good.iso"]).hexdigest(),
+        "tampered.iso": hashlib.sha256(b"original").hexdigest(),
+    }
+    bundle = tmp_path / "bundle.tar"
+    make_bundle(bundle, isos, sums)
+    messages = []
+
+    OfflineBundle.import_bundle(bundle, tmp_path / "state", tmp_path / "isos", log=messages.append)
+
+    assert sorted(path.name for path in (tmp_path / "isos").iterdir()) == ["good.iso"]
+    assert any("unlisted.iso" in message and "sem checksum" in message for message in messages)
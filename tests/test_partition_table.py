@@ -0,0 +1,86 @@
+"""Tabela de partições nativa em arquivos de imagem, com setores lógicos de 512 e 4096 bytes"""
+
+import struct
+import zlib
+
+import pytest
+
+from bootable_usb_creator_final import (
+    GPT_TYPES, MBR_TYPES, gpt_table_sectors, read_partition_table, write_partition_table,
+)
+
+MIB = 1024 * 1024
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "disk.img"
+    with open(path, "wb") as f:
+        f.truncate(64 * MIB)
+    return path
+
+
+def gpt_header(data, lba, sector_size):
+    """Cabeçalho GPT do LBA e se o CRC dele confere"""
+    header = bytearray(data[lba * sector_size:lba * sector_size + 92])
+    stored = struct.unpack_from("<I", header, 16)[0]
+    struct.pack_into("<I", header, 16, 0)
+    return header, (zlib.crc32(header) & 0xFFFFFFFF) == stored
+
+
+@pytest.mark.parametrize("sector_size", [512, 4096])
+def test_mbr_round_trip(image, sector_size):
+    written = write_partition_table(str(image), "dos", sector_size=sector_size)
+
+    table = read_partition_table(str(image), sector_size=sector_size)
+    assert table["label"] == "dos" and table["crc_ok"]
+    assert table["partitions"] == written
+    partition = table["partitions"][0]
+    assert partition["start"] * sector_size == MIB
+    assert (partition["start"] + partition["size"]) * sector_size == 64 * MIB
+    assert partition["type_id"] == MBR_TYPES["fat32"] and partition["bootable"]
+
+
+@pytest.mark.parametrize("sector_size", [512, 4096])
+def test_gpt_round_trip_and_crcs(image, sector_size):
+    write_partition_table(str(image), "gpt", sector_size=sector_size)
+    data = image.read_bytes()
+    total_sectors = len(data) // sector_size
+    table_sectors = gpt_table_sectors(sector_size)
+
+    table = read_partition_table(str(image), sector_size=sector_size)
+    assert table["label"] == "gpt" and table["crc_ok"]
+    partition = table["partitions"][0]
+    assert partition["start"] * sector_size == MIB
+    assert partition["start"] + partition["size"] - 1 == total_sectors - 2 - table_sectors  # último LBA utilizável
+    assert partition["type_guid"] == GPT_TYPES["fat32"]
+
+    primary, primary_ok = gpt_header(data, 1, sector_size)
+    backup, backup_ok = gpt_header(data, total_sectors - 1, sector_size)
+    assert primary_ok and backup_ok
+    current, alternate, first_usable, last_usable = struct.unpack_from("<QQQQ", primary, 24)
+    assert (current, alternate) == (1, total_sectors - 1)
+    assert (first_usable, last_usable) == (2 + table_sectors, total_sectors - 2 - table_sectors)
+    assert struct.unpack_from("<QQ", backup, 24) == (total_sectors - 1, 1)
+    assert struct.unpack_from("<Q", backup, 72)[0] == total_sectors - 1 - table_sectors
+
+    entries_crc = struct.unpack_from("<I", primary, 88)[0]
+    for entries_lba in (2, total_sectors - 1 - table_sectors):
+        entries = data[entries_lba * sector_size:entries_lba * sector_size + 128 * 128]
+        assert zlib.crc32(entries) & 0xFFFFFFFF == entries_crc
+
+
+def test_gpt_read_with_wrong_sector_size_is_not_trusted(image):
+    write_partition_table(str(image), "gpt", sector_size=4096)
+
+    table = read_partition_table(str(image), sector_size=512)
+    assert table["label"] != "gpt" or not table["crc_ok"]
+
+
+def test_corrupted_gpt_entries_fail_crc(image):
+    write_partition_table(str(image), "gpt", sector_size=512)
+    with open(image, "r+b") as f:
+        f.seek(2 * 512 + 40)
+        f.write(b"\xff")
+
+    assert not read_partition_table(str(image), sector_size=512)["crc_ok"]
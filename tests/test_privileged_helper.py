@@ -0,0 +1,133 @@
+"""Ajudante privilegiado: só RPCs tipadas, nunca argv ou caminhos livres"""
+
+import io
+import os
+import threading
+import time
+
+import pytest
+
+import bootable_usb_creator_final as creator
+from bootable_usb_creator_final import PrivilegedHelperServer, check_sfdisk_script, disk_tool_argv
+
+
+@pytest.fixture
+def server(tmp_path):
+    return PrivilegedHelperServer(str(tmp_path / "helper.sock"), os.getuid(), sys_root=str(tmp_path / "sys"))
+
+
+def make_disk(sys_root, device_path, name, removable):
+    """/sys/block/<name> apontando para o disco em device_path (SATA interno ou atrás de um pendrive)"""
+    disk_dir = sys_root / "devices" / device_path / "block" / name
+    disk_dir.mkdir(parents=True)
+    (disk_dir / "size").write_text("31260672\n")
+    (disk_dir / "removable").write_text(f"{int(removable)}\n")
+    (disk_dir / "ro").write_text("0\n")
+    if "/usb1/" in device_path:
+        (sys_root / "devices" / device_path.split("/1-1:")[0] / "idVendor").write_text("0781\n")
+    (sys_root / "block").mkdir(exist_ok=True)
+    os.symlink(disk_dir, sys_root / "block" / name)
+
+
+def test_no_generic_run_endpoint(server):
+    assert not hasattr(server, "rpc_run")
+
+
+@pytest.mark.parametrize("pid", [-1, 0, 1, "-1", "123", 1.5, True])
+def test_kill_rejects_groups_init_and_untyped_pids(server, pid):
+    with pytest.raises(PermissionError):
+        server.rpc_kill(pid)
+
+
+def test_kill_rejects_process_without_allowed_device(server):
+    # O próprio processo de teste não segura nenhum pendrive
+    with pytest.raises(PermissionError):
+        server.rpc_kill(os.getppid())
+
+
+@pytest.mark.parametrize("call", [
+    lambda s: s.rpc_wipefs("/etc/passwd"),
+    lambda s: s.rpc_mkfs("/etc/foo"),
+    lambda s: s.rpc_zero("/dev/null"),
+    lambda s: s.rpc_parted("/dev/zero", "mklabel-msdos"),
+    lambda s: s.rpc_partprobe("/tmp"),
+])
+def test_tools_reject_non_device_paths(server, call):
+    with pytest.raises(PermissionError):
+        call(server)
+
+
+@pytest.mark.parametrize("tool, device, options", [
+    ("dd", "/dev/sdz", {}),
+    ("kill", "/dev/sdz", {}),
+    ("wipefs", "/etc/passwd", {}),
+    ("wipefs", "/dev/sdz", {"args": ["-a", "/etc/passwd"]}),
+    ("mkfs", "/dev/sdz1", {"label": "-C /etc/foo"}),
+    ("mkfs", "/dev/sdz1", {"fstype": "ext4"}),
+    ("parted", "/dev/sdz", {"action": "rm 1"}),
+    ("zero", "/dev/sdz", {"mib": 100000}),
+    ("zero", "/dev/sdz", {"mib": "10; rm"}),
+])
+def test_argv_builder_rejects_free_arguments(tool, device, options):
+    with pytest.raises(ValueError):
+        disk_tool_argv(tool, device, **options)
+
+
+def test_argv_builder_only_places_device_and_known_options():
+    assert disk_tool_argv("mkfs", "/dev/sdz1", fstype="vfat", label="USB_BOOT") == [
+        "mkfs.vfat", "-F", "32", "-n", "USB_BOOT", "/dev/sdz1",
+    ]
+    assert disk_tool_argv("parted", "/dev/sdz", action="mkpart-fat32") == [
+        "parted", "-s", "/dev/sdz", "mkpart", "primary", "fat32", "1MiB", "100%",
+    ]
+    assert disk_tool_argv("zero", "/dev/sdz", mib=10)[1:3] == ["if=/dev/zero", "of=/dev/sdz"]
+
+
+def test_sfdisk_script_rejects_control_bytes():
+    assert check_sfdisk_script("label: dos\nstart=2048, type=c\n")
+    with pytest.raises(ValueError):
+        check_sfdisk_script("label: dos\x00")
+    with pytest.raises(ValueError):
+        check_sfdisk_script("x" * 10000)
+
+
+def test_helper_refuses_internal_and_virtual_disks(server, tmp_path):
+    sys_root = tmp_path / "sys"
+    make_disk(sys_root, "pci0000:00/0000:00:17.0/ata1/host0/target0:0:0/0:0:0:0", "sdy", removable=False)
+    make_disk(sys_root, "pci0000:00/0000:00:14.0/usb1/1-1/1-1:1.0/host6/target6:0:0/6:0:0:0", "sdz",
+              removable=True)
+
+    server._check_disk("sdz")
+    for disk in ("sdy", "loop0", "dm-0"):
+        with pytest.raises(PermissionError):
+            server._check_disk(disk)
+
+
+def test_parallel_jobs_start_a_single_helper(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    started = []
+
+    class SlowHelper:
+        alive = False
+
+        def start(self, password):
+            started.append(password)
+            time.sleep(0.2)  # sudo + conexão: a outra thread chega no meio
+            self.alive = True
+            return {"pid": 1}
+
+        def close(self):
+            self.alive = False
+
+    monkeypatch.setattr(creator, "PrivilegedHelperClient", SlowHelper)
+    app = creator.HeadlessUSBCreator(assume_yes=True, stream=io.StringIO())
+    app.sudo_password = "senha"
+    helpers = []
+    threads = [threading.Thread(target=lambda: helpers.append(app.get_privileged_helper())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert started == ["senha"]
+    assert len(helpers) == 4 and all(helper is app.privileged_helper for helper in helpers)
@@ -0,0 +1,77 @@
+"""Preparação da gravação: só imagens com tabela de partições própria pulam a formatação"""
+
+import io
+
+import pytest
+
+import bootable_usb_creator_final as creator
+
+MIB = 1024 * 1024
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    app = creator.HeadlessUSBCreator(assume_yes=True, stream=io.StringIO())
+    app.formatted = []
+    monkeypatch.setattr(app, "unmount_all_partitions", lambda device: None)
+    monkeypatch.setattr(app, "format_usb", lambda device: app.formatted.append(device) or True)
+    monkeypatch.setattr(creator, "discard_device", lambda device, *args, **kwargs: "tail")
+    monkeypatch.setattr(creator.os, "geteuid", lambda: 0)
+    return app
+
+
+def make_image(path, hybrid):
+    with open(path, "wb") as f:
+        f.truncate(8 * MIB)
+        f.seek(creator.ISO9660_MAGIC_OFFSET)
+        f.write(b"CD001")
+    if hybrid:
+        creator.write_partition_table(str(path), rescan=False, sector_size=512)
+        with open(path, "r+b") as f:  # a tabela zera o primeiro MiB: devolve a marca da ISO
+            f.seek(creator.ISO9660_MAGIC_OFFSET)
+            f.write(b"CD001")
+    return str(path)
+
+
+def test_hybrid_image_skips_formatting(app, tmp_path):
+    image = make_image(tmp_path / "hybrid.iso", hybrid=True)
+
+    assert app.prepare_raw_write(image, "/dev/sdz")
+    assert creator.inspect_disk_image(image)["kind"] == "hybrid"
+
+
+def test_plain_iso_is_formatted_before_the_write(app, tmp_path, monkeypatch):
+    image = make_image(tmp_path / "plain.iso", hybrid=False)
+    monkeypatch.setattr(app, "open_device", lambda device, write: (_ for _ in ()).throw(OSError("parou aqui")))
+
+    assert not app.prepare_raw_write(image, "/dev/sdz")
+    with pytest.raises(OSError, match="parou aqui"):
+        app.write_scheduled_job({"image": image, "device": "/dev/sdz", "size": 8 * MIB, "verify": False},
+                                lambda done: None, lambda: False)
+    assert app.formatted == ["/dev/sdz"]
+
+
+def test_verified_job_reports_both_phases_complete(app, tmp_path, monkeypatch):
+    image = tmp_path / "image.img"
+    image.write_bytes(bytes(range(256)) * 4096)
+    target = tmp_path / "stick.img"
+    target.write_bytes(b"")
+    monkeypatch.setattr(app, "prepare_raw_write", lambda iso_path, device: True)
+    estimators = []
+
+    class RecordingEstimator(creator.ProgressEstimator):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            estimators.append(self)
+
+    monkeypatch.setattr(creator, "ProgressEstimator", RecordingEstimator)
+    size = image.stat().st_size
+    progress = []
+
+    job = {"image": str(image), "device": str(target), "size": size, "verify": True}
+    assert app.write_scheduled_job(job, progress.append, lambda: False)
+
+    assert job["sha256"] and progress[-1] == 2 * size
+    assert [estimator.phase for estimator in estimators] == ["write", "verify"]
+    assert all(estimator.snapshot()["finished"] for estimator in estimators)  # sem ETA/vazão pendurada
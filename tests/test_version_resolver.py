@@ -0,0 +1,81 @@
+"""Provedores de versões contra um servidor HTTP local: o prazo vale para a busca inteira"""
+
+import http.server
+import threading
+import time
+
+import pytest
+
+from bootable_usb_creator_final import VersionResolver
+
+pytest.importorskip("requests")
+
+TIMEOUT = 1.0
+
+
+class FixtureHandler(http.server.BaseHTTPRequestHandler):
+    """/ubuntu/: índice na hora; /debian/...: índice mandado um byte a cada 50 ms"""
+
+    def do_GET(self):
+        if self.path.startswith("/ubuntu/"):
+            body = b'<a href="24.04/">24.04/</a> <a href="25.10/">25.10/</a>'
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        body = b'<a href="12.4.0/">12.4.0/</a>' + b" " * 200
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            for byte in body:
+                self.wfile.write(bytes([byte]))
+                self.wfile.flush()
+                time.sleep(0.05)
+        except OSError:
+            pass  # o cliente desistiu no prazo
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_slow_drip_mirror_is_cut_at_the_deadline(server, tmp_path):
+    resolver = VersionResolver(
+        tmp_path / "versions.json", timeout=TIMEOUT, log=lambda message: None,
+        base_urls={"Ubuntu": f"{server}/ubuntu/", "Debian": f"{server}/debian/"},
+    )
+
+    start = time.monotonic()
+    results = resolver.fetch_many(["Ubuntu", "Debian"], force=True)
+    waited = time.monotonic() - start
+    resolver._executor.shutdown(wait=True)  # o provedor lento também tem de largar a thread
+    released = time.monotonic() - start
+
+    assert results == {"Ubuntu": ["25.10", "24.04 LTS"], "Debian": None}
+    assert waited < TIMEOUT + 0.5
+    assert released < TIMEOUT + 0.5  # sem o prazo, as duas páginas do Debian levariam mais de 20 s
+
+
+def test_provider_deadline_spans_all_index_pages(server):
+    resolver = VersionResolver("/nonexistent/versions.json", timeout=TIMEOUT, log=lambda message: None,
+                               base_urls={"Debian": f"{server}/debian/"})
+    provider = resolver.providers["Debian"]
+    assert len(provider.index_paths) == 2
+
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        provider.fetch(deadline=time.monotonic() + TIMEOUT)
+    assert time.monotonic() - start < TIMEOUT + 0.5
+    resolver.shutdown()
@@ -0,0 +1,142 @@
+"""Fila de gravação com topologia USB simulada: limites por controlador e adaptação pela vazão"""
+
+import threading
+import time
+
+import pytest
+
+from bootable_usb_creator_final import WriteJobScheduler
+
+MB = 1024 * 1024
+
+
+class SimulatedBus:
+    """Cada controlador rende min(banda, pendrives * por_pendrive), dividido entre as gravações ativas"""
+
+    def __init__(self, controllers):
+        self.controllers = controllers  # controlador -> (banda total, por pendrive) em bytes/s
+        self.lock = threading.Lock()
+        self.active = {name: 0 for name in controllers}
+        self.peak = {name: 0 for name in controllers}
+        self.peak_total = 0
+
+    def write_func(self, job, on_progress, cancelled, step=0.01):
+        controller = job["controller"]
+        with self.lock:
+            self.active[controller] += 1
+            self.peak[controller] = max(self.peak[controller], self.active[controller])
+            self.peak_total = max(self.peak_total, sum(self.active.values()))
+        try:
+            done = 0.0
+            while done < job["total"]:
+                if cancelled():
+                    return False
+                time.sleep(step)
+                with self.lock:
+                    bandwidth, per_stick = self.controllers[controller]
+                    count = self.active[controller]
+                    done = min(job["total"], done + min(bandwidth, count * per_stick) / count * step)
+                on_progress(int(done))
+            return True
+        finally:
+            with self.lock:
+                self.active[controller] -= 1
+
+
+@pytest.fixture
+def images(tmp_path):
+    def make(count, size_mb):
+        paths = []
+        for index in range(count):
+            path = tmp_path / f"image{index}.img"
+            with open(path, "wb") as f:
+                f.truncate(size_mb * MB)
+            paths.append(str(path))
+        return paths
+    return make
+
+
+def topology(sticks):
+    """/dev/sdX -> registro no formato de device_topology"""
+    table = {device: {"controller": controller, "hub": f"{controller}-hub", "port_path": device[-1], "speed": speed}
+             for device, controller, speed in sticks}
+    return table.__getitem__
+
+
+def test_fixed_limit_is_per_controller(images):
+    sticks = [(f"/dev/sd{letter}", "usb-a" if index % 2 else "usb-b", 5000) for index, letter in enumerate("bcdefg")]
+    bus = SimulatedBus({"usb-a": (400 * MB, 100 * MB), "usb-b": (400 * MB, 100 * MB)})
+    scheduler = WriteJobScheduler(bus.write_func, max_per_controller=2, adaptive=False,
+                                  topology=topology(sticks), log=lambda message: None)
+    for (device, _, _), image in zip(sticks, images(6, 8)):
+        scheduler.submit(image, device)
+
+    snapshot = scheduler.run()
+
+    assert snapshot["states"] == {"done": 6}
+    assert bus.peak == {"usb-a": 2, "usb-b": 2}
+    assert bus.peak_total == 4  # os dois controladores gravam ao mesmo tempo
+    assert {job["controller"] for job in snapshot["jobs"]} == {"usb-a", "usb-b"}
+
+
+def test_initial_limit_follows_port_speed(images):
+    sticks = [("/dev/sdb", "ehci", 480), ("/dev/sdc", "xhci", 5000)]
+    scheduler = WriteJobScheduler(lambda job, on_progress, cancelled: True, max_per_controller=4,
+                                  topology=topology(sticks), log=lambda message: None)
+    for (device, _, _), image in zip(sticks, images(2, 1)):
+        scheduler.submit(image, device)
+
+    controllers = scheduler.snapshot()["controllers"]
+    assert controllers["ehci"]["limit"] == 1 and controllers["xhci"]["limit"] == 2
+
+
+def test_same_device_is_never_queued_twice(images):
+    sticks = [("/dev/sdb", "xhci", 5000)]
+    scheduler = WriteJobScheduler(lambda job, on_progress, cancelled: True, topology=topology(sticks),
+                                  log=lambda message: None)
+    first, second = images(2, 1)
+
+    assert scheduler.submit(first, "/dev/sdb") is scheduler.submit(second, "/dev/sdb")
+
+
+def test_adaptive_limit_grows_while_it_pays_and_backs_off(images):
+    # Dois pendrives já saturam o controlador: a terceira gravação não rende nada
+    sticks = [(f"/dev/sd{letter}", "hub", 480) for letter in "bcdefg"]
+    bus = SimulatedBus({"hub": (40 * MB, 20 * MB)})
+    messages = []
+    scheduler = WriteJobScheduler(bus.write_func, max_per_controller=4, adapt_interval=0.15, min_gain=0.1,
+                                  topology=topology(sticks), log=messages.append)
+    for (device, _, _), image in zip(sticks, images(6, 12)):
+        scheduler.submit(image, device)
+
+    snapshot = scheduler.run()
+
+    controller = snapshot["controllers"]["hub"]
+    assert snapshot["states"] == {"done": 6}
+    assert {1, 2, 3} <= set(controller["rates"])
+    assert controller["rates"][2] > controller["rates"][1] * 1.5
+    assert controller["limit"] == 2
+    assert bus.peak["hub"] == 3  # testou uma a mais e voltou
+    assert any("📉" in message for message in messages)
+
+
+def test_queued_jobs_get_etas_once_rates_are_known(images):
+    sticks = [(f"/dev/sd{letter}", "hub", 480) for letter in "bcd"]
+    bus = SimulatedBus({"hub": (40 * MB, 40 * MB)})
+    scheduler = WriteJobScheduler(bus.write_func, max_per_controller=1, adaptive=False,
+                                  topology=topology(sticks), log=lambda message: None)
+    for (device, _, _), image in zip(sticks, images(3, 24)):
+        scheduler.submit(image, device)
+    scheduler.start()
+
+    deadline = time.monotonic() + 5
+    snapshot = scheduler.snapshot()
+    while snapshot["eta"] is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+        snapshot = scheduler.snapshot()
+    scheduler.cancel()
+    scheduler.wait()
+
+    queued = [job for job in snapshot["jobs"] if job["state"] == "queued"]
+    assert queued and all(job["eta"] is not None and job["starts_in"] > 0 for job in queued)
+    assert snapshot["eta"] == max(job["eta"] for job in snapshot["jobs"] if job["state"] in ("queued", "running"))